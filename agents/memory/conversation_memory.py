@@ -18,7 +18,7 @@ from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 
 logger = logging.getLogger(__name__)
 
@@ -251,14 +251,13 @@ class Conversation:
             if t.role in [MessageRole.USER, MessageRole.ASSISTANT, MessageRole.SYSTEM]
         ]
 
-    def to_dict(self) -> Dict[str, Any]:
-        return {
+    def to_dict(self, include_turns: bool = True) -> Dict[str, Any]:
+        data = {
             "conversation_id": self.conversation_id,
             "agent_id": self.agent_id,
             "user_id": self.user_id,
             "channel": self.channel,
             "status": self.status.value,
-            "turns": [t.to_dict() for t in self.turns],
             "context": self.context,
             "tags": self.tags,
             "category": self.category,
@@ -269,12 +268,21 @@ class Conversation:
             "summary": self.summary.to_dict() if self.summary else None,
             "analytics": self.analytics.to_dict() if self.analytics else None,
         }
+        if include_turns:
+            data["turns"] = [t.to_dict() for t in self.turns]
+        return data
 
 
 class ConversationMemory:
     """
     Sistema de memória para conversas.
     Gerencia armazenamento, busca e análise de conversas.
+
+    Cache LRU limitado a `max_active_conversations`. No Redis, o cabeçalho
+    da conversa fica em `conversation:{id}` e os turnos numa lista
+    `conversation_turns:{id}`; a persistência é write-behind: mudanças
+    marcam a conversa como suja e uma tarefa em background grava os lotes
+    num único pipeline, acrescentando apenas os turnos novos.
     """
 
     def __init__(
@@ -284,15 +292,26 @@ class ConversationMemory:
         llm_client=None,
         max_active_conversations: int = 1000,
         summarize_after_turns: int = 20,
+        flush_interval: float = 1.0,
+        flush_batch_size: int = 200,
     ):
         self.redis = redis_client
         self.vector_store = vector_store
         self.llm = llm_client
         self.max_active = max_active_conversations
         self.summarize_threshold = summarize_after_turns
+        self.flush_interval = flush_interval
+        self.flush_batch_size = flush_batch_size
 
-        # Cache em memória para conversas ativas
-        self._active_conversations: Dict[str, Conversation] = {}
+        # Cache LRU em memória (mais recente no fim)
+        self._active_conversations: "OrderedDict[str, Conversation]" = OrderedDict()
+
+        # Write-behind: conversas com mudanças pendentes e quantos turnos
+        # de cada uma já estão na lista do Redis
+        self._dirty: Dict[str, Conversation] = {}
+        self._persisted_turns: Dict[str, int] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_wakeup = asyncio.Event()
 
         # Índices
         self._user_conversations: Dict[str, List[str]] = defaultdict(list)
@@ -327,6 +346,9 @@ class ConversationMemory:
         self._agent_conversations[agent_id].append(conversation_id)
         if user_id:
             self._user_conversations[user_id].append(conversation_id)
+        if self.redis:
+            self._persisted_turns[conversation_id] = 0
+        self._mark_dirty(conversation)
 
         # Limpar cache se muito grande
         if len(self._active_conversations) > self.max_active:
@@ -339,7 +361,10 @@ class ConversationMemory:
         """Recupera uma conversa pelo ID"""
         # Primeiro verificar cache
         if conversation_id in self._active_conversations:
+            self._active_conversations.move_to_end(conversation_id)
             return self._active_conversations[conversation_id]
+        if conversation_id in self._dirty:
+            return self._cache(self._dirty[conversation_id])
 
         # Se não estiver no cache, buscar no storage
         return asyncio.get_event_loop().run_until_complete(
@@ -348,11 +373,43 @@ class ConversationMemory:
 
     async def _load_conversation(self, conversation_id: str) -> Optional[Conversation]:
         """Carrega conversa do storage"""
-        if self.redis:
-            data = await self.redis.get(f"conversation:{conversation_id}")
-            if data:
-                return self._deserialize_conversation(json.loads(data))
-        return None
+        conversations = await self._load_conversations([conversation_id])
+        return conversations[0] if conversations else None
+
+    async def _load_conversations(self, conversation_ids: List[str]) -> List[Conversation]:
+        """
+        Carrega várias conversas em dois round-trips: MGET dos cabeçalhos e
+        um pipeline de LRANGE dos turnos. Conversas em memória (cache ou
+        pendentes de gravação) não vão ao Redis.
+        """
+        found: Dict[str, Conversation] = {}
+        missing = []
+        for conv_id in conversation_ids:
+            conv = self._active_conversations.get(conv_id) or self._dirty.get(conv_id)
+            if conv:
+                found[conv_id] = conv
+            else:
+                missing.append(conv_id)
+
+        if missing and self.redis:
+            headers = await self.redis.mget([f"conversation:{cid}" for cid in missing])
+            loaded = [
+                (cid, json.loads(raw)) for cid, raw in zip(missing, headers) if raw
+            ]
+            if loaded:
+                pipe = self.redis.pipeline(transaction=False)
+                for cid, _ in loaded:
+                    pipe.lrange(f"conversation_turns:{cid}", 0, -1)
+                turn_lists = await pipe.execute()
+
+                for (cid, data), raw_turns in zip(loaded, turn_lists):
+                    conv = self._deserialize_conversation(data, raw_turns)
+                    found[cid] = conv
+                    if cid not in self._persisted_turns and "turns" not in data:
+                        self._persisted_turns[cid] = len(raw_turns)
+                    self._cache(conv)
+
+        return [found[cid] for cid in conversation_ids if cid in found]
 
     def add_message(
         self,
@@ -368,6 +425,7 @@ class ConversationMemory:
             return None
 
         turn = conversation.add_turn(role, content, **kwargs)
+        self._mark_dirty(conversation)
 
         # Verificar se precisa sumarizar
         if len(conversation.turns) % self.summarize_threshold == 0:
@@ -408,6 +466,8 @@ class ConversationMemory:
         # Remover do cache ativo
         if conversation_id in self._active_conversations:
             del self._active_conversations[conversation_id]
+        if conversation_id not in self._dirty:
+            self._persisted_turns.pop(conversation_id, None)
 
         logger.info(f"Conversa fechada: {conversation_id} - Status: {status.value}")
         return conversation
@@ -456,15 +516,10 @@ class ConversationMemory:
             filter_metadata={"type": "conversation", **(filters or {})}
         )
 
-        conversations = []
-        for result in results:
-            conv_id = result.get("metadata", {}).get("conversation_id")
-            if conv_id:
-                conv = await self._load_conversation(conv_id)
-                if conv:
-                    conversations.append(conv)
-
-        return conversations
+        conv_ids = [
+            result.get("metadata", {}).get("conversation_id") for result in results
+        ]
+        return await self._load_conversations([cid for cid in conv_ids if cid])
 
     async def get_user_history(
         self,
@@ -473,21 +528,22 @@ class ConversationMemory:
         include_active: bool = True
     ) -> List[Conversation]:
         """Recupera histórico de conversas de um usuário"""
-        conversation_ids = self._user_conversations.get(user_id, [])
+        conversation_ids = set(self._user_conversations.get(user_id, []))
 
         # Buscar também no storage
         if self.redis:
             stored_ids = await self.redis.smembers(f"user_conversations:{user_id}")
-            conversation_ids = list(set(conversation_ids) | set(stored_ids or []))
-
-        conversations = []
-        for conv_id in conversation_ids[-limit:]:
-            conv = await self._load_conversation(conv_id)
-            if conv:
-                if include_active or conv.status != ConversationStatus.ACTIVE:
-                    conversations.append(conv)
+            conversation_ids |= {
+                cid.decode() if isinstance(cid, bytes) else cid
+                for cid in stored_ids or []
+            }
 
-        return sorted(conversations, key=lambda c: c.created_at, reverse=True)
+        conversations = [
+            conv for conv in await self._load_conversations(list(conversation_ids))
+            if include_active or conv.status != ConversationStatus.ACTIVE
+        ]
+        conversations.sort(key=lambda c: c.created_at, reverse=True)
+        return conversations[:limit]
 
     async def get_similar_past_conversations(
         self,
@@ -623,6 +679,10 @@ Responda em JSON."""
                 # Substituir turnos antigos pelo resumo
                 conversation.turns = [system_turn] + conversation.turns[-10:]
 
+                # A lista de turnos no Redis precisa ser reescrita
+                self._persisted_turns.pop(conversation.conversation_id, None)
+                self._mark_dirty(conversation)
+
             except Exception as e:
                 logger.error(f"Erro na sumarização automática: {e}")
 
@@ -789,25 +849,108 @@ Responda em JSON com:
     # ========================================================================
 
     async def _save_conversation(self, conversation: Conversation):
-        """Salva conversa no storage"""
+        """Salva conversa no storage imediatamente (fechamento, escalação)"""
         if self.redis:
-            data = json.dumps(conversation.to_dict())
-            await self.redis.set(
-                f"conversation:{conversation.conversation_id}",
-                data
+            self._dirty[conversation.conversation_id] = conversation
+            await self.flush([conversation.conversation_id])
+
+    def _mark_dirty(self, conversation: Conversation):
+        """Agenda gravação write-behind da conversa"""
+        if not self.redis:
+            return
+        self._dirty[conversation.conversation_id] = conversation
+        if len(self._dirty) >= self.flush_batch_size:
+            self._flush_wakeup.set()
+        self._ensure_flusher()
+
+    async def flush(self, conversation_ids: List[str] = None) -> int:
+        """
+        Grava as conversas pendentes numa única transação: cabeçalho (SET),
+        turnos novos (RPUSH) e índices (SADD). Retorna quantas foram gravadas.
+
+        A lista de turnos é aparada para a contagem já persistida antes do
+        RPUSH: se execute() falhar depois de aplicado (conexão caiu na
+        resposta), a nova tentativa não duplica turnos.
+        """
+        if not self.redis:
+            return 0
+        ids = conversation_ids if conversation_ids is not None else list(self._dirty)
+        batch = [(cid, self._dirty.pop(cid)) for cid in ids if cid in self._dirty]
+        if not batch:
+            return 0
+
+        pipe = self.redis.pipeline(transaction=True)
+        written_turns = {}
+        for conv_id, conversation in batch:
+            pipe.set(
+                f"conversation:{conv_id}",
+                json.dumps(conversation.to_dict(include_turns=False))
             )
 
+            turns_key = f"conversation_turns:{conv_id}"
+            persisted = self._persisted_turns.get(conv_id)
+            if not persisted or persisted > len(conversation.turns):
+                # Nada persistido, turnos reescritos (resumo) ou estado desconhecido
+                pipe.delete(turns_key)
+                persisted = 0
+            else:
+                pipe.ltrim(turns_key, 0, persisted - 1)
+            new_turns = conversation.turns[persisted:]
+            if new_turns:
+                pipe.rpush(turns_key, *[json.dumps(t.to_dict()) for t in new_turns])
+            written_turns[conv_id] = len(conversation.turns)
+
             # Atualizar índices
             if conversation.user_id:
-                await self.redis.sadd(
-                    f"user_conversations:{conversation.user_id}",
-                    conversation.conversation_id
-                )
+                pipe.sadd(f"user_conversations:{conversation.user_id}", conv_id)
+            pipe.sadd(f"agent_conversations:{conversation.agent_id}", conv_id)
 
-            await self.redis.sadd(
-                f"agent_conversations:{conversation.agent_id}",
-                conversation.conversation_id
-            )
+        try:
+            await pipe.execute()
+        except Exception as e:
+            # Devolver ao buffer sem sobrescrever mudanças mais novas
+            for conv_id, conversation in batch:
+                self._dirty.setdefault(conv_id, conversation)
+            logger.warning(f"Falha ao gravar conversas: {e}")
+            return 0
+
+        for conv_id, count in written_turns.items():
+            if conv_id in self._active_conversations or conv_id in self._dirty:
+                self._persisted_turns[conv_id] = count
+            else:
+                self._persisted_turns.pop(conv_id, None)
+        return len(batch)
+
+    def _ensure_flusher(self):
+        if self._flush_task is not None:
+            return
+        try:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+        except RuntimeError:
+            pass
+
+    async def _flush_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._flush_wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"Erro no write-behind de conversas: {e}")
+
+    async def close(self):
+        """Para a tarefa de gravação e grava o que estiver pendente"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
 
     async def _index_conversation(self, conversation: Conversation):
         """Indexa conversa no vector store para busca"""
@@ -853,21 +996,40 @@ Responda em JSON com:
         hash_input = f"{agent_id}:{timestamp}"
         return hashlib.sha256(hash_input.encode()).hexdigest()[:16]
 
-    def _cleanup_old_conversations(self):
-        """Remove conversas antigas do cache"""
-        # Ordenar por última atualização
-        sorted_convs = sorted(
-            self._active_conversations.items(),
-            key=lambda x: x[1].updated_at
-        )
+    def _cache(self, conversation: Conversation) -> Conversation:
+        """Coloca a conversa no cache LRU como a mais recente"""
+        self._active_conversations[conversation.conversation_id] = conversation
+        self._active_conversations.move_to_end(conversation.conversation_id)
+        if len(self._active_conversations) > self.max_active:
+            self._cleanup_old_conversations()
+        return conversation
 
-        # Remover metade mais antiga
-        to_remove = len(sorted_convs) // 2
-        for conv_id, _ in sorted_convs[:to_remove]:
-            if self._active_conversations[conv_id].status != ConversationStatus.ACTIVE:
-                del self._active_conversations[conv_id]
+    def _cleanup_old_conversations(self):
+        """
+        Remove do cache as conversas menos usadas até caber no limite.
+        Conversas ativas nunca saem: add_message/close_conversation as
+        buscam de forma síncrona e não podem ir ao Redis dentro do loop.
+        """
+        excess = len(self._active_conversations) - self.max_active
+        if excess <= 0:
+            return
 
-    def _deserialize_conversation(self, data: Dict[str, Any]) -> Conversation:
+        for conv_id in list(self._active_conversations):
+            if excess <= 0:
+                break
+            conversation = self._active_conversations[conv_id]
+            if conversation.status == ConversationStatus.ACTIVE:
+                continue
+            del self._active_conversations[conv_id]
+            if conv_id not in self._dirty:
+                self._persisted_turns.pop(conv_id, None)
+            excess -= 1
+
+    def _deserialize_conversation(
+        self,
+        data: Dict[str, Any],
+        raw_turns: List[Any] = None
+    ) -> Conversation:
         """Deserializa conversa do JSON"""
         conversation = Conversation(
             conversation_id=data["conversation_id"],
@@ -883,9 +1045,11 @@ Responda em JSON com:
             updated_at=datetime.fromisoformat(data["updated_at"]),
         )
 
-        # Deserializar turnos
+        # Deserializar turnos (formato antigo embutido + lista de turnos)
         for turn_data in data.get("turns", []):
             conversation.turns.append(ConversationTurn.from_dict(turn_data))
+        for raw in raw_turns or []:
+            conversation.turns.append(ConversationTurn.from_dict(json.loads(raw)))
 
         return conversation
 
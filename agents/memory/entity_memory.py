@@ -14,6 +14,8 @@ import asyncio
 import json
 import logging
 import hashlib
+import re
+import unicodedata
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Set, Tuple
 from dataclasses import dataclass, field
@@ -261,6 +263,254 @@ class Entity:
         return entity
 
 
+# ============================================================================
+# ÍNDICE DE RESOLUÇÃO DE ENTIDADES
+# ============================================================================
+
+# Partículas ignoradas nas chaves de bloco ("Maria da Silva" ~ "Maria Silva")
+NAME_STOPWORDS = {"da", "de", "do", "das", "dos", "e"}
+
+# Atributos tratados como identificadores externos (além de external_ids)
+IDENTIFIER_ATTRIBUTES = ("cpf", "rg", "cnpj", "placa", "email", "telefone")
+
+# Substituições fonéticas aplicadas em ordem (português simplificado)
+_PHONETIC_RULES = [
+    (re.compile(r"ch|sh"), "x"),
+    (re.compile(r"lh"), "l"),
+    (re.compile(r"nh"), "n"),
+    (re.compile(r"ph"), "f"),
+    (re.compile(r"qu(?=[ei])|q"), "k"),
+    (re.compile(r"gu(?=[ei])"), "g"),
+    (re.compile(r"g(?=[ei])"), "j"),
+    (re.compile(r"c(?=[ei])"), "s"),
+    (re.compile(r"z"), "s"),
+    (re.compile(r"(?<=[aeiou])s(?=[aeiou])"), "z"),
+    (re.compile(r"c"), "k"),
+    (re.compile(r"y"), "i"),
+    (re.compile(r"w"), "v"),
+    (re.compile(r"h"), ""),
+    (re.compile(r"m$"), "n"),
+    (re.compile(r"(.)\1+"), r"\1"),
+]
+
+
+def normalize_name(text: str) -> str:
+    """Minúsculas, sem acentos e só com letras/dígitos separados por espaço"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    plain = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(re.findall(r"[a-z0-9]+", plain.lower()))
+
+
+def phonetic_key(token: str) -> str:
+    """
+    Código fonético simplificado para português.
+    Mantém a primeira letra e o esqueleto consonantal após as
+    substituições (ch/x, ç/s, qu/k...): "Luiz" e "Luis" -> "ls".
+    """
+    if not token or token.isdigit():
+        return token
+    for pattern, replacement in _PHONETIC_RULES:
+        token = pattern.sub(replacement, token)
+    if not token:
+        return ""
+    head, tail = token[0], re.sub(r"[aeiou]", "", token[1:])
+    return re.sub(r"(.)\1+", r"\1", head + tail)
+
+
+def normalize_identifier(value: Any) -> str:
+    """Identificador externo só com letras e dígitos (CPF, placa...)"""
+    return re.sub(r"[^0-9A-Z]", "", normalize_name(str(value)).upper())
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class EntityResolutionIndex:
+    """
+    Índice de resolução de entidades (blocking).
+
+    Cada entidade recebe chaves de bloco por tipo: tokens do nome e
+    aliases, seus códigos fonéticos, o código fonético do nome completo e
+    identificadores externos normalizados. Só entidades que compartilham
+    algum bloco viram pares candidatos, então a deduplicação é quase
+    linear em vez de comparar todos os pares.
+
+    Também mantém um índice de trigramas para a busca fuzzy por nome.
+    """
+
+    def __init__(self, max_block_size: int = 200):
+        # Blocos maiores que isso (ex.: token "maria") são ignorados na
+        # geração de pares; nomes completos e identificadores nunca são.
+        self.max_block_size = max_block_size
+
+        self._blocks: Dict[str, Set[str]] = defaultdict(set)
+        self._keys_by_entity: Dict[str, Set[str]] = {}
+
+        self._trigrams: Dict[str, Set[str]] = defaultdict(set)
+        self._grams_by_entity: Dict[str, Set[str]] = {}
+        self._names_by_entity: Dict[str, List[str]] = {}
+
+        self.last_candidate_pairs = 0
+        self.last_skipped_blocks = 0
+
+    def __len__(self) -> int:
+        return len(self._keys_by_entity)
+
+    def __contains__(self, entity_id: str) -> bool:
+        return entity_id in self._keys_by_entity
+
+    # ==================== Manutenção ====================
+
+    def add(self, entity: "Entity") -> None:
+        """Indexa (ou reindexa) a entidade"""
+        self.remove(entity.entity_id)
+
+        names = [normalize_name(n) for n in [entity.name] + list(entity.aliases)]
+        names = [n for n in dict.fromkeys(names) if n]
+
+        keys = self._blocking_keys(entity, names)
+        for key in keys:
+            self._blocks[key].add(entity.entity_id)
+        self._keys_by_entity[entity.entity_id] = keys
+
+        grams: Set[str] = set()
+        for name in names:
+            grams |= _trigrams(f" {name} ")
+        for gram in grams:
+            self._trigrams[gram].add(entity.entity_id)
+        self._grams_by_entity[entity.entity_id] = grams
+        self._names_by_entity[entity.entity_id] = names
+
+    def remove(self, entity_id: str) -> None:
+        for key in self._keys_by_entity.pop(entity_id, ()):
+            block = self._blocks.get(key)
+            if block is not None:
+                block.discard(entity_id)
+                if not block:
+                    del self._blocks[key]
+        for gram in self._grams_by_entity.pop(entity_id, ()):
+            postings = self._trigrams.get(gram)
+            if postings is not None:
+                postings.discard(entity_id)
+                if not postings:
+                    del self._trigrams[gram]
+        self._names_by_entity.pop(entity_id, None)
+
+    def _blocking_keys(self, entity: "Entity", names: List[str]) -> Set[str]:
+        prefix = entity.entity_type.value
+        keys: Set[str] = set()
+
+        for name in names:
+            tokens = [t for t in name.split() if t not in NAME_STOPWORDS]
+            codes = [phonetic_key(t) for t in tokens]
+            if codes:
+                keys.add(f"{prefix}|f:{' '.join(codes)}")
+            for token, code in zip(tokens, codes):
+                if len(token) >= 2:
+                    keys.add(f"{prefix}|n:{token}")
+                    keys.add(f"{prefix}|p:{code}")
+
+        identifiers = dict(entity.external_ids)
+        for attr_name in IDENTIFIER_ATTRIBUTES:
+            attr = entity.attributes.get(attr_name)
+            if attr is not None and attr.value and attr_name not in identifiers:
+                identifiers[attr_name] = attr.value
+        for id_type, id_value in identifiers.items():
+            value = normalize_identifier(id_value)
+            if value:
+                keys.add(f"{prefix}|x:{id_type}:{value}")
+
+        return keys
+
+    # ==================== Consultas ====================
+
+    def candidate_pairs(self, entity_type: Optional[EntityType] = None) -> Set[Tuple[str, str]]:
+        """Pares (id1, id2) que compartilham algum bloco, com id1 < id2"""
+        prefix = f"{entity_type.value}|" if entity_type else None
+        pairs: Set[Tuple[str, str]] = set()
+        skipped = 0
+
+        for key, block in self._blocks.items():
+            if len(block) < 2:
+                continue
+            if prefix and not key.startswith(prefix):
+                continue
+            kind = key.split("|", 1)[1][:2]
+            if len(block) > self.max_block_size and kind in ("n:", "p:"):
+                skipped += 1
+                continue
+            members = sorted(block)
+            for i, first in enumerate(members):
+                for second in members[i + 1:]:
+                    pairs.add((first, second))
+
+        self.last_candidate_pairs = len(pairs)
+        self.last_skipped_blocks = skipped
+        return pairs
+
+    def substring_matches(self, query: str) -> Set[str]:
+        """
+        IDs cujo nome ou alias contém a query (normalizada).
+        Interseção das listas de trigramas da query, da menor para a maior,
+        seguida de verificação. Queries com menos de 3 caracteres não têm
+        trigramas e caem na varredura dos nomes indexados.
+        """
+        query = normalize_name(query)
+        if not query:
+            return set()
+        grams = _trigrams(query)
+
+        if grams:
+            postings = sorted((self._trigrams.get(g, set()) for g in grams), key=len)
+            candidates = set(postings[0])
+            for other in postings[1:]:
+                if not candidates:
+                    break
+                candidates &= other
+        else:
+            candidates = set(self._names_by_entity)
+
+        return {
+            entity_id for entity_id in candidates
+            if any(query in name for name in self._names_by_entity.get(entity_id, ()))
+        }
+
+    def similar(self, query: str, min_similarity: float = 0.5, limit: int = 20) -> List[Tuple[str, float]]:
+        """
+        Entidades com nome parecido (coeficiente de Dice sobre trigramas),
+        tolerando erros de digitação. Retorna [(entity_id, score)] ordenado.
+        """
+        grams = _trigrams(f" {normalize_name(query)} ")
+        if not grams:
+            return []
+
+        shared: Dict[str, int] = defaultdict(int)
+        for gram in grams:
+            for entity_id in self._trigrams.get(gram, ()):
+                shared[entity_id] += 1
+
+        scored = []
+        for entity_id, count in shared.items():
+            score = 2.0 * count / (len(grams) + len(self._grams_by_entity[entity_id]))
+            if score >= min_similarity:
+                scored.append((entity_id, score))
+
+        # Empates pelo id: o corte em `limit` não depende da ordem do set
+        scored.sort(key=lambda x: (-x[1], x[0]))
+        return scored[:limit]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "indexed_entities": len(self._keys_by_entity),
+            "blocks": len(self._blocks),
+            "largest_block": max((len(b) for b in self._blocks.values()), default=0),
+            "trigrams": len(self._trigrams),
+            "last_candidate_pairs": self.last_candidate_pairs,
+            "last_skipped_blocks": self.last_skipped_blocks,
+        }
+
+
 class EntityMemory:
     """
     Sistema de memória para entidades.
@@ -284,6 +534,7 @@ class EntityMemory:
         self._by_type: Dict[EntityType, Set[str]] = defaultdict(set)
         self._by_name: Dict[str, Set[str]] = defaultdict(set)  # name_lower -> entity_ids
         self._by_external_id: Dict[str, str] = {}  # external_id -> entity_id
+        self._resolution = EntityResolutionIndex()  # blocking + trigramas
 
         # Contexto de conversa para resolução de referências
         self._conversation_context: Dict[str, List[str]] = defaultdict(list)  # conv_id -> entity_ids mencionados
@@ -393,7 +644,10 @@ class EntityMemory:
         entity_type: EntityType = None,
         fuzzy: bool = False
     ) -> List[Entity]:
-        """Busca entidades por nome"""
+        """
+        Busca entidades por nome, ordenadas por (score, entity_id): match
+        exato ou por substring vale 1.0; fuzzy usa a similaridade.
+        """
         name_lower = name.lower().strip()
         results = []
 
@@ -403,23 +657,27 @@ class EntityMemory:
                 entity = self.get_entity(entity_id)
                 if entity and entity.status == EntityStatus.ACTIVE:
                     if entity_type is None or entity.entity_type == entity_type:
-                        results.append(entity)
+                        results.append((1.0, entity))
 
         # Busca fuzzy se não encontrou
         if fuzzy and not results:
-            for entity in self._entities.values():
-                if entity.status != EntityStatus.ACTIVE:
+            scored = [
+                (entity_id, 1.0) for entity_id in self._resolution.substring_matches(name)
+            ]
+            if not scored:
+                # Nenhum nome contém a query: tolerar erros de digitação
+                scored = self._resolution.similar(name)
+
+            for entity_id, score in scored:
+                entity = self._entities.get(entity_id)
+                if not entity or entity.status != EntityStatus.ACTIVE:
                     continue
                 if entity_type and entity.entity_type != entity_type:
                     continue
+                results.append((score, entity))
 
-                # Verificar nome e aliases
-                if name_lower in entity.name.lower() or any(
-                    name_lower in alias.lower() for alias in entity.aliases
-                ):
-                    results.append(entity)
-
-        return results
+        results.sort(key=lambda r: (-r[0], r[1].entity_id))
+        return [entity for _, entity in results]
 
     def find_by_type(
         self,
@@ -723,25 +981,24 @@ Responda apenas com o número da opção correta (1, 2, etc.) ou 0 se nenhum cor
         entity_type: EntityType = None,
         threshold: float = 0.8
     ) -> List[Tuple[Entity, Entity, float]]:
-        """Encontra possíveis entidades duplicadas"""
+        """
+        Encontra possíveis entidades duplicadas.
+        Só compara pares que compartilham um bloco do índice de resolução
+        (token, código fonético, nome completo ou identificador externo).
+        """
         duplicates = []
-        entities = list(self._entities.values())
 
-        for i, entity1 in enumerate(entities):
-            if entity1.status != EntityStatus.ACTIVE:
+        for id1, id2 in self._resolution.candidate_pairs(entity_type):
+            entity1 = self._entities.get(id1)
+            entity2 = self._entities.get(id2)
+            if not entity1 or not entity2:
                 continue
-            if entity_type and entity1.entity_type != entity_type:
+            if entity1.status != EntityStatus.ACTIVE or entity2.status != EntityStatus.ACTIVE:
                 continue
 
-            for entity2 in entities[i+1:]:
-                if entity2.status != EntityStatus.ACTIVE:
-                    continue
-                if entity1.entity_type != entity2.entity_type:
-                    continue
-
-                score = self._calculate_similarity(entity1, entity2)
-                if score >= threshold:
-                    duplicates.append((entity1, entity2, score))
+            score = self._calculate_similarity(entity1, entity2)
+            if score >= threshold:
+                duplicates.append((entity1, entity2, score))
 
         return sorted(duplicates, key=lambda x: x[2], reverse=True)
 
@@ -764,7 +1021,8 @@ Responda apenas com o número da opção correta (1, 2, etc.) ou 0 se nenhum cor
 
         # External IDs em comum
         for id_type, id_value in entity1.external_ids.items():
-            if entity2.external_ids.get(id_type) == id_value:
+            other_value = entity2.external_ids.get(id_type)
+            if other_value is not None and normalize_identifier(other_value) == normalize_identifier(id_value):
                 score += 5.0  # IDs iguais são forte indicador
                 weights_total += 5.0
                 break
@@ -781,21 +1039,31 @@ Responda apenas com o número da opção correta (1, 2, etc.) ou 0 se nenhum cor
         return score / weights_total if weights_total > 0 else 0.0
 
     def _string_similarity(self, s1: str, s2: str) -> float:
-        """Calcula similaridade entre strings (Jaccard básico)"""
-        s1_lower = s1.lower()
-        s2_lower = s2.lower()
+        """
+        Calcula similaridade entre strings (Jaccard em palavras).
+        Compara sem acentos e, com peso menor, pelos códigos fonéticos
+        ("Luiz Souza" ~ "Luis Sousa").
+        """
+        s1_norm = normalize_name(s1)
+        s2_norm = normalize_name(s2)
 
-        if s1_lower == s2_lower:
+        if s1_norm == s2_norm:
             return 1.0
 
         # Jaccard em palavras
-        words1 = set(s1_lower.split())
-        words2 = set(s2_lower.split())
+        words1 = set(s1_norm.split())
+        words2 = set(s2_norm.split())
 
         intersection = len(words1 & words2)
         union = len(words1 | words2)
+        lexical = intersection / union if union > 0 else 0.0
+
+        codes1 = {phonetic_key(w) for w in words1}
+        codes2 = {phonetic_key(w) for w in words2}
+        union = len(codes1 | codes2)
+        phonetic = 0.9 * len(codes1 & codes2) / union if union > 0 else 0.0
 
-        return intersection / union if union > 0 else 0.0
+        return max(lexical, phonetic)
 
     # ========================================================================
     # PERSISTÊNCIA E ÍNDICES
@@ -846,6 +1114,9 @@ Responda apenas com o número da opção correta (1, 2, etc.) ou 0 se nenhum cor
 
     def _update_indices(self, entity: Entity):
         """Atualiza índices de busca"""
+        # Resolução (reindexa nome, aliases e identificadores atuais)
+        self._resolution.add(entity)
+
         # Por tipo
         self._by_type[entity.entity_type].add(entity.entity_id)
 
@@ -860,6 +1131,7 @@ Responda apenas com o número da opção correta (1, 2, etc.) ou 0 se nenhum cor
 
     def _remove_from_indices(self, entity: Entity):
         """Remove entidade dos índices"""
+        self._resolution.remove(entity.entity_id)
         self._by_type[entity.entity_type].discard(entity.entity_id)
         self._by_name[entity.name.lower()].discard(entity.entity_id)
         for alias in entity.aliases:
@@ -906,4 +1178,5 @@ Responda apenas com o número da opção correta (1, 2, etc.) ou 0 se nenhum cor
             "total_mentions": sum(e.mention_count for e in self._entities.values()),
             "indexed_names": len(self._by_name),
             "indexed_external_ids": len(self._by_external_id),
+            "resolution_index": self._resolution.get_stats(),
         }
@@ -21,6 +21,8 @@ from dataclasses import dataclass, field
 from enum import Enum
 from collections import defaultdict
 
+from .text_index import InvertedIndex
+
 logger = logging.getLogger(__name__)
 
 
@@ -269,6 +271,9 @@ class KnowledgeBase:
     Gerencia armazenamento, busca e manutenção de conhecimento.
     """
 
+    # Pesos dos campos na busca textual (BM25F)
+    SEARCH_FIELDS = {"title": 3.0, "keywords": 2.0, "tags": 1.5, "content": 1.0}
+
     def __init__(
         self,
         redis_client=None,
@@ -288,6 +293,7 @@ class KnowledgeBase:
         self._by_category: Dict[KnowledgeCategory, Set[str]] = defaultdict(set)
         self._by_keyword: Dict[str, Set[str]] = defaultdict(set)
         self._by_tag: Dict[str, Set[str]] = defaultdict(set)
+        self._text_index = InvertedIndex(self.SEARCH_FIELDS)
 
     # ========================================================================
     # CRUD
@@ -408,46 +414,29 @@ class KnowledgeBase:
         limit: int = 10,
         active_only: bool = True
     ) -> List[KnowledgeItem]:
-        """Busca conhecimento por texto"""
-        results = []
-        query_lower = query.lower()
-        query_words = set(query_lower.split())
+        """
+        Busca conhecimento por texto.
+        Usa o índice invertido (BM25F com peso maior para título e
+        keywords); categoria e tags filtram pelos bitsets do índice.
+        """
+        facets = {}
+        if category:
+            facets["category"] = category.value
+        if tags:
+            facets["tags"] = tags
 
-        for item in self._items.values():
-            if active_only and not item.is_valid():
-                continue
-            if category and item.category != category:
+        results = []
+        for knowledge_id, _ in self._text_index.search(query, facets=facets):
+            item = self._items.get(knowledge_id)
+            if not item:
                 continue
-            if tags and not any(t in item.tags for t in tags):
+            if active_only and not item.is_valid():
                 continue
+            results.append(item)
+            if len(results) >= limit:
+                break
 
-            # Calcular relevância
-            score = 0
-
-            # Match no título
-            if query_lower in item.title.lower():
-                score += 10
-            elif any(w in item.title.lower() for w in query_words):
-                score += 5
-
-            # Match no conteúdo
-            content_lower = item.content.lower()
-            if query_lower in content_lower:
-                score += 5
-            else:
-                word_matches = sum(1 for w in query_words if w in content_lower)
-                score += word_matches
-
-            # Match em keywords
-            keyword_matches = sum(1 for k in item.keywords if k.lower() in query_lower)
-            score += keyword_matches * 3
-
-            if score > 0:
-                results.append((item, score))
-
-        # Ordenar por relevância
-        results.sort(key=lambda x: x[1], reverse=True)
-        return [item for item, _ in results[:limit]]
+        return results
 
     async def semantic_search(
         self,
@@ -793,6 +782,17 @@ Responda de forma clara e direta. Se a informação não estiver no conhecimento
         """Atualiza índices"""
         self._by_category[item.category].add(item.knowledge_id)
 
+        self._text_index.add(
+            item.knowledge_id,
+            {
+                "title": item.title,
+                "keywords": item.keywords,
+                "tags": item.tags,
+                "content": item.content,
+            },
+            facets={"category": [item.category.value], "tags": item.tags},
+        )
+
         for keyword in item.keywords:
             self._by_keyword[keyword.lower()].add(item.knowledge_id)
 
@@ -802,6 +802,7 @@ Responda de forma clara e direta. Se a informação não estiver no conhecimento
     def _remove_from_indices(self, item: KnowledgeItem):
         """Remove item dos índices"""
         self._by_category[item.category].discard(item.knowledge_id)
+        self._text_index.remove(item.knowledge_id)
 
         for keyword in item.keywords:
             self._by_keyword[keyword.lower()].discard(item.knowledge_id)
@@ -861,4 +862,5 @@ Responda de forma clara e direta. Se a informação não estiver no conhecimento
             "by_status": dict(status_counts),
             "total_keywords": len(self._by_keyword),
             "total_tags": len(self._by_tag),
+            "text_index": self._text_index.get_stats(),
         }
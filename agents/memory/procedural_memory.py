@@ -15,11 +15,13 @@ import json
 import logging
 import hashlib
 from datetime import datetime, timedelta
-from typing import Dict, List, Any, Optional, Callable
+from typing import Dict, List, Any, Optional, Callable, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
 from collections import defaultdict
 
+from .text_index import InvertedIndex
+
 logger = logging.getLogger(__name__)
 
 
@@ -313,6 +315,9 @@ class ProceduralMemory:
     Gerencia armazenamento, execução e aprendizado de procedimentos.
     """
 
+    # Pesos dos campos na busca por contexto (BM25F)
+    SEARCH_FIELDS = {"triggers": 5.0, "contexts": 3.0, "name": 2.0, "description": 1.0}
+
     def __init__(
         self,
         redis_client=None,
@@ -331,6 +336,7 @@ class ProceduralMemory:
         self._by_type: Dict[ProcedureType, set] = defaultdict(set)
         self._by_trigger: Dict[str, set] = defaultdict(set)
         self._by_context: Dict[str, set] = defaultdict(set)
+        self._text_index = InvertedIndex(self.SEARCH_FIELDS)
 
         # Habilidades aprendidas
         self._agent_skills: Dict[str, Dict[str, SkillLevel]] = defaultdict(dict)
@@ -600,33 +606,23 @@ class ProceduralMemory:
     def find_procedure_for_context(
         self,
         context: str,
-        agent_id: str = None
+        agent_id: str = None,
+        procedure_type: ProcedureType = None
     ) -> List[Tuple[Procedure, float]]:
-        """Encontra procedimentos adequados para o contexto"""
+        """
+        Encontra procedimentos adequados para o contexto.
+        Relevância textual pelo índice invertido (triggers e contextos com
+        peso maior), mais bônus por taxa de sucesso e skill do agente.
+        """
         results = []
-        context_lower = context.lower()
+        facets = {"type": procedure_type.value} if procedure_type else None
 
-        for procedure in self._procedures.values():
-            if not procedure.active:
+        for procedure_id, text_score in self._text_index.search(context, facets=facets):
+            procedure = self._procedures.get(procedure_id)
+            if not procedure or not procedure.active:
                 continue
 
-            score = 0
-
-            # Match em triggers
-            for trigger in procedure.triggers:
-                if trigger.lower() in context_lower:
-                    score += 5
-
-            # Match em contextos
-            for ctx in procedure.contexts:
-                if ctx.lower() in context_lower:
-                    score += 3
-
-            # Match no nome/descrição
-            if any(word in procedure.name.lower() for word in context_lower.split()):
-                score += 2
-            if any(word in procedure.description.lower() for word in context_lower.split()):
-                score += 1
+            score = text_score
 
             # Bonus por taxa de sucesso
             score += procedure.success_rate * 2
@@ -654,7 +650,7 @@ class ProceduralMemory:
     ) -> List[Tuple[Procedure, float]]:
         """Busca semântica de procedimentos"""
         if not self.vector_store:
-            results = self.find_procedure_for_context(query)
+            results = self.find_procedure_for_context(query, procedure_type=procedure_type)
             return results[:limit]
 
         filters = {"type": "procedure"}
@@ -820,6 +816,17 @@ class ProceduralMemory:
         for ctx in procedure.contexts:
             self._by_context[ctx.lower()].add(procedure.procedure_id)
 
+        self._text_index.add(
+            procedure.procedure_id,
+            {
+                "triggers": procedure.triggers,
+                "contexts": procedure.contexts,
+                "name": procedure.name,
+                "description": procedure.description,
+            },
+            facets={"type": [procedure.procedure_type.value]},
+        )
+
     # ========================================================================
     # UTILITÁRIOS
     # ========================================================================
@@ -847,4 +854,5 @@ class ProceduralMemory:
             "by_type": dict(type_counts),
             "total_executions": len(self._executions),
             "agents_with_skills": len(self._agent_skills),
+            "text_index": self._text_index.get_stats(),
         }
@@ -14,11 +14,12 @@ import asyncio
 import json
 import logging
 import hashlib
+import heapq
 from datetime import datetime, timedelta
 from typing import Dict, List, Any, Optional, Set, Tuple
 from dataclasses import dataclass, field
 from enum import Enum
-from collections import defaultdict
+from collections import defaultdict, deque
 
 logger = logging.getLogger(__name__)
 
@@ -322,6 +323,240 @@ class Relationship:
         return rel
 
 
+# ============================================================================
+# GRAFO COMPACTO
+# ============================================================================
+
+class RelationshipGraph:
+    """
+    Núcleo de grafo para análises sobre os relacionamentos.
+
+    Nós são indexados por inteiros e cada nó guarda listas de índices de
+    arestas (saída e entrada). Por nó são mantidos incrementalmente:
+    contagem de arestas, soma das forças e vizinhos distintos das arestas
+    ativas. Assim grau e força média são O(1) e travessias não passam por
+    dicionários de strings nem por objetos Relationship.
+
+    A atividade da aresta é avaliada ao indexar; relacionamentos com
+    validade temporal (valid_from/valid_until) são reavaliados em
+    `refresh_validity`, chamado antes das análises.
+    """
+
+    def __init__(self):
+        # Nós
+        self._index: Dict[str, int] = {}
+        self._nodes: List[str] = []
+        self._out: List[List[int]] = []  # nó -> arestas de saída
+        self._in: List[List[int]] = []  # nó -> arestas de entrada
+
+        # Agregados por nó (arestas ativas, nos dois sentidos)
+        self._active_degree: List[int] = []
+        self._strength_sum: List[float] = []
+        self._neighbors: List[Dict[int, int]] = []  # vizinho -> multiplicidade
+
+        # Arestas
+        self._edge_by_rel: Dict[str, int] = {}
+        self._edge_rel: List[Relationship] = []
+        self._edge_src: List[int] = []
+        self._edge_dst: List[int] = []
+        self._edge_active: List[bool] = []
+        self._edge_strength: List[float] = []
+        self._timed_edges: Set[int] = set()
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    @property
+    def edge_count(self) -> int:
+        return len(self._edge_rel)
+
+    # ==================== Manutenção ====================
+
+    def _node(self, entity_id: str) -> int:
+        node = self._index.get(entity_id)
+        if node is None:
+            node = len(self._nodes)
+            self._index[entity_id] = node
+            self._nodes.append(entity_id)
+            self._out.append([])
+            self._in.append([])
+            self._active_degree.append(0)
+            self._strength_sum.append(0.0)
+            self._neighbors.append({})
+        return node
+
+    def upsert(self, rel: Relationship, now: Optional[datetime] = None) -> None:
+        """Indexa ou atualiza a aresta do relacionamento"""
+        src = self._node(rel.source_id)
+        dst = self._node(rel.target_id)
+        edge = self._edge_by_rel.get(rel.relationship_id)
+
+        if edge is None:
+            edge = len(self._edge_rel)
+            self._edge_by_rel[rel.relationship_id] = edge
+            self._edge_rel.append(rel)
+            self._edge_src.append(src)
+            self._edge_dst.append(dst)
+            self._edge_active.append(False)
+            self._edge_strength.append(0.0)
+            self._out[src].append(edge)
+            self._in[dst].append(edge)
+        else:
+            self._set_active(edge, False)
+            self._edge_rel[edge] = rel
+            if (self._edge_src[edge], self._edge_dst[edge]) != (src, dst):
+                self._out[self._edge_src[edge]].remove(edge)
+                self._in[self._edge_dst[edge]].remove(edge)
+                self._edge_src[edge] = src
+                self._edge_dst[edge] = dst
+                self._out[src].append(edge)
+                self._in[dst].append(edge)
+
+        if rel.valid_from or rel.valid_until:
+            self._timed_edges.add(edge)
+        else:
+            self._timed_edges.discard(edge)
+
+        self._edge_strength[edge] = rel.strength
+        self._set_active(edge, self._is_active(rel, now))
+
+    def refresh_validity(self, now: Optional[datetime] = None) -> None:
+        """Reavalia arestas com janela de validade"""
+        now = now or datetime.now()
+        for edge in self._timed_edges:
+            active = self._is_active(self._edge_rel[edge], now)
+            if active != self._edge_active[edge]:
+                self._set_active(edge, active)
+
+    @staticmethod
+    def _is_active(rel: Relationship, now: Optional[datetime]) -> bool:
+        if rel.status != RelationshipStatus.ACTIVE:
+            return False
+        now = now or datetime.now()
+        if rel.valid_from and now < rel.valid_from:
+            return False
+        if rel.valid_until and now > rel.valid_until:
+            return False
+        return True
+
+    def _set_active(self, edge: int, active: bool) -> None:
+        if self._edge_active[edge] == active:
+            return
+        self._edge_active[edge] = active
+        sign = 1 if active else -1
+        src, dst = self._edge_src[edge], self._edge_dst[edge]
+        strength = self._edge_strength[edge]
+
+        for node, other in ((src, dst), (dst, src)) if src != dst else ((src, src),):
+            self._active_degree[node] += sign
+            self._strength_sum[node] += sign * strength
+            neighbors = self._neighbors[node]
+            count = neighbors.get(other, 0) + sign
+            if count:
+                neighbors[other] = count
+            else:
+                neighbors.pop(other, None)
+
+    # ==================== Consultas ====================
+
+    def has_node(self, entity_id: str) -> bool:
+        return entity_id in self._index
+
+    def node_stats(self, entity_id: str) -> Tuple[int, int, int, float]:
+        """(saídas, entradas, arestas ativas, força média das ativas)"""
+        node = self._index.get(entity_id)
+        if node is None:
+            return 0, 0, 0, 0.0
+        active = self._active_degree[node]
+        avg = self._strength_sum[node] / active if active else 0.0
+        return len(self._out[node]), len(self._in[node]), active, avg
+
+    def shortest_path(self, source_id: str, target_id: str, max_depth: int) -> Optional[List[Relationship]]:
+        """
+        BFS pelas arestas de saída ativas com deque e ponteiros para a
+        aresta pai; o caminho só é montado ao encontrar o destino.
+        """
+        src = self._index.get(source_id)
+        dst = self._index.get(target_id)
+        if src is None or dst is None or max_depth <= 0:
+            return None
+
+        parent_edge: Dict[int, int] = {src: -1}
+        queue = deque([(src, 0)])
+
+        while queue:
+            node, depth = queue.popleft()
+            if depth >= max_depth:
+                continue
+
+            for edge in self._out[node]:
+                if not self._edge_active[edge]:
+                    continue
+                nxt = self._edge_dst[edge]
+                if nxt in parent_edge:
+                    continue
+                parent_edge[nxt] = edge
+                if nxt == dst:
+                    return self._build_path(parent_edge, dst)
+                queue.append((nxt, depth + 1))
+
+        return None
+
+    def _build_path(self, parent_edge: Dict[int, int], node: int) -> List[Relationship]:
+        path = []
+        edge = parent_edge[node]
+        while edge != -1:
+            path.append(self._edge_rel[edge])
+            edge = parent_edge[self._edge_src[edge]]
+        path.reverse()
+        return path
+
+    def components(self, min_neighbors: int) -> List[Set[str]]:
+        """
+        Componentes conexos (union-find) do subgrafo das entidades com ao
+        menos `min_neighbors` vizinhos distintos por arestas ativas.
+        """
+        qualifies = [len(n) >= min_neighbors for n in self._neighbors]
+        parent = list(range(len(self._nodes)))
+        size = [1] * len(self._nodes)
+
+        def find(x: int) -> int:
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        for edge, active in enumerate(self._edge_active):
+            if not active:
+                continue
+            a, b = self._edge_src[edge], self._edge_dst[edge]
+            if not (qualifies[a] and qualifies[b]):
+                continue
+            ra, rb = find(a), find(b)
+            if ra == rb:
+                continue
+            if size[ra] < size[rb]:
+                ra, rb = rb, ra
+            parent[rb] = ra
+            size[ra] += size[rb]
+
+        groups: Dict[int, Set[str]] = defaultdict(set)
+        for node, ok in enumerate(qualifies):
+            if ok:
+                groups[find(node)].add(self._nodes[node])
+        return list(groups.values())
+
+    def top_by_influence(self, limit: int) -> List[Tuple[str, float]]:
+        """Maiores scores de influência (conexões e força média), O(n log k)"""
+        def score(node: int) -> float:
+            active = self._active_degree[node]
+            avg = self._strength_sum[node] / active if active else 0.0
+            return (len(self._out[node]) + len(self._in[node])) * 0.5 + avg * 10
+
+        best = heapq.nlargest(limit, range(len(self._nodes)), key=score)
+        return [(self._nodes[node], score(node)) for node in best]
+
+
 class RelationshipMemory:
     """
     Sistema de memória para relacionamentos.
@@ -344,6 +579,7 @@ class RelationshipMemory:
         self._incoming: Dict[str, Set[str]] = defaultdict(set)  # target -> relationship_ids
         self._by_type: Dict[RelationshipType, Set[str]] = defaultdict(set)
         self._by_pair: Dict[str, str] = {}  # "source:target" -> relationship_id
+        self._graph = RelationshipGraph()  # travessias e agregados por entidade
 
     # ========================================================================
     # CRUD DE RELACIONAMENTOS
@@ -540,26 +776,8 @@ class RelationshipMemory:
         if source_id == target_id:
             return []
 
-        visited = {source_id}
-        queue = [(source_id, [])]
-
-        while queue:
-            current_id, path = queue.pop(0)
-
-            if len(path) >= max_depth:
-                continue
-
-            for rel in self.get_relationships_of(current_id, direction="outgoing"):
-                next_id = rel.target_id
-
-                if next_id == target_id:
-                    return path + [rel]
-
-                if next_id not in visited:
-                    visited.add(next_id)
-                    queue.append((next_id, path + [rel]))
-
-        return None
+        self._graph.refresh_validity()
+        return self._graph.shortest_path(source_id, target_id, max_depth)
 
     def get_mutual_connections(
         self,
@@ -608,6 +826,7 @@ class RelationshipMemory:
                 bidirectional=True
             )
             rel.add_interaction(interaction)
+            self._store_relationship(rel)
 
         return interaction
 
@@ -634,14 +853,11 @@ class RelationshipMemory:
 
     def get_network_stats(self, entity_id: str) -> Dict[str, Any]:
         """Estatísticas de rede de uma entidade"""
-        outgoing = len(self._outgoing.get(entity_id, set()))
-        incoming = len(self._incoming.get(entity_id, set()))
+        self._graph.refresh_validity()
+        outgoing, incoming, _, avg_strength = self._graph.node_stats(entity_id)
 
         relationships = self.get_relationships_of(entity_id)
 
-        total_strength = sum(r.strength for r in relationships)
-        avg_strength = total_strength / len(relationships) if relationships else 0
-
         by_type = defaultdict(int)
         for rel in relationships:
             by_type[rel.relationship_type.value] += 1
@@ -659,57 +875,21 @@ class RelationshipMemory:
         self,
         min_connections: int = 3
     ) -> List[Set[str]]:
-        """Identifica clusters/comunidades"""
-        clusters = []
-        visited = set()
-
-        for entity_id in list(self._outgoing.keys()) + list(self._incoming.keys()):
-            if entity_id in visited:
-                continue
-
-            # BFS para encontrar cluster
-            cluster = set()
-            queue = [entity_id]
-
-            while queue:
-                current = queue.pop(0)
-                if current in visited:
-                    continue
-
-                visited.add(current)
-
-                connections = self.get_related_entities(current)
-                if len(connections) >= min_connections:
-                    cluster.add(current)
-                    for conn in connections:
-                        if conn not in visited:
-                            queue.append(conn)
-
-            if len(cluster) >= min_connections:
-                clusters.append(cluster)
-
-        return clusters
+        """
+        Identifica clusters/comunidades: componentes conexos entre entidades
+        com ao menos `min_connections` conexões ativas distintas.
+        """
+        self._graph.refresh_validity()
+        return [
+            cluster for cluster in self._graph.components(min_connections)
+            if len(cluster) >= min_connections
+        ]
 
     def get_influential_entities(self, limit: int = 10) -> List[Tuple[str, float]]:
         """Identifica entidades mais influentes (por conexões)"""
-        influence_scores = {}
-
-        for entity_id in set(self._outgoing.keys()) | set(self._incoming.keys()):
-            stats = self.get_network_stats(entity_id)
-            # Score baseado em conexões e força média
-            score = (
-                stats["total_connections"] * 0.5 +
-                stats["avg_relationship_strength"] * 10
-            )
-            influence_scores[entity_id] = score
-
-        sorted_entities = sorted(
-            influence_scores.items(),
-            key=lambda x: x[1],
-            reverse=True
-        )
-
-        return sorted_entities[:limit]
+        # Score baseado em conexões e força média (agregados incrementais)
+        self._graph.refresh_validity()
+        return self._graph.top_by_influence(limit)
 
     def suggest_connections(
         self,
@@ -779,6 +959,7 @@ class RelationshipMemory:
         self._incoming[rel.target_id].add(rel.relationship_id)
         self._by_type[rel.relationship_type].add(rel.relationship_id)
         self._by_pair[f"{rel.source_id}:{rel.target_id}"] = rel.relationship_id
+        self._graph.upsert(rel)
 
     # ========================================================================
     # UTILITÁRIOS
@@ -812,7 +993,7 @@ class RelationshipMemory:
 
         return {
             "total_relationships": len(self._relationships),
-            "unique_entities": len(set(self._outgoing.keys()) | set(self._incoming.keys())),
+            "unique_entities": len(self._graph),
             "by_type": dict(type_counts),
             "by_status": dict(status_counts),
             "active_relationships": status_counts.get("active", 0),
@@ -11,6 +11,8 @@ Funcionalidades:
 """
 
 import asyncio
+import bisect
+import heapq
 import json
 import logging
 import hashlib
@@ -259,11 +261,14 @@ class TemporalEvent:
             "all_day": self.all_day,
             "recurring": self.recurring,
             "location": self.location,
+            "location_id": self.location_id,
             "organizer": self.organizer,
             "participants": self.participants,
             "reminders": self.reminders,
+            "notifications_sent": [n.isoformat() for n in self.notifications_sent],
             "description": self.description,
             "tags": self.tags,
+            "metadata": self.metadata,
             "created_at": self.created_at.isoformat(),
         }
 
@@ -279,9 +284,13 @@ class TemporalEvent:
             all_day=data.get("all_day", False),
             recurring=data.get("recurring", False),
             location=data.get("location"),
+            location_id=data.get("location_id"),
             organizer=data.get("organizer"),
             participants=data.get("participants", []),
             reminders=data.get("reminders", []),
+            notifications_sent=[
+                datetime.fromisoformat(n) for n in data.get("notifications_sent", [])
+            ],
             description=data.get("description", ""),
             tags=data.get("tags", []),
             metadata=data.get("metadata", {}),
@@ -310,6 +319,60 @@ class CalendarEntry:
         return len(self.events)
 
 
+class IntervalIndex:
+    """
+    Índice de intervalos ordenado por início (bisect).
+
+    Mantém (início, fim, event_id) ordenados e a maior duração vista.
+    Um intervalo que sobrepõe [start, end) começa em
+    [start - maior_duracao, end), então a consulta é uma busca binária
+    seguida de varredura só dos candidatos: O(log n + k).
+    """
+
+    def __init__(self):
+        self._entries: List[Tuple[datetime, datetime, str]] = []
+        self._max_duration = timedelta(0)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, start: datetime, end: datetime, event_id: str) -> None:
+        bisect.insort(self._entries, (start, end, event_id))
+        if end - start > self._max_duration:
+            self._max_duration = end - start
+
+    def remove(self, start: datetime, end: datetime, event_id: str) -> None:
+        entry = (start, end, event_id)
+        i = bisect.bisect_left(self._entries, entry)
+        if i < len(self._entries) and self._entries[i] == entry:
+            del self._entries[i]
+
+    def overlapping(self, start: datetime, end: datetime) -> List[Tuple[datetime, datetime, str]]:
+        """Intervalos que sobrepõem [start, end), ordenados por início"""
+        lo = bisect.bisect_left(self._entries, (start - self._max_duration,))
+        hi = bisect.bisect_left(self._entries, (end,))
+        return [entry for entry in self._entries[lo:hi] if entry[1] > start]
+
+    def starting_between(self, start: datetime, end: datetime) -> List[Tuple[datetime, datetime, str]]:
+        """Intervalos com início em [start, end), ordenados por início"""
+        lo = bisect.bisect_left(self._entries, (start,))
+        hi = bisect.bisect_left(self._entries, (end,))
+        return self._entries[lo:hi]
+
+    def free_gaps(self, start: datetime, end: datetime) -> List[Tuple[datetime, datetime]]:
+        """Intervalos livres em [start, end) em uma única varredura"""
+        gaps = []
+        cursor = start
+        for busy_start, busy_end, _ in self.overlapping(start, end):
+            if busy_start > cursor:
+                gaps.append((cursor, busy_start))
+            if busy_end > cursor:
+                cursor = busy_end
+        if cursor < end:
+            gaps.append((cursor, end))
+        return gaps
+
+
 class TemporalMemory:
     """
     Sistema de memória temporal.
@@ -334,14 +397,23 @@ class TemporalMemory:
         self._by_participant: Dict[str, set] = defaultdict(set)
         self._by_location: Dict[str, set] = defaultdict(set)
 
+        # Índices de intervalos (eventos não cancelados): geral e por local
+        self._intervals = IntervalIndex()
+        self._intervals_by_location: Dict[str, IntervalIndex] = defaultdict(IntervalIndex)
+        self._indexed_intervals: Dict[str, Tuple[datetime, datetime, Optional[str]]] = {}
+
         # Padrões detectados
         self._detected_patterns: Dict[str, Dict[str, Any]] = {}
 
         # Feriados
         self._holidays: Dict[date, str] = {}
 
-        # Task de reminder
+        # Lembretes: heap de (horário, event_id, minutos_antes) com remoção
+        # preguiçosa; entradas obsoletas são descartadas ao sair do heap
         self._reminder_task: Optional[asyncio.Task] = None
+        self._reminder_heap: List[Tuple[datetime, str, int]] = []
+        self._armed_reminders: set = set()
+        self._reminder_wakeup = asyncio.Event()
 
     # ========================================================================
     # GESTÃO DE EVENTOS
@@ -464,14 +536,15 @@ class TemporalMemory:
         if not event:
             return None
 
+        # Remover dos índices antigos
+        self._remove_from_indices(event)
+
         old_start = event.start_time
         event.start_time = new_start
         event.end_time = new_start + timedelta(minutes=event.duration_minutes)
         event.status = EventStatus.RESCHEDULED
         event.metadata["original_start"] = old_start.isoformat()
 
-        # Atualizar índices
-        self._remove_from_indices(event)
         self._store_event(event)
 
         return event
@@ -500,14 +573,11 @@ class TemporalMemory:
         end_date: date
     ) -> List[TemporalEvent]:
         """Lista eventos em um período"""
-        events = []
-        current = start_date
-
-        while current <= end_date:
-            events.extend(self.get_events_for_date(current))
-            current += timedelta(days=1)
-
-        return events
+        entries = self._intervals.starting_between(
+            datetime.combine(start_date, time.min),
+            datetime.combine(end_date + timedelta(days=1), time.min)
+        )
+        return [self._events[event_id] for _, _, event_id in entries if event_id in self._events]
 
     def get_upcoming_events(
         self,
@@ -576,20 +646,11 @@ class TemporalMemory:
         location_id: str = None
     ) -> Dict[str, Any]:
         """Verifica disponibilidade de horário"""
-        slot = TimeSlot(start=start_time, end=end_time)
-        conflicts = []
-
-        for event in self._events.values():
-            if event.status == EventStatus.CANCELLED:
-                continue
-
-            # Verificar localização se especificada
-            if location_id and event.location_id != location_id:
-                continue
-
-            event_slot = event.get_time_slot()
-            if slot.overlaps(event_slot):
-                conflicts.append(event)
+        conflicts = [
+            self._events[event_id]
+            for _, _, event_id in self._interval_index(location_id).overlapping(start_time, end_time)
+            if event_id in self._events
+        ]
 
         return {
             "available": len(conflicts) == 0,
@@ -605,28 +666,53 @@ class TemporalMemory:
         end_hour: int = 18,
         location_id: str = None
     ) -> List[TimeSlot]:
-        """Encontra slots disponíveis em uma data"""
+        """Encontra slots disponíveis em uma data (grade de 30 minutos)"""
         available = []
+        duration = timedelta(minutes=duration_minutes)
+        step = timedelta(minutes=30)
 
         # Gerar slots de 30 em 30 minutos
         current = datetime.combine(target_date, time(start_hour, 0))
         end = datetime.combine(target_date, time(end_hour, 0))
 
-        while current + timedelta(minutes=duration_minutes) <= end:
-            slot_end = current + timedelta(minutes=duration_minutes)
-            result = self.check_availability(current, slot_end, location_id)
-
-            if result["available"]:
+        # Percorre a grade e os intervalos livres juntos (sweep line)
+        for gap_start, gap_end in self._interval_index(location_id).free_gaps(current, end):
+            if gap_start > current:
+                current += step * -(-(gap_start - current) // step)
+            while current + duration <= gap_end:
                 available.append(TimeSlot(
                     start=current,
-                    end=slot_end,
+                    end=current + duration,
                     available=True
                 ))
-
-            current += timedelta(minutes=30)
+                current += step
 
         return available
 
+    def find_free_gaps(
+        self,
+        target_date: date,
+        start_hour: int = 8,
+        end_hour: int = 18,
+        location_id: str = None,
+        min_duration_minutes: int = 0
+    ) -> List[TimeSlot]:
+        """Retorna todos os intervalos livres do dia em uma única varredura"""
+        start = datetime.combine(target_date, time(start_hour, 0))
+        end = datetime.combine(target_date, time(end_hour, 0))
+        min_duration = timedelta(minutes=min_duration_minutes)
+
+        return [
+            TimeSlot(start=gap_start, end=gap_end, available=True)
+            for gap_start, gap_end in self._interval_index(location_id).free_gaps(start, end)
+            if gap_end - gap_start >= min_duration
+        ]
+
+    def _interval_index(self, location_id: str = None) -> IntervalIndex:
+        if location_id:
+            return self._intervals_by_location.get(location_id) or IntervalIndex()
+        return self._intervals
+
     def get_next_available_slot(
         self,
         duration_minutes: int,
@@ -734,36 +820,81 @@ class TemporalMemory:
 
     async def start_reminder_service(self):
         """Inicia serviço de lembretes"""
+        await self._restore_reminders()
         self._reminder_task = asyncio.create_task(self._reminder_loop())
 
     async def _reminder_loop(self):
-        """Loop de verificação de lembretes"""
+        """Dorme até o próximo lembrete (ou até ser reagendado)"""
         while True:
             try:
                 await self._check_reminders()
-                await asyncio.sleep(60)  # Verificar a cada minuto
+
+                timeout = None
+                if self._reminder_heap:
+                    timeout = max(0.0, (self._reminder_heap[0][0] - datetime.now()).total_seconds())
+
+                self._reminder_wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._reminder_wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logger.error(f"Erro no serviço de lembretes: {e}")
+                await asyncio.sleep(1)
 
     async def _check_reminders(self):
-        """Verifica e envia lembretes pendentes"""
+        """Envia lembretes vencidos do topo do heap"""
         now = datetime.now()
 
-        for event in self._events.values():
-            if event.status == EventStatus.CANCELLED:
-                continue
-            if event.is_past:
+        while self._reminder_heap and self._reminder_heap[0][0] <= now:
+            entry = heapq.heappop(self._reminder_heap)
+            self._armed_reminders.discard(entry)
+            reminder_time, event_id, minutes_before = entry
+            event = self._events.get(event_id)
+
+            if not self._reminder_valid(event, reminder_time, minutes_before):
                 continue
 
-            for minutes_before in event.reminders:
-                reminder_time = event.start_time - timedelta(minutes=minutes_before)
+            if not event.is_past:
+                await self._send_reminder(event, minutes_before)
+            event.notifications_sent.append(reminder_time)
+            await self._unpersist_reminder(event_id, minutes_before)
+            asyncio.create_task(self._persist_event(event))
+
+    def _reminder_valid(
+        self,
+        event: Optional[TemporalEvent],
+        reminder_time: datetime,
+        minutes_before: int
+    ) -> bool:
+        """Entrada do heap ainda corresponde ao estado atual do evento"""
+        return (
+            event is not None
+            and event.status != EventStatus.CANCELLED
+            and minutes_before in event.reminders
+            and event.start_time - timedelta(minutes=minutes_before) == reminder_time
+            and reminder_time not in event.notifications_sent
+        )
+
+    def _schedule_reminders(self, event: TemporalEvent):
+        """(Re)arma os lembretes pendentes do evento"""
+        if event.status == EventStatus.CANCELLED or event.is_past:
+            return
+
+        earliest = self._reminder_heap[0][0] if self._reminder_heap else None
+        for minutes_before in event.reminders:
+            reminder_time = event.start_time - timedelta(minutes=minutes_before)
+            entry = (reminder_time, event.event_id, minutes_before)
+            if reminder_time in event.notifications_sent or entry in self._armed_reminders:
+                continue
+            heapq.heappush(self._reminder_heap, entry)
+            self._armed_reminders.add(entry)
 
-                # Verificar se está na hora e ainda não foi enviado
-                if now >= reminder_time and reminder_time not in event.notifications_sent:
-                    await self._send_reminder(event, minutes_before)
-                    event.notifications_sent.append(reminder_time)
+        # Acorda o loop se o próximo lembrete mudou
+        if self._reminder_heap and self._reminder_heap[0][0] != earliest:
+            self._reminder_wakeup.set()
 
     async def _send_reminder(self, event: TemporalEvent, minutes_before: int):
         """Envia lembrete de evento"""
@@ -782,10 +913,60 @@ class TemporalMemory:
 
         logger.info(f"Lembrete enviado: {event.event_id} ({minutes_before}min antes)")
 
+    async def _persist_reminders(self, event: TemporalEvent):
+        """Persiste lembretes pendentes (sorted set por horário)"""
+        if not self.redis:
+            return
+        members = {
+            f"{event.event_id}:{minutes_before}": (
+                event.start_time - timedelta(minutes=minutes_before)
+            ).timestamp()
+            for minutes_before in event.reminders
+        }
+        if event.status == EventStatus.CANCELLED or not members:
+            if members:
+                await self.redis.zrem("reminders:schedule", *members)
+            return
+        await self.redis.zadd("reminders:schedule", members)
+
+    async def _unpersist_reminder(self, event_id: str, minutes_before: int):
+        if self.redis:
+            await self.redis.zrem("reminders:schedule", f"{event_id}:{minutes_before}")
+
+    async def _restore_reminders(self):
+        """Recarrega lembretes pendentes após reinício"""
+        if not self.redis:
+            return
+        try:
+            members = await self.redis.zrange("reminders:schedule", 0, -1)
+        except Exception as e:
+            logger.warning(f"Erro ao restaurar lembretes: {e}")
+            return
+
+        restored = 0
+        for member in members:
+            if isinstance(member, bytes):
+                member = member.decode()
+            event_id, _, minutes = member.rpartition(":")
+            event = self._events.get(event_id) or await self._load_event(event_id)
+            if not event or int(minutes) not in event.reminders:
+                await self.redis.zrem("reminders:schedule", member)
+                continue
+            reminder_time = event.start_time - timedelta(minutes=int(minutes))
+            entry = (reminder_time, event_id, int(minutes))
+            if self._reminder_valid(event, reminder_time, int(minutes)) and entry not in self._armed_reminders:
+                heapq.heappush(self._reminder_heap, entry)
+                self._armed_reminders.add(entry)
+                restored += 1
+
+        if restored:
+            logger.info(f"{restored} lembretes restaurados")
+
     def stop_reminder_service(self):
         """Para serviço de lembretes"""
         if self._reminder_task:
             self._reminder_task.cancel()
+            self._reminder_task = None
 
     # ========================================================================
     # FERIADOS
@@ -822,7 +1003,10 @@ class TemporalMemory:
         """Armazena evento"""
         self._events[event.event_id] = event
         self._update_indices(event)
+        self._schedule_reminders(event)
         asyncio.create_task(self._persist_event(event))
+        if event.reminders:
+            asyncio.create_task(self._persist_reminders(event))
 
     async def _persist_event(self, event: TemporalEvent):
         """Persiste evento"""
@@ -859,6 +1043,18 @@ class TemporalMemory:
         if event.location_id:
             self._by_location[event.location_id].add(event.event_id)
 
+        # Intervalos (cancelados não ocupam horário)
+        self._remove_interval(event.event_id)
+        if event.status != EventStatus.CANCELLED:
+            self._intervals.add(event.start_time, event.end_time, event.event_id)
+            if event.location_id:
+                self._intervals_by_location[event.location_id].add(
+                    event.start_time, event.end_time, event.event_id
+                )
+            self._indexed_intervals[event.event_id] = (
+                event.start_time, event.end_time, event.location_id
+            )
+
     def _remove_from_indices(self, event: TemporalEvent):
         """Remove dos índices"""
         event_date = event.start_time.date()
@@ -873,6 +1069,18 @@ class TemporalMemory:
         if event.location_id:
             self._by_location[event.location_id].discard(event.event_id)
 
+        self._remove_interval(event.event_id)
+
+    def _remove_interval(self, event_id: str):
+        """Remove o intervalo indexado do evento (posição em que foi indexado)"""
+        indexed = self._indexed_intervals.pop(event_id, None)
+        if not indexed:
+            return
+        start, end, location_id = indexed
+        self._intervals.remove(start, end, event_id)
+        if location_id and location_id in self._intervals_by_location:
+            self._intervals_by_location[location_id].remove(start, end, event_id)
+
     # ========================================================================
     # UTILITÁRIOS
     # ========================================================================
@@ -891,5 +1099,6 @@ class TemporalMemory:
             "past_events": len([e for e in self._events.values() if e.is_past]),
             "recurring_patterns": len(self._patterns),
             "holidays_loaded": len(self._holidays),
+            "pending_reminders": len(self._reminder_heap),
             "events_today": len(self.get_events_for_date(now.date())),
         }
@@ -0,0 +1,244 @@
+"""
+Conecta Plus - Text Index
+Índice invertido em memória compartilhado pelas memórias de agentes
+
+Funcionalidades:
+- Normalização para português (minúsculas, sem acentos, stopwords, plurais)
+- Campos com pesos (título, keywords, triggers...)
+- Ranking BM25F
+- Manutenção incremental em add/remove
+- Filtros por facetas (categoria, tags) como bitsets
+"""
+
+import math
+import re
+import unicodedata
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple, Union
+
+STOPWORDS = {
+    "de", "da", "do", "das", "dos", "em", "no", "na", "nos", "nas",
+    "um", "uma", "uns", "umas", "o", "a", "os", "as", "e", "ou",
+    "para", "pra", "por", "com", "sem", "que", "se", "nao", "mais", "muito",
+    "como", "quando", "onde", "qual", "quais", "isso", "este", "esta",
+    "esse", "essa", "aquele", "aquela", "ao", "aos", "me", "meu", "minha",
+    "eu", "ele", "ela", "sao", "foi", "ser", "ter", "tem", "ha",
+}
+
+# Redução de plural (passo de plural do RSLP, simplificado)
+_PLURAL_RULES = [
+    ("oes", "ao"), ("aes", "ao"), ("ais", "al"), ("eis", "el"),
+    ("ois", "ol"), ("ns", "m"), ("res", "r"), ("zes", "z"), ("les", "l"),
+]
+
+FieldValue = Union[str, Iterable[str]]
+
+
+def normalize_text(text: str) -> str:
+    """Minúsculas e sem acentos"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def stem(token: str) -> str:
+    """Remove o plural: "portões" -> "portao", "vagas" -> "vaga" """
+    if len(token) <= 3 or not token.endswith("s"):
+        return token
+    for suffix, replacement in _PLURAL_RULES:
+        if token.endswith(suffix):
+            return token[:-len(suffix)] + replacement
+    if token.endswith("is") or token.endswith("us") or token.endswith("ss"):
+        return token
+    return token[:-1]
+
+
+def tokenize(text: str) -> List[str]:
+    """Tokens normalizados, sem stopwords e sem plural"""
+    return [
+        stem(token)
+        for token in re.findall(r"[a-z0-9]+", normalize_text(text))
+        if token not in STOPWORDS and len(token) > 1
+    ]
+
+
+class InvertedIndex:
+    """
+    Índice invertido com ranking BM25F.
+
+    Cada documento recebe um número interno (reaproveitado após remoção)
+    e, por termo, a lista de postings guarda as frequências em cada
+    campo. A busca só visita os postings dos termos da query; filtros por
+    faceta são bitsets (inteiros) testados por número de documento.
+    """
+
+    def __init__(self, fields: Dict[str, float], k1: float = 1.2, b: float = 0.75):
+        self.fields = list(fields)
+        self.boosts = [fields[f] for f in self.fields]
+        self.k1 = k1
+        self.b = b
+
+        # Documentos
+        self._docno: Dict[str, int] = {}
+        self._doc_ids: List[Optional[str]] = []
+        self._free: List[int] = []
+        self._lengths: List[List[int]] = []
+        self._total_lengths = [0] * len(self.fields)
+
+        # termo -> docno -> frequência por campo
+        self._postings: Dict[str, Dict[int, List[int]]] = defaultdict(dict)
+        self._doc_terms: Dict[int, Set[str]] = {}
+
+        # (faceta, valor) -> bitset de docnos
+        self._facets: Dict[Tuple[str, str], int] = defaultdict(int)
+        self._doc_facets: Dict[int, List[Tuple[str, str]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._docno)
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._docno
+
+    # ==================== Manutenção ====================
+
+    def add(
+        self,
+        doc_id: str,
+        fields: Dict[str, FieldValue],
+        facets: Dict[str, Iterable[str]] = None,
+    ) -> None:
+        """Indexa (ou reindexa) um documento"""
+        self.remove(doc_id)
+
+        if self._free:
+            docno = self._free.pop()
+            self._doc_ids[docno] = doc_id
+        else:
+            docno = len(self._doc_ids)
+            self._doc_ids.append(doc_id)
+            self._lengths.append([])
+        self._docno[doc_id] = docno
+
+        frequencies: Dict[str, List[int]] = {}
+        lengths = [0] * len(self.fields)
+        for i, name in enumerate(self.fields):
+            value = fields.get(name)
+            if not value:
+                continue
+            text = value if isinstance(value, str) else " ".join(value)
+            tokens = tokenize(text)
+            lengths[i] = len(tokens)
+            for token in tokens:
+                tf = frequencies.get(token)
+                if tf is None:
+                    tf = frequencies[token] = [0] * len(self.fields)
+                tf[i] += 1
+
+        for token, tf in frequencies.items():
+            self._postings[token][docno] = tf
+        self._doc_terms[docno] = set(frequencies)
+        self._lengths[docno] = lengths
+        for i, length in enumerate(lengths):
+            self._total_lengths[i] += length
+
+        keys = []
+        for facet, values in (facets or {}).items():
+            if isinstance(values, str):
+                values = [values]
+            for value in values:
+                key = (facet, str(value).lower())
+                self._facets[key] |= 1 << docno
+                keys.append(key)
+        self._doc_facets[docno] = keys
+
+    def remove(self, doc_id: str) -> None:
+        docno = self._docno.pop(doc_id, None)
+        if docno is None:
+            return
+
+        for token in self._doc_terms.pop(docno, ()):
+            postings = self._postings.get(token)
+            if postings is not None:
+                postings.pop(docno, None)
+                if not postings:
+                    del self._postings[token]
+
+        for i, length in enumerate(self._lengths[docno]):
+            self._total_lengths[i] -= length
+        self._lengths[docno] = []
+
+        bit = ~(1 << docno)
+        for key in self._doc_facets.pop(docno, ()):
+            self._facets[key] &= bit
+            if not self._facets[key]:
+                del self._facets[key]
+
+        self._doc_ids[docno] = None
+        self._free.append(docno)
+
+    # ==================== Consultas ====================
+
+    def facet_mask(self, facets: Dict[str, Union[str, Iterable[str]]]) -> int:
+        """
+        Bitset dos documentos que atendem os filtros: valores da mesma
+        faceta são combinados com OU e facetas diferentes com E.
+        """
+        mask = -1
+        for facet, values in facets.items():
+            if values is None:
+                continue
+            if isinstance(values, str):
+                values = [values]
+            facet_mask = 0
+            for value in values:
+                facet_mask |= self._facets.get((facet, str(value).lower()), 0)
+            mask &= facet_mask
+        return mask
+
+    def search(
+        self,
+        query: str,
+        facets: Dict[str, Union[str, Iterable[str]]] = None,
+        limit: Optional[int] = None,
+    ) -> List[Tuple[str, float]]:
+        """Retorna [(doc_id, score)] ordenado por relevância BM25F"""
+        terms = set(tokenize(query))
+        if not terms or not self._docno:
+            return []
+
+        mask = self.facet_mask(facets) if facets else -1
+        if mask == 0:
+            return []
+
+        n_docs = len(self._docno)
+        avg_lengths = [max(total / n_docs, 1.0) for total in self._total_lengths]
+        scores: Dict[int, float] = defaultdict(float)
+
+        for term in terms:
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+
+            for docno, tf in postings.items():
+                if mask != -1 and not (mask >> docno) & 1:
+                    continue
+                lengths = self._lengths[docno]
+                weighted = 0.0
+                for i, freq in enumerate(tf):
+                    if freq:
+                        norm = 1 - self.b + self.b * lengths[i] / avg_lengths[i]
+                        weighted += self.boosts[i] * freq / norm
+                scores[docno] += idf * weighted / (self.k1 + weighted)
+
+        ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [(self._doc_ids[docno], score) for docno, score in ranked]
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "documents": len(self._docno),
+            "terms": len(self._postings),
+            "postings": sum(len(p) for p in self._postings.values()),
+            "facet_values": len(self._facets),
+        }
@@ -6,12 +6,13 @@ Agente autônomo de monitoramento e correção do sistema
 
 import os
 import sys
-import time
 import json
 import yaml
+import signal
+import asyncio
 import logging
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 from pathlib import Path
 
 # Adicionar diretório ao path
@@ -49,6 +50,7 @@ from skills.failure_predictor import FailurePredictor
 from skills.health_score_evolutivo import EvolutionaryHealthScore
 from skills.forensic_audit import ForensicAudit
 from skills.contextual_healer import ContextualHealer
+from skills.cycle_executor import CycleExecutor
 
 # Importar MCPs
 from mcps.logs_mcp import LogsMCP
@@ -59,6 +61,24 @@ from mcps.code_analyzer_mcp import CodeAnalyzerMCP
 class SystemMonitorAgent:
     """Agente autônomo de monitoramento do sistema"""
 
+    # Checks pesados: chave em test_results -> (skill, método)
+    TEST_SKILLS = {
+        'load_tests': ('load_tester', 'test_endpoints'),
+        'integration_tests': ('integration_tester', 'run_all_tests'),
+        'edge_case_tests': ('edge_case_tester', 'run_all_tests'),
+        'security_audit': ('security_auditor', 'run_all_audits'),
+        'production_validation': ('production_validator', 'run_all_validations'),
+        'database_health': ('database_monitor', 'check_all_databases'),
+        'container_health': ('container_monitor', 'run_full_check'),
+        'agent_health': ('agent_monitor', 'run_full_check'),
+        'network_health': ('network_monitor', 'run_full_check'),
+        'frontend_health': ('frontend_monitor', 'run_full_check'),
+        'backup_status': ('backup_validator', 'run_full_validation'),
+        'filesystem_status': ('filesystem_watcher', 'run_full_check'),
+        'api_performance': ('api_profiler', 'run_full_profile'),
+        'cache_health': ('cache_monitor', 'run_full_check'),
+    }
+
     def __init__(self, config_path: str = '/opt/conecta-plus/agents/system-monitor/config.yaml'):
         # Carregar configuração
         with open(config_path) as f:
@@ -100,13 +120,22 @@ class SystemMonitorAgent:
         self.failure_predictor = FailurePredictor(self.config)
         self.health_score_evolutivo = EvolutionaryHealthScore(self.config)
         self.forensic_audit = ForensicAudit(self.config)
-        self.contextual_healer = ContextualHealer(self.config)
+        self.contextual_healer = ContextualHealer(
+            self.config,
+            audit=self.forensic_audit,
+            memory=self.operational_memory,
+            predictor=self.failure_predictor
+        )
 
         # Inicializar MCPs
         self.logs_mcp = LogsMCP()
         self.metrics_mcp = MetricsMCP()
         self.code_mcp = CodeAnalyzerMCP()
 
+        # Executor assíncrono do ciclo (paralelismo, timeouts e cadência)
+        self.executor = CycleExecutor(self.config)
+        self._register_cycle_skills()
+
         # Estado
         self.running = False
         self.iteration = 0
@@ -114,6 +143,7 @@ class SystemMonitorAgent:
         self.total_gaps_detected = 0
         self.total_tests_run = 0
         self.total_tests_passed = 0
+        self._tests_counted_at = 0.0
 
         self.logger.info(f"System Monitor Agent v{self.config['agent']['version']} initialized")
         self.logger.info("Loaded 28 skills + 3 MCPs (vNEXT: Correlation, Prediction, Contextual Healing enabled!)")
@@ -134,10 +164,37 @@ class SystemMonitorAgent:
 
         self.logger = logging.getLogger('SystemMonitor')
 
+    def _register_cycle_skills(self):
+        """Registra as skills independentes no executor do ciclo"""
+        # Checks rápidos: todo ciclo
+        self.executor.register('log_analysis', self.log_analyzer.analyze_all_logs, cadence=10, timeout=15)
+        self.executor.register('metrics', self.metrics_mcp.get_system_info, cadence=10, timeout=5)
+        self.executor.register('gap_detection', self.gap_detector.detect_all_gaps, cadence=10, timeout=20)
+
+        # Checks pesados: a cada 10 minutos, resultado em cache entre ciclos
+        for key, (skill, method) in self.TEST_SKILLS.items():
+            self.executor.register(
+                key, getattr(getattr(self, skill), method),
+                cadence=600, timeout=120, group='heavy'
+            )
+
     def run_monitoring_cycle(self) -> Dict[str, Any]:
         """
         Executa um ciclo completo de monitoramento
 
+        Returns:
+            Resultado do ciclo
+        """
+        return asyncio.run(self.run_monitoring_cycle_async())
+
+    async def run_monitoring_cycle_async(self) -> Dict[str, Any]:
+        """
+        Executa um ciclo completo de monitoramento
+
+        Fase 1: logs, gaps, métricas e checks pesados em paralelo (com
+        timeout e cadência por skill). Fase 2: correlação, predição,
+        healing e score, que dependem dos resultados da fase 1.
+
         Returns:
             Resultado do ciclo
         """
@@ -157,9 +214,25 @@ class SystemMonitorAgent:
         }
 
         try:
+            # 0. Executar skills independentes em paralelo
+            gaps_enabled = self.config.get('gap_detection', {}).get('enabled', True)
+            independent = ['log_analysis', 'metrics']
+            if gaps_enabled:
+                independent.append('gap_detection')
+            independent.extend(self.TEST_SKILLS)
+
+            gaps_due = gaps_enabled and self.executor.is_due('gap_detection')
+
+            self.logger.info(f"0. Running {len(independent)} independent skills concurrently...")
+            results = await self.executor.run(independent)
+
             # 1. Analisar logs
             self.logger.info("1. Analyzing logs...")
-            cycle_result['log_analysis'] = self.log_analyzer.analyze_all_logs()
+            cycle_result['log_analysis'] = results['log_analysis']
+
+            # Métricas coletadas na fase 1: já alimentam correlação e predição
+            metrics = results['metrics']
+            cycle_result['metrics'] = metrics if 'cpu' in metrics else {}
 
             log_summary = cycle_result['log_analysis']
             self.logger.info(
@@ -168,9 +241,10 @@ class SystemMonitorAgent:
             )
 
             # 2. Detectar gaps
-            if self.config.get('gap_detection', {}).get('enabled', True):
+            if gaps_enabled:
                 self.logger.info("2. Detecting gaps...")
-                cycle_result['gaps'] = self.gap_detector.detect_all_gaps()
+                # Cópia: o resultado em cache não é alterado pela priorização
+                cycle_result['gaps'] = dict(results['gap_detection'])
 
                 # 2.1 Aplicar priorização inteligente (P1-P4)
                 gaps_list = cycle_result['gaps'].get('gaps', [])
@@ -185,12 +259,18 @@ class SystemMonitorAgent:
                         priority_counts[p] += 1
                 cycle_result['gaps']['by_priority'] = priority_counts
 
-                self.total_gaps_detected += cycle_result['gaps'].get('total_gaps', 0)
+                if gaps_due:
+                    self.total_gaps_detected += cycle_result['gaps'].get('total_gaps', 0)
                 self.logger.info(
                     f"   Detected {cycle_result['gaps'].get('total_gaps', 0)} gaps "
                     f"(P1:{priority_counts['P1']} P2:{priority_counts['P2']} P3:{priority_counts['P3']} P4:{priority_counts['P4']})"
                 )
 
+            # Checks pesados (cache entre ciclos, recalculados a cada 10 min)
+            test_results, tests_refreshed = self._collect_test_results(results)
+            if test_results:
+                cycle_result['test_results'] = test_results
+
             # 3. VNEXT: Correlação e Análise Inteligente
             self.logger.info("3. vNEXT: Intelligent correlation analysis...")
 
@@ -308,17 +388,14 @@ class SystemMonitorAgent:
                     f"   Applied {len(fixes)} total fixes ({validated_fixes} validated)"
                 )
 
-            # 5. Coletar métricas
-            self.logger.info("5. Collecting system metrics...")
-            cycle_result['metrics'] = self.metrics_mcp.get_system_info()
+            # 5. Verificar thresholds das métricas
+            self.logger.info("5. Checking system metrics...")
+            if cycle_result['metrics']:
+                self._check_metric_thresholds(cycle_result['metrics'])
 
-            # Verificar thresholds
-            self._check_metric_thresholds(cycle_result['metrics'])
-
-            # 6. Executar testes (a cada 5 minutos = 10 ciclos)
-            if self.iteration % 10 == 0:
-                self.logger.info("6. Running comprehensive tests...")
-                cycle_result['test_results'] = self._run_comprehensive_tests()
+            # 6. Contabilizar testes (somente quando recalculados)
+            if tests_refreshed:
+                self.logger.info("6. Comprehensive tests refreshed...")
 
                 # Contabilizar testes
                 test_summary = cycle_result['test_results'].get('summary', {})
@@ -391,9 +468,10 @@ class SystemMonitorAgent:
                 success=True
             )
 
-            # Duração do ciclo
+            # Duração do ciclo e de cada skill
             cycle_end = datetime.now()
             cycle_result['duration_seconds'] = (cycle_end - cycle_start).total_seconds()
+            cycle_result['skill_timings'] = self.executor.get_timings()
 
             self.logger.info(
                 f"=== Cycle completed in {cycle_result['duration_seconds']:.2f}s ==="
@@ -524,144 +602,33 @@ class SystemMonitorAgent:
 
         return actions
 
-    def _run_comprehensive_tests(self) -> Dict[str, Any]:
-        """Executa bateria completa de testes"""
-        results = {
-            'timestamp': datetime.now().isoformat(),
-            'load_tests': {},
-            'integration_tests': {},
-            'edge_case_tests': {},
-            'security_audit': {},
-            'production_validation': {},
-            'database_health': {},
-            'container_health': {},
-            'agent_health': {},
-            'network_health': {},
-            'frontend_health': {},
-            'backup_status': {},
-            'filesystem_status': {},
-            'api_performance': {},
-            'cache_health': {}
-        }
-
-        # 1. Load Tests
-        self.logger.info("   → Load testing...")
-        try:
-            results['load_tests'] = self.load_tester.test_endpoints()
-        except Exception as e:
-            self.logger.error(f"   Load tests failed: {str(e)}")
-            results['load_tests'] = {'error': str(e)}
-
-        # 2. Integration Tests
-        self.logger.info("   → Integration testing...")
-        try:
-            results['integration_tests'] = self.integration_tester.run_all_tests()
-        except Exception as e:
-            self.logger.error(f"   Integration tests failed: {str(e)}")
-            results['integration_tests'] = {'error': str(e)}
-
-        # 3. Edge Case Tests
-        self.logger.info("   → Edge case testing...")
-        try:
-            results['edge_case_tests'] = self.edge_case_tester.run_all_tests()
-        except Exception as e:
-            self.logger.error(f"   Edge case tests failed: {str(e)}")
-            results['edge_case_tests'] = {'error': str(e)}
-
-        # 4. Security Audit
-        self.logger.info("   → Security audit...")
-        try:
-            results['security_audit'] = self.security_auditor.run_all_audits()
-        except Exception as e:
-            self.logger.error(f"   Security audit failed: {str(e)}")
-            results['security_audit'] = {'error': str(e)}
-
-        # 5. Production Validation
-        self.logger.info("   → Production validation...")
-        try:
-            results['production_validation'] = self.production_validator.run_all_validations()
-        except Exception as e:
-            self.logger.error(f"   Production validation failed: {str(e)}")
-            results['production_validation'] = {'error': str(e)}
-
-        # === MONITORAMENTO COMPLETO 100% ===
-
-        # 6. Database Health Monitoring
-        self.logger.info("   → Database health check...")
-        try:
-            results['database_health'] = self.database_monitor.check_all_databases()
-        except Exception as e:
-            self.logger.error(f"   Database check failed: {str(e)}")
-            results['database_health'] = {'error': str(e)}
-
-        # 7. Container Health Monitoring
-        self.logger.info("   → Container health check...")
-        try:
-            results['container_health'] = self.container_monitor.run_full_check()
-        except Exception as e:
-            self.logger.error(f"   Container check failed: {str(e)}")
-            results['container_health'] = {'error': str(e)}
-
-        # 8. Agent Health Monitoring (TODOS os 15+ agentes)
-        self.logger.info("   → Agent health check...")
-        try:
-            results['agent_health'] = self.agent_monitor.run_full_check()
-        except Exception as e:
-            self.logger.error(f"   Agent check failed: {str(e)}")
-            results['agent_health'] = {'error': str(e)}
-
-        # 9. Network & Connectivity Monitoring
-        self.logger.info("   → Network health check...")
-        try:
-            results['network_health'] = self.network_monitor.run_full_check()
-        except Exception as e:
-            self.logger.error(f"   Network check failed: {str(e)}")
-            results['network_health'] = {'error': str(e)}
-
-        # 10. Frontend Health Monitoring
-        self.logger.info("   → Frontend health check...")
-        try:
-            results['frontend_health'] = self.frontend_monitor.run_full_check()
-        except Exception as e:
-            self.logger.error(f"   Frontend check failed: {str(e)}")
-            results['frontend_health'] = {'error': str(e)}
-
-        # 11. Backup & Recovery Validation
-        self.logger.info("   → Backup validation...")
-        try:
-            results['backup_status'] = self.backup_validator.run_full_validation()
-        except Exception as e:
-            self.logger.error(f"   Backup validation failed: {str(e)}")
-            results['backup_status'] = {'error': str(e)}
+    def _collect_test_results(self, results: Dict[str, Any]) -> Tuple[Dict[str, Any], bool]:
+        """
+        Monta a bateria de testes a partir dos resultados do executor
 
-        # 12. FileSystem & Disk Monitoring
-        self.logger.info("   → Filesystem check...")
-        try:
-            results['filesystem_status'] = self.filesystem_watcher.run_full_check()
-        except Exception as e:
-            self.logger.error(f"   Filesystem check failed: {str(e)}")
-            results['filesystem_status'] = {'error': str(e)}
+        Returns:
+            (resultados, recalculados): resultados vazios enquanto nenhum
+            check pesado concluiu; recalculados indica execução nova desde
+            a última contabilização
+        """
+        specs = [self.executor.skills[key] for key in self.TEST_SKILLS]
+        if not any(spec.has_result for spec in specs):
+            return {}, False
 
-        # 13. API Performance Profiling
-        self.logger.info("   → API performance profiling...")
-        try:
-            results['api_performance'] = self.api_profiler.run_full_profile()
-        except Exception as e:
-            self.logger.error(f"   API profiling failed: {str(e)}")
-            results['api_performance'] = {'error': str(e)}
-
-        # 14. Cache Effectiveness Monitoring
-        self.logger.info("   → Cache health check...")
-        try:
-            results['cache_health'] = self.cache_monitor.run_full_check()
-        except Exception as e:
-            self.logger.error(f"   Cache check failed: {str(e)}")
-            results['cache_health'] = {'error': str(e)}
+        test_results = {'timestamp': datetime.now().isoformat()}
+        for key, spec in zip(self.TEST_SKILLS, specs):
+            test_results[key] = results.get(key, {})
+            if spec.status in ('timeout', 'error'):
+                self.logger.warning(f"   {key}: {spec.status} ({spec.error})")
 
         # Gerar resumo geral
-        results['summary'] = self._summarize_test_results(results)
+        test_results['summary'] = self._summarize_test_results(test_results)
 
-        return results
+        latest = max(spec.last_run for spec in specs)
+        refreshed = latest > self._tests_counted_at
+        self._tests_counted_at = latest
+
+        return test_results, refreshed
 
     def _summarize_test_results(self, results: Dict[str, Any]) -> Dict[str, Any]:
         """Gera resumo dos resultados de testes"""
@@ -729,27 +696,45 @@ class SystemMonitorAgent:
 
     def run(self):
         """Executa agente em loop contínuo"""
+        asyncio.run(self.run_async())
+
+    async def run_async(self):
+        """Loop contínuo em um único event loop"""
         self.running = True
         interval = self.config['agent']['interval']
 
+        # systemd encerra com SIGTERM: sai do loop e passa pelo stop()
+        shutdown = asyncio.Event()
+        try:
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, shutdown.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+
         self.logger.info(f"Starting continuous monitoring (interval: {interval}s)")
 
         try:
-            while self.running:
+            while self.running and not shutdown.is_set():
                 # Executar ciclo
-                cycle_result = self.run_monitoring_cycle()
+                cycle_result = await self.run_monitoring_cycle_async()
 
                 # Salvar estado
                 self._save_state(cycle_result)
 
                 # Aguardar próximo ciclo
-                time.sleep(interval)
+                try:
+                    await asyncio.wait_for(shutdown.wait(), timeout=interval)
+                except asyncio.TimeoutError:
+                    pass
+
+            if shutdown.is_set():
+                self.logger.info("Received shutdown signal")
 
         except KeyboardInterrupt:
             self.logger.info("Received shutdown signal")
-            self.stop()
         except Exception as e:
             self.logger.error(f"Fatal error: {str(e)}", exc_info=True)
+        finally:
+            # Também no Ctrl+C (asyncio.run cancela a task)
             self.stop()
 
     def stop(self):
@@ -768,6 +753,10 @@ class SystemMonitorAgent:
 
         self.logger.info(f"Final statistics: {json.dumps(final_stats, indent=2)}")
 
+        self.executor.shutdown()
+        # Grava o histórico de métricas pendente (snapshot periódico)
+        self.failure_predictor.flush()
+        self.forensic_audit.close()
         self.running = False
 
     def _save_state(self, cycle_result: Dict[str, Any]):
@@ -781,6 +770,7 @@ class SystemMonitorAgent:
             'total_gaps_detected': self.total_gaps_detected,
             'total_tests_run': self.total_tests_run,
             'total_tests_passed': self.total_tests_passed,
+            'skill_timings': self.executor.get_timings(),
             'last_cycle': cycle_result
         }
 
@@ -43,7 +43,19 @@ class ContextualHealer:
     - Feature flags
     """
 
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(
+        self,
+        config: Dict[str, Any],
+        audit: Optional[ForensicAudit] = None,
+        memory: Optional[OperationalMemory] = None,
+        predictor: Optional[FailurePredictor] = None
+    ):
+        """
+        Args:
+            audit, memory, predictor: instâncias do agente. Gravam no mesmo
+                diretório de estado, então deve haver um único escritor
+                de cada (cria as próprias quando omitidas)
+        """
         self.config = config
         self.state_dir = Path('/opt/conecta-plus/agents/system-monitor/state')
         self.state_dir.mkdir(parents=True, exist_ok=True)
@@ -54,9 +66,9 @@ class ContextualHealer:
         self.safe_healer = SafeHealer(config)
         self.correlation = CorrelationEngine(config)
         self.severity = DynamicSeverityClassifier(config)
-        self.memory = OperationalMemory(config)
-        self.predictor = FailurePredictor(config)
-        self.audit = ForensicAudit(config)
+        self.memory = memory or OperationalMemory(config)
+        self.predictor = predictor or FailurePredictor(config)
+        self.audit = audit or ForensicAudit(config)
 
         # Estado do healer
         self.state = self._load_state()
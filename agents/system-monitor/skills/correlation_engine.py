@@ -10,13 +10,140 @@ Princípios:
 """
 
 import json
-from typing import Dict, Any, List, Optional, Tuple
+import time
+from typing import Dict, Any, List, Optional, Tuple, Union
 from datetime import datetime, timedelta
 from pathlib import Path
-from collections import defaultdict
+from collections import defaultdict, Counter
 import statistics
 
 
+class EventStore:
+    """
+    Buffer circular de eventos ordenado por tempo
+
+    - Timestamp convertido para epoch uma única vez, na inserção
+    - Consultas por janela com busca binária sobre o buffer
+    - Contadores por categoria do buffer inteiro e de cada janela
+      deslizante, atualizados incrementalmente a cada evento (a janela
+      avança um ponteiro e desconta os eventos que saíram)
+    """
+
+    def __init__(self, capacity: int = 1000, windows: Dict[str, timedelta] = None):
+        self.capacity = capacity
+        self._events: List[Optional[Dict[str, Any]]] = [None] * capacity
+        self._ts: List[float] = [0.0] * capacity
+
+        # Números de sequência: o evento seq fica na posição seq % capacity
+        self._first = 0
+        self._next = 0
+
+        self.category_counts: Counter = Counter()
+
+        self._windows = {name: delta.total_seconds() for name, delta in (windows or {}).items()}
+        self._window_start = {name: 0 for name in self._windows}
+        self._window_counts = {name: Counter() for name in self._windows}
+
+    def __len__(self) -> int:
+        return self._next - self._first
+
+    def __iter__(self):
+        for seq in range(self._first, self._next):
+            yield self._events[seq % self.capacity]
+
+    @staticmethod
+    def to_epoch(timestamp: Union[str, datetime, float, None]) -> float:
+        """Converte timestamp (ISO, datetime ou epoch) para epoch"""
+        if isinstance(timestamp, (int, float)):
+            return float(timestamp)
+        if isinstance(timestamp, datetime):
+            return timestamp.timestamp()
+        try:
+            return datetime.fromisoformat(str(timestamp).replace('Z', '+00:00')).timestamp()
+        except (TypeError, ValueError):
+            return time.time()
+
+    def add(self, event: Dict[str, Any]) -> float:
+        """
+        Adiciona evento. Eventos fora de ordem entram com o timestamp do
+        último evento, mantendo o buffer ordenado. Retorna o epoch usado.
+        """
+        ts = self.to_epoch(event.get('timestamp'))
+        if self._next > self._first:
+            ts = max(ts, self._ts[(self._next - 1) % self.capacity])
+
+        if len(self) == self.capacity:
+            self._evict_oldest()
+
+        slot = self._next % self.capacity
+        self._events[slot] = event
+        self._ts[slot] = ts
+        self._next += 1
+
+        category = event.get('category')
+        self.category_counts[category] += 1
+        for counts in self._window_counts.values():
+            counts[category] += 1
+
+        self._advance(ts)
+        return ts
+
+    def _evict_oldest(self):
+        slot = self._first % self.capacity
+        category = self._events[slot].get('category')
+        self._decrement(self.category_counts, category)
+
+        for name, start in self._window_start.items():
+            if start == self._first:
+                self._decrement(self._window_counts[name], category)
+                self._window_start[name] = start + 1
+
+        self._events[slot] = None
+        self._first += 1
+
+    def _advance(self, now: float):
+        """Desconta das janelas os eventos mais antigos que o corte"""
+        for name, seconds in self._windows.items():
+            cutoff = now - seconds
+            start = self._window_start[name]
+            counts = self._window_counts[name]
+            while start < self._next and self._ts[start % self.capacity] < cutoff:
+                self._decrement(counts, self._events[start % self.capacity].get('category'))
+                start += 1
+            self._window_start[name] = start
+
+    @staticmethod
+    def _decrement(counter: Counter, key):
+        counter[key] -= 1
+        if counter[key] <= 0:
+            del counter[key]
+
+    def window_counts(self, name: str, now: Optional[float] = None) -> Counter:
+        """Contagem por categoria na janela deslizante `name`"""
+        self._advance(time.time() if now is None else now)
+        return Counter(self._window_counts[name])
+
+    def _bisect(self, cutoff: float) -> int:
+        """Primeira sequência com timestamp >= cutoff"""
+        lo, hi = self._first, self._next
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._ts[mid % self.capacity] < cutoff:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def events_since(self, cutoff: float, limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Eventos com timestamp >= cutoff, do mais antigo ao mais novo"""
+        start = self._bisect(cutoff)
+        end = self._next if limit is None else min(self._next, start + limit)
+        return [self._events[seq % self.capacity] for seq in range(start, end)]
+
+    def count_since(self, cutoff: float) -> int:
+        return self._next - self._bisect(cutoff)
+
+
 class CorrelationEngine:
     """
     Motor de Correlação Inteligente
@@ -41,9 +168,9 @@ class CorrelationEngine:
             'long': timedelta(hours=2)
         }
 
-        # Buffer de eventos recentes
-        self.event_buffer: List[Dict[str, Any]] = []
-        self.max_buffer_size = 1000
+        # Buffer de eventos recentes (circular, ordenado por tempo)
+        self.max_buffer_size = config.get('correlation', {}).get('max_buffer_size', 1000)
+        self.events = EventStore(self.max_buffer_size, self.time_windows)
 
         # Padrões conhecidos
         self.known_patterns = self._load_patterns()
@@ -135,16 +262,17 @@ class CorrelationEngine:
             }
         ]
 
+    @property
+    def event_buffer(self) -> List[Dict[str, Any]]:
+        """Eventos do buffer, do mais antigo ao mais novo"""
+        return list(self.events)
+
     def add_event(self, event: Dict[str, Any]):
         """Adiciona evento ao buffer para análise"""
         event['timestamp'] = event.get('timestamp', datetime.now().isoformat())
         event['processed'] = False
 
-        self.event_buffer.append(event)
-
-        # Manter buffer limitado
-        if len(self.event_buffer) > self.max_buffer_size:
-            self.event_buffer = self.event_buffer[-self.max_buffer_size:]
+        self.events.add(event)
 
     def correlate(
         self,
@@ -174,9 +302,11 @@ class CorrelationEngine:
         # 1. Normalizar e indexar eventos
         events = self._normalize_events(logs, metrics, gaps, test_results)
         correlation_result['events_analyzed'] = len(events)
+        for event in events:
+            self.add_event(event)
 
-        # 2. Detectar correlações temporais
-        temporal_correlations = self._find_temporal_correlations(events)
+        # 2. Detectar correlações temporais (janelas sobre o buffer)
+        temporal_correlations = self._find_temporal_correlations()
         correlation_result['correlations_found'].extend(temporal_correlations)
 
         # 3. Aplicar regras de correlação
@@ -280,53 +410,42 @@ class CorrelationEngine:
 
         return events
 
-    def _find_temporal_correlations(
-        self,
-        events: List[Dict[str, Any]]
-    ) -> List[Dict[str, Any]]:
-        """Encontra correlações temporais entre eventos"""
+    def _find_temporal_correlations(self) -> List[Dict[str, Any]]:
+        """
+        Encontra correlações temporais entre eventos do buffer.
+        Usa os contadores por categoria de cada janela, mantidos
+        incrementalmente, sem percorrer os eventos.
+        """
         correlations = []
-
-        # Agrupar eventos por janela temporal
-        for window_name, window_delta in self.time_windows.items():
-            window_events = self._filter_events_by_window(events, window_delta)
-
-            if len(window_events) >= 2:
-                # Verificar se há mix de categorias (indica correlação)
-                categories = set(e.get('category') for e in window_events)
-
-                if len(categories) >= 2:
-                    correlations.append({
-                        'window': window_name,
-                        'event_count': len(window_events),
-                        'categories': list(categories),
-                        'summary': f"{len(window_events)} eventos em {window_name} window",
-                        'events': window_events[:5]  # Primeiros 5
-                    })
+        now = time.time()
+
+        for window_name in self.time_windows:
+            counts = self.events.window_counts(window_name, now)
+            event_count = sum(counts.values())
+
+            # Verificar se há mix de categorias (indica correlação)
+            if event_count >= 2 and len(counts) >= 2:
+                correlations.append({
+                    'window': window_name,
+                    'event_count': event_count,
+                    'categories': list(counts),
+                    'summary': f"{event_count} eventos em {window_name} window",
+                    'events': self._filter_events_by_window(
+                        self.time_windows[window_name], limit=5, now=now
+                    )  # Primeiros 5
+                })
 
         return correlations
 
     def _filter_events_by_window(
         self,
-        events: List[Dict[str, Any]],
-        window: timedelta
+        window: timedelta,
+        limit: Optional[int] = None,
+        now: Optional[float] = None
     ) -> List[Dict[str, Any]]:
-        """Filtra eventos dentro de uma janela temporal"""
-        now = datetime.now()
-        cutoff = now - window
-
-        filtered = []
-        for event in events:
-            try:
-                event_time = datetime.fromisoformat(
-                    event.get('timestamp', now.isoformat()).replace('Z', '+00:00')
-                )
-                if event_time >= cutoff:
-                    filtered.append(event)
-            except:
-                filtered.append(event)  # Incluir se não conseguir parsear
-
-        return filtered
+        """Eventos do buffer dentro de uma janela temporal (busca binária)"""
+        cutoff = (time.time() if now is None else now) - window.total_seconds()
+        return self.events.events_since(cutoff, limit)
 
     def _apply_correlation_rules(
         self,
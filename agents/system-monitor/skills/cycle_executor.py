@@ -0,0 +1,195 @@
+"""
+Skill: Cycle Executor (Executor Assíncrono do Ciclo)
+Executa skills independentes em paralelo dentro do ciclo de monitoramento
+
+Funcionalidades:
+- Execução concorrente em pool de threads (skills são síncronas)
+- Timeout por skill e deadline do ciclo
+- Cadência por skill: resultados de skills lentas ficam em cache
+  entre ciclos (checks rápidos a cada 10s, pesados a cada 10min)
+- Skill que estoura o timeout continua em background e o resultado
+  entra no cache quando terminar; não é disparada de novo enquanto roda
+- Duração e status de cada execução
+"""
+
+import time
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Optional, Callable
+
+
+@dataclass
+class SkillSpec:
+    """Skill registrada no executor"""
+    name: str
+    func: Callable[[], Any]
+    cadence: float                  # Segundos mínimos entre execuções
+    timeout: float                  # Segundos de espera por execução
+    group: str = 'fast'             # Pool de threads (fast/heavy)
+    last_run: float = 0.0           # Início da última execução concluída
+    result: Any = None              # Último resultado (cache)
+    has_result: bool = False
+    duration: Optional[float] = None
+    status: str = 'pending'         # ok, error, timeout, cached, running
+    error: Optional[str] = None
+    inflight: Optional[Future] = field(default=None, repr=False)
+
+
+class CycleExecutor:
+    """
+    Executor do ciclo de monitoramento
+
+    Configuração (config.yaml, seção `cycle`):
+        max_workers: threads por grupo ({fast: 4, heavy: 8})
+        deadline: segundos máximos de espera por fase do ciclo
+        skills: {nome: {cadence, timeout}} sobrescreve os padrões
+
+    Skills rápidas e pesadas usam pools separados: checks pesados que
+    estouraram o timeout não ocupam as threads dos checks rápidos.
+    """
+
+    DEFAULT_WORKERS = {'fast': 4, 'heavy': 8}
+
+    def __init__(self, config: Dict[str, Any]):
+        self.config = config
+        cycle_config = config.get('cycle', {}) or {}
+
+        self.max_workers = {**self.DEFAULT_WORKERS, **(cycle_config.get('max_workers') or {})}
+        self.deadline = cycle_config.get('deadline', 25)
+        self.overrides = cycle_config.get('skills', {}) or {}
+
+        self.skills: Dict[str, SkillSpec] = {}
+        self._pools: Dict[str, ThreadPoolExecutor] = {}
+        self._lock = threading.Lock()
+
+    def _pool(self, group: str) -> ThreadPoolExecutor:
+        pool = self._pools.get(group)
+        if pool is None:
+            pool = self._pools[group] = ThreadPoolExecutor(
+                max_workers=self.max_workers.get(group, 4),
+                thread_name_prefix=f'monitor-{group}'
+            )
+        return pool
+
+    def register(
+        self,
+        name: str,
+        func: Callable[[], Any],
+        cadence: float = 10,
+        timeout: float = 20,
+        group: str = 'fast'
+    ):
+        """Registra uma skill (config.yaml pode sobrescrever cadência/timeout)"""
+        override = self.overrides.get(name, {}) or {}
+        self.skills[name] = SkillSpec(
+            name=name,
+            func=func,
+            cadence=override.get('cadence', cadence),
+            timeout=override.get('timeout', timeout),
+            group=group
+        )
+
+    def is_due(self, name: str, now: float = None) -> bool:
+        """Skill deve rodar neste ciclo?"""
+        spec = self.skills[name]
+        now = time.time() if now is None else now
+        if spec.inflight is not None:
+            return False
+        return not spec.has_result or now - spec.last_run >= spec.cadence
+
+    async def run(
+        self,
+        names: List[str],
+        deadline: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Executa as skills em paralelo
+
+        Args:
+            names: Skills a executar
+            deadline: Segundos máximos de espera (padrão: config)
+
+        Returns:
+            {nome: resultado}; skills fora da cadência retornam o cache,
+            skills sem resultado retornam {'error': ...}
+        """
+        now = time.time()
+        deadline_at = now + (self.deadline if deadline is None else deadline)
+
+        due = [name for name in names if self.is_due(name, now)]
+        for name in names:
+            spec = self.skills[name]
+            if name not in due:
+                spec.status = 'running' if spec.inflight is not None else 'cached'
+
+        waits = [self._run_one(self.skills[name], deadline_at) for name in due]
+        if waits:
+            await asyncio.gather(*waits)
+
+        results = {}
+        for name in names:
+            spec = self.skills[name]
+            if spec.has_result:
+                results[name] = spec.result
+            else:
+                results[name] = {'error': spec.error or spec.status}
+        return results
+
+    async def _run_one(self, spec: SkillSpec, deadline_at: float):
+        started = time.time()
+        future = self._pool(spec.group).submit(spec.func)
+        with self._lock:
+            spec.inflight = future
+        future.add_done_callback(lambda f: self._complete(spec, f, started))
+
+        timeout = max(min(spec.timeout, deadline_at - started), 0)
+        try:
+            # O timeout só para a espera: uma execução já iniciada segue no
+            # pool (threads não são interrompíveis); uma ainda na fila é descartada
+            await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                if spec.inflight is future or future.cancelled():
+                    spec.status = 'timeout'
+                    spec.error = f'Timeout after {timeout:.1f}s'
+        except Exception:
+            pass  # Tratado em _complete
+
+    def _complete(self, spec: SkillSpec, future: Future, started: float):
+        """Callback do pool: grava resultado, duração e status"""
+        with self._lock:
+            spec.inflight = None
+            if future.cancelled():
+                return
+            spec.duration = time.time() - started
+            spec.last_run = started
+            error = future.exception()
+            if error is None:
+                spec.result = future.result()
+                spec.has_result = True
+                spec.status = 'ok'
+                spec.error = None
+            else:
+                spec.status = 'error'
+                spec.error = str(error)
+
+    def get_timings(self) -> Dict[str, Dict[str, Any]]:
+        """Duração e status da última execução de cada skill"""
+        return {
+            name: {
+                'status': spec.status,
+                'duration_seconds': round(spec.duration, 3) if spec.duration is not None else None,
+                'last_run': spec.last_run or None,
+                'cadence': spec.cadence,
+                'timeout': spec.timeout,
+                'error': spec.error,
+            }
+            for name, spec in self.skills.items()
+        }
+
+    def shutdown(self):
+        """Encerra os pools sem esperar skills em andamento"""
+        for pool in self._pools.values():
+            pool.shutdown(wait=False)
@@ -9,7 +9,11 @@ Princípios:
 - Alertas antecipados
 """
 
+import os
 import json
+import time
+import bisect
+from array import array
 from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -17,6 +21,129 @@ from collections import defaultdict
 import statistics
 import math
 
+# NumPy acelera as séries (graceful fallback se não disponível)
+try:
+    import numpy as np
+    HAS_NUMPY = True
+except ImportError:
+    HAS_NUMPY = False
+    np = None
+
+
+class MetricSeries:
+    """
+    Série temporal de uma métrica em buffer circular
+
+    - Valores e timestamps (epoch) em arrays float64 de tamanho fixo
+    - Média/variância online (Welford com remoção) das últimas
+      `anomaly_window - 1` amostras anteriores: o z-score de cada nova
+      amostra sai em O(1), na inserção
+    """
+
+    def __init__(self, capacity: int = 1000, anomaly_window: int = 50):
+        self.capacity = max(capacity, anomaly_window)
+        self.anomaly_window = anomaly_window
+        if HAS_NUMPY:
+            self._values = np.zeros(self.capacity, dtype=np.float64)
+            self._ts = np.zeros(self.capacity, dtype=np.float64)
+        else:
+            self._values = array('d', [0.0]) * self.capacity
+            self._ts = array('d', [0.0]) * self.capacity
+        self._start = 0
+        self._count = 0
+
+        # Welford sobre as amostras anteriores à mais recente
+        self._n = 0
+        self._mean = 0.0
+        self._m2 = 0.0
+
+        # Estatística da amostra mais recente contra as anteriores
+        self.last_z = 0.0
+        self.last_mean = 0.0
+        self.last_std = 0.0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _at(self, index: int) -> float:
+        """Valor na posição lógica `index` (0 = mais antigo)"""
+        return float(self._values[(self._start + index) % self.capacity])
+
+    def append(self, value: float, timestamp: float):
+        value = float(value)
+
+        # Z-score contra a janela anterior
+        if self._n >= 2:
+            std = math.sqrt(self._m2 / (self._n - 1))
+            self.last_mean = self._mean
+            self.last_std = std
+            self.last_z = (value - self._mean) / std if std > 0 else 0.0
+        else:
+            self.last_mean, self.last_std, self.last_z = self._mean, 0.0, 0.0
+
+        # Gravar no buffer circular
+        if self._count < self.capacity:
+            slot = (self._start + self._count) % self.capacity
+            self._count += 1
+        else:
+            slot = self._start
+            self._start = (self._start + 1) % self.capacity
+        self._values[slot] = value
+        self._ts[slot] = timestamp
+
+        # Atualizar Welford: entra a nova amostra, sai a que deixou a janela
+        self._welford_add(value)
+        if self._n > self.anomaly_window - 1:
+            self._welford_remove(self._at(self._count - self.anomaly_window))
+
+    @property
+    def last(self) -> float:
+        """Amostra mais recente"""
+        return self._at(self._count - 1)
+
+    def _welford_add(self, x: float):
+        self._n += 1
+        delta = x - self._mean
+        self._mean += delta / self._n
+        self._m2 += delta * (x - self._mean)
+
+    def _welford_remove(self, x: float):
+        self._n -= 1
+        if self._n == 0:
+            self._mean = self._m2 = 0.0
+            return
+        delta = x - self._mean
+        self._mean -= delta / self._n
+        self._m2 = max(self._m2 - delta * (x - self._mean), 0.0)
+
+    def view(self) -> Tuple[Any, Any]:
+        """(valores, timestamps) em ordem cronológica"""
+        end = self._start + self._count
+        if HAS_NUMPY:
+            if end <= self.capacity:
+                return self._values[self._start:end], self._ts[self._start:end]
+            wrap = end - self.capacity
+            return (
+                np.concatenate((self._values[self._start:], self._values[:wrap])),
+                np.concatenate((self._ts[self._start:], self._ts[:wrap])),
+            )
+        values = [self._at(i) for i in range(self._count)]
+        timestamps = [self._ts[(self._start + i) % self.capacity] for i in range(self._count)]
+        return values, timestamps
+
+    def since(self, cutoff: float) -> Tuple[Any, Any]:
+        """Amostras com timestamp >= cutoff (busca binária)"""
+        values, timestamps = self.view()
+        if HAS_NUMPY:
+            first = int(np.searchsorted(timestamps, cutoff, side='left'))
+        else:
+            first = bisect.bisect_left(timestamps, cutoff)
+        return values[first:], timestamps[first:]
+
+    def to_dict(self) -> Dict[str, List[float]]:
+        values, timestamps = self.view()
+        return {'values': [float(v) for v in values], 'timestamps': [float(t) for t in timestamps]}
+
 
 class FailurePredictor:
     """
@@ -99,35 +226,75 @@ class FailurePredictor:
         self.history_file = self.state_dir / 'metrics_history.json'
         self.predictions_file = self.state_dir / 'predictions.json'
 
-        self.history = self._load_history()
-        self.predictions = self._load_predictions()
-
         # Configuração
         self.prediction_config = {
             'history_window_hours': 24,    # Janela de análise
             'min_samples': 5,              # Mínimo de amostras para predição
             'trend_sensitivity': 0.05,     # Sensibilidade para detectar tendência
             'prediction_horizon_hours': 6, # Horizonte de predição
+            'max_samples': 1000,           # Amostras por métrica (buffer circular)
+            'anomaly_window': 50,          # Amostras na base do z-score
+            'snapshot_interval_seconds': 300,  # Gravação periódica do histórico
         }
 
+        # Séries por métrica + eventos/anomalias
+        self.series: Dict[str, MetricSeries] = {}
+        self.history = self._load_history()
+        self.predictions = self._load_predictions()
+        self._last_snapshot = time.time()
+
+    def _new_series(self) -> MetricSeries:
+        return MetricSeries(
+            self.prediction_config['max_samples'],
+            self.prediction_config['anomaly_window'],
+        )
+
     def _load_history(self) -> Dict[str, Any]:
-        """Carrega histórico de métricas"""
+        """Carrega histórico de métricas (snapshot) e reconstrói as séries"""
+        history = {
+            'events': [],       # Eventos importantes
+            'anomalies': [],    # Anomalias detectadas
+        }
         try:
             if self.history_file.exists():
                 with open(self.history_file) as f:
-                    return json.load(f)
+                    data = json.load(f)
+                history['events'] = data.get('events', [])
+                history['anomalies'] = data.get('anomalies', [])
+
+                for metric_name, stored in data.get('metrics', {}).items():
+                    series = self._new_series()
+                    if isinstance(stored, dict):
+                        points = zip(stored.get('values', []), stored.get('timestamps', []))
+                    else:
+                        # Formato antigo: [{value, timestamp ISO}]
+                        points = (
+                            (p['value'], datetime.fromisoformat(p['timestamp']).timestamp())
+                            for p in stored
+                        )
+                    for value, ts in points:
+                        series.append(value, ts)
+                    self.series[metric_name] = series
         except:
             pass
-        return {
-            'metrics': {},      # {metric_name: [{value, timestamp}]}
-            'events': [],       # Eventos importantes
-            'anomalies': [],    # Anomalias detectadas
-        }
+        return history
 
     def _save_history(self):
-        """Salva histórico"""
-        with open(self.history_file, 'w') as f:
-            json.dump(self.history, f, indent=2, default=str)
+        """Salva snapshot do histórico (escrita atômica)"""
+        data = {
+            'metrics': {name: series.to_dict() for name, series in self.series.items()},
+            'events': self.history.get('events', []),
+            'anomalies': self.history.get('anomalies', []),
+        }
+        tmp = self.history_file.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(data, f, default=str)
+        os.replace(tmp, self.history_file)
+        self._last_snapshot = time.time()
+
+    def flush(self):
+        """Força a gravação do histórico"""
+        self._save_history()
 
     def _load_predictions(self) -> Dict[str, Any]:
         """Carrega predições anteriores"""
@@ -159,7 +326,7 @@ class FailurePredictor:
         Args:
             metrics: Dicionário de métricas atuais
         """
-        now = datetime.now()
+        now = time.time()
 
         for metric_name, value in metrics.items():
             # Extrair valor numérico
@@ -172,20 +339,19 @@ class FailurePredictor:
                 continue
 
             # Inicializar se necessário
-            if metric_name not in self.history['metrics']:
-                self.history['metrics'][metric_name] = []
-
-            # Adicionar ponto
-            self.history['metrics'][metric_name].append({
-                'value': numeric_value,
-                'timestamp': now.isoformat()
-            })
+            series = self.series.get(metric_name)
+            if series is None:
+                series = self.series[metric_name] = self._new_series()
 
-            # Manter apenas últimas 1000 amostras por métrica
-            self.history['metrics'][metric_name] = \
-                self.history['metrics'][metric_name][-1000:]
+            # Adicionar ponto (buffer circular mantém as últimas N amostras)
+            series.append(numeric_value, now)
 
-        self._save_history()
+        # Snapshot periódico em vez de reescrever a cada chamada
+        if now - self._last_snapshot >= self.prediction_config['snapshot_interval_seconds']:
+            try:
+                self._save_history()
+            except OSError:
+                pass
 
     def predict(self, current_metrics: Dict[str, Any] = None) -> Dict[str, Any]:
         """
@@ -251,59 +417,53 @@ class FailurePredictor:
     def _analyze_trends(self) -> Dict[str, Any]:
         """Analisa tendências em todas as métricas"""
         trends = {}
-        now = datetime.now()
-        window = timedelta(hours=self.prediction_config['history_window_hours'])
-        cutoff = now - window
-
-        for metric_name, data_points in self.history['metrics'].items():
-            # Filtrar pontos dentro da janela
-            recent_points = []
-            for point in data_points:
-                try:
-                    ts = datetime.fromisoformat(point['timestamp'])
-                    if ts >= cutoff:
-                        recent_points.append({
-                            'value': point['value'],
-                            'timestamp': ts
-                        })
-                except:
-                    pass
-
-            if len(recent_points) < self.prediction_config['min_samples']:
+        window = self.prediction_config['history_window_hours'] * 3600
+        cutoff = time.time() - window
+
+        for metric_name, series in self.series.items():
+            # Pontos dentro da janela (busca binária no buffer)
+            values, timestamps = series.since(cutoff)
+
+            if len(values) < self.prediction_config['min_samples']:
                 trends[metric_name] = {
                     'trend': 'insufficient_data',
-                    'samples': len(recent_points)
+                    'samples': len(values)
                 }
                 continue
 
             # Calcular tendência
-            trend_info = self._calculate_trend(recent_points)
+            trend_info = self._calculate_trend(values, timestamps)
             trends[metric_name] = trend_info
 
         return trends
 
-    def _calculate_trend(self, points: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Calcula tendência para uma série de pontos"""
-        values = [p['value'] for p in points]
-
-        # Estatísticas básicas
-        current = values[-1]
-        mean = statistics.mean(values)
-        std = statistics.stdev(values) if len(values) >= 2 else 0
-
-        # Regressão linear simples para tendência
+    def _calculate_trend(self, values, timestamps) -> Dict[str, Any]:
+        """Calcula tendência para uma série (valores e timestamps epoch)"""
         n = len(values)
-        x = list(range(n))
-        x_mean = sum(x) / n
-        y_mean = mean
-
-        numerator = sum((x[i] - x_mean) * (values[i] - y_mean) for i in range(n))
-        denominator = sum((x[i] - x_mean) ** 2 for i in range(n))
 
-        if denominator != 0:
-            slope = numerator / denominator
+        if HAS_NUMPY:
+            # Estatísticas e regressão linear vetorizadas
+            values = np.asarray(values, dtype=np.float64)
+            current = float(values[-1])
+            mean = float(values.mean())
+            std = float(values.std(ddof=1)) if n >= 2 else 0
+            x = np.arange(n, dtype=np.float64)
+            dx = x - x.mean()
+            denominator = float(dx @ dx)
+            slope = float(dx @ (values - mean)) / denominator if denominator != 0 else 0
+            v_min, v_max = float(values.min()), float(values.max())
         else:
-            slope = 0
+            # Estatísticas básicas
+            current = values[-1]
+            mean = statistics.mean(values)
+            std = statistics.stdev(values) if n >= 2 else 0
+
+            # Regressão linear simples para tendência
+            x_mean = (n - 1) / 2
+            numerator = sum((i - x_mean) * (values[i] - mean) for i in range(n))
+            denominator = sum((i - x_mean) ** 2 for i in range(n))
+            slope = numerator / denominator if denominator != 0 else 0
+            v_min, v_max = min(values), max(values)
 
         # Determinar direção
         sensitivity = self.prediction_config['trend_sensitivity']
@@ -321,8 +481,8 @@ class FailurePredictor:
             rate_per_sample = 0
 
         # Estimar tempo de amostragem
-        if len(points) >= 2:
-            time_span = (points[-1]['timestamp'] - points[0]['timestamp']).total_seconds() / 3600
+        if n >= 2:
+            time_span = (timestamps[-1] - timestamps[0]) / 3600
             samples_per_hour = n / max(time_span, 1)
             rate_per_hour = rate_per_sample * samples_per_hour
         else:
@@ -335,8 +495,8 @@ class FailurePredictor:
             'current': round(current, 2),
             'mean': round(mean, 2),
             'std': round(std, 2),
-            'min': round(min(values), 2),
-            'max': round(max(values), 2),
+            'min': round(v_min, 2),
+            'max': round(v_max, 2),
             'samples': n
         }
 
@@ -449,20 +609,15 @@ class FailurePredictor:
         """Detecta anomalias nas métricas"""
         anomalies = []
 
-        for metric_name, data_points in self.history['metrics'].items():
-            if len(data_points) < 10:
+        for metric_name, series in self.series.items():
+            if len(series) < 10:
                 continue
 
-            values = [p['value'] for p in data_points[-50:]]  # Últimos 50
-            current = values[-1]
-            mean = statistics.mean(values[:-1])
-            std = statistics.stdev(values[:-1]) if len(values) > 2 else 1
-
-            # Z-score
-            if std > 0:
-                z_score = (current - mean) / std
-            else:
-                z_score = 0
+            # Z-score da última amostra contra as anteriores (Welford, O(1))
+            current = series.last
+            mean = series.last_mean
+            std = series.last_std
+            z_score = series.last_z
 
             # Anomalia se z-score > 3 (muito fora do normal)
             if abs(z_score) > 3:
@@ -677,10 +832,8 @@ class FailurePredictor:
 
     def get_statistics(self) -> Dict[str, Any]:
         """Retorna estatísticas do preditor"""
-        metrics_tracked = len(self.history.get('metrics', {}))
-        total_samples = sum(
-            len(v) for v in self.history.get('metrics', {}).values()
-        )
+        metrics_tracked = len(self.series)
+        total_samples = sum(len(s) for s in self.series.values())
 
         return {
             'metrics_tracked': metrics_tracked,
@@ -696,7 +849,6 @@ if __name__ == '__main__':
     predictor = FailurePredictor({})
 
     # Simular métricas crescentes
-    import time
     for i in range(20):
         predictor.record_metrics({
             'cpu': {'percent': 50 + i * 2},  # Crescendo
@@ -1,23 +1,144 @@
 """
 Skill: Load Tester
 Testa carga do sistema com múltiplas requisições simultâneas
+
+Modos:
+- Rajada fechada (run_concurrent_requests): N requisições de uma vez
+- Loop aberto (run_open_loop): taxa de chegada constante ou em rampa,
+  independente das respostas, sem coordinated omission; latências em
+  histograma HDR (p50/p90/p99/p99.9) e comparação com baselines
 """
 
 import asyncio
 import aiohttp
+import json
 import time
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
+from pathlib import Path
+from collections import defaultdict
 import statistics
 
 
+class LatencyHistogram:
+    """
+    Histograma de latência no estilo HDR
+
+    Buckets log-lineares em microssegundos: cada potência de 2 é dividida
+    em 64 sub-buckets (erro relativo < 1.6%). Memória proporcional ao
+    número de buckets ocupados, registro O(1) e histogramas mescláveis.
+    """
+
+    SUB_BUCKET_BITS = 6
+    SUB_BUCKETS = 1 << SUB_BUCKET_BITS
+
+    def __init__(self):
+        self.counts: Dict[int, int] = defaultdict(int)
+        self.total = 0
+        self.sum_us = 0
+        self.min_us: Optional[int] = None
+        self.max_us = 0
+
+    @classmethod
+    def _index(cls, value_us: int) -> int:
+        if value_us < cls.SUB_BUCKETS:
+            return value_us
+        exponent = value_us.bit_length() - cls.SUB_BUCKET_BITS - 1
+        return exponent * cls.SUB_BUCKETS + (value_us >> exponent)
+
+    @classmethod
+    def _highest_value(cls, index: int) -> int:
+        """Maior valor (µs) equivalente ao bucket"""
+        if index < 2 * cls.SUB_BUCKETS:
+            return index
+        exponent, mantissa = divmod(index, cls.SUB_BUCKETS)
+        mantissa += cls.SUB_BUCKETS
+        exponent -= 1
+        return ((mantissa + 1) << exponent) - 1
+
+    def record(self, seconds: float):
+        value_us = max(int(seconds * 1_000_000), 0)
+        self.counts[self._index(value_us)] += 1
+        self.total += 1
+        self.sum_us += value_us
+        if self.min_us is None or value_us < self.min_us:
+            self.min_us = value_us
+        if value_us > self.max_us:
+            self.max_us = value_us
+
+    def merge(self, other: 'LatencyHistogram'):
+        for index, count in other.counts.items():
+            self.counts[index] += count
+        self.total += other.total
+        self.sum_us += other.sum_us
+        if other.min_us is not None and (self.min_us is None or other.min_us < self.min_us):
+            self.min_us = other.min_us
+        self.max_us = max(self.max_us, other.max_us)
+
+    def percentile(self, percent: float) -> float:
+        """Latência (segundos) no percentil"""
+        if not self.total:
+            return 0.0
+        target = max(1, int(round(percent / 100 * self.total)))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return min(self._highest_value(index), self.max_us) / 1_000_000
+        return self.max_us / 1_000_000
+
+    @property
+    def mean(self) -> float:
+        return self.sum_us / self.total / 1_000_000 if self.total else 0.0
+
+    def summary(self) -> Dict[str, float]:
+        """Percentis em segundos"""
+        return {
+            'count': self.total,
+            'min': (self.min_us or 0) / 1_000_000,
+            'mean': self.mean,
+            'p50': self.percentile(50),
+            'p90': self.percentile(90),
+            'p99': self.percentile(99),
+            'p999': self.percentile(99.9),
+            'max': self.max_us / 1_000_000,
+        }
+
+
 class LoadTester:
     """Executa testes de carga no sistema"""
 
+    # Endpoints monitorados (load_testing.targets no config.yaml sobrescreve)
+    DEFAULT_TARGETS = [
+        {'name': 'API Gateway Health', 'url': 'http://localhost:3001/health'},
+        {'name': 'Backend Health', 'url': 'http://localhost:8000/health'},
+        {'name': 'Backend Ready', 'url': 'http://localhost:8000/health/ready'},
+        {'name': 'AI Orchestrator Status', 'url': 'http://localhost:8001/status'},
+        {'name': 'AI Orchestrator v2 Status', 'url': 'http://localhost:8001/v2/status'},
+        {'name': 'Frontend Home', 'url': 'http://localhost:3000/'},
+        {'name': 'Dashboard', 'url': 'http://localhost:3000/dashboard'},
+        {'name': 'Monitor Dashboard', 'url': 'http://localhost:8888/'},
+    ]
+
     def __init__(self, config: Dict[str, Any]):
         self.config = config
         self.test_results = []
 
+        load_config = config.get('load_testing', {}) or {}
+        self.load_config = {
+            'rate': load_config.get('rate', 20),                  # req/s por endpoint
+            'duration': load_config.get('duration', 10),          # segundos
+            'pool_size': load_config.get('pool_size', 50),        # conexões
+            'max_in_flight': load_config.get('max_in_flight', 500),
+            'request_timeout': load_config.get('request_timeout', 10),
+            'regression_tolerance': load_config.get('regression_tolerance', 0.25),
+        }
+        self.targets = load_config.get('targets') or self.DEFAULT_TARGETS
+
+        self.state_dir = Path('/opt/conecta-plus/agents/system-monitor/state')
+        self.baselines_file = self.state_dir / 'load_baselines.json'
+        self.baselines = self._load_baselines()
+
     async def _make_request(
         self,
         session: aiohttp.ClientSession,
@@ -136,7 +257,10 @@ class LoadTester:
         if not durations:
             return 'F - Sistema não respondeu'
 
-        avg = statistics.mean(durations)
+        return self._grade_latency(statistics.mean(durations), failed_count, total)
+
+    def _grade_latency(self, avg: float, failed_count: int, total: int) -> str:
+        """Nota pela latência média e taxa de falha"""
         failure_rate = (failed_count / total * 100) if total > 0 else 100
 
         if failure_rate > 10:
@@ -152,30 +276,299 @@ class LoadTester:
         else:
             return 'F - Muito lento'
 
+    # ==================== Loop aberto ====================
+
+    @staticmethod
+    def _arrival_times(
+        stages: List[Tuple[float, float]],
+        start_rate: float = 0.0
+    ) -> List[float]:
+        """
+        Instantes de chegada (segundos desde o início) para um perfil
+
+        Cada estágio (duração, taxa_alvo) varia a taxa linearmente da taxa
+        do estágio anterior até a alvo; taxa constante = estágio com a
+        mesma taxa inicial e final.
+        """
+        arrivals = []
+        offset = 0.0
+        previous_rate = start_rate
+        for duration, target_rate in stages:
+            # Integra a taxa: uma chegada a cada unidade acumulada
+            step = 0.001
+            accumulated = 0.0
+            t = 0.0
+            while t < duration:
+                rate = previous_rate + (target_rate - previous_rate) * (t / duration)
+                accumulated += rate * step
+                while accumulated >= 1.0:
+                    accumulated -= 1.0
+                    arrivals.append(offset + t)
+                t += step
+            offset += duration
+            previous_rate = target_rate
+        return arrivals
+
+    async def _timed_request(
+        self,
+        session: aiohttp.ClientSession,
+        scheduled_at: float,
+        url: str,
+        method: str,
+        headers: Dict,
+        json_data: Dict,
+        timeout: aiohttp.ClientTimeout
+    ) -> Dict[str, Any]:
+        """
+        Requisição com latência medida a partir do instante agendado
+
+        A espera por conexão livre no pool entra na latência: é assim que
+        o loop aberto evita coordinated omission.
+        """
+        sent_at = time.perf_counter()
+        try:
+            async with session.request(
+                method, url, headers=headers, json=json_data, timeout=timeout
+            ) as response:
+                await response.read()
+                done = time.perf_counter()
+                return {
+                    'success': response.status < 500,
+                    'status_code': response.status,
+                    'latency': done - scheduled_at,
+                    'service_time': done - sent_at,
+                }
+        except asyncio.TimeoutError:
+            error = 'timeout'
+        except Exception as e:
+            error = type(e).__name__
+        done = time.perf_counter()
+        return {
+            'success': False,
+            'error': error,
+            'latency': done - scheduled_at,
+            'service_time': done - sent_at,
+        }
+
+    async def run_open_loop(
+        self,
+        url: str,
+        rate: float = None,
+        duration: float = None,
+        stages: List[Tuple[float, float]] = None,
+        pool_size: int = None,
+        method: str = 'GET',
+        headers: Dict = None,
+        json_data: Dict = None
+    ) -> Dict[str, Any]:
+        """
+        Teste de carga em loop aberto (taxa de chegada constante ou rampa)
+
+        Args:
+            url: URL para testar
+            rate: Requisições por segundo (taxa constante)
+            duration: Duração em segundos (taxa constante)
+            stages: Perfil em rampa [(duração, taxa_alvo), ...]
+            pool_size: Máximo de conexões simultâneas
+            method: Método HTTP
+            headers: Headers da requisição
+            json_data: Dados JSON para POST/PUT
+
+        Returns:
+            Estatísticas do teste com percentis de latência
+        """
+        rate = rate or self.load_config['rate']
+        duration = duration or self.load_config['duration']
+        if stages:
+            arrivals = self._arrival_times(stages)
+        else:
+            arrivals = self._arrival_times([(duration, rate)], start_rate=rate)
+
+        pool_size = pool_size or self.load_config['pool_size']
+        max_in_flight = self.load_config['max_in_flight']
+        timeout = aiohttp.ClientTimeout(total=self.load_config['request_timeout'])
+
+        latency = LatencyHistogram()
+        service = LatencyHistogram()
+        status_codes: Dict[Any, int] = defaultdict(int)
+        errors: Dict[str, int] = defaultdict(int)
+        counters = {'successful': 0, 'failed': 0, 'dropped': 0}
+        in_flight = set()
+
+        def collect(task: asyncio.Task):
+            in_flight.discard(task)
+            result = task.result()
+            latency.record(result['latency'])
+            service.record(result['service_time'])
+            status_codes[result.get('status_code', 'error')] += 1
+            if result['success']:
+                counters['successful'] += 1
+            else:
+                counters['failed'] += 1
+                if result.get('error'):
+                    errors[result['error']] += 1
+
+        connector = aiohttp.TCPConnector(limit=pool_size)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            start = time.perf_counter()
+            for offset in arrivals:
+                scheduled_at = start + offset
+                delay = scheduled_at - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+                # Proteção do gerador: acima do limite a chegada é descartada
+                if len(in_flight) >= max_in_flight:
+                    counters['dropped'] += 1
+                    continue
+
+                task = asyncio.ensure_future(self._timed_request(
+                    session, scheduled_at, url, method, headers, json_data, timeout
+                ))
+                in_flight.add(task)
+                task.add_done_callback(collect)
+
+            if in_flight:
+                await asyncio.wait(list(in_flight))
+            total_time = time.perf_counter() - start
+
+        total = counters['successful'] + counters['failed'] + counters['dropped']
+        latency_summary = latency.summary()
+
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'url': url,
+            'method': method,
+            'mode': 'open_loop',
+            'target_rate': rate if not stages else None,
+            'stages': stages,
+            'pool_size': pool_size,
+            'total_requests': total,
+            'successful': counters['successful'],
+            'failed': counters['failed'],
+            'dropped': counters['dropped'],
+            'success_rate': (counters['successful'] / total * 100) if total > 0 else 0,
+            'total_time': total_time,
+            'requests_per_second': latency.total / total_time if total_time > 0 else 0,
+            'latency': latency_summary,
+            'service_time': service.summary(),
+            'avg_response_time': latency_summary['mean'],
+            'min_response_time': latency_summary['min'],
+            'max_response_time': latency_summary['max'],
+            'median_response_time': latency_summary['p50'],
+            'status_codes': dict(status_codes),
+            'errors': dict(errors),
+            'performance_grade': (
+                self._grade_latency(latency_summary['mean'], counters['failed'] + counters['dropped'], total)
+                if latency.total else 'F - Sistema não respondeu'
+            )
+        }
+
+    # ==================== Baselines ====================
+
+    def _load_baselines(self) -> Dict[str, Any]:
+        try:
+            if self.baselines_file.exists():
+                with open(self.baselines_file) as f:
+                    return json.load(f)
+        except:
+            pass
+        return {}
+
+    def _save_baselines(self):
+        try:
+            self.state_dir.mkdir(parents=True, exist_ok=True)
+            with open(self.baselines_file, 'w') as f:
+                json.dump(self.baselines, f, indent=2)
+        except OSError:
+            pass
+
+    def save_baseline(self, name: str, result: Dict[str, Any]):
+        """Grava o resultado como baseline do endpoint"""
+        latency = result.get('latency', {})
+        self.baselines[name] = {
+            'p50': latency.get('p50', 0),
+            'p90': latency.get('p90', 0),
+            'p99': latency.get('p99', 0),
+            'p999': latency.get('p999', 0),
+            'requests_per_second': result.get('requests_per_second', 0),
+            'success_rate': result.get('success_rate', 0),
+            'target_rate': result.get('target_rate'),
+            'recorded_at': result.get('timestamp'),
+        }
+        self._save_baselines()
+
+    def compare_to_baseline(self, name: str, result: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Compara percentis e taxa de sucesso com o baseline
+
+        Regressão: percentil acima de (1 + tolerância) x baseline, ou taxa
+        de sucesso mais de 1 ponto percentual abaixo.
+        """
+        baseline = self.baselines.get(name)
+        if not baseline:
+            return {'status': 'no_baseline', 'regressions': []}
+
+        tolerance = self.load_config['regression_tolerance']
+        latency = result.get('latency', {})
+        regressions = []
+
+        for percentile in ('p50', 'p90', 'p99', 'p999'):
+            before = baseline.get(percentile, 0)
+            after = latency.get(percentile, 0)
+            # Ignora variações abaixo de 1ms (ruído de medição)
+            if before > 0 and after > before * (1 + tolerance) and after - before > 0.001:
+                regressions.append({
+                    'metric': percentile,
+                    'baseline': before,
+                    'current': after,
+                    'change_percent': round((after / before - 1) * 100, 1)
+                })
+
+        if result.get('success_rate', 0) < baseline.get('success_rate', 0) - 1:
+            regressions.append({
+                'metric': 'success_rate',
+                'baseline': baseline.get('success_rate'),
+                'current': result.get('success_rate'),
+            })
+
+        return {
+            'status': 'regression' if regressions else 'ok',
+            'regressions': regressions,
+            'baseline_recorded_at': baseline.get('recorded_at'),
+        }
+
     def test_endpoints(self) -> Dict[str, Any]:
-        """Testa todos os endpoints principais"""
-        endpoints = [
-            ('http://localhost:3000/', 'GET', 'Frontend Home'),
-            ('http://localhost:3000/dashboard', 'GET', 'Dashboard'),
-            ('http://localhost:3000/cftv', 'GET', 'CFTV Page'),
-            ('http://localhost:3001/health', 'GET', 'API Health'),
-            ('http://localhost:8888/', 'GET', 'Monitor Dashboard'),
-        ]
+        """
+        Testa os endpoints principais em loop aberto
 
+        Cada endpoint é comparado ao seu baseline; o primeiro resultado
+        bem-sucedido de um endpoint vira o baseline.
+        """
         results = {}
 
-        for url, method, name in endpoints:
-            try:
-                result = asyncio.run(
-                    self.run_concurrent_requests(url, num_requests=100, method=method)
-                )
-                results[name] = result
-            except Exception as e:
-                results[name] = {
-                    'error': str(e),
-                    'url': url,
-                    'failed': True
-                }
+        async def run_all():
+            for target in self.targets:
+                name = target['name']
+                try:
+                    result = await self.run_open_loop(
+                        target['url'],
+                        rate=target.get('rate'),
+                        duration=target.get('duration'),
+                        method=target.get('method', 'GET')
+                    )
+                    result['baseline'] = self.compare_to_baseline(name, result)
+                    if result['baseline']['status'] == 'no_baseline' and result['successful']:
+                        self.save_baseline(name, result)
+                    results[name] = result
+                except Exception as e:
+                    results[name] = {
+                        'error': str(e),
+                        'url': target['url'],
+                        'failed': True
+                    }
+
+        asyncio.run(run_all())
 
         return {
             'timestamp': datetime.now().isoformat(),
@@ -196,77 +589,113 @@ class LoadTester:
             if not r.get('failed')
         ]) if results else 0
 
+        regressions = [
+            name for name, r in results.items()
+            if r.get('baseline', {}).get('status') == 'regression'
+        ]
+        p99s = [r['latency']['p99'] for r in results.values() if r.get('latency', {}).get('count')]
+
+        if failing >= total_endpoints / 2 and failing > 0:
+            overall_health = 'critical'
+        elif failing > 0 or regressions:
+            overall_health = 'degraded'
+        else:
+            overall_health = 'healthy'
+
         return {
             'total_endpoints_tested': total_endpoints,
             'passing': passing,
             'warning': total_endpoints - passing - failing,
             'failing': failing,
             'avg_requests_per_second': avg_rps,
-            'overall_health': 'healthy' if failing == 0 else 'degraded' if failing < total_endpoints / 2 else 'critical'
+            'worst_p99': max(p99s) if p99s else 0,
+            'regressions': regressions,
+            'overall_health': overall_health
         }
 
-    def stress_test(self, url: str, duration_seconds: int = 60) -> Dict[str, Any]:
+    def stress_test(
+        self,
+        url: str,
+        duration_seconds: int = 60,
+        start_rate: float = 10,
+        step_seconds: int = 10,
+        growth: float = 1.5
+    ) -> Dict[str, Any]:
         """
-        Teste de stress - aumenta carga gradualmente
+        Teste de stress - aumenta a taxa de chegada gradualmente
+
+        Rampa em degraus (taxa x growth a cada step_seconds), em loop
+        aberto, até o fim da duração ou o ponto de ruptura.
 
         Args:
             url: URL para testar
             duration_seconds: Duração do teste
+            start_rate: Taxa inicial (req/s)
+            step_seconds: Duração de cada degrau
+            growth: Fator de aumento da taxa por degrau
 
         Returns:
             Resultados do stress test
         """
         results = []
-        start_time = time.time()
-
-        concurrent_requests = 10
+        rate = start_rate
+        elapsed = 0
 
-        while time.time() - start_time < duration_seconds:
+        while elapsed < duration_seconds:
             result = asyncio.run(
-                self.run_concurrent_requests(url, concurrent_requests)
+                self.run_open_loop(url, rate=rate, duration=step_seconds)
             )
 
             results.append({
-                'concurrent_requests': concurrent_requests,
+                'rate': rate,
                 'result': result
             })
+            elapsed += step_seconds
 
-            # Aumentar carga gradualmente
-            if result['success_rate'] > 95:
-                concurrent_requests = int(concurrent_requests * 1.5)
+            if self._is_breaking(result):
+                break
 
-            time.sleep(5)  # Aguardar entre rodadas
+            # Aumentar carga gradualmente
+            rate = round(rate * growth, 1)
 
         return {
             'timestamp': datetime.now().isoformat(),
             'test_type': 'stress_test',
             'duration': duration_seconds,
             'url': url,
-            'max_concurrent': max([r['concurrent_requests'] for r in results]),
+            'max_rate': max([r['rate'] for r in results]),
             'results': results,
             'breaking_point': self._find_breaking_point(results)
         }
 
+    @staticmethod
+    def _is_breaking(result: Dict[str, Any]) -> bool:
+        """Falhas acima de 10% ou vazão abaixo de 90% da taxa pedida"""
+        target = result.get('target_rate') or 0
+        return (
+            result['success_rate'] < 90 or
+            (target > 0 and result['requests_per_second'] < target * 0.9)
+        )
+
     def _find_breaking_point(self, results: List[Dict]) -> Dict[str, Any]:
         """Identifica o ponto onde o sistema começa a falhar"""
-        for i, r in enumerate(results):
-            if r['result']['success_rate'] < 90:
+        for r in results:
+            if self._is_breaking(r['result']):
                 return {
-                    'concurrent_requests': r['concurrent_requests'],
+                    'rate': r['rate'],
                     'success_rate': r['result']['success_rate'],
-                    'avg_response_time': r['result']['avg_response_time']
+                    'requests_per_second': r['result']['requests_per_second'],
+                    'p99': r['result']['latency']['p99']
                 }
 
         return {
             'message': 'Sistema aguentou toda a carga',
-            'max_tested': results[-1]['concurrent_requests'] if results else 0
+            'max_tested': results[-1]['rate'] if results else 0
         }
 
 
 if __name__ == '__main__':
     # Teste
-    import json
-
     tester = LoadTester({})
     results = tester.test_endpoints()
 
@@ -1,25 +1,52 @@
 """
 Skill: Log Analyzer
 Analisa logs do sistema em busca de erros, padrões e anomalias
+
+Ingestão incremental: por arquivo guarda inode e offset (checkpoint) e
+lê apenas os bytes novos a cada ciclo, tratando rotação e truncamento.
+Um único regex combinado, com um grupo nomeado por alternativa, varre o
+bloco novo: o grupo de cada match diz se a linha é erro, warning ou qual
+padrão configurado ocorreu, sem novas buscas por linha.
 """
 
+import os
 import re
 import json
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Optional
-from collections import defaultdict, Counter
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+from collections import defaultdict, Counter, deque
 import hashlib
 
+# Palavras-chave das verificações de erro/warning (substrings, minúsculas)
+ERROR_KEYWORDS = ['error', 'erro', 'failed', 'failure']
+WARNING_KEYWORDS = ['warn', 'warning', 'aviso']
+
 
 class LogAnalyzer:
     """Analisa logs do sistema identificando erros e padrões"""
 
-    def __init__(self, config: Dict[str, Any]):
+    def __init__(self, config: Dict[str, Any], state_dir: Optional[str] = None):
         self.config = config
         self.error_patterns = self._compile_patterns()
+        # Grupo nomeado -> padrão configurado (chave em analysis['patterns'])
+        self.pattern_groups = {f'p{i}': p.pattern for i, p in enumerate(self.error_patterns)}
+        self.combined_pattern = self._compile_combined(self.error_patterns)
         self.error_history = defaultdict(list)
         self.analysis_cache = {}
 
+        log_config = config.get('log_analysis', {})
+        self.max_read_bytes = log_config.get('max_read_bytes', 8 * 1024 * 1024)
+        self.rolling_window = timedelta(minutes=log_config.get('rolling_window_minutes', 60))
+
+        # Checkpoints por arquivo: inode, offset e linhas já lidas
+        self.state_dir = Path(state_dir or '/opt/conecta-plus/agents/system-monitor/state')
+        self.checkpoint_file = self.state_dir / 'log_checkpoints.json'
+        self.checkpoints: Dict[str, Dict[str, int]] = self._load_checkpoints()
+
+        # Contadores por ciclo para a janela deslizante de cada log
+        self.rolling: Dict[str, deque] = defaultdict(deque)
+
     def _compile_patterns(self) -> List[re.Pattern]:
         """Compila padrões regex para identificar erros"""
         patterns = []
@@ -28,32 +55,161 @@ class LogAnalyzer:
                 patterns.append(re.compile(pattern, re.IGNORECASE))
         return patterns
 
+    def _compile_combined(self, patterns: List[re.Pattern]) -> re.Pattern:
+        """
+        Regex único com todos os padrões configurados (grupos p0, p1...) e
+        as palavras-chave (grupos error e warning). Os padrões vêm antes: na
+        mesma posição vence o mais específico, e as palavras-chave contidas
+        no trecho casado são conferidas em _match_groups().
+        """
+        alternatives = [f'(?P<p{i}>{p.pattern})' for i, p in enumerate(patterns)]
+        alternatives.append('(?P<error>' + '|'.join(map(re.escape, ERROR_KEYWORDS)) + ')')
+        alternatives.append('(?P<warning>' + '|'.join(map(re.escape, WARNING_KEYWORDS)) + ')')
+        return re.compile('|'.join(alternatives), re.IGNORECASE)
+
+    @staticmethod
+    def _match_groups(match: re.Match) -> List[str]:
+        """Grupos indicados por um match do regex combinado"""
+        group = match.lastgroup
+        if group in ('error', 'warning'):
+            return [group]
+        groups = [group]
+        matched = match.group().lower()
+        if any(keyword in matched for keyword in ERROR_KEYWORDS):
+            groups.append('error')
+        if any(keyword in matched for keyword in WARNING_KEYWORDS):
+            groups.append('warning')
+        return groups
+
+    # ==================== Checkpoints ====================
+
+    def _load_checkpoints(self) -> Dict[str, Dict[str, int]]:
+        try:
+            with open(self.checkpoint_file) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def save_checkpoints(self):
+        """Persiste os checkpoints (chamado ao fim de cada análise completa)"""
+        try:
+            self.state_dir.mkdir(parents=True, exist_ok=True)
+            tmp = self.checkpoint_file.with_suffix('.tmp')
+            with open(tmp, 'w') as f:
+                json.dump(self.checkpoints, f)
+            os.replace(tmp, self.checkpoint_file)
+        except OSError:
+            pass
+
+    def _read_new(self, log_path: str, lines: int) -> Tuple[str, int]:
+        """
+        Lê o que foi escrito desde o último checkpoint.
+        Retorna (texto, número da primeira linha). Só linhas completas são
+        consumidas; a linha parcial no fim fica para o próximo ciclo.
+        """
+        stat = os.stat(log_path)
+        checkpoint = self.checkpoints.get(log_path)
+        chunks: List[bytes] = []
+
+        if checkpoint is None:
+            # Primeira vez: analisar as últimas N linhas, como antes. As
+            # linhas já existentes são contadas uma vez para que os números
+            # reportados daqui em diante sejam os do arquivo.
+            with open(log_path, 'r', encoding='utf-8', errors='ignore') as f:
+                tail = self._tail(f, lines)
+            existing, partial = self._count_lines(log_path, stat.st_size)
+            self.checkpoints[log_path] = {
+                'inode': stat.st_ino,
+                'offset': stat.st_size,
+                'line': existing,
+            }
+            return '\n'.join(tail), max(1, existing + partial - len(tail) + 1)
+
+        if checkpoint['inode'] != stat.st_ino:
+            # Rotação: terminar o arquivo antigo (logrotate renomeia para .1)
+            rotated = f'{log_path}.1'
+            try:
+                if os.stat(rotated).st_ino == checkpoint['inode']:
+                    remainder = self._read_from(rotated, checkpoint['offset'], complete=False)[0]
+                    if remainder and not remainder.endswith(b'\n'):
+                        remainder += b'\n'
+                    chunks.append(remainder)
+            except OSError:
+                pass
+            checkpoint = {'inode': stat.st_ino, 'offset': 0, 'line': 0}
+        elif stat.st_size < checkpoint['offset']:
+            # Truncado (copytruncate): recomeçar do início
+            checkpoint = {'inode': stat.st_ino, 'offset': 0, 'line': 0}
+
+        data, consumed = self._read_from(log_path, checkpoint['offset'])
+        chunks.append(data)
+        text = b''.join(chunks).decode('utf-8', errors='ignore')
+
+        first_line = checkpoint['line'] + 1
+        checkpoint['offset'] += consumed
+        checkpoint['line'] += data.count(b'\n')
+        self.checkpoints[log_path] = checkpoint
+        return text, first_line
+
+    def _count_lines(self, path: str, size: int) -> Tuple[int, int]:
+        """
+        Conta as linhas completas nos primeiros `size` bytes. Retorna
+        (linhas completas, 1 se houver uma linha parcial no fim senão 0).
+        """
+        count = 0
+        last = b''
+        with open(path, 'rb') as f:
+            remaining = size
+            while remaining > 0:
+                block = f.read(min(1024 * 1024, remaining))
+                if not block:
+                    break
+                count += block.count(b'\n')
+                last = block[-1:]
+                remaining -= len(block)
+        return count, 1 if last and last != b'\n' else 0
+
+    def _read_from(self, path: str, offset: int, complete: bool = True) -> Tuple[bytes, int]:
+        """Lê até `max_read_bytes` a partir de `offset`; retorna (dados, bytes consumidos)"""
+        with open(path, 'rb') as f:
+            f.seek(offset)
+            data = f.read(self.max_read_bytes)
+        if complete:
+            end = data.rfind(b'\n') + 1
+            data = data[:end]
+        return data, len(data)
+
     def analyze_log_file(
         self,
         log_path: str,
         lines: int = 1000,
-        since: Optional[datetime] = None
+        since: Optional[datetime] = None,
+        incremental: bool = True
     ) -> Dict[str, Any]:
         """
         Analisa arquivo de log
 
         Args:
             log_path: Caminho do arquivo de log
-            lines: Número de linhas para analisar (do final)
+            lines: Número de linhas para analisar (do final) na primeira
+                leitura ou no modo não incremental
             since: Analisar apenas logs após este timestamp
+            incremental: Ler só o que foi escrito desde o último ciclo
 
         Returns:
             Dicionário com análise completa
         """
         try:
-            with open(log_path, 'r', encoding='utf-8', errors='ignore') as f:
-                # Ler últimas N linhas
-                log_lines = self._tail(f, lines)
+            if incremental:
+                text, first_line = self._read_new(log_path, lines)
+            else:
+                with open(log_path, 'r', encoding='utf-8', errors='ignore') as f:
+                    text, first_line = '\n'.join(self._tail(f, lines)), 1
 
             analysis = {
                 'log_path': log_path,
                 'timestamp': datetime.now().isoformat(),
-                'total_lines': len(log_lines),
+                'total_lines': text.count('\n') + (1 if text and not text.endswith('\n') else 0),
                 'errors': [],
                 'warnings': [],
                 'patterns': defaultdict(int),
@@ -62,13 +218,16 @@ class LogAnalyzer:
                 'recommendations': []
             }
 
-            # Analisar cada linha
-            for line_num, line in enumerate(log_lines, 1):
-                self._analyze_line(line, line_num, analysis)
+            # Analisar só as linhas com match no regex combinado
+            for line_num, line, groups in self._matching_lines(text, first_line):
+                self._analyze_line(line, line_num, analysis, groups)
 
             # Calcular severidade geral
             analysis['severity'] = self._calculate_severity(analysis)
 
+            if incremental:
+                analysis['rolling'] = self._update_rolling(log_path, analysis)
+
             # Gerar recomendações
             analysis['recommendations'] = self._generate_recommendations(analysis)
 
@@ -112,26 +271,79 @@ class LogAnalyzer:
         content = ''.join(reversed(blocks))
         return content.splitlines()[-lines:]
 
-    def _analyze_line(self, line: str, line_num: int, analysis: Dict[str, Any]):
-        """Analisa uma linha de log"""
-        line_lower = line.lower()
+    def _matching_lines(self, text: str, first_line: int):
+        """
+        Percorre os matches do regex combinado no bloco inteiro e gera
+        (número, linha, grupos) de cada linha com match, uma única vez;
+        grupos reúne os de todos os matches da linha.
+        """
+        line_start = -1
+        line_num = first_line
+        scanned = 0
+        line, groups = '', set()
+        for match in self.combined_pattern.finditer(text):
+            start = text.rfind('\n', 0, match.start()) + 1
+            if start != line_start:
+                if groups:
+                    yield line_num, line, groups
+                line_num += text.count('\n', scanned, start)
+                scanned = start
+                line_start = start
+                end = text.find('\n', match.end())
+                line, groups = text[start:end if end != -1 else len(text)], set()
+            groups.update(self._match_groups(match))
+        if groups:
+            yield line_num, line, groups
+
+    def _update_rolling(self, log_path: str, analysis: Dict[str, Any]) -> Dict[str, Any]:
+        """Acumula os contadores do ciclo e retorna os totais da janela deslizante"""
+        now = datetime.now()
+        buckets = self.rolling[log_path]
+        buckets.append((
+            now,
+            len(analysis['errors']),
+            len(analysis['warnings']),
+            analysis['total_lines'],
+            Counter(analysis['patterns']),
+        ))
+        while buckets and now - buckets[0][0] > self.rolling_window:
+            buckets.popleft()
+
+        patterns = Counter()
+        for bucket in buckets:
+            patterns.update(bucket[4])
+        return {
+            'window_minutes': int(self.rolling_window.total_seconds() // 60),
+            'errors': sum(b[1] for b in buckets),
+            'warnings': sum(b[2] for b in buckets),
+            'lines': sum(b[3] for b in buckets),
+            'patterns': dict(patterns),
+        }
+
+    def _analyze_line(self, line: str, line_num: int, analysis: Dict[str, Any],
+                      groups: Optional[set] = None):
+        """Analisa uma linha de log a partir dos grupos do regex combinado"""
+        if groups is None:
+            groups = set()
+            for match in self.combined_pattern.finditer(line):
+                groups.update(self._match_groups(match))
 
         # Detectar erros
-        if any(keyword in line_lower for keyword in ['error', 'erro', 'failed', 'failure']):
+        if 'error' in groups:
             error = self._extract_error(line, line_num)
             if error:
                 analysis['errors'].append(error)
 
         # Detectar warnings
-        if any(keyword in line_lower for keyword in ['warn', 'warning', 'aviso']):
+        if 'warning' in groups:
             warning = self._extract_warning(line, line_num)
             if warning:
                 analysis['warnings'].append(warning)
 
         # Contar padrões
-        for pattern in self.error_patterns:
-            if pattern.search(line):
-                analysis['patterns'][pattern.pattern] += 1
+        for group in groups:
+            if group in self.pattern_groups:
+                analysis['patterns'][self.pattern_groups[group]] += 1
 
     def _extract_error(self, line: str, line_num: int) -> Optional[Dict[str, Any]]:
         """Extrai informações detalhadas de um erro"""
@@ -300,6 +512,8 @@ class LogAnalyzer:
                     'error_count': len(analysis.get('errors', []))
                 })
 
+        self.save_checkpoints()
+
         # Calcular severidade geral
         severities = [log['severity'] for log in results['logs'].values()]
         if 'critical' in severities:
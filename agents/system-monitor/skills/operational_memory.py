@@ -8,9 +8,14 @@ Princípios:
 - Construir base de conhecimento progressiva
 - Usar histórico para prever resultados
 - Detectar padrões de sucesso/falha
+
+Persistência: SQLite (WAL) com log append-only de ações, contadores
+agregados por hash de ação/contexto e compactação periódica.
 """
 
 import json
+import sqlite3
+import threading
 from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime, timedelta
 from pathlib import Path
@@ -19,6 +24,161 @@ import statistics
 import hashlib
 
 
+class OperationalStore:
+    """
+    Armazenamento embutido da memória operacional (SQLite em modo WAL)
+
+    - actions: log append-only das ações (uma linha por registro)
+    - counters: contadores agregados de tentativas/sucessos por chave
+      (hash da ação, tipo da ação, hash do contexto + tipo)
+    - kv: partes pequenas do conhecimento (issues conhecidas, práticas...)
+
+    Cada registro é uma transação pequena (INSERT + UPSERTs); a compactação
+    periódica poda o log e trunca o WAL.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS actions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT NOT NULL,
+            action_hash TEXT NOT NULL,
+            context_hash TEXT NOT NULL,
+            action_type TEXT NOT NULL,
+            success INTEGER NOT NULL,
+            record TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_actions_hash ON actions(action_hash, id);
+        CREATE INDEX IF NOT EXISTS idx_actions_type ON actions(action_type, id);
+        CREATE TABLE IF NOT EXISTS counters (
+            scope TEXT NOT NULL,
+            key TEXT NOT NULL,
+            sub TEXT NOT NULL DEFAULT '',
+            total INTEGER NOT NULL DEFAULT 0,
+            successes INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (scope, key, sub)
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS kv (
+            name TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(str(path), check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.executescript(self.SCHEMA)
+
+    def append(
+        self,
+        record: Dict[str, Any],
+        counter_keys: List[Tuple[str, str, str]],
+        kv: Dict[str, Any] = None
+    ):
+        """Grava um registro, incrementa os contadores e atualiza o kv"""
+        success = 1 if record.get('success') else 0
+        with self._lock, self.db:
+            self.db.execute(
+                'INSERT INTO actions (timestamp, action_hash, context_hash, action_type, success, record) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (
+                    record['timestamp'], record['action_hash'], record['context_hash'],
+                    record['action'].get('type', 'unknown'), success,
+                    json.dumps(record, default=str)
+                )
+            )
+            self.db.executemany(
+                'INSERT INTO counters (scope, key, sub, total, successes) VALUES (?, ?, ?, 1, ?) '
+                'ON CONFLICT(scope, key, sub) DO UPDATE SET '
+                'total = total + 1, successes = successes + excluded.successes',
+                [(scope, key, sub, success) for scope, key, sub in counter_keys]
+            )
+            self._put_many(kv or {})
+
+    def put(self, name: str, value: Any):
+        with self._lock, self.db:
+            self._put_many({name: value})
+
+    def _put_many(self, values: Dict[str, Any]):
+        self.db.executemany(
+            'INSERT OR REPLACE INTO kv (name, value) VALUES (?, ?)',
+            [(name, json.dumps(value, default=str)) for name, value in values.items()]
+        )
+
+    def get(self, name: str, default: Any = None) -> Any:
+        with self._lock:
+            row = self.db.execute('SELECT value FROM kv WHERE name = ?', (name,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def counters(self) -> List[Tuple[str, str, str, int, int]]:
+        with self._lock:
+            return self.db.execute(
+                'SELECT scope, key, sub, total, successes FROM counters'
+            ).fetchall()
+
+    def recent_by_type(self, action_type: str, limit: int) -> List[Dict[str, Any]]:
+        """Últimos registros de um tipo de ação (mais antigo primeiro)"""
+        with self._lock:
+            rows = self.db.execute(
+                'SELECT record FROM actions WHERE action_type = ? ORDER BY id DESC LIMIT ?',
+                (action_type, limit)
+            ).fetchall()
+        return [json.loads(row[0]) for row in reversed(rows)]
+
+    def history(self, action_hash: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Últimos registros de uma ação (mais recente primeiro)"""
+        with self._lock:
+            rows = self.db.execute(
+                'SELECT record FROM actions WHERE action_hash = ? ORDER BY id DESC LIMIT ?',
+                (action_hash, limit)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def import_records(self, records: List[Dict[str, Any]]):
+        """Importa registros em lote (migração), sem mexer nos contadores"""
+        with self._lock, self.db:
+            self.db.executemany(
+                'INSERT INTO actions (timestamp, action_hash, context_hash, action_type, success, record) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                [
+                    (
+                        r.get('timestamp', ''), r.get('action_hash', ''), r.get('context_hash', ''),
+                        r.get('action', {}).get('type', 'unknown'), 1 if r.get('success') else 0,
+                        json.dumps(r, default=str)
+                    )
+                    for r in records
+                ]
+            )
+
+    def import_counters(self, rows: List[Tuple[str, str, str, int, int]]):
+        with self._lock, self.db:
+            self.db.executemany(
+                'INSERT OR REPLACE INTO counters (scope, key, sub, total, successes) VALUES (?, ?, ?, ?, ?)',
+                rows
+            )
+
+    def compact(self, max_entries: int) -> int:
+        """Poda o log além de max_entries e trunca o WAL. Retorna linhas removidas"""
+        with self._lock:
+            with self.db:
+                cursor = self.db.execute(
+                    'DELETE FROM actions WHERE id <= (SELECT MAX(id) FROM actions) - ?',
+                    (max_entries,)
+                )
+            self.db.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        return cursor.rowcount
+
+    def count(self) -> int:
+        with self._lock:
+            return self.db.execute('SELECT COUNT(*) FROM actions').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+
 class OperationalMemory:
     """
     Sistema de Memória Operacional
@@ -35,11 +195,10 @@ class OperationalMemory:
         self.state_dir = Path('/opt/conecta-plus/agents/system-monitor/state')
         self.state_dir.mkdir(parents=True, exist_ok=True)
 
+        # JSON do formato antigo (migrados para o banco na primeira carga)
         self.memory_file = self.state_dir / 'operational_memory.json'
         self.knowledge_file = self.state_dir / 'system_knowledge.json'
-
-        self.memory = self._load_memory()
-        self.knowledge = self._load_knowledge()
+        self.db_file = self.state_dir / 'operational_memory.db'
 
         # Configuração de aprendizado
         self.learning_config = {
@@ -48,55 +207,127 @@ class OperationalMemory:
             'success_weight': 1.0,              # Peso de sucesso
             'failure_weight': 1.5,              # Peso de falha (aprender mais com erros)
             'max_memory_entries': 10000,        # Máximo de entradas na memória
+            'compact_every': 500,               # Compactar o log a cada N registros
         }
 
+        self.store = OperationalStore(self.db_file)
+        self._migrate_legacy_json()
+
+        self.memory = self._load_memory()
+        self.knowledge = self._load_knowledge()
+
+        # Padrões indexados: chave -> padrão e tipo de ação -> chaves
+        self.patterns: Dict[Tuple[str, ...], Dict[str, Any]] = {}
+        self._patterns_by_action: Dict[str, Dict[Tuple[str, ...], Dict[str, Any]]] = defaultdict(dict)
+        self._detect_patterns()
+        self._writes = 0
+
     def _load_memory(self) -> Dict[str, Any]:
-        """Carrega memória operacional"""
-        try:
-            if self.memory_file.exists():
-                with open(self.memory_file) as f:
-                    return json.load(f)
-        except:
-            pass
-        return {
-            'actions': [],          # Histórico de ações
-            'outcomes': {},         # {action_hash: [outcomes]}
-            'contexts': {},         # Contextos de execução
-            'patterns': [],         # Padrões detectados
-            'metadata': {
+        """Carrega contadores por hash de ação e metadados"""
+        memory = {
+            'outcomes': {},         # {action_hash: {total, successes}}
+            'metadata': self.store.get('metadata') or {
                 'created_at': datetime.now().isoformat(),
                 'total_actions': 0,
                 'total_successes': 0,
                 'total_failures': 0
             }
         }
+        for scope, key, sub, total, successes in self.store.counters():
+            if scope == 'action':
+                memory['outcomes'][key] = {'total': total, 'successes': successes}
+        return memory
 
     def _save_memory(self):
-        """Salva memória"""
-        with open(self.memory_file, 'w') as f:
-            json.dump(self.memory, f, indent=2, default=str)
+        """Salva metadados (registros e contadores são gravados em record_action)"""
+        self.store.put('metadata', self.memory['metadata'])
 
     def _load_knowledge(self) -> Dict[str, Any]:
-        """Carrega base de conhecimento"""
-        try:
-            if self.knowledge_file.exists():
-                with open(self.knowledge_file) as f:
-                    return json.load(f)
-        except:
-            pass
-        return {
+        """Carrega base de conhecimento a partir dos contadores e do kv"""
+        knowledge = {
             'action_effectiveness': {},   # {action_type: effectiveness_score}
             'context_correlations': {},   # {context_hash: {action: success_rate}}
-            'known_issues': {},           # Issues conhecidas e soluções
-            'best_practices': [],         # Melhores práticas aprendidas
-            'anti_patterns': [],          # Anti-padrões a evitar
-            'system_baseline': {},        # Baseline do sistema
+            'known_issues': self.store.get('known_issues', {}),        # Issues conhecidas e soluções
+            'best_practices': self.store.get('best_practices', []),    # Melhores práticas aprendidas
+            'anti_patterns': self.store.get('anti_patterns', []),      # Anti-padrões a evitar
+            'system_baseline': self.store.get('system_baseline', {}),  # Baseline do sistema
         }
 
-    def _save_knowledge(self):
-        """Salva conhecimento"""
-        with open(self.knowledge_file, 'w') as f:
-            json.dump(self.knowledge, f, indent=2, default=str)
+        for scope, key, sub, total, successes in self.store.counters():
+            if scope == 'action_type':
+                knowledge['action_effectiveness'][key] = {
+                    'total': total,
+                    'successes': successes,
+                    'score': successes / total if total > 0 else 0.5,
+                    'samples': [
+                        {
+                            'success': r.get('success', False),
+                            'timestamp': r.get('timestamp'),
+                            'context_hash': r.get('context_hash')
+                        }
+                        for r in self.store.recent_by_type(key, 100)
+                    ]
+                }
+            elif scope == 'context':
+                knowledge['context_correlations'].setdefault(key, {})[sub] = {
+                    'attempts': total,
+                    'successes': successes,
+                    'success_rate': successes / total if total > 0 else 0.5
+                }
+
+        # Índice de anti-padrões por tipo de ação
+        self._anti_by_action = {p.get('action'): p for p in knowledge['anti_patterns']}
+        return knowledge
+
+    def _save_knowledge(self, *names: str):
+        """Salva partes do conhecimento guardadas no kv"""
+        for name in names or ('known_issues', 'best_practices', 'anti_patterns', 'system_baseline'):
+            self.store.put(name, self.knowledge[name])
+
+    def _migrate_legacy_json(self):
+        """Importa operational_memory.json/system_knowledge.json para o banco"""
+        if self.store.get('metadata') is not None:
+            return
+        if not (self.memory_file.exists() or self.knowledge_file.exists()):
+            return
+
+        try:
+            memory, knowledge = {}, {}
+            if self.memory_file.exists():
+                with open(self.memory_file) as f:
+                    memory = json.load(f)
+            if self.knowledge_file.exists():
+                with open(self.knowledge_file) as f:
+                    knowledge = json.load(f)
+
+            rows = []
+            for action_type, eff in knowledge.get('action_effectiveness', {}).items():
+                rows.append(('action_type', action_type, '', eff.get('total', 0), eff.get('successes', 0)))
+            for context_hash, actions in knowledge.get('context_correlations', {}).items():
+                for action_type, corr in actions.items():
+                    rows.append(('context', context_hash, action_type,
+                                 corr.get('attempts', 0), corr.get('successes', 0)))
+            for action_hash, outcomes in memory.get('outcomes', {}).items():
+                successes = sum(1 for o in outcomes if o.get('success'))
+                rows.append(('action', action_hash, '', len(outcomes), successes))
+
+            self.store.import_records(memory.get('actions', [])[-self.learning_config['max_memory_entries']:])
+            self.store.import_counters(rows)
+            for name in ('known_issues', 'best_practices', 'anti_patterns', 'system_baseline'):
+                if name in knowledge:
+                    self.store.put(name, knowledge[name])
+            self.store.put('metadata', memory.get('metadata') or {
+                'created_at': datetime.now().isoformat(),
+                'total_actions': 0,
+                'total_successes': 0,
+                'total_failures': 0
+            })
+
+            for path in (self.memory_file, self.knowledge_file):
+                if path.exists():
+                    path.rename(path.with_suffix('.json.migrated'))
+        except Exception:
+            pass
 
     def _hash_action(self, action: Dict[str, Any]) -> str:
         """Gera hash único para uma ação"""
@@ -146,48 +377,44 @@ class OperationalMemory:
             'success': outcome.get('success', False)
         }
 
-        # Adicionar à memória
-        self.memory['actions'].append(record)
-
-        # Atualizar outcomes
-        if action_hash not in self.memory['outcomes']:
-            self.memory['outcomes'][action_hash] = []
-        self.memory['outcomes'][action_hash].append({
-            'success': outcome.get('success', False),
-            'context_hash': context_hash,
-            'timestamp': now.isoformat(),
-            'details': outcome.get('details', {})
-        })
+        success = outcome.get('success', False)
 
-        # Atualizar contextos
-        if context_hash not in self.memory['contexts']:
-            self.memory['contexts'][context_hash] = {
-                'context': context,
-                'actions': []
-            }
-        self.memory['contexts'][context_hash]['actions'].append({
-            'action_hash': action_hash,
-            'success': outcome.get('success', False),
-            'timestamp': now.isoformat()
-        })
+        # Contadores por hash da ação
+        counters = self.memory['outcomes'].setdefault(action_hash, {'total': 0, 'successes': 0})
+        counters['total'] += 1
+        if success:
+            counters['successes'] += 1
 
         # Atualizar metadados
         self.memory['metadata']['total_actions'] += 1
-        if outcome.get('success', False):
+        if success:
             self.memory['metadata']['total_successes'] += 1
         else:
             self.memory['metadata']['total_failures'] += 1
 
-        # Limitar tamanho da memória
-        if len(self.memory['actions']) > self.learning_config['max_memory_entries']:
-            self.memory['actions'] = self.memory['actions'][-self.learning_config['max_memory_entries']:]
-
         # Aprender com a ação
         self._learn_from_action(record)
 
-        # Salvar
-        self._save_memory()
-        self._save_knowledge()
+        # Salvar: um INSERT no log + UPSERT dos contadores (O(registro))
+        action_type = action.get('type', 'unknown')
+        self.store.append(
+            record,
+            [
+                ('action', action_hash, ''),
+                ('action_type', action_type, ''),
+                ('context', context_hash, action_type),
+            ],
+            kv={
+                'metadata': self.memory['metadata'],
+                'best_practices' if success else 'anti_patterns':
+                    self.knowledge['best_practices' if success else 'anti_patterns'],
+            }
+        )
+
+        # Compactação periódica do log
+        self._writes += 1
+        if self._writes % self.learning_config['compact_every'] == 0:
+            self.store.compact(self.learning_config['max_memory_entries'])
 
     def _learn_from_action(self, record: Dict[str, Any]):
         """Aprende com uma ação registrada"""
@@ -236,8 +463,8 @@ class OperationalMemory:
             corr['successes'] += 1
         corr['success_rate'] = corr['successes'] / corr['attempts']
 
-        # 3. Detectar padrões
-        self._detect_patterns()
+        # 3. Atualizar padrões afetados por este registro
+        self._update_patterns(context_hash, action_type)
 
         # 4. Atualizar melhores práticas / anti-padrões
         if success:
@@ -246,50 +473,71 @@ class OperationalMemory:
             self._update_anti_patterns(record)
 
     def _detect_patterns(self):
-        """Detecta padrões nos dados de memória"""
-        patterns = []
-
-        # Padrão 1: Ações que sempre falham em certo contexto
+        """Detecta padrões em todos os contadores (reconstrução na carga)"""
+        self.patterns = {}
+        self._patterns_by_action = defaultdict(dict)
         for context_hash, actions in self.knowledge['context_correlations'].items():
-            for action_type, stats in actions.items():
-                if stats['attempts'] >= 3:
-                    if stats['success_rate'] < 0.2:
-                        patterns.append({
-                            'type': 'consistent_failure',
-                            'action': action_type,
-                            'context': context_hash,
-                            'success_rate': stats['success_rate'],
-                            'recommendation': f'Evitar {action_type} neste contexto'
-                        })
-                    elif stats['success_rate'] > 0.9:
-                        patterns.append({
-                            'type': 'consistent_success',
-                            'action': action_type,
-                            'context': context_hash,
-                            'success_rate': stats['success_rate'],
-                            'recommendation': f'{action_type} é seguro neste contexto'
-                        })
-
-        # Padrão 2: Ações com tendência de piora
-        for action_type, eff in self.knowledge['action_effectiveness'].items():
-            samples = eff.get('samples', [])
-            if len(samples) >= 10:
-                recent = samples[-5:]
-                older = samples[-10:-5]
-
-                recent_rate = sum(1 for s in recent if s['success']) / 5
-                older_rate = sum(1 for s in older if s['success']) / 5
-
-                if recent_rate < older_rate - 0.3:  # Queda de 30%+
-                    patterns.append({
-                        'type': 'degrading_action',
-                        'action': action_type,
-                        'recent_rate': recent_rate,
-                        'older_rate': older_rate,
-                        'recommendation': f'{action_type} está ficando menos efetivo'
-                    })
-
-        self.memory['patterns'] = patterns
+            for action_type in actions:
+                self._update_context_pattern(context_hash, action_type)
+        for action_type in self.knowledge['action_effectiveness']:
+            self._update_degrading_pattern(action_type)
+
+    def _update_patterns(self, context_hash: str, action_type: str):
+        """Atualiza só os padrões da combinação registrada (O(1))"""
+        self._update_context_pattern(context_hash, action_type)
+        self._update_degrading_pattern(action_type)
+
+    def _set_pattern(self, key: Tuple[str, ...], action_type: str, pattern: Optional[Dict[str, Any]]):
+        if pattern is None:
+            self.patterns.pop(key, None)
+            self._patterns_by_action.get(action_type, {}).pop(key, None)
+        else:
+            self.patterns[key] = pattern
+            self._patterns_by_action[action_type][key] = pattern
+
+    def _update_context_pattern(self, context_hash: str, action_type: str):
+        """Padrão 1: Ações que sempre falham (ou acertam) em certo contexto"""
+        stats = self.knowledge['context_correlations'][context_hash][action_type]
+        pattern = None
+        if stats['attempts'] >= 3:
+            if stats['success_rate'] < 0.2:
+                pattern = {
+                    'type': 'consistent_failure',
+                    'action': action_type,
+                    'context': context_hash,
+                    'success_rate': stats['success_rate'],
+                    'recommendation': f'Evitar {action_type} neste contexto'
+                }
+            elif stats['success_rate'] > 0.9:
+                pattern = {
+                    'type': 'consistent_success',
+                    'action': action_type,
+                    'context': context_hash,
+                    'success_rate': stats['success_rate'],
+                    'recommendation': f'{action_type} é seguro neste contexto'
+                }
+        self._set_pattern(('context', context_hash, action_type), action_type, pattern)
+
+    def _update_degrading_pattern(self, action_type: str):
+        """Padrão 2: Ações com tendência de piora"""
+        samples = self.knowledge['action_effectiveness'][action_type].get('samples', [])
+        pattern = None
+        if len(samples) >= 10:
+            recent = samples[-5:]
+            older = samples[-10:-5]
+
+            recent_rate = sum(1 for s in recent if s['success']) / 5
+            older_rate = sum(1 for s in older if s['success']) / 5
+
+            if recent_rate < older_rate - 0.3:  # Queda de 30%+
+                pattern = {
+                    'type': 'degrading_action',
+                    'action': action_type,
+                    'recent_rate': recent_rate,
+                    'older_rate': older_rate,
+                    'recommendation': f'{action_type} está ficando menos efetivo'
+                }
+        self._set_pattern(('degrading', action_type), action_type, pattern)
 
     def _update_best_practices(self, record: Dict[str, Any]):
         """Atualiza melhores práticas baseado em sucesso"""
@@ -346,6 +594,7 @@ class OperationalMemory:
             else:
                 idx = self.knowledge['anti_patterns'].index(existing[0])
                 self.knowledge['anti_patterns'][idx] = anti_pattern
+            self._anti_by_action[action_type] = anti_pattern
 
     def predict_outcome(
         self,
@@ -384,21 +633,19 @@ class OperationalMemory:
                 'attempts': context_corr[action_type]['attempts']
             }
 
-        # 3. Padrões relevantes
-        for pattern in self.memory.get('patterns', []):
-            if pattern.get('action') == action_type:
-                evidence['patterns'].append(pattern)
+        # 3. Padrões relevantes (índice por tipo de ação)
+        evidence['patterns'].extend(self._patterns_by_action.get(action_type, {}).values())
 
         # Calcular predição
         prediction = self._calculate_prediction(evidence)
 
         # Verificar anti-padrões
-        for anti in self.knowledge.get('anti_patterns', []):
-            if anti.get('action') == action_type:
-                prediction['warnings'].append(
-                    f"Anti-padrão detectado: {anti.get('description')}"
-                )
-                prediction['recommended'] = False
+        anti = self._anti_by_action.get(action_type)
+        if anti:
+            prediction['warnings'].append(
+                f"Anti-padrão detectado: {anti.get('description')}"
+            )
+            prediction['recommended'] = False
 
         return prediction
 
@@ -543,7 +790,7 @@ class OperationalMemory:
                 'first_used': datetime.now().isoformat()
             })
 
-        self._save_knowledge()
+        self._save_knowledge('known_issues')
 
     def update_system_baseline(self, metrics: Dict[str, Any]):
         """Atualiza baseline do sistema"""
@@ -570,7 +817,7 @@ class OperationalMemory:
                 b['max'] = max(b['values'])
 
         self.knowledge['system_baseline'] = baseline
-        self._save_knowledge()
+        self._save_knowledge('system_baseline')
 
     def get_statistics(self) -> Dict[str, Any]:
         """Retorna estatísticas da memória operacional"""
@@ -590,7 +837,8 @@ class OperationalMemory:
             'known_issues': len(self.knowledge.get('known_issues', {})),
             'best_practices_count': len(self.knowledge.get('best_practices', [])),
             'anti_patterns_count': len(self.knowledge.get('anti_patterns', [])),
-            'detected_patterns': len(self.memory.get('patterns', [])),
+            'detected_patterns': len(self.patterns),
+            'stored_actions': self.store.count(),
             'memory_created': meta.get('created_at', 'unknown')
         }
 
@@ -44,6 +44,11 @@ class Settings(BaseSettings):
     RATE_LIMIT_ENABLED: bool = True
     RATE_LIMIT_REQUESTS: int = 100  # requests por janela
     RATE_LIMIT_WINDOW: int = 60  # segundos
+    RATE_LIMIT_BACKEND: str = "memory"  # memory | redis (compartilhado entre workers)
+
+    # Audit Log (destino do flush em lote)
+    AUDIT_LOG_SINK: str = "logger"  # logger | file | postgres | redis
+    AUDIT_LOG_BUFFER_SIZE: int = 50000
 
     # Security Headers
     SECURITY_HEADERS_ENABLED: bool = True
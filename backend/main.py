@@ -65,6 +65,8 @@ from .middleware import (
     AuditLogMiddleware,
 )
 from .middleware.rate_limit import LoginRateLimitMiddleware
+from shared.sliding_window import create_rate_limit_store
+from .middleware.audit_sink import configure_audit_buffer, create_audit_sink, get_audit_buffer
 from .telemetry import setup_telemetry
 
 # Configurar logging estruturado (JSON)
@@ -92,6 +94,16 @@ audit_handler.setFormatter(logging.Formatter('%(asctime)s | %(message)s'))
 audit_logger.addHandler(audit_handler)
 audit_logger.setLevel(logging.INFO)
 
+# Buffer assincrono de auditoria (flush em lote fora do request path)
+configure_audit_buffer(
+    create_audit_sink(
+        settings.AUDIT_LOG_SINK,
+        file_path=os.path.join(LOG_DIR, 'audit.jsonl'),
+        redis_url=settings.REDIS_URL,
+    ),
+    capacity=settings.AUDIT_LOG_BUFFER_SIZE,
+)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -125,6 +137,15 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"Hardware Manager nao disponivel: {e}")
 
+    # Cache de tranquilidade atualizado por eventos
+    try:
+        from .services.events import get_event_bus
+        from .services.tranquilidade_cache import get_tranquilidade_cache
+        get_tranquilidade_cache().registrar(get_event_bus())
+        logger.info("Cache de tranquilidade registrado no Event Bus")
+    except Exception as e:
+        logger.warning(f"Cache de tranquilidade nao disponivel: {e}")
+
     # ==================== WARMUP ====================
     # Elimina cold start pre-aquecendo conexoes e cache
     try:
@@ -154,6 +175,10 @@ async def lifespan(app: FastAPI):
         await hardware_manager.shutdown()
     except Exception:
         pass
+    try:
+        await get_audit_buffer().close()
+    except Exception as e:
+        logger.warning(f"Falha ao drenar audit log: {e}")
     logger.info("API encerrada com sucesso")
 
 
@@ -217,6 +242,7 @@ if settings.RATE_LIMIT_ENABLED:
         RateLimitMiddleware,
         requests_per_window=settings.RATE_LIMIT_REQUESTS,
         window_seconds=settings.RATE_LIMIT_WINDOW,
+        store=create_rate_limit_store(settings.RATE_LIMIT_BACKEND, settings.REDIS_URL),
     )
     logger.info(f"Middleware: RateLimit ativado ({settings.RATE_LIMIT_REQUESTS} req/{settings.RATE_LIMIT_WINDOW}s)")
 
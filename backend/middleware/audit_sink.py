@@ -0,0 +1,515 @@
+"""
+Conecta Plus - Sink Assincrono de Audit Log
+Buffer circular limitado + flush em lote fora do caminho da requisicao
+
+O middleware apenas enfileira uma tupla com os dados brutos da requisicao
+(O(1), sem I/O). Sanitizacao, decodificacao do usuario, formatacao de
+timestamp e serializacao acontecem na tarefa de flush, em lotes, para um
+dos destinos:
+
+- LoggerAuditSink: logger "audit" (audit.log, comportamento original)
+- FileAuditSink: arquivo JSONL
+- PostgresCopyAuditSink: tabela audit_logs via COPY
+- RedisStreamAuditSink: Redis Streams (XADD em pipeline)
+"""
+
+import asyncio
+import csv
+import io
+import ipaddress
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from datetime import datetime
+from typing import Any, Deque, Dict, List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+audit_logger = logging.getLogger("audit")
+
+SENSITIVE_KEYS = (
+    "password", "senha", "secret", "token", "api_key",
+    "credit_card", "cpf", "cnpj", "rg"
+)
+
+
+class AuditRecord(NamedTuple):
+    """Dados brutos capturados no caminho da requisicao."""
+    phase: str  # "request" (entrada de mutacao) ou "response"
+    timestamp: float
+    request_id: str
+    client_ip: str
+    authorization: Optional[str]
+    method: str
+    path: str
+    status_code: int
+    process_time: float
+    user_agent: str
+    query_params: Optional[Dict[str, str]]
+    error: Optional[str]
+    detailed: bool
+
+
+def sanitize_data(data: dict) -> dict:
+    """Remove dados sensiveis do log."""
+    sanitized = {}
+    for key, value in data.items():
+        key_lower = key.lower()
+        if any(sk in key_lower for sk in SENSITIVE_KEYS):
+            sanitized[key] = "[REDACTED]"
+        elif isinstance(value, dict):
+            sanitized[key] = sanitize_data(value)
+        else:
+            sanitized[key] = value
+    return sanitized
+
+
+def decode_user_id(authorization: Optional[str]) -> Optional[str]:
+    """Extrai ID do usuario do token JWT (sem verificar assinatura, apenas log)."""
+    if not authorization or not authorization.startswith("Bearer "):
+        return None
+    try:
+        from jose import jwt
+        payload = jwt.get_unverified_claims(authorization[7:])
+        return str(payload.get("sub", "unknown"))
+    except Exception:
+        return None
+
+
+def format_record(record: AuditRecord) -> Dict[str, Any]:
+    """Converte registro bruto no dict de auditoria (fora do request path)."""
+    entry = {
+        "timestamp": datetime.utcfromtimestamp(record.timestamp).isoformat(),
+        "request_id": record.request_id,
+        "client_ip": record.client_ip,
+        "user_id": decode_user_id(record.authorization),
+        "method": record.method,
+        "path": record.path,
+    }
+    if record.phase == "request":
+        entry["phase"] = "request"
+        return entry
+
+    entry.update({
+        "status_code": record.status_code,
+        "process_time_ms": round(record.process_time * 1000, 2),
+        "user_agent": record.user_agent[:100],  # Limitar tamanho
+    })
+
+    # Adicionar detalhes para paths sensiveis
+    if record.detailed and record.query_params is not None:
+        entry["query_params"] = sanitize_data(record.query_params)
+
+    # Adicionar erro se houver
+    if record.error:
+        entry["error"] = record.error[:500]
+
+    return entry
+
+
+def record_level(record: AuditRecord) -> int:
+    """Nivel de log equivalente ao do middleware original."""
+    if record.phase == "request":
+        return logging.INFO
+    if record.status_code >= 500:
+        return logging.ERROR
+    if record.status_code >= 400:
+        return logging.WARNING
+    if record.detailed:
+        return logging.INFO
+    return logging.DEBUG
+
+
+# ==================== DESTINOS ====================
+
+class AuditSink(ABC):
+    """Destino de um lote de registros de auditoria."""
+
+    @abstractmethod
+    async def write_batch(self, records: List[AuditRecord]) -> None:
+        """Grava um lote. Pode levantar excecao (o buffer contabiliza)."""
+
+    async def close(self) -> None:
+        """Libera recursos do destino."""
+
+
+class LoggerAuditSink(AuditSink):
+    """Grava no logger "audit" (handlers configurados no main)."""
+
+    def __init__(self, target: logging.Logger = audit_logger):
+        self.target = target
+
+    def _write(self, records: List[AuditRecord]) -> None:
+        for record in records:
+            level = record_level(record)
+            if not self.target.isEnabledFor(level):
+                continue
+            if record.phase == "request":
+                self.target.log(
+                    level,
+                    f"REQUEST | id={record.request_id} | ip={record.client_ip} | "
+                    f"user={decode_user_id(record.authorization) or 'anonymous'} | "
+                    f"{record.method} {record.path}"
+                )
+            else:
+                self.target.log(level, json.dumps(format_record(record)))
+
+    async def write_batch(self, records: List[AuditRecord]) -> None:
+        await asyncio.to_thread(self._write, records)
+
+
+class FileAuditSink(AuditSink):
+    """Grava registros como JSONL em arquivo (um write por lote)."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def _write(self, records: List[AuditRecord]) -> None:
+        lines = "".join(
+            json.dumps(format_record(r), ensure_ascii=False) + "\n" for r in records
+        )
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+
+    async def write_batch(self, records: List[AuditRecord]) -> None:
+        await asyncio.to_thread(self._write, records)
+
+
+def valid_ip(value: Optional[str]) -> Optional[str]:
+    """IP normalizado, ou None se invalido (X-Forwarded-For e forjavel)."""
+    if not value:
+        return None
+    try:
+        return str(ipaddress.ip_address(value.strip()))
+    except ValueError:
+        return None
+
+
+class PostgresCopyAuditSink(AuditSink):
+    """
+    Grava na tabela audit_logs (scripts/migration_fase1.sql) com COPY.
+    Um COPY por lote em vez de um INSERT por requisicao.
+
+    Se o COPY falhar, o lote e regravado registro a registro: um registro
+    invalido nao derruba os demais.
+    """
+
+    COLUMNS = (
+        "action", "entity_type", "entity_id", "user_id", "ip_address",
+        "user_agent", "details", "status", "error_message", "duration_ms",
+        "timestamp",
+    )
+
+    def __init__(self, engine, table: str = "audit_logs"):
+        self.engine = engine
+        self.table = table
+        self.rejected = 0
+
+    def _rows(self, records: List[AuditRecord]) -> List[tuple]:
+        rows = []
+        for record in records:
+            if record.phase == "request":
+                continue
+            entry = format_record(record)
+            details = {k: entry[k] for k in ("query_params", "status_code") if k in entry}
+            rows.append((
+                f"{record.method} {record.path}"[:100],
+                "http_request",
+                record.request_id,
+                entry["user_id"] or None,
+                valid_ip(record.client_ip),
+                entry["user_agent"] or None,
+                json.dumps(details, ensure_ascii=False),
+                "error" if record.status_code >= 400 else "success",
+                entry.get("error") or None,
+                int(entry["process_time_ms"]),
+                entry["timestamp"] + "Z",
+            ))
+        return rows
+
+    @staticmethod
+    def _to_csv(rows: List[tuple]) -> io.StringIO:
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)  # None -> '' (NULL no COPY)
+        buffer.seek(0)
+        return buffer
+
+    def _write(self, records: List[AuditRecord]) -> None:
+        rows = self._rows(records)
+        if not rows:
+            return
+        raw = self.engine.raw_connection()
+        try:
+            try:
+                with raw.cursor() as cursor:
+                    cursor.copy_expert(
+                        f"COPY {self.table} ({', '.join(self.COLUMNS)}) "
+                        f"FROM STDIN WITH (FORMAT csv, NULL '')",
+                        self._to_csv(rows),
+                    )
+                raw.commit()
+            except Exception as e:
+                raw.rollback()
+                logger.warning(f"COPY de auditoria falhou, gravando registro a registro: {e}")
+                self._insert_each(raw, rows)
+        finally:
+            raw.close()
+
+    def _insert_each(self, raw, rows: List[tuple]) -> None:
+        sql = (
+            f"INSERT INTO {self.table} ({', '.join(self.COLUMNS)}) "
+            f"VALUES ({', '.join(['%s'] * len(self.COLUMNS))})"
+        )
+        failed, error = 0, None
+        for row in rows:
+            try:
+                with raw.cursor() as cursor:
+                    cursor.execute(sql, row)
+                raw.commit()
+            except Exception as e:
+                raw.rollback()
+                failed, error = failed + 1, e
+                logger.error(f"Registro de auditoria rejeitado ({row[2]}): {e}")
+        if failed == len(rows):
+            # Nenhum registro entrou: falha do banco, nao dos dados
+            raise error
+        self.rejected += failed
+
+    async def write_batch(self, records: List[AuditRecord]) -> None:
+        await asyncio.to_thread(self._write, records)
+
+
+class RedisStreamAuditSink(AuditSink):
+    """Grava em Redis Stream (XADD em pipeline, MAXLEN aproximado)."""
+
+    def __init__(self, redis_client, stream: str = "audit:requests", maxlen: int = 1_000_000):
+        self.redis = redis_client
+        self.stream = stream
+        self.maxlen = maxlen
+
+    async def write_batch(self, records: List[AuditRecord]) -> None:
+        pipe = self.redis.pipeline(transaction=False)
+        for record in records:
+            pipe.xadd(
+                self.stream,
+                {"data": json.dumps(format_record(record), ensure_ascii=False)},
+                maxlen=self.maxlen,
+                approximate=True,
+            )
+        await pipe.execute()
+
+    async def close(self) -> None:
+        await self.redis.close()
+
+
+# ==================== BUFFER ====================
+
+class AuditLogBuffer:
+    """
+    Buffer circular limitado com flush em lote por tarefa em background.
+
+    - enqueue() e O(1) e nunca bloqueia: com o buffer cheio o registro mais
+      antigo e descartado e contabilizado em `dropped` (backpressure)
+    - Flush a cada `flush_interval` segundos ou quando `batch_size` registros
+      se acumulam
+    - Lote que falha volta ao inicio do buffer e e retentado com backoff
+      exponencial; so e descartado apos `max_retries` tentativas
+    - close() drena todo o buffer antes de encerrar
+    """
+
+    def __init__(
+        self,
+        sink: Optional[AuditSink] = None,
+        capacity: int = 50_000,
+        batch_size: int = 500,
+        flush_interval: float = 1.0,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5,
+        max_backoff: float = 30.0,
+    ):
+        self.sink = sink or LoggerAuditSink()
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.max_backoff = max_backoff
+
+        self._buffer: Deque[AuditRecord] = deque(maxlen=capacity)
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._closed = False
+        self._attempts = 0
+        self._retry_at = 0.0
+
+        # Metricas de backpressure
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.flush_errors = 0
+        self.high_water = 0
+        self.last_flush_ms = 0.0
+        self.last_failure_at: Optional[float] = None  # time.monotonic()
+
+    def enqueue(self, record: AuditRecord) -> None:
+        """Enfileira registro (caminho da requisicao)."""
+        if len(self._buffer) == self.capacity:
+            self._count_dropped(1)
+        self._buffer.append(record)
+        self.enqueued += 1
+
+        size = len(self._buffer)
+        if size > self.high_water:
+            self.high_water = size
+
+        if self._task is None and not self._closed:
+            self._start()
+        elif size >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+
+    def _start(self) -> None:
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = loop.create_task(self._run())
+
+    async def _run(self) -> None:
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    def _count_dropped(self, count: int) -> None:
+        self.dropped += count
+        self.last_failure_at = time.monotonic()
+
+    def _requeue(self, batch: List[AuditRecord]) -> None:
+        """Devolve o lote ao inicio do buffer, na ordem original."""
+        overflow = len(self._buffer) + len(batch) - self.capacity
+        if overflow > 0:
+            # Buffer encheu durante a gravacao: descarta os mais antigos do lote
+            self._count_dropped(overflow)
+            batch = batch[overflow:]
+        self._buffer.extendleft(reversed(batch))
+
+    async def flush(self, wait: bool = False) -> int:
+        """
+        Grava todos os registros pendentes em lotes. Retorna total gravado.
+
+        Durante o backoff de um lote que falhou retorna sem gravar; com
+        wait=True aguarda o backoff (usado no close()).
+        """
+        total = 0
+        while self._buffer:
+            delay = self._retry_at - time.monotonic()
+            if delay > 0:
+                if not wait:
+                    break
+                await asyncio.sleep(delay)
+
+            batch: List[AuditRecord] = []
+            while self._buffer and len(batch) < self.batch_size:
+                batch.append(self._buffer.popleft())
+
+            start = time.perf_counter()
+            try:
+                await self.sink.write_batch(batch)
+            except Exception as e:
+                self.flush_errors += 1
+                self.last_failure_at = time.monotonic()
+                self._attempts += 1
+                if self._attempts > self.max_retries:
+                    self._attempts, self._retry_at = 0, 0.0
+                    self._count_dropped(len(batch))
+                    logger.error(
+                        f"Lote de auditoria descartado apos {self.max_retries + 1} "
+                        f"tentativas ({len(batch)} registros): {e}"
+                    )
+                else:
+                    self._requeue(batch)
+                    backoff = min(self.retry_backoff * 2 ** (self._attempts - 1), self.max_backoff)
+                    self._retry_at = time.monotonic() + backoff
+                    logger.warning(
+                        f"Falha ao gravar lote de auditoria ({len(batch)} registros), "
+                        f"nova tentativa em {backoff:.1f}s: {e}"
+                    )
+                continue
+            finally:
+                self.last_flush_ms = (time.perf_counter() - start) * 1000
+
+            self._attempts, self._retry_at = 0, 0.0
+            self.written += len(batch)
+            total += len(batch)
+        return total
+
+    async def close(self) -> None:
+        """Encerra a tarefa de flush garantindo gravacao do buffer."""
+        self._closed = True
+        if self._task is not None:
+            self._wakeup.set()
+            try:
+                await self._task
+            except Exception:
+                pass
+            self._task = None
+        await self.flush(wait=True)
+        await self.sink.close()
+
+    def failed_within(self, window: float) -> bool:
+        """Houve falha de gravacao ou descarte nos ultimos `window` segundos?"""
+        if self.last_failure_at is None:
+            return False
+        return time.monotonic() - self.last_failure_at <= window
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._buffer),
+            "capacity": self.capacity,
+            "high_water": self.high_water,
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "flush_errors": self.flush_errors,
+            "retrying": self._attempts > 0,
+            "last_flush_ms": round(self.last_flush_ms, 2),
+        }
+
+
+def create_audit_sink(kind: str = "logger", file_path: Optional[str] = None, redis_url: Optional[str] = None) -> AuditSink:
+    """Cria destino conforme configuracao: logger | file | postgres | redis."""
+    if kind == "file" and file_path:
+        return FileAuditSink(file_path)
+    if kind == "postgres":
+        from ..database import engine
+        return PostgresCopyAuditSink(engine)
+    if kind == "redis":
+        import redis.asyncio as redis
+        return RedisStreamAuditSink(redis.from_url(redis_url or "redis://localhost:6379/0"))
+    return LoggerAuditSink()
+
+
+# === Singleton ===
+
+_audit_buffer: Optional[AuditLogBuffer] = None
+
+
+def get_audit_buffer() -> AuditLogBuffer:
+    """Obtém o buffer de auditoria compartilhado (destino padrao: logger audit)."""
+    global _audit_buffer
+    if _audit_buffer is None:
+        _audit_buffer = AuditLogBuffer()
+    return _audit_buffer
+
+
+def configure_audit_buffer(sink: AuditSink, **kwargs) -> AuditLogBuffer:
+    """Substitui o destino do buffer de auditoria (antes do primeiro request)."""
+    global _audit_buffer
+    _audit_buffer = AuditLogBuffer(sink=sink, **kwargs)
+    return _audit_buffer
@@ -12,6 +12,12 @@ from starlette.requests import Request
 from starlette.responses import Response, JSONResponse
 import logging
 
+from shared.sliding_window import (
+    RateLimitRule,
+    RateLimitStore,
+    SlidingWindowRateLimiter,
+)
+
 logger = logging.getLogger(__name__)
 
 
@@ -19,8 +25,9 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
     """
     Rate limiting baseado em IP e usuario.
 
-    Algoritmo: Sliding Window Counter
-    - Armazena contagem de requests por janela de tempo
+    Algoritmo: Sliding Window Counter (ver shared/sliding_window.py)
+    - Memoria constante por cliente (janela atual + anterior)
+    - Store plugavel: memoria do processo ou Redis (compartilhado entre workers)
     - Retorna 429 Too Many Requests quando limite excedido
     - Headers informativos: X-RateLimit-*
 
@@ -28,6 +35,7 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
     - requests_per_window: Numero maximo de requests
     - window_seconds: Tamanho da janela em segundos
     - whitelist_paths: Paths que ignoram rate limit
+    - store: RateLimitStore (default: memoria)
     """
 
     def __init__(
@@ -36,14 +44,17 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         requests_per_window: int = 100,
         window_seconds: int = 60,
         whitelist_paths: Optional[list] = None,
+        store: Optional[RateLimitStore] = None,
     ):
         super().__init__(app)
         self.requests_per_window = requests_per_window
         self.window_seconds = window_seconds
         self.whitelist_paths = whitelist_paths or ["/health", "/api/v1/docs", "/api/v1/openapi.json"]
 
-        # Armazenamento em memoria (usar Redis em producao para multiplas instancias)
-        self._requests: Dict[str, list] = defaultdict(list)
+        self.limiter = SlidingWindowRateLimiter(
+            [RateLimitRule(requests_per_window, window_seconds)],
+            store=store,
+        )
 
     def _get_client_id(self, request: Request) -> str:
         """
@@ -62,39 +73,17 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         raw_id = f"{ip}:{user_agent}"
         return hashlib.sha256(raw_id.encode()).hexdigest()[:16]
 
-    def _clean_old_requests(self, client_id: str, current_time: float) -> None:
-        """Remove requests fora da janela de tempo."""
-        cutoff = current_time - self.window_seconds
-        self._requests[client_id] = [
-            ts for ts in self._requests[client_id] if ts > cutoff
-        ]
-
-    def _is_rate_limited(self, client_id: str) -> tuple[bool, int, int]:
+    async def _is_rate_limited(self, client_id: str) -> tuple[bool, int, int]:
         """
         Verifica se cliente excedeu o limite.
 
         Returns:
             tuple: (is_limited, remaining_requests, reset_time)
         """
-        current_time = time.time()
-        self._clean_old_requests(client_id, current_time)
-
-        request_count = len(self._requests[client_id])
-        remaining = max(0, self.requests_per_window - request_count)
-
-        # Tempo ate reset da janela
-        if self._requests[client_id]:
-            oldest_request = min(self._requests[client_id])
-            reset_time = int(oldest_request + self.window_seconds - current_time)
-        else:
-            reset_time = self.window_seconds
-
-        is_limited = request_count >= self.requests_per_window
-
-        if not is_limited:
-            self._requests[client_id].append(current_time)
-
-        return is_limited, remaining, max(0, reset_time)
+        result = await self.limiter.hit(client_id)
+        if not result.allowed:
+            return True, 0, result.retry_after
+        return False, result.remaining, result.reset_after
 
     async def dispatch(self, request: Request, call_next: Callable) -> Response:
         # Ignorar paths na whitelist
@@ -102,7 +91,7 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
             return await call_next(request)
 
         client_id = self._get_client_id(request)
-        is_limited, remaining, reset_time = self._is_rate_limited(client_id)
+        is_limited, remaining, reset_time = await self._is_rate_limited(client_id)
 
         if is_limited:
             logger.warning(
@@ -125,6 +125,28 @@ def check_circuit_breakers() -> Dict[str, Any]:
         }
 
 
+AUDIT_HEALTH_WINDOW = 300  # segundos
+
+
+def check_audit_log() -> Dict[str, Any]:
+    """Verifica backpressure do buffer de auditoria (falhas recentes, nao acumuladas)."""
+    from ..middleware.audit_sink import get_audit_buffer
+
+    try:
+        buffer = get_audit_buffer()
+        stats = buffer.stats
+        if stats["retrying"] or buffer.failed_within(AUDIT_HEALTH_WINDOW):
+            status = "degraded"
+        else:
+            status = "healthy"
+        return {"status": status, **stats}
+    except Exception as e:
+        return {
+            "status": "unknown",
+            "error": str(e)
+        }
+
+
 def check_memory() -> Dict[str, Any]:
     """Verifica uso de memória do processo e do sistema."""
     try:
@@ -187,6 +209,7 @@ async def health_check():
     event_check = check_event_stream()
     circuit_check = check_circuit_breakers()
     memory_check = check_memory()
+    audit_check = check_audit_log()
 
     # Componentes principais com latência
     components = {
@@ -211,7 +234,8 @@ async def health_check():
                 "half_open": circuit_check.get("half_open", 0),
                 "closed": circuit_check.get("closed", 0),
             }
-        }
+        },
+        "audit_log": audit_check
     }
 
     # Adicionar erros se existirem
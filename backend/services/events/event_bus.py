@@ -41,6 +41,9 @@ class EventType(str, Enum):
     ACESSO_LIBERADO = "ACESSO_LIBERADO"
     ACESSO_NEGADO = "ACESSO_NEGADO"
 
+    # Dispositivos
+    DEVICE_STATUS_CHANGED = "DEVICE_STATUS_CHANGED"
+
     # Sistema
     SYSTEM_STATE_UPDATED = "SYSTEM_STATE_UPDATED"
     SYSTEM_HEALTH_CHANGED = "SYSTEM_HEALTH_CHANGED"
@@ -7,8 +7,13 @@ Com Circuit Breaker para resiliência por dispositivo
 """
 
 import asyncio
+import heapq
+import json
 import logging
+import random
+import time
 from abc import ABC, abstractmethod
+from collections import deque
 from typing import Optional, Dict, Any, List
 from dataclasses import dataclass
 from enum import Enum
@@ -26,6 +31,7 @@ from .resilience import (
     get_resilient_redis,
     ResilientRedis,
 )
+from .events import get_event_bus, create_event, EventType
 
 logger = logging.getLogger(__name__)
 
@@ -97,13 +103,351 @@ class CommandResult:
     error: Optional[str] = None
 
 
+# ==================== Transport ====================
+
+# Respostas de controle do protocolo Intelbras ISP
+ISP_ACK = 0x06
+ISP_NACK = 0x15
+
+
+class HTTPConnectionPool:
+    """
+    Clientes HTTP keep-alive compartilhados por host.
+
+    Drivers do mesmo host (e mesmas credenciais) reutilizam o mesmo pool
+    de conexões; reconectar um driver não descarta as conexões abertas.
+    """
+
+    def __init__(
+        self,
+        max_connections_per_host: int = 10,
+        max_keepalive_per_host: int = 5,
+        keepalive_expiry: float = 60.0,
+        timeout: float = 10.0,
+        connect_timeout: float = 3.0,
+    ):
+        self._limits = httpx.Limits(
+            max_connections=max_connections_per_host,
+            max_keepalive_connections=max_keepalive_per_host,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self._timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self._clients: Dict[tuple, httpx.AsyncClient] = {}
+
+    def get(self, base_url: str, auth: Optional[tuple] = None) -> httpx.AsyncClient:
+        """Obtém (ou cria) o cliente do host"""
+        key = (base_url, auth)
+        client = self._clients.get(key)
+        if client is None or client.is_closed:
+            client = httpx.AsyncClient(
+                timeout=self._timeout,
+                limits=self._limits,
+                auth=auth,
+            )
+            self._clients[key] = client
+        return client
+
+    async def close(self) -> None:
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+
+class PipelinedConnection:
+    """
+    Conexão TCP persistente com pipelining.
+
+    Várias requisições podem estar em trânsito na mesma conexão; como o
+    equipamento responde em ordem, cada resposta resolve a requisição mais
+    antiga pendente (FIFO). Uma requisição cancelada pelo chamador mantém
+    seu lugar na fila e a resposta correspondente é descartada quando
+    chegar. Um timeout falha só a requisição que expirou, do mesmo jeito.
+    Se a requisição mais antiga da fila passa de stall_timeout sem resposta,
+    o equipamento parou de responder: a conexão é fechada, as pendentes
+    falham e a próxima chamada reabre.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        connect_timeout: float = 10.0,
+        stall_timeout: float = 15.0
+    ):
+        self.host = host
+        self.port = port
+        self.connect_timeout = connect_timeout
+        self.stall_timeout = stall_timeout
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._pending: deque = deque()
+        self._write_lock = asyncio.Lock()
+        self._open_lock = asyncio.Lock()
+        self._reader_task: Optional[asyncio.Task] = None
+        self.requests = 0
+        self.reconnects = 0
+
+    @property
+    def closed(self) -> bool:
+        return self._writer is None or self._writer.is_closing()
+
+    async def open(self) -> bool:
+        """Abre a conexão. Retorna True se uma nova conexão foi aberta."""
+        async with self._open_lock:
+            if not self.closed:
+                return False
+            self._reader, self._writer = await asyncio.wait_for(
+                asyncio.open_connection(self.host, self.port),
+                timeout=self.connect_timeout
+            )
+            self._reader_task = asyncio.create_task(self._read_loop())
+            self.reconnects += 1
+            return True
+
+    async def request(self, payload: bytes, timeout: float = 5.0) -> bytes:
+        """Envia um comando e aguarda sua resposta sem bloquear os demais"""
+        if self.closed:
+            raise ConnectionError(f"Conexão com {self.host}:{self.port} fechada")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        async with self._write_lock:
+            self._pending.append((future, loop.time()))
+            self._writer.write(payload)
+            await self._writer.drain()
+        self.requests += 1
+
+        try:
+            return await asyncio.wait_for(future, timeout=timeout)
+        except asyncio.TimeoutError:
+            # O future expirado continua na fila e consome a resposta tardia
+            if self._stalled():
+                await self.close()
+            raise
+        except asyncio.CancelledError:
+            # O future cancelado continua na fila e consome a resposta tardia
+            raise
+
+    def _stalled(self) -> bool:
+        """A requisição mais antiga espera resposta há mais de stall_timeout"""
+        if not self._pending:
+            return False
+        _, sent_at = self._pending[0]
+        return asyncio.get_running_loop().time() - sent_at >= self.stall_timeout
+
+    async def _read_loop(self) -> None:
+        try:
+            while True:
+                frame = await self.read_frame(self._reader)
+                if self._pending:
+                    future, _ = self._pending.popleft()
+                    if not future.done():
+                        future.set_result(frame)
+                    # Requisição cancelada: a resposta é dela, descarta
+                else:
+                    logger.debug(f"Resposta não solicitada de {self.host}: {frame!r}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._fail_pending(ConnectionError(f"Conexão com {self.host}:{self.port} perdida: {e}"))
+            if self._writer:
+                self._writer.close()
+
+    @staticmethod
+    async def read_frame(reader: asyncio.StreamReader) -> bytes:
+        """
+        Lê um quadro de resposta.
+        ACK/NACK ocupam um byte; demais respostas são prefixadas pelo
+        tamanho e terminam com checksum (formato simplificado - ajustar
+        conforme protocolo real).
+        """
+        head = await reader.readexactly(1)
+        if head[0] in (ISP_ACK, ISP_NACK):
+            return head
+        body = await reader.readexactly(head[0] + 1)
+        return head + body
+
+    def _fail_pending(self, error: Exception) -> None:
+        while self._pending:
+            future, _ = self._pending.popleft()
+            if not future.done():
+                future.set_exception(error)
+
+    async def close(self) -> None:
+        if self._reader_task:
+            self._reader_task.cancel()
+            self._reader_task = None
+        self._fail_pending(ConnectionError(f"Conexão com {self.host}:{self.port} fechada"))
+        if self._writer:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except Exception:
+                pass
+            self._writer = None
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._pending)
+
+
+class TCPConnectionPool:
+    """Uma conexão pipelined persistente por host:porta"""
+
+    def __init__(self):
+        self._connections: Dict[tuple, PipelinedConnection] = {}
+
+    def get(self, host: str, port: int) -> PipelinedConnection:
+        key = (host, port)
+        if key not in self._connections:
+            self._connections[key] = PipelinedConnection(host, port)
+        return self._connections[key]
+
+    async def close(self) -> None:
+        for connection in self._connections.values():
+            await connection.close()
+        self._connections.clear()
+
+    def __len__(self) -> int:
+        return len(self._connections)
+
+
+class CommandLogBatcher:
+    """
+    Log de comandos em lote.
+
+    `add` apenas enfileira (O(1)) e não bloqueia o comando do dispositivo;
+    uma tarefa em background grava os lotes com um único pipeline Redis
+    (LPUSH + LTRIM). Com o buffer cheio, as entradas mais antigas são
+    descartadas.
+    """
+
+    def __init__(
+        self,
+        redis_client: Optional[redis.Redis] = None,
+        key: str = "hardware:command_log",
+        max_log_length: int = 10000,
+        capacity: int = 10000,
+        batch_size: int = 200,
+        flush_interval: float = 0.5,
+    ):
+        self.redis = redis_client
+        self.key = key
+        self.max_log_length = max_log_length
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._buffer: deque = deque(maxlen=capacity)
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+        self.written = 0
+        self.dropped = 0
+
+    def add(self, entry: Dict[str, Any]) -> None:
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        self._buffer.append(json.dumps(entry, default=str))
+        if len(self._buffer) >= self.batch_size:
+            self._wakeup.set()
+        self._ensure_task()
+
+    async def flush(self) -> int:
+        """Grava as entradas pendentes. Retorna quantidade gravada."""
+        if not self.redis or not self._buffer:
+            return 0
+        total = 0
+        while self._buffer:
+            batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.lpush(self.key, *batch)
+                pipe.ltrim(self.key, 0, self.max_log_length - 1)
+                await pipe.execute()
+            except Exception as e:
+                self.dropped += len(batch)
+                logger.warning(f"Falha ao gravar log de comandos: {e}")
+                break
+            total += len(batch)
+        self.written += total
+        return total
+
+    def _ensure_task(self) -> None:
+        if self._task is not None or not self.redis:
+            return
+        try:
+            self._task = asyncio.get_running_loop().create_task(self._flush_loop())
+        except RuntimeError:
+            pass
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self._buffer),
+            "written": self.written,
+            "dropped": self.dropped,
+        }
+
+
+class HardwareTransport:
+    """Camada de transporte compartilhada pelos drivers"""
+
+    def __init__(self):
+        self.http = HTTPConnectionPool()
+        self.tcp = TCPConnectionPool()
+
+    async def close(self) -> None:
+        await self.http.close()
+        await self.tcp.close()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "http_hosts": len(self.http),
+            "tcp_connections": len(self.tcp),
+            "tcp_in_flight": sum(c.in_flight for c in self.tcp._connections.values()),
+        }
+
+
+_transport: Optional[HardwareTransport] = None
+
+
+def get_hardware_transport() -> HardwareTransport:
+    """Obtém a camada de transporte compartilhada"""
+    global _transport
+    if _transport is None:
+        _transport = HardwareTransport()
+    return _transport
+
+
 # ==================== Base Driver ====================
 
 class DeviceDriver(ABC):
     """Classe base para drivers de dispositivos"""
 
-    def __init__(self, device: Device):
+    def __init__(self, device: Device, transport: Optional[HardwareTransport] = None):
         self.device = device
+        self.transport = transport or get_hardware_transport()
         self._connected = False
 
     @abstractmethod
@@ -136,15 +480,15 @@ class ControlIDDriver(DeviceDriver):
     Protocolo: HTTP REST API
     """
 
-    def __init__(self, device: Device):
-        super().__init__(device)
+    def __init__(self, device: Device, transport: Optional[HardwareTransport] = None):
+        super().__init__(device, transport)
         self.base_url = f"http://{device.ip}:{device.port or 80}"
         self.session_id = None
         self._client: Optional[httpx.AsyncClient] = None
 
     async def connect(self) -> bool:
         try:
-            self._client = httpx.AsyncClient(timeout=10.0)
+            self._client = self.transport.http.get(self.base_url)
 
             # Login na controladora
             response = await self._client.post(
@@ -179,7 +523,7 @@ class ControlIDDriver(DeviceDriver):
                     )
                 except Exception:
                     pass
-            await self._client.aclose()
+            # Conexões permanecem no pool compartilhado
             self._client = None
             self._connected = False
 
@@ -312,33 +656,21 @@ class IntelbrasAlarmDriver(DeviceDriver):
     Driver para centrais de alarme Intelbras
     Modelos: AMT 4010, AMT 8000
     Protocolo: Intelbras ISP (porta 9009)
+    Conexão TCP persistente compartilhada, com pipelining de comandos
     """
 
-    def __init__(self, device: Device):
-        super().__init__(device)
+    # Abaixo do timeout do poller (PollingConfig.timeout): a verificação,
+    # incluindo a reconexão, termina aqui e não é cancelada no meio
+    REQUEST_TIMEOUT = 3.0
+
+    def __init__(self, device: Device, transport: Optional[HardwareTransport] = None):
+        super().__init__(device, transport)
         self.port = device.port or 9009
-        self._reader = None
-        self._writer = None
+        self._connection = self.transport.tcp.get(device.ip, self.port)
 
     async def connect(self) -> bool:
         try:
-            self._reader, self._writer = await asyncio.wait_for(
-                asyncio.open_connection(self.device.ip, self.port),
-                timeout=10.0
-            )
-
-            # Enviar comando de autenticação
-            auth_cmd = self._build_auth_command()
-            self._writer.write(auth_cmd)
-            await self._writer.drain()
-
-            response = await asyncio.wait_for(
-                self._reader.read(256),
-                timeout=5.0
-            )
-
-            if self._parse_response(response).get("success"):
-                self._connected = True
+            if await self._ensure_connection():
                 self.device.status = DeviceStatus.ONLINE
                 logger.info(f"Conectado à central Intelbras {self.device.ip}")
                 return True
@@ -349,25 +681,37 @@ class IntelbrasAlarmDriver(DeviceDriver):
 
         return False
 
+    async def _ensure_connection(self) -> bool:
+        """Reabre e reautentica a conexão compartilhada se necessário"""
+        if await self._connection.open() or not self._connected:
+            # Enviar comando de autenticação
+            response = await self._connection.request(
+                self._build_auth_command(), timeout=self.REQUEST_TIMEOUT
+            )
+            self._connected = self._parse_response(response).get("success", False)
+        return self._connected
+
+    async def _request(self, cmd: bytes, timeout: float = None) -> bytes:
+        if not await self._ensure_connection():
+            raise ConnectionError("Falha de autenticação na central")
+        try:
+            return await self._connection.request(cmd, timeout=timeout or self.REQUEST_TIMEOUT)
+        except ConnectionError:
+            # Conexão perdida: a próxima chamada reabre e reautentica. Um
+            # timeout isolado não derruba a sessão.
+            self._connected = False
+            raise
+
     async def disconnect(self) -> None:
-        if self._writer:
-            self._writer.close()
-            await self._writer.wait_closed()
+        await self._connection.close()
         self._connected = False
 
     async def check_status(self) -> DeviceStatus:
         try:
-            if not self._connected:
-                return DeviceStatus.OFFLINE
-
-            # Enviar comando de status
+            # Enviar comando de status (_request reconecta se a sessão caiu)
             status_cmd = bytes([0x21, 0x00, 0x00, 0x21])  # Comando simplificado
-            self._writer.write(status_cmd)
-            await self._writer.drain()
-
             response = await asyncio.wait_for(
-                self._reader.read(256),
-                timeout=5.0
+                self._request(status_cmd), timeout=self.REQUEST_TIMEOUT
             )
 
             if response:
@@ -387,11 +731,7 @@ class IntelbrasAlarmDriver(DeviceDriver):
         try:
             if command == "arm":
                 partition = params.get("partition", 1)
-                cmd = self._build_arm_command(partition)
-                self._writer.write(cmd)
-                await self._writer.drain()
-
-                response = await self._reader.read(256)
+                response = await self._request(self._build_arm_command(partition))
                 parsed = self._parse_response(response)
 
                 return CommandResult(
@@ -405,11 +745,7 @@ class IntelbrasAlarmDriver(DeviceDriver):
             elif command == "disarm":
                 partition = params.get("partition", 1)
                 password = params.get("password", self.device.password)
-                cmd = self._build_disarm_command(partition, password)
-                self._writer.write(cmd)
-                await self._writer.drain()
-
-                response = await self._reader.read(256)
+                response = await self._request(self._build_disarm_command(partition, password))
                 parsed = self._parse_response(response)
 
                 return CommandResult(
@@ -421,11 +757,7 @@ class IntelbrasAlarmDriver(DeviceDriver):
                 )
 
             elif command == "get_zones":
-                cmd = self._build_zones_status_command()
-                self._writer.write(cmd)
-                await self._writer.drain()
-
-                response = await self._reader.read(1024)
+                response = await self._request(self._build_zones_status_command())
                 zones = self._parse_zones_response(response)
 
                 return CommandResult(
@@ -439,11 +771,7 @@ class IntelbrasAlarmDriver(DeviceDriver):
 
             elif command == "bypass":
                 zone = params.get("zone")
-                cmd = self._build_bypass_command(zone)
-                self._writer.write(cmd)
-                await self._writer.drain()
-
-                response = await self._reader.read(256)
+                response = await self._request(self._build_bypass_command(zone))
                 parsed = self._parse_response(response)
 
                 return CommandResult(
@@ -495,7 +823,7 @@ class IntelbrasAlarmDriver(DeviceDriver):
         if not response:
             return {"success": False}
         # Resposta ACK = 0x06
-        return {"success": response[0] == 0x06 if response else False}
+        return {"success": response[0] == ISP_ACK if response else False}
 
     def _parse_zones_response(self, response: bytes) -> List[Dict]:
         """Parse do status das zonas"""
@@ -519,8 +847,8 @@ class ONVIFCameraDriver(DeviceDriver):
     Suporta: Hikvision, Dahua, Intelbras, Axis, etc
     """
 
-    def __init__(self, device: Device):
-        super().__init__(device)
+    def __init__(self, device: Device, transport: Optional[HardwareTransport] = None):
+        super().__init__(device, transport)
         self.base_url = f"http://{device.ip}:{device.port or 80}"
         self._client: Optional[httpx.AsyncClient] = None
         self.onvif_port = 80
@@ -528,8 +856,8 @@ class ONVIFCameraDriver(DeviceDriver):
 
     async def connect(self) -> bool:
         try:
-            self._client = httpx.AsyncClient(
-                timeout=10.0,
+            self._client = self.transport.http.get(
+                self.base_url,
                 auth=(self.device.username or "admin", self.device.password or "admin")
             )
 
@@ -554,10 +882,8 @@ class ONVIFCameraDriver(DeviceDriver):
         return False
 
     async def disconnect(self) -> None:
-        if self._client:
-            await self._client.aclose()
-            self._client = None
-            self._connected = False
+        self._client = None
+        self._connected = False
 
     async def check_status(self) -> DeviceStatus:
         try:
@@ -868,17 +1194,20 @@ class GateDriver(DeviceDriver):
     Suporta: PPA, Garen, Nice via interface de relé/HTTP
     """
 
-    def __init__(self, device: Device):
-        super().__init__(device)
+    # Abertura de portão é interativa: falhar rápido
+    timeout = 5.0
+
+    def __init__(self, device: Device, transport: Optional[HardwareTransport] = None):
+        super().__init__(device, transport)
         self.base_url = f"http://{device.ip}:{device.port or 80}"
         self._client: Optional[httpx.AsyncClient] = None
 
     async def connect(self) -> bool:
         try:
-            self._client = httpx.AsyncClient(timeout=5.0)
+            self._client = self.transport.http.get(self.base_url)
 
             # Testar conexão
-            response = await self._client.get(f"{self.base_url}/status")
+            response = await self._client.get(f"{self.base_url}/status", timeout=self.timeout)
             if response.status_code == 200:
                 self._connected = True
                 self.device.status = DeviceStatus.ONLINE
@@ -891,17 +1220,15 @@ class GateDriver(DeviceDriver):
         return False
 
     async def disconnect(self) -> None:
-        if self._client:
-            await self._client.aclose()
-            self._client = None
-            self._connected = False
+        self._client = None
+        self._connected = False
 
     async def check_status(self) -> DeviceStatus:
         try:
             if not self._client:
                 return DeviceStatus.OFFLINE
 
-            response = await self._client.get(f"{self.base_url}/status")
+            response = await self._client.get(f"{self.base_url}/status", timeout=self.timeout)
             if response.status_code == 200:
                 self.device.status = DeviceStatus.ONLINE
                 self.device.last_seen = datetime.now()
@@ -917,7 +1244,8 @@ class GateDriver(DeviceDriver):
             if command in ["open", "close", "stop"]:
                 response = await self._client.post(
                     f"{self.base_url}/command",
-                    json={"action": command}
+                    json={"action": command},
+                    timeout=self.timeout
                 )
 
                 return CommandResult(
@@ -933,7 +1261,8 @@ class GateDriver(DeviceDriver):
                 duration = params.get("duration", 1000) if params else 1000
                 response = await self._client.post(
                     f"{self.base_url}/pulse",
-                    json={"duration": duration}
+                    json={"duration": duration},
+                    timeout=self.timeout
                 )
 
                 return CommandResult(
@@ -955,6 +1284,192 @@ class GateDriver(DeviceDriver):
             )
 
 
+# ==================== Polling Scheduler ====================
+
+@dataclass
+class PollingConfig:
+    """Configuração do agendador de verificação de status"""
+    base_interval: float = 30.0       # Dispositivos online
+    critical_interval: float = 5.0    # Portões e dispositivos marcados como críticos
+    max_backoff: float = 300.0        # Teto do intervalo para dispositivos offline
+    backoff_factor: float = 2.0
+    jitter: float = 0.1               # Fração aleatória (+/-) aplicada ao intervalo
+    timeout: float = 5.0              # Timeout por chamada de check_status
+    max_concurrency: int = 100        # Verificações simultâneas
+
+
+@dataclass
+class _PollState:
+    """Estado de agendamento de um dispositivo"""
+    failures: int = 0
+    last_duration: float = 0.0
+
+
+class DevicePollingScheduler:
+    """
+    Agendador de health check de dispositivos.
+
+    - Fila de prioridade (heap) por próximo horário de verificação
+    - Concorrência limitada por semáforo e timeout por chamada, de modo que
+      um dispositivo lento não atrasa os demais
+    - Intervalo adaptativo: backoff exponencial para offline, intervalo curto
+      para dispositivos críticos, jitter para evitar rajadas sincronizadas
+    - Mudanças de status publicadas no SystemEventBus
+
+    Com N dispositivos o pior caso do ciclo é ceil(N / max_concurrency) * timeout.
+    """
+
+    def __init__(self, manager: "HardwareManager", config: Optional[PollingConfig] = None):
+        self.manager = manager
+        self.config = config or PollingConfig()
+        self._heap: List[tuple] = []
+        self._seq = 0
+        self._states: Dict[str, _PollState] = {}
+        self._scheduled: set = set()
+        self._wakeup = asyncio.Event()
+        self._semaphore = asyncio.Semaphore(self.config.max_concurrency)
+        self._in_flight: set = set()
+        self._task: Optional[asyncio.Task] = None
+
+        self.polls = 0
+        self.timeouts = 0
+        self.status_changes = 0
+        self.max_lag = 0.0
+
+    def is_critical(self, device: Device) -> bool:
+        """Portões e dispositivos com metadata {"critical": true}"""
+        if device.metadata and device.metadata.get("critical"):
+            return True
+        return device.type == DeviceType.GATE
+
+    def next_interval(self, device: Device, state: _PollState) -> float:
+        """Intervalo até a próxima verificação, com backoff e jitter"""
+        cfg = self.config
+        base = cfg.critical_interval if self.is_critical(device) else cfg.base_interval
+        if state.failures:
+            interval = min(base * cfg.backoff_factor ** state.failures, cfg.max_backoff)
+        else:
+            interval = base
+        if cfg.jitter:
+            interval *= 1 + random.uniform(-cfg.jitter, cfg.jitter)
+        return max(0.1, interval)
+
+    def schedule(self, device_id: str, delay: float = 0.0) -> None:
+        """
+        Agenda verificação de um dispositivo.
+
+        Cada dispositivo tem uma única cadeia de verificações, que se
+        reagenda ao fim de cada _poll; se já houver uma (na fila ou em
+        execução), a chamada é ignorada para não duplicar a carga.
+        """
+        if device_id in self._scheduled:
+            return
+        self._push(device_id, delay)
+
+    def _push(self, device_id: str, delay: float) -> None:
+        self._states.setdefault(device_id, _PollState())
+        self._scheduled.add(device_id)
+        self._seq += 1
+        heapq.heappush(self._heap, (time.monotonic() + delay, self._seq, device_id))
+        self._wakeup.set()
+
+    def start(self) -> None:
+        if self._task is None:
+            # Espalha a primeira rodada para não disparar tudo ao mesmo tempo
+            for device_id in self.manager._drivers:
+                if device_id not in self._scheduled:
+                    self.schedule(device_id, random.uniform(0, self.config.base_interval))
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        for task in list(self._in_flight):
+            task.cancel()
+        # Verificações canceladas não se reagendam: libera para o próximo start()
+        self._scheduled = {device_id for _, _, device_id in self._heap}
+
+    async def run(self) -> None:
+        """Loop principal: dorme até o próximo vencimento e dispara verificações"""
+        while self.manager._running:
+            now = time.monotonic()
+            while self._heap and self._heap[0][0] <= now:
+                due, _, device_id = heapq.heappop(self._heap)
+                if device_id not in self.manager._drivers:
+                    self._scheduled.discard(device_id)
+                    self._states.pop(device_id, None)
+                    continue
+                # Continua em _scheduled durante o _poll, que reagenda ao final
+                self.max_lag = max(self.max_lag, now - due)
+                task = asyncio.create_task(self._poll(device_id))
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+
+            timeout = self._heap[0][0] - now if self._heap else None
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _poll(self, device_id: str) -> None:
+        driver = self.manager._drivers.get(device_id)
+        device = self.manager._devices.get(device_id)
+        if not driver or not device:
+            self._scheduled.discard(device_id)
+            return
+
+        state = self._states.setdefault(device_id, _PollState())
+        previous = device.status
+
+        async with self._semaphore:
+            start = time.monotonic()
+            try:
+                status = await asyncio.wait_for(driver.check_status(), timeout=self.config.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                status = DeviceStatus.OFFLINE
+            except Exception as e:
+                logger.warning(f"Erro ao verificar {device_id}: {e}")
+                status = DeviceStatus.ERROR
+            state.last_duration = time.monotonic() - start
+            self.polls += 1
+
+        device.status = status
+        if status == DeviceStatus.ONLINE:
+            device.last_seen = datetime.now()
+            state.failures = 0
+        else:
+            state.failures += 1
+
+        if status != previous:
+            self.status_changes += 1
+            await self.manager._on_status_change(device, previous, status)
+
+        if self.manager._running and device_id in self.manager._drivers:
+            self._push(device_id, self.next_interval(device, state))
+        else:
+            self._scheduled.discard(device_id)
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "devices": len(self._states),
+            "scheduled": len(self._heap),
+            "in_flight": len(self._in_flight),
+            "polls": self.polls,
+            "timeouts": self.timeouts,
+            "status_changes": self.status_changes,
+            "max_lag_seconds": round(self.max_lag, 3),
+            "offline": sum(1 for s in self._states.values() if s.failures),
+        }
+
+
 # ==================== Hardware Manager ====================
 
 class HardwareManager:
@@ -972,16 +1487,20 @@ class HardwareManager:
         self._redis: Optional[redis.Redis] = None
         self._resilient_redis: Optional[ResilientRedis] = None
         self._running = False
+        self._poller = DevicePollingScheduler(self)
+        self.transport = get_hardware_transport()
+        self._command_log = CommandLogBatcher()
 
     async def initialize(self):
         """Inicializa o gerenciador"""
         try:
             self._redis = await redis.from_url(self.redis_url)
             self._resilient_redis = ResilientRedis(self._redis, "hardware-redis")
+            self._command_log.redis = self._redis
             await self._load_devices_from_cache()
             self._running = True
-            # Iniciar loop de monitoramento
-            asyncio.create_task(self._monitoring_loop())
+            # Iniciar agendador de monitoramento
+            self._poller.start()
             logger.info("HardwareManager inicializado com Circuit Breakers")
         except Exception as e:
             logger.error(f"Erro ao inicializar HardwareManager: {e}")
@@ -1011,8 +1530,11 @@ class HardwareManager:
     async def shutdown(self):
         """Encerra o gerenciador"""
         self._running = False
+        await self._poller.stop()
         for driver in self._drivers.values():
             await driver.disconnect()
+        await self.transport.close()
+        await self._command_log.close()
         if self._redis:
             await self._redis.close()
 
@@ -1028,6 +1550,8 @@ class HardwareManager:
             connected = await driver.connect()
             # Salvar no cache
             await self._save_device_to_cache(device)
+            # Agendar monitoramento
+            self._poller.schedule(device.id, self._poller.next_interval(device, _PollState()))
             return connected
 
         return False
@@ -1036,15 +1560,15 @@ class HardwareManager:
         """Cria driver baseado no tipo de dispositivo"""
         if device.type == DeviceType.ACCESS_CONTROL:
             if "control" in device.protocol.lower():
-                return ControlIDDriver(device)
+                return ControlIDDriver(device, self.transport)
         elif device.type == DeviceType.ALARM_PANEL:
             if "intelbras" in device.protocol.lower():
-                return IntelbrasAlarmDriver(device)
+                return IntelbrasAlarmDriver(device, self.transport)
         elif device.type == DeviceType.GATE:
-            return GateDriver(device)
+            return GateDriver(device, self.transport)
         elif device.type == DeviceType.CAMERA:
             if "onvif" in device.protocol.lower():
-                return ONVIFCameraDriver(device)
+                return ONVIFCameraDriver(device, self.transport)
 
         return None
 
@@ -1091,16 +1615,14 @@ class HardwareManager:
                 error=f"Circuit breaker is {e.state.value}"
             )
 
-        # Log do comando usando Redis resiliente
-        if self._resilient_redis:
-            log_entry = {
-                "device_id": device_id,
-                "command": command,
-                "success": result.success,
-                "timestamp": result.timestamp.isoformat(),
-                "circuit_state": circuit.state.value
-            }
-            await self._resilient_redis.lpush("hardware:command_log", str(log_entry))
+        # Log do comando em lote (não bloqueia a resposta)
+        self._command_log.add({
+            "device_id": device_id,
+            "command": command,
+            "success": result.success,
+            "timestamp": result.timestamp.isoformat(),
+            "circuit_state": circuit.state.value
+        })
 
         return result
 
@@ -1115,18 +1637,38 @@ class HardwareManager:
         """Retorna todos os dispositivos registrados"""
         return list(self._devices.values())
 
-    async def _monitoring_loop(self):
-        """Loop de monitoramento de dispositivos"""
-        while self._running:
-            for device_id, driver in self._drivers.items():
-                try:
-                    status = await driver.check_status()
-                    self._devices[device_id].status = status
-                    self._devices[device_id].last_seen = datetime.now()
-                except Exception as e:
-                    logger.warning(f"Erro ao verificar {device_id}: {e}")
+    def get_polling_stats(self) -> Dict[str, Any]:
+        """Estatísticas do agendador de monitoramento."""
+        return self._poller.stats
 
-            await asyncio.sleep(30)  # Verificar a cada 30 segundos
+    def get_transport_stats(self) -> Dict[str, Any]:
+        """Estatísticas de conexões e do log de comandos."""
+        return {**self.transport.stats, "command_log": self._command_log.stats}
+
+    async def _on_status_change(
+        self,
+        device: Device,
+        previous: DeviceStatus,
+        current: DeviceStatus
+    ) -> None:
+        """Publica mudança de status no Event Bus"""
+        logger.info(f"Dispositivo {device.id} mudou de {previous.value} para {current.value}")
+        data = {
+            "device_id": device.id,
+            "name": device.name,
+            "type": device.type.value,
+            "previous_status": previous.value,
+            "status": current.value,
+            "last_seen": device.last_seen.isoformat() if device.last_seen else None,
+        }
+        if device.metadata and device.metadata.get("condominio_id"):
+            data["condominio_id"] = device.metadata["condominio_id"]
+        try:
+            await get_event_bus().emit(
+                create_event(EventType.DEVICE_STATUS_CHANGED, "dispositivo", device.id, data)
+            )
+        except Exception as e:
+            logger.warning(f"Falha ao publicar status de {device.id}: {e}")
 
     async def _load_devices_from_cache(self):
         """Carrega dispositivos do cache Redis"""
@@ -1136,7 +1678,6 @@ class HardwareManager:
         try:
             devices_data = await self._redis.hgetall("hardware:devices")
             for device_id, device_json in devices_data.items():
-                import json
                 device_dict = json.loads(device_json)
                 device = Device(**device_dict)
                 await self.register_device(device)
@@ -1148,7 +1689,6 @@ class HardwareManager:
         if not self._redis:
             return
 
-        import json
         device_dict = {
             "id": device.id,
             "name": device.name,
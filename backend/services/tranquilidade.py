@@ -3,7 +3,7 @@ Conecta Plus - Servico de Tranquilidade
 Calcula estado de tranquilidade e recomendacoes por perfil
 """
 
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Optional, Dict, Any, List
 from uuid import UUID
 import logging
@@ -21,6 +21,11 @@ from ..models.tranquilidade import (
 from ..models.ocorrencia import Ocorrencia, StatusOcorrencia
 from ..models.financeiro import Boleto
 from .sla_manager import SLAManagerService
+from .tranquilidade_cache import (
+    TranquilidadeCache,
+    EntradaTranquilidade,
+    get_tranquilidade_cache,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -28,9 +33,10 @@ logger = logging.getLogger(__name__)
 class TranquilidadeService:
     """Servico para calcular e gerenciar estado de tranquilidade."""
 
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, cache: Optional[TranquilidadeCache] = None):
         self.db = db
         self.sla_manager = SLAManagerService(db)
+        self.cache = cache or get_tranquilidade_cache()
 
     async def calcular_tranquilidade(
         self,
@@ -41,10 +47,48 @@ class TranquilidadeService:
         """
         Calcula o estado de tranquilidade para um perfil/usuario.
         Retorna snapshot com estado, contadores e recomendacoes.
+
+        As metricas sao materializadas no cache; o banco so recebe um
+        snapshot quando o estado muda (historico de transicoes).
         """
         # Coleta metricas
         metricas = await self._coletar_metricas(condominio_id, perfil, usuario_id)
 
+        agora = datetime.utcnow()
+        entrada = EntradaTranquilidade(
+            condominio_id=str(condominio_id),
+            perfil=perfil,
+            usuario_id=str(usuario_id),
+            metricas=metricas,
+            proxima_tarefa=await self._gerar_proxima_tarefa(condominio_id) if perfil == "porteiro" else None,
+            calculated_at=agora,
+            expires_at=agora + self.cache.ttl
+        )
+
+        await self.cache.put(entrada)
+
+        snapshot = await self._montar_snapshot(entrada, usuario_id, condominio_id)
+
+        # Salva no banco apenas transicoes de estado
+        anterior = await self.cache.estado_anterior(condominio_id, perfil, usuario_id)
+        if anterior != snapshot.estado:
+            self.db.add(snapshot)
+            self.db.commit()
+            self.db.refresh(snapshot)
+            await self.cache.registrar_estado(condominio_id, perfil, usuario_id, snapshot.estado)
+
+        return snapshot
+
+    async def _montar_snapshot(
+        self,
+        entrada: EntradaTranquilidade,
+        usuario_id: UUID,
+        condominio_id: UUID
+    ) -> TranquilidadeSnapshot:
+        """Deriva snapshot (nao persistido) a partir das metricas em cache."""
+        metricas = entrada.metricas
+        perfil = entrada.perfil
+
         # Calcula estado
         estado = self._calcular_estado(metricas)
 
@@ -62,8 +106,7 @@ class TranquilidadeService:
         # Mensagem principal
         mensagem = CRITERIOS_ESTADO.get(estado, {}).get("mensagem", "")
 
-        # Cria snapshot
-        snapshot = TranquilidadeSnapshot(
+        return TranquilidadeSnapshot(
             perfil=perfil,
             usuario_id=usuario_id,
             condominio_id=condominio_id,
@@ -82,17 +125,11 @@ class TranquilidadeService:
             recomendacao=recomendacao["mensagem"],
             recomendacao_tipo=recomendacao["tipo"],
             saude_condominio=self._gerar_saude_condominio(metricas) if perfil in ["sindico", "gerente", "admin"] else {},
-            proxima_tarefa=await self._gerar_proxima_tarefa(condominio_id) if perfil == "porteiro" else None,
-            expires_at=datetime.utcnow() + timedelta(minutes=5)  # Cache 5 min
+            proxima_tarefa=entrada.proxima_tarefa,
+            calculated_at=entrada.calculated_at,
+            expires_at=entrada.expires_at
         )
 
-        # Salva no banco
-        self.db.add(snapshot)
-        self.db.commit()
-        self.db.refresh(snapshot)
-
-        return snapshot
-
     async def _coletar_metricas(
         self,
         condominio_id: UUID,
@@ -338,18 +375,10 @@ class TranquilidadeService:
         Retorna snapshot do cache ou calcula novo se expirado.
         """
         if not forcar_recalculo:
-            # Busca snapshot valido no cache
-            snapshot = self.db.query(TranquilidadeSnapshot).filter(
-                and_(
-                    TranquilidadeSnapshot.perfil == perfil,
-                    TranquilidadeSnapshot.usuario_id == usuario_id,
-                    TranquilidadeSnapshot.condominio_id == condominio_id,
-                    TranquilidadeSnapshot.expires_at > datetime.utcnow()
-                )
-            ).order_by(TranquilidadeSnapshot.calculated_at.desc()).first()
-
-            if snapshot:
-                return snapshot
+            # Busca metricas validas no cache (memoria -> Redis)
+            entrada = await self.cache.get(condominio_id, perfil, usuario_id)
+            if entrada:
+                return await self._montar_snapshot(entrada, usuario_id, condominio_id)
 
         # Calcula novo
         return await self.calcular_tranquilidade(perfil, usuario_id, condominio_id)
@@ -0,0 +1,414 @@
+"""
+Conecta Plus - Cache de Tranquilidade
+Cache materializado (memoria + Redis) das metricas do painel de tranquilidade,
+atualizado incrementalmente por eventos do SystemEventBus.
+"""
+
+import json
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, Set, Tuple
+
+from .events import SystemEvent, EventType
+
+logger = logging.getLogger(__name__)
+
+# Chave do cache: (condominio_id, perfil, usuario_id)
+ChaveTranquilidade = Tuple[str, str, str]
+
+# Deltas aplicados diretamente nas metricas em cache (apenas contadores
+# que _coletar_metricas deriva das mesmas ocorrencias)
+DELTAS_EVENTO: Dict[EventType, Dict[str, int]] = {
+    EventType.OCORRENCIA_CREATED: {"ocorrencias_abertas": 1},
+}
+
+# Eventos que invalidam o cache (metricas nao derivaveis do evento). A
+# resolucao tambem: a ocorrencia resolvida pode ser a que tinha o SLA
+# estourado/proximo, e o evento nao diz qual.
+EVENTOS_INVALIDACAO: Set[EventType] = {
+    EventType.OCORRENCIA_RESOLVED,
+    EventType.OCORRENCIA_UPDATED,
+    EventType.ALARME_DISPARADO,
+    EventType.ALARME_ARMADO,
+    EventType.ALARME_DESARMADO,
+    EventType.ACESSO_LIBERADO,
+    EventType.ACESSO_NEGADO,
+}
+
+# Eventos de acesso afetam apenas a proxima tarefa do porteiro
+PERFIS_EVENTO_ACESSO = {"porteiro"}
+
+
+@dataclass
+class EntradaTranquilidade:
+    """Metricas materializadas de um (condominio, perfil, usuario)."""
+    condominio_id: str
+    perfil: str
+    usuario_id: str
+    metricas: Dict[str, Any]
+    proxima_tarefa: Optional[Dict[str, Any]] = None
+    calculated_at: datetime = field(default_factory=datetime.utcnow)
+    expires_at: datetime = field(default_factory=datetime.utcnow)
+
+    @property
+    def chave(self) -> ChaveTranquilidade:
+        return (self.condominio_id, self.perfil, self.usuario_id)
+
+    def expirada(self, agora: Optional[datetime] = None) -> bool:
+        return (agora or datetime.utcnow()) >= self.expires_at
+
+    def aplicar_delta(self, delta: Dict[str, int]) -> None:
+        """Aplica incremento nos contadores (nunca abaixo de zero)."""
+        for campo, valor in delta.items():
+            self.metricas[campo] = max(0, self.metricas.get(campo, 0) + valor)
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "condominio_id": self.condominio_id,
+            "perfil": self.perfil,
+            "usuario_id": self.usuario_id,
+            "metricas": self.metricas,
+            "proxima_tarefa": self.proxima_tarefa,
+            "calculated_at": self.calculated_at.isoformat(),
+            "expires_at": self.expires_at.isoformat(),
+        }, ensure_ascii=False, default=str)
+
+    @classmethod
+    def from_json(cls, raw: Any) -> "EntradaTranquilidade":
+        data = json.loads(raw)
+        return cls(
+            condominio_id=data["condominio_id"],
+            perfil=data["perfil"],
+            usuario_id=data["usuario_id"],
+            metricas=data["metricas"],
+            proxima_tarefa=data.get("proxima_tarefa"),
+            calculated_at=datetime.fromisoformat(data["calculated_at"]),
+            expires_at=datetime.fromisoformat(data["expires_at"]),
+        )
+
+
+class TranquilidadeCache:
+    """
+    Cache em dois niveis para snapshots de tranquilidade.
+
+    - L1: memoria do processo (LRU limitado, TTL curto para convergir entre workers)
+    - L2: Redis compartilhado (TTL = validade do snapshot)
+
+    Eventos de ocorrencia/alarme/acesso atualizam as entradas do condominio
+    sem recalcular tudo no banco: contadores conhecidos recebem delta e os
+    demais casos invalidam a entrada para recalculo na proxima leitura.
+    No Redis, os deltas vao para um hash por entrada (HINCRBY, atomico)
+    somado ao snapshot na leitura.
+
+    O ultimo estado calculado de cada chave fica guardado a parte (memoria
+    e um hash por condominio no Redis) e nao e afetado pela invalidacao:
+    so uma mudanca de estado gera registro no banco.
+    """
+
+    PREFIXO = "tranquilidade"
+    ESTADOS_TTL = timedelta(days=1)
+
+    def __init__(
+        self,
+        redis_client=None,
+        ttl: timedelta = timedelta(minutes=5),
+        memoria_ttl: timedelta = timedelta(seconds=15),
+        max_entradas: int = 10000,
+    ):
+        self.redis = redis_client
+        self.ttl = ttl
+        self.memoria_ttl = memoria_ttl
+        self.max_entradas = max_entradas
+
+        # chave -> (entrada, validade_l1)
+        self._memoria: "OrderedDict[ChaveTranquilidade, Tuple[EntradaTranquilidade, datetime]]" = OrderedDict()
+        self._por_condominio: Dict[str, Set[ChaveTranquilidade]] = {}
+        self._estados: "OrderedDict[ChaveTranquilidade, str]" = OrderedDict()
+        self._registrado = False
+
+        self.hits = 0
+        self.misses = 0
+        self.atualizacoes_incrementais = 0
+        self.invalidacoes = 0
+
+    # ==================== Chaves ====================
+
+    @staticmethod
+    def chave(condominio_id: Any, perfil: str, usuario_id: Any) -> ChaveTranquilidade:
+        return (str(condominio_id), perfil, str(usuario_id))
+
+    def _redis_key(self, chave: ChaveTranquilidade) -> str:
+        return f"{self.PREFIXO}:{chave[0]}:{chave[1]}:{chave[2]}"
+
+    def _redis_idx(self, condominio_id: str) -> str:
+        return f"{self.PREFIXO}:idx:{condominio_id}"
+
+    def _redis_estados(self, condominio_id: str) -> str:
+        return f"{self.PREFIXO}:estados:{condominio_id}"
+
+    @staticmethod
+    def _redis_deltas(chave_redis: Any) -> str:
+        """Hash de deltas pendentes (HINCRBY) aplicados sobre o snapshot na leitura"""
+        if isinstance(chave_redis, bytes):
+            chave_redis = chave_redis.decode()
+        return f"{chave_redis}:deltas"
+
+    # ==================== Leitura / Escrita ====================
+
+    async def get(
+        self,
+        condominio_id: Any,
+        perfil: str,
+        usuario_id: Any
+    ) -> Optional[EntradaTranquilidade]:
+        """Retorna entrada valida (L1 -> L2) ou None."""
+        chave = self.chave(condominio_id, perfil, usuario_id)
+        agora = datetime.utcnow()
+
+        item = self._memoria.get(chave)
+        if item:
+            entrada, validade_l1 = item
+            if not entrada.expirada(agora) and agora < validade_l1:
+                self._memoria.move_to_end(chave)
+                self.hits += 1
+                return entrada
+
+        if self.redis is not None:
+            chave_redis = self._redis_key(chave)
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.get(chave_redis)
+                pipe.hgetall(self._redis_deltas(chave_redis))
+                raw, deltas = await pipe.execute()
+            except Exception as e:
+                logger.warning(f"Cache tranquilidade: falha ao ler Redis: {e}")
+                raw = None
+            if raw:
+                entrada = EntradaTranquilidade.from_json(raw)
+                if deltas:
+                    entrada.aplicar_delta({
+                        (k.decode() if isinstance(k, bytes) else k): int(v)
+                        for k, v in deltas.items()
+                    })
+                if not entrada.expirada(agora):
+                    self._guardar_memoria(entrada)
+                    self.hits += 1
+                    return entrada
+
+        self.misses += 1
+        return None
+
+    async def estado_anterior(
+        self,
+        condominio_id: Any,
+        perfil: str,
+        usuario_id: Any
+    ) -> Optional[str]:
+        """
+        Ultimo estado registrado, mesmo com a entrada invalidada.
+        Com Redis, le o valor compartilhado (outro worker pode ter registrado
+        uma transicao); a memoria so e usada sem Redis ou se ele falhar.
+        """
+        chave = self.chave(condominio_id, perfil, usuario_id)
+        if self.redis is not None:
+            try:
+                raw = await self.redis.hget(self._redis_estados(chave[0]), f"{chave[1]}:{chave[2]}")
+                if raw is not None:
+                    estado = raw.decode() if isinstance(raw, bytes) else raw
+                    self._guardar_estado_memoria(chave, estado)
+                    return estado
+            except Exception as e:
+                logger.warning(f"Cache tranquilidade: falha ao ler estado no Redis: {e}")
+        return self._estados.get(chave)
+
+    async def registrar_estado(
+        self,
+        condominio_id: Any,
+        perfil: str,
+        usuario_id: Any,
+        estado: str
+    ) -> None:
+        """Guarda o estado gravado no banco para comparar com o proximo calculo."""
+        chave = self.chave(condominio_id, perfil, usuario_id)
+        self._guardar_estado_memoria(chave, estado)
+
+        if self.redis is not None:
+            try:
+                chave_estados = self._redis_estados(chave[0])
+                pipe = self.redis.pipeline()
+                pipe.hset(chave_estados, f"{chave[1]}:{chave[2]}", estado)
+                pipe.expire(chave_estados, int(self.ESTADOS_TTL.total_seconds()))
+                await pipe.execute()
+            except Exception as e:
+                logger.warning(f"Cache tranquilidade: falha ao gravar estado no Redis: {e}")
+
+    def _guardar_estado_memoria(self, chave: ChaveTranquilidade, estado: str) -> None:
+        self._estados[chave] = estado
+        self._estados.move_to_end(chave)
+        while len(self._estados) > self.max_entradas:
+            self._estados.popitem(last=False)
+
+    async def put(self, entrada: EntradaTranquilidade) -> None:
+        """Armazena entrada recem calculada em L1 e L2."""
+        self._guardar_memoria(entrada)
+
+        if self.redis is not None:
+            try:
+                segundos = max(1, int((entrada.expires_at - datetime.utcnow()).total_seconds()))
+                chave_redis = self._redis_key(entrada.chave)
+                pipe = self.redis.pipeline()
+                pipe.set(chave_redis, entrada.to_json(), ex=segundos)
+                pipe.delete(self._redis_deltas(chave_redis))  # Snapshot novo ja inclui os deltas
+                pipe.sadd(self._redis_idx(entrada.condominio_id), self._redis_key(entrada.chave))
+                pipe.expire(self._redis_idx(entrada.condominio_id), int(self.ttl.total_seconds()))
+                await pipe.execute()
+            except Exception as e:
+                logger.warning(f"Cache tranquilidade: falha ao gravar Redis: {e}")
+
+    def _guardar_memoria(self, entrada: EntradaTranquilidade) -> None:
+        chave = entrada.chave
+        validade_l1 = entrada.expires_at
+        if self.redis is not None:
+            # Com Redis, L1 expira antes para refletir eventos de outros workers
+            validade_l1 = min(validade_l1, datetime.utcnow() + self.memoria_ttl)
+        self._memoria[chave] = (entrada, validade_l1)
+        self._memoria.move_to_end(chave)
+        self._por_condominio.setdefault(entrada.condominio_id, set()).add(chave)
+
+        while len(self._memoria) > self.max_entradas:
+            antiga, _ = self._memoria.popitem(last=False)
+            chaves = self._por_condominio.get(antiga[0])
+            if chaves:
+                chaves.discard(antiga)
+                if not chaves:
+                    del self._por_condominio[antiga[0]]
+
+    # ==================== Atualizacao por eventos ====================
+
+    async def aplicar_delta(self, condominio_id: str, delta: Dict[str, int]) -> int:
+        """Aplica delta nas entradas do condominio. Retorna entradas afetadas."""
+        afetadas = 0
+        for chave in list(self._por_condominio.get(condominio_id, ())):
+            item = self._memoria.get(chave)
+            if item:
+                item[0].aplicar_delta(delta)
+                afetadas += 1
+
+        if self.redis is not None:
+            # HINCRBY e atomico: eventos concorrentes de varios workers nao
+            # se sobrescrevem (o snapshot JSON nao e reescrito)
+            try:
+                chaves_redis = list(await self.redis.smembers(self._redis_idx(condominio_id)))
+                if chaves_redis:
+                    segundos = int(self.ttl.total_seconds())
+                    pipe = self.redis.pipeline(transaction=False)
+                    for chave_redis in chaves_redis:
+                        chave_deltas = self._redis_deltas(chave_redis)
+                        for campo, valor in delta.items():
+                            pipe.hincrby(chave_deltas, campo, valor)
+                        pipe.expire(chave_deltas, segundos)
+                    await pipe.execute()
+            except Exception as e:
+                logger.warning(f"Cache tranquilidade: falha ao atualizar Redis: {e}")
+
+        self.atualizacoes_incrementais += 1
+        return afetadas
+
+    async def invalidar(self, condominio_id: Optional[str] = None, perfis: Optional[Set[str]] = None) -> None:
+        """Remove entradas do condominio (ou todas, se None) para recalculo."""
+        if condominio_id is None:
+            self._memoria.clear()
+            self._por_condominio.clear()
+            self.invalidacoes += 1
+            return
+
+        chaves = self._por_condominio.get(condominio_id, set())
+        for chave in [c for c in chaves if perfis is None or c[1] in perfis]:
+            self._memoria.pop(chave, None)
+            chaves.discard(chave)
+        if not chaves:
+            self._por_condominio.pop(condominio_id, None)
+
+        if self.redis is not None:
+            try:
+                idx = self._redis_idx(condominio_id)
+                chaves_redis = [
+                    c for c in await self.redis.smembers(idx)
+                    if perfis is None or self._perfil_da_chave(c) in perfis
+                ]
+                if chaves_redis:
+                    pipe = self.redis.pipeline()
+                    pipe.delete(*chaves_redis, *[self._redis_deltas(c) for c in chaves_redis])
+                    pipe.srem(idx, *chaves_redis)
+                    await pipe.execute()
+            except Exception as e:
+                logger.warning(f"Cache tranquilidade: falha ao invalidar Redis: {e}")
+
+        self.invalidacoes += 1
+
+    @staticmethod
+    def _perfil_da_chave(chave_redis: Any) -> str:
+        if isinstance(chave_redis, bytes):
+            chave_redis = chave_redis.decode()
+        return chave_redis.split(":")[2]
+
+    async def on_event(self, event: SystemEvent) -> None:
+        """Handler do SystemEventBus."""
+        condominio_id = (event.data or {}).get("condominio_id")
+        if condominio_id is None:
+            # Sem escopo conhecido: descarta apenas a memoria local
+            await self.invalidar()
+            return
+        condominio_id = str(condominio_id)
+
+        delta = DELTAS_EVENTO.get(event.type)
+        if delta:
+            await self.aplicar_delta(condominio_id, delta)
+        elif event.type in (EventType.ACESSO_LIBERADO, EventType.ACESSO_NEGADO):
+            await self.invalidar(condominio_id, perfis=PERFIS_EVENTO_ACESSO)
+        elif event.type in EVENTOS_INVALIDACAO:
+            await self.invalidar(condominio_id)
+
+    def registrar(self, event_bus) -> None:
+        """Registra o cache como handler dos eventos relevantes."""
+        if self._registrado:
+            return
+        for event_type in set(DELTAS_EVENTO) | EVENTOS_INVALIDACAO:
+            event_bus.register_handler(event_type, self.on_event)
+        self._registrado = True
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "entradas_memoria": len(self._memoria),
+            "condominios": len(self._por_condominio),
+            "redis": self.redis is not None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "atualizacoes_incrementais": self.atualizacoes_incrementais,
+            "invalidacoes": self.invalidacoes,
+        }
+
+
+# === Singleton ===
+
+_tranquilidade_cache: Optional[TranquilidadeCache] = None
+
+
+def get_tranquilidade_cache() -> TranquilidadeCache:
+    """Obtém a instância singleton do cache (Redis opcional)."""
+    global _tranquilidade_cache
+    if _tranquilidade_cache is None:
+        redis_client = None
+        try:
+            import redis.asyncio as redis
+            from ..config import settings
+            redis_client = redis.from_url(
+                settings.REDIS_URL, socket_timeout=1, socket_connect_timeout=1
+            )
+        except Exception as e:
+            logger.warning(f"Cache tranquilidade sem Redis: {e}")
+        _tranquilidade_cache = TranquilidadeCache(redis_client=redis_client)
+    return _tranquilidade_cache
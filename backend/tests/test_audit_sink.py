@@ -0,0 +1,245 @@
+"""
+Conecta Plus - Testes do Sink Assincrono de Audit Log
+"""
+
+import asyncio
+import csv
+import ipaddress
+import json
+import pytest
+import time
+
+from ..middleware.audit_sink import (
+    AuditLogBuffer,
+    AuditRecord,
+    AuditSink,
+    FileAuditSink,
+    PostgresCopyAuditSink,
+    format_record,
+)
+
+
+def _record(path="/api/v1/auth/login", status_code=200, **kwargs):
+    dados = dict(
+        phase="response",
+        timestamp=time.time(),
+        request_id="1-1",
+        client_ip="10.0.0.1",
+        authorization=None,
+        method="POST",
+        path=path,
+        status_code=status_code,
+        process_time=0.0123,
+        user_agent="pytest",
+        query_params={"senha": "123", "pagina": "2"},
+        error=None,
+        detailed=True,
+    )
+    dados.update(kwargs)
+    return AuditRecord(**dados)
+
+
+class FakeCursor:
+    """Cursor psycopg2 fake: ip_address e INET; entity_id 'duplicado' viola constraint."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+    @staticmethod
+    def _check(row):
+        if row[4]:
+            ipaddress.ip_address(row[4])  # invalid input syntax for type inet
+        if row[2] == "duplicado":
+            raise ValueError("duplicate key value violates unique constraint")
+
+    def copy_expert(self, sql, data):
+        rows = [[v or None for v in row] for row in csv.reader(data)]
+        for row in rows:
+            self._check(row)
+        self.db.copies += 1
+        self.db.pending.extend(rows)
+
+    def execute(self, sql, row):
+        self._check(row)
+        self.db.pending.append(list(row))
+
+
+class FakeConnection:
+    def __init__(self):
+        self.rows = []
+        self.pending = []
+        self.copies = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def commit(self):
+        self.rows.extend(self.pending)
+        self.pending = []
+
+    def rollback(self):
+        self.pending = []
+
+    def close(self):
+        pass
+
+
+class FakeEngine:
+    def __init__(self):
+        self.connection = FakeConnection()
+
+    def raw_connection(self):
+        return self.connection
+
+
+class MemorySink(AuditSink):
+    def __init__(self, falhar: int = 0):
+        self.lotes = []
+        self.falhar = falhar  # numero de gravacoes que falham
+
+    async def write_batch(self, records):
+        if self.falhar:
+            self.falhar -= 1
+            raise IOError("disco cheio")
+        self.lotes.append(list(records))
+
+
+class TestFormatRecord:
+    """Formatacao fora do caminho da requisicao."""
+
+    def test_sanitiza_query_params(self):
+        entry = format_record(_record())
+        assert entry["query_params"]["senha"] == "[REDACTED]"
+        assert entry["query_params"]["pagina"] == "2"
+        assert entry["process_time_ms"] == 12.3
+
+    def test_sem_detalhes_para_path_comum(self):
+        entry = format_record(_record(path="/api/v1/dashboard", detailed=False, query_params=None))
+        assert "query_params" not in entry
+
+
+class TestAuditLogBuffer:
+    """Testes do buffer circular com flush em lote."""
+
+    @pytest.mark.asyncio
+    async def test_flush_em_lotes(self):
+        sink = MemorySink()
+        buffer = AuditLogBuffer(sink=sink, batch_size=2)
+        for _ in range(5):
+            buffer.enqueue(_record())
+
+        assert await buffer.flush() == 5
+        assert [len(lote) for lote in sink.lotes] == [2, 2, 1]
+        await buffer.close()
+
+    @pytest.mark.asyncio
+    async def test_buffer_cheio_descarta_mais_antigo(self):
+        buffer = AuditLogBuffer(sink=MemorySink(), capacity=3)
+        for i in range(5):
+            buffer.enqueue(_record(request_id=str(i)))
+
+        assert buffer.stats["dropped"] == 2
+        assert buffer.stats["pending"] == 3
+        await buffer.close()
+
+    @pytest.mark.asyncio
+    async def test_close_drena_buffer(self, tmp_path):
+        arquivo = tmp_path / "audit.jsonl"
+        buffer = AuditLogBuffer(sink=FileAuditSink(str(arquivo)), flush_interval=60)
+        buffer.enqueue(_record())
+        buffer.enqueue(_record(status_code=500, error="boom"))
+
+        await buffer.close()
+
+        linhas = [json.loads(l) for l in arquivo.read_text().splitlines()]
+        assert [l["status_code"] for l in linhas] == [200, 500]
+        assert buffer.stats["written"] == 2
+
+    @pytest.mark.asyncio
+    async def test_falha_do_destino_retenta_lote(self):
+        sink = MemorySink(falhar=1)
+        buffer = AuditLogBuffer(sink=sink, retry_backoff=0.05)
+        buffer.enqueue(_record(request_id="0"))
+        buffer.enqueue(_record(request_id="1"))
+
+        assert await buffer.flush() == 0
+        assert buffer.stats["flush_errors"] == 1
+        assert buffer.stats["dropped"] == 0
+        assert buffer.stats["pending"] == 2
+
+        # Ainda em backoff: nao tenta de novo
+        buffer.enqueue(_record(request_id="2"))
+        assert await buffer.flush() == 0
+
+        await asyncio.sleep(0.06)
+        assert await buffer.flush() == 3
+        assert [r.request_id for r in sink.lotes[0]] == ["0", "1", "2"]
+        assert not buffer.stats["retrying"]
+        await buffer.close()
+
+    @pytest.mark.asyncio
+    async def test_lote_descartado_apos_tentativas(self):
+        buffer = AuditLogBuffer(sink=MemorySink(falhar=10), max_retries=2, retry_backoff=0.01)
+        buffer.enqueue(_record())
+
+        await buffer.close()
+
+        assert buffer.stats["flush_errors"] == 3
+        assert buffer.stats["dropped"] == 1
+        assert buffer.stats["pending"] == 0
+
+    @pytest.mark.asyncio
+    async def test_saude_considera_so_falhas_recentes(self):
+        buffer = AuditLogBuffer(sink=MemorySink(falhar=1), retry_backoff=0)
+        buffer.enqueue(_record())
+        assert await buffer.flush() == 1
+
+        assert buffer.failed_within(60)
+        buffer.last_failure_at -= 120
+        assert not buffer.failed_within(60)
+        assert buffer.stats["flush_errors"] == 1
+        await buffer.close()
+
+
+class TestPostgresCopyAuditSink:
+    """Testes do sink COPY com fallback por registro."""
+
+    @pytest.mark.asyncio
+    async def test_ip_invalido_gravado_como_null(self):
+        engine = FakeEngine()
+        sink = PostgresCopyAuditSink(engine)
+
+        await sink.write_batch([_record(), _record(client_ip="1.2.3.4, <script>")])
+
+        linhas = engine.connection.rows
+        assert engine.connection.copies == 1
+        assert [l[4] for l in linhas] == ["10.0.0.1", None]
+
+    @pytest.mark.asyncio
+    async def test_falha_do_copy_grava_registro_a_registro(self):
+        engine = FakeEngine()
+        sink = PostgresCopyAuditSink(engine)
+        registros = [_record(request_id=str(i)) for i in range(4)]
+        registros.insert(2, _record(request_id="duplicado"))
+
+        await sink.write_batch(registros)
+
+        assert engine.connection.copies == 0
+        assert [l[2] for l in engine.connection.rows] == ["0", "1", "2", "3"]
+        assert sink.rejected == 1
+
+    @pytest.mark.asyncio
+    async def test_lote_todo_rejeitado_conta_falha(self):
+        engine = FakeEngine()
+        buffer = AuditLogBuffer(sink=PostgresCopyAuditSink(engine), max_retries=0)
+        buffer.enqueue(_record(request_id="duplicado"))
+
+        assert await buffer.flush() == 0
+        assert buffer.stats["flush_errors"] == 1
+        await buffer.close()
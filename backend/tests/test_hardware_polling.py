@@ -0,0 +1,137 @@
+"""
+Conecta Plus - Testes do Agendador de Monitoramento de Dispositivos
+"""
+
+import asyncio
+import pytest
+
+from ..services.hardware import (
+    Device,
+    DeviceStatus,
+    DeviceType,
+    DevicePollingScheduler,
+    HardwareManager,
+    PollingConfig,
+    _PollState,
+)
+
+
+class FakeDriver:
+    def __init__(self, status=DeviceStatus.ONLINE, delay=0.0):
+        self.status = status
+        self.delay = delay
+        self.calls = 0
+
+    async def check_status(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.status
+
+
+def _device(device_id, device_type=DeviceType.CAMERA, **metadata):
+    return Device(
+        id=device_id, name=device_id, type=device_type,
+        ip="10.0.0.1", port=80, protocol="http", metadata=metadata,
+    )
+
+
+def _manager(drivers, config=None):
+    manager = HardwareManager()
+    manager._poller = DevicePollingScheduler(manager, config or PollingConfig(jitter=0))
+    manager._running = True
+    changes = []
+
+    async def on_change(device, previous, current):
+        changes.append((device.id, previous, current))
+
+    manager._on_status_change = on_change
+    for device_id, (device, driver) in drivers.items():
+        manager._devices[device_id] = device
+        manager._drivers[device_id] = driver
+    return manager, changes
+
+
+class TestDevicePollingScheduler:
+    """Testes do agendador de health check."""
+
+    def test_intervalo_adaptativo(self):
+        scheduler = DevicePollingScheduler(HardwareManager(), PollingConfig(jitter=0))
+
+        assert scheduler.next_interval(_device("cam"), _PollState()) == 30
+        assert scheduler.next_interval(_device("gate", DeviceType.GATE), _PollState()) == 5
+        assert scheduler.next_interval(_device("cam", critical=True), _PollState()) == 5
+        assert scheduler.next_interval(_device("cam"), _PollState(failures=2)) == 120
+        assert scheduler.next_interval(_device("cam"), _PollState(failures=10)) == 300
+
+    @pytest.mark.asyncio
+    async def test_dispositivo_lento_nao_atrasa_demais(self):
+        lento = FakeDriver(delay=10)
+        rapido = FakeDriver(status=DeviceStatus.OFFLINE)
+        manager, changes = _manager({
+            "lento": (_device("lento"), lento),
+            "rapido": (_device("rapido"), rapido),
+        }, PollingConfig(jitter=0, timeout=0.05))
+
+        await asyncio.gather(manager._poller._poll("lento"), manager._poller._poll("rapido"))
+
+        assert manager._devices["lento"].status == DeviceStatus.OFFLINE
+        assert manager._poller.timeouts == 1
+        assert ("rapido", DeviceStatus.UNKNOWN, DeviceStatus.OFFLINE) in changes
+        assert manager._poller._states["rapido"].failures == 1
+
+    @pytest.mark.asyncio
+    async def test_loop_respeita_concorrencia(self):
+        drivers = {f"d{i}": (_device(f"d{i}"), FakeDriver(delay=0.01)) for i in range(50)}
+        manager, changes = _manager(drivers, PollingConfig(jitter=0, max_concurrency=10))
+        for device_id in drivers:
+            manager._poller.schedule(device_id)
+
+        task = asyncio.create_task(manager._poller.run())
+        await asyncio.sleep(0.2)
+        manager._running = False
+        manager._poller._wakeup.set()
+        await task
+
+        assert manager._poller.polls == 50
+        assert len(changes) == 50
+        assert all(d.last_seen is not None for d, _ in drivers.values())
+        # Reagendados para o próximo ciclo
+        assert manager._poller.stats["scheduled"] == 50
+
+    @pytest.mark.asyncio
+    async def test_schedule_repetido_nao_duplica_cadeia(self):
+        """Reagendar dispositivo já agendado (ou em verificação) é ignorado."""
+        driver = FakeDriver(delay=0.05)
+        manager, _ = _manager({"cam": (_device("cam"), driver)})
+        poller = manager._poller
+
+        poller.schedule("cam")
+        poller.schedule("cam", 10)
+        assert poller.stats["scheduled"] == 1
+
+        task = asyncio.create_task(poller.run())
+        await asyncio.sleep(0.01)
+        # Verificação em andamento: novo registro não inicia outra cadeia
+        poller.schedule("cam")
+        await asyncio.sleep(0.1)
+        manager._running = False
+        poller._wakeup.set()
+        await task
+
+        assert driver.calls == 1
+        assert poller.stats["scheduled"] == 1
+
+    @pytest.mark.asyncio
+    async def test_stop_libera_verificacoes_canceladas(self):
+        driver = FakeDriver(delay=10)
+        manager, _ = _manager({"cam": (_device("cam"), driver)})
+        poller = manager._poller
+        poller.schedule("cam")
+
+        poller._task = asyncio.create_task(poller.run())
+        await asyncio.sleep(0.01)
+        await poller.stop()
+        await asyncio.sleep(0)
+
+        poller.schedule("cam")
+        assert poller.stats["scheduled"] == 1
@@ -0,0 +1,253 @@
+"""
+Conecta Plus - Testes da Camada de Transporte de Hardware
+"""
+
+import asyncio
+import json
+import pytest
+
+from ..services.hardware import (
+    CommandLogBatcher,
+    Device,
+    DeviceStatus,
+    DeviceType,
+    HardwareTransport,
+    HTTPConnectionPool,
+    ISP_ACK,
+    IntelbrasAlarmDriver,
+    PipelinedConnection,
+)
+
+
+async def _central(delays):
+    """Central fake: responde ACK para cada byte recebido, em ordem."""
+    async def handle(reader, writer):
+        try:
+            while True:
+                data = await reader.readexactly(1)
+                await asyncio.sleep(delays.get(data[0], 0))
+                if data[0] == 0x50:
+                    writer.write(bytes([2, 0xAA, 0xBB, 0x00]))
+                else:
+                    writer.write(bytes([ISP_ACK]))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+async def _central_alarme(delays):
+    """Central de alarme fake: um ACK por comando (autenticação ou status)."""
+    writers = []
+
+    async def handle(reader, writer):
+        writers.append(writer)
+        try:
+            while True:
+                head = await reader.readexactly(1)
+                if head[0] == 0x40:
+                    await reader.readuntil(bytes([0x00]))
+                    await reader.readexactly(1)
+                else:
+                    await reader.readexactly(3)
+                await asyncio.sleep(delays.pop(head[0], 0))
+                writer.write(bytes([ISP_ACK]))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1], writers
+
+
+class FakePipeline:
+    def __init__(self, store):
+        self.store = store
+        self.ops = []
+
+    def lpush(self, key, *values):
+        self.ops.append(("lpush", key, values))
+
+    def ltrim(self, key, start, end):
+        self.ops.append(("ltrim", key, end))
+
+    async def execute(self):
+        for op, key, arg in self.ops:
+            if op == "lpush":
+                for value in arg:
+                    self.store.setdefault(key, []).insert(0, value)
+            else:
+                self.store[key] = self.store[key][:arg + 1]
+        self.store.setdefault("_executions", []).append(len(self.ops))
+
+
+class FakeRedis:
+    def __init__(self):
+        self.store = {}
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self.store)
+
+
+class TestPipelinedConnection:
+    """Testes da conexão TCP persistente."""
+
+    @pytest.mark.asyncio
+    async def test_respostas_em_ordem_com_pipelining(self):
+        server, port = await _central({0x41: 0.05})
+        connection = PipelinedConnection("127.0.0.1", port)
+        await connection.open()
+
+        respostas = await asyncio.gather(
+            connection.request(bytes([0x41])),
+            connection.request(bytes([0x50])),
+            connection.request(bytes([0x42])),
+        )
+
+        assert respostas == [bytes([ISP_ACK]), bytes([2, 0xAA, 0xBB, 0x00]), bytes([ISP_ACK])]
+        assert connection.reconnects == 1
+        await connection.close()
+        server.close()
+        await server.wait_closed()
+
+    @pytest.mark.asyncio
+    async def test_timeout_falha_so_o_comando(self):
+        """Um comando lento expira sozinho; os demais em trânsito recebem a resposta."""
+        server, port = await _central({0x41: 0.1})
+        connection = PipelinedConnection("127.0.0.1", port)
+        await connection.open()
+
+        lento = asyncio.create_task(connection.request(bytes([0x41]), timeout=0.05))
+        seguinte = asyncio.create_task(connection.request(bytes([0x50]), timeout=1.0))
+        with pytest.raises(asyncio.TimeoutError):
+            await lento
+
+        assert await seguinte == bytes([2, 0xAA, 0xBB, 0x00])
+        assert not connection.closed
+        assert connection.reconnects == 1
+        await connection.close()
+        server.close()
+        await server.wait_closed()
+
+    @pytest.mark.asyncio
+    async def test_equipamento_travado_fecha_e_reabre(self):
+        server, port = await _central({0x41: 0.3})
+        connection = PipelinedConnection("127.0.0.1", port, stall_timeout=0.1)
+        await connection.open()
+
+        with pytest.raises(asyncio.TimeoutError):
+            await connection.request(bytes([0x41]), timeout=0.05)
+        assert not connection.closed
+
+        # A mais antiga segue sem resposta além do stall_timeout
+        with pytest.raises(asyncio.TimeoutError):
+            await connection.request(bytes([0x42]), timeout=0.1)
+        assert connection.closed
+
+        assert await connection.open()
+        assert await connection.request(bytes([0x42])) == bytes([ISP_ACK])
+        await connection.close()
+        await asyncio.sleep(0.3)
+        server.close()
+        await server.wait_closed()
+
+    @pytest.mark.asyncio
+    async def test_cancelamento_descarta_resposta_tardia(self):
+        """Resposta de uma requisição cancelada não vai para a próxima."""
+        server, port = await _central({0x50: 0.1})
+        connection = PipelinedConnection("127.0.0.1", port)
+        await connection.open()
+
+        cancelada = asyncio.create_task(connection.request(bytes([0x50])))
+        await asyncio.sleep(0.02)
+        cancelada.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await cancelada
+
+        assert await connection.request(bytes([0x42])) == bytes([ISP_ACK])
+        assert not connection.closed
+        await connection.close()
+        server.close()
+        await server.wait_closed()
+
+
+class TestIntelbrasAlarmDriver:
+    """Testes da sessão da central sobre a conexão compartilhada."""
+
+    @staticmethod
+    def _driver(port):
+        device = Device(
+            id="central", name="central", type=DeviceType.ALARM_PANEL,
+            ip="127.0.0.1", port=port, protocol="tcp",
+        )
+        return IntelbrasAlarmDriver(device, HardwareTransport())
+
+    @pytest.mark.asyncio
+    async def test_check_status_reconecta_apos_queda(self):
+        server, port, writers = await _central_alarme({})
+        driver = self._driver(port)
+
+        # Sem connect() prévio: a verificação abre e autentica a sessão
+        assert await driver.check_status() == DeviceStatus.ONLINE
+
+        for writer in writers:
+            writer.close()
+        await asyncio.sleep(0.05)
+        assert driver._connection.closed
+
+        assert await driver.check_status() == DeviceStatus.ONLINE
+        assert driver._connection.reconnects == 2
+
+        await driver.transport.close()
+        server.close()
+        await server.wait_closed()
+
+    @pytest.mark.asyncio
+    async def test_timeout_nao_derruba_a_sessao(self):
+        delays = {}
+        server, port, _ = await _central_alarme(delays)
+        driver = self._driver(port)
+        driver.REQUEST_TIMEOUT = 0.05
+        assert await driver.check_status() == DeviceStatus.ONLINE
+
+        # Status atrasado: só esta verificação falha
+        delays[0x21] = 0.1
+        assert await driver.check_status() == DeviceStatus.OFFLINE
+        await asyncio.sleep(0.1)
+
+        assert await driver.check_status() == DeviceStatus.ONLINE
+        assert driver._connected
+        assert driver._connection.reconnects == 1
+
+        await driver.transport.close()
+        server.close()
+        await server.wait_closed()
+
+
+class TestHTTPConnectionPool:
+
+    @pytest.mark.asyncio
+    async def test_cliente_compartilhado_por_host(self):
+        pool = HTTPConnectionPool()
+        assert pool.get("http://10.0.0.1") is pool.get("http://10.0.0.1")
+        assert pool.get("http://10.0.0.1", auth=("a", "b")) is not pool.get("http://10.0.0.1")
+        await pool.close()
+        assert len(pool) == 0
+
+
+class TestCommandLogBatcher:
+
+    @pytest.mark.asyncio
+    async def test_lote_em_um_pipeline(self):
+        redis_client = FakeRedis()
+        batcher = CommandLogBatcher(redis_client, max_log_length=3, flush_interval=60)
+        for i in range(5):
+            batcher.add({"device_id": f"d{i}", "command": "open"})
+
+        assert await batcher.flush() == 5
+        log = redis_client.store["hardware:command_log"]
+        assert [json.loads(e)["device_id"] for e in log] == ["d4", "d3", "d2"]
+        assert redis_client.store["_executions"] == [2]
+        await batcher.close()
@@ -0,0 +1,178 @@
+"""
+Conecta Plus - Testes do Rate Limiter Sliding Window
+"""
+
+import pytest
+
+from shared.sliding_window import (
+    MemoryRateLimitStore,
+    RateLimitRule,
+    RedisRateLimitStore,
+    SlidingWindowRateLimiter,
+)
+
+# Inicio de uma janela de 60s (t = 1000 janelas + 10s)
+T0 = 1000 * 60 + 10
+
+
+class TestMemoryRateLimitStore:
+    """Testes do store em memoria."""
+
+    @pytest.mark.asyncio
+    async def test_bloqueia_apos_limite(self):
+        store = MemoryRateLimitStore(evict_interval=0)
+        regras = [RateLimitRule(5, 60)]
+
+        for i in range(5):
+            resultado = await store.hit("cliente", regras, now=T0 + i)
+            assert resultado.allowed
+            assert resultado.remaining == 4 - i
+
+        resultado = await store.hit("cliente", regras, now=T0 + 5)
+        assert not resultado.allowed
+        assert resultado.retry_after == 45
+
+    @pytest.mark.asyncio
+    async def test_janela_anterior_decai(self):
+        """Contagem da janela anterior pesa proporcionalmente ao tempo restante."""
+        store = MemoryRateLimitStore(evict_interval=0)
+        regras = [RateLimitRule(5, 60)]
+        for i in range(5):
+            await store.hit("cliente", regras, now=T0 + i)
+
+        # 10s na janela seguinte: 5 * 50/60 = 4.17 -> ainda bloqueado
+        resultado = await store.hit("cliente", regras, now=T0 + 60)
+        assert not resultado.allowed
+        assert resultado.retry_after == 2
+
+        # 20s na janela seguinte: 5 * 40/60 = 3.33 -> liberado
+        resultado = await store.hit("cliente", regras, now=T0 + 70)
+        assert resultado.allowed
+
+    @pytest.mark.asyncio
+    async def test_multiplas_regras_atomicas(self):
+        """Request bloqueado por uma regra nao consome as demais."""
+        store = MemoryRateLimitStore(evict_interval=0)
+        regras = [
+            RateLimitRule(2, 60, "rate_limit_minute"),
+            RateLimitRule(100, 3600, "rate_limit_hour"),
+        ]
+        for i in range(4):
+            resultado = await store.hit("cliente", regras, now=T0 + i)
+
+        assert not resultado.allowed
+        assert resultado.rule == "rate_limit_minute"
+        assert resultado.remaining_by_rule["rate_limit_hour"] == 98
+
+    @pytest.mark.asyncio
+    async def test_clientes_isolados(self):
+        limiter = SlidingWindowRateLimiter(
+            [RateLimitRule(1, 60)], store=MemoryRateLimitStore(evict_interval=0)
+        )
+        assert (await limiter.hit("a")).allowed
+        assert (await limiter.hit("b")).allowed
+        assert not (await limiter.hit("a")).allowed
+
+    @pytest.mark.asyncio
+    async def test_evict_clientes_inativos(self):
+        store = MemoryRateLimitStore(evict_interval=0)
+        await store.hit("cliente", [RateLimitRule(5, 60)], now=T0)
+
+        assert store.evict_idle(now=T0 + 60) == 0
+        assert store.evict_idle(now=T0 + 120) == 1
+        assert len(store) == 0
+
+
+class RedisFora:
+    """Cliente Redis cujo script sempre falha (conta as tentativas)."""
+
+    def __init__(self):
+        self.chamadas = 0
+
+    def register_script(self, script):
+        async def executar(keys=None, args=None):
+            self.chamadas += 1
+            raise ConnectionError("Redis fora do ar")
+        return executar
+
+    async def close(self):
+        pass
+
+
+class TestRedisRateLimitStore:
+    """Testes do store Redis (script Lua via fakeredis)."""
+
+    @pytest.fixture
+    def redis_client(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        pytest.importorskip("lupa")
+        return fakeredis.FakeAsyncRedis()
+
+    @pytest.mark.asyncio
+    async def test_mesmo_resultado_que_memoria(self, redis_client):
+        """Script Lua e store em memoria seguem o mesmo algoritmo."""
+        redis_store = RedisRateLimitStore(redis_client=redis_client, fallback=MemoryRateLimitStore(evict_interval=0))
+        memoria = MemoryRateLimitStore(evict_interval=0)
+        regras = [
+            RateLimitRule(5, 60, "rate_limit_minute"),
+            RateLimitRule(8, 3600, "rate_limit_hour"),
+        ]
+
+        for t in [0, 1, 2, 3, 4, 5, 60, 70, 75, 130]:
+            esperado = await memoria.hit("cliente", regras, now=T0 + t)
+            resultado = await redis_store.hit("cliente", regras, now=T0 + t)
+            assert resultado == esperado
+
+    @pytest.mark.asyncio
+    async def test_limite_compartilhado_entre_workers(self, redis_client):
+        regras = [RateLimitRule(3, 60)]
+        worker_a = RedisRateLimitStore(redis_client=redis_client, fallback=MemoryRateLimitStore(evict_interval=0))
+        worker_b = RedisRateLimitStore(redis_client=redis_client, fallback=MemoryRateLimitStore(evict_interval=0))
+
+        assert (await worker_a.hit("cliente", regras, now=T0)).allowed
+        assert (await worker_b.hit("cliente", regras, now=T0 + 1)).allowed
+        assert (await worker_a.hit("cliente", regras, now=T0 + 2)).allowed
+        resultado = await worker_b.hit("cliente", regras, now=T0 + 3)
+        assert not resultado.allowed
+        assert resultado.retry_after == 47
+
+    @pytest.mark.asyncio
+    async def test_chaves_expiram(self, redis_client):
+        store = RedisRateLimitStore(
+            redis_client=redis_client, prefix="rl", fallback=MemoryRateLimitStore(evict_interval=0)
+        )
+        await store.hit("cliente", [RateLimitRule(3, 60)], now=T0)
+
+        ttl = await redis_client.pttl("rl:{cliente}:60")
+        assert 0 < ttl <= 120000
+
+    @pytest.mark.asyncio
+    async def test_circuito_aberto_apos_falha(self):
+        """Com o Redis fora, so a primeira request paga o timeout."""
+        redis = RedisFora()
+        store = RedisRateLimitStore(
+            redis_client=redis,
+            fallback=MemoryRateLimitStore(evict_interval=0),
+            retry_interval=30,
+        )
+        regras = [RateLimitRule(2, 60)]
+
+        assert (await store.hit("cliente", regras, now=T0)).allowed
+        assert store.circuit_open
+        assert (await store.hit("cliente", regras, now=T0 + 1)).allowed
+        assert not (await store.hit("cliente", regras, now=T0 + 2)).allowed
+        assert redis.chamadas == 1
+
+    @pytest.mark.asyncio
+    async def test_retenta_redis_apos_intervalo(self):
+        redis = RedisFora()
+        store = RedisRateLimitStore(
+            redis_client=redis,
+            fallback=MemoryRateLimitStore(evict_interval=0),
+            retry_interval=0,
+        )
+        regras = [RateLimitRule(5, 60)]
+
+        await store.hit("cliente", regras, now=T0)
+        await store.hit("cliente", regras, now=T0 + 1)
+        assert redis.chamadas == 2
@@ -0,0 +1,196 @@
+"""
+Conecta Plus - Testes do Cache de Tranquilidade
+"""
+
+import asyncio
+import pytest
+from datetime import datetime, timedelta
+
+from ..services.events import EventType, create_event
+from ..services.tranquilidade_cache import TranquilidadeCache, EntradaTranquilidade
+
+
+def _metricas(**kwargs):
+    metricas = {
+        "alertas_criticos": 0,
+        "alertas_medios": 0,
+        "ocorrencias_abertas": 2,
+        "ocorrencias_sla_proximo": 0,
+        "ocorrencias_sla_estourado": 0,
+        "cameras_offline": 0,
+        "inadimplencia_percentual": 0.0,
+        "resolvido_hoje": 0,
+    }
+    metricas.update(kwargs)
+    return metricas
+
+
+def _entrada(condominio="c1", perfil="sindico", usuario="u1", minutos=5, **metricas):
+    agora = datetime.utcnow()
+    return EntradaTranquilidade(
+        condominio_id=condominio,
+        perfil=perfil,
+        usuario_id=usuario,
+        metricas=_metricas(**metricas),
+        calculated_at=agora,
+        expires_at=agora + timedelta(minutes=minutos),
+    )
+
+
+class TestTranquilidadeCache:
+    """Testes do cache em memoria (sem Redis)."""
+
+    @pytest.mark.asyncio
+    async def test_hit_ate_expirar(self):
+        cache = TranquilidadeCache()
+        await cache.put(_entrada())
+
+        assert await cache.get("c1", "sindico", "u1") is not None
+        assert cache.hits == 1
+
+    @pytest.mark.asyncio
+    async def test_entrada_expirada_e_miss(self):
+        cache = TranquilidadeCache()
+        await cache.put(_entrada(minutos=-1))
+
+        assert await cache.get("c1", "sindico", "u1") is None
+
+    @pytest.mark.asyncio
+    async def test_evento_ocorrencia_aplica_delta(self):
+        cache = TranquilidadeCache()
+        await cache.put(_entrada())
+        await cache.put(_entrada(condominio="c2"))
+
+        evento = create_event(
+            EventType.OCORRENCIA_CREATED, "ocorrencia", "o1", {"condominio_id": "c1"}
+        )
+        await cache.on_event(evento)
+
+        entrada = await cache.get("c1", "sindico", "u1")
+        assert entrada.metricas["ocorrencias_abertas"] == 3
+        outra = await cache.get("c2", "sindico", "u1")
+        assert outra.metricas["ocorrencias_abertas"] == 2
+
+    @pytest.mark.asyncio
+    async def test_resolucao_invalida_contadores_de_sla(self):
+        cache = TranquilidadeCache()
+        await cache.put(_entrada(ocorrencias_sla_estourado=1))
+
+        evento = create_event(
+            EventType.OCORRENCIA_RESOLVED, "ocorrencia", "o1", {"condominio_id": "c1"}
+        )
+        await cache.on_event(evento)
+
+        assert await cache.get("c1", "sindico", "u1") is None
+
+    @pytest.mark.asyncio
+    async def test_estado_anterior_sobrevive_a_invalidacao(self):
+        cache = TranquilidadeCache()
+        await cache.put(_entrada(perfil="porteiro"))
+        await cache.registrar_estado("c1", "porteiro", "u1", "verde")
+
+        evento = create_event(
+            EventType.ACESSO_LIBERADO, "acesso", "a1", {"condominio_id": "c1"}
+        )
+        await cache.on_event(evento)
+
+        assert await cache.get("c1", "porteiro", "u1") is None
+        assert await cache.estado_anterior("c1", "porteiro", "u1") == "verde"
+        assert await cache.estado_anterior("c1", "sindico", "u1") is None
+
+    @pytest.mark.asyncio
+    async def test_evento_acesso_invalida_apenas_porteiro(self):
+        cache = TranquilidadeCache()
+        await cache.put(_entrada(perfil="porteiro"))
+        await cache.put(_entrada(perfil="sindico"))
+
+        evento = create_event(
+            EventType.ACESSO_LIBERADO, "acesso", "a1", {"condominio_id": "c1"}
+        )
+        await cache.on_event(evento)
+
+        assert await cache.get("c1", "porteiro", "u1") is None
+        assert await cache.get("c1", "sindico", "u1") is not None
+
+    @pytest.mark.asyncio
+    async def test_lru_limita_entradas(self):
+        cache = TranquilidadeCache(max_entradas=2)
+        for usuario in ("u1", "u2", "u3"):
+            await cache.put(_entrada(usuario=usuario))
+
+        assert await cache.get("c1", "sindico", "u1") is None
+        assert cache.stats["entradas_memoria"] == 2
+
+    @pytest.mark.asyncio
+    async def test_alarme_invalida_em_vez_de_delta(self):
+        cache = TranquilidadeCache()
+        await cache.put(_entrada())
+
+        evento = create_event(
+            EventType.ALARME_DISPARADO, "alarme", "z1", {"condominio_id": "c1"}
+        )
+        await cache.on_event(evento)
+
+        assert await cache.get("c1", "sindico", "u1") is None
+
+
+class TestTranquilidadeCacheRedis:
+    """Testes do nivel L2 (Redis) com fakeredis."""
+
+    @pytest.fixture
+    def redis_client(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        return fakeredis.FakeAsyncRedis()
+
+    @pytest.mark.asyncio
+    async def test_deltas_concorrentes_de_workers(self, redis_client):
+        worker_a = TranquilidadeCache(redis_client=redis_client)
+        worker_b = TranquilidadeCache(redis_client=redis_client)
+        await worker_a.put(_entrada(ocorrencias_abertas=2))
+
+        evento = create_event(
+            EventType.OCORRENCIA_CREATED, "ocorrencia", "o1", {"condominio_id": "c1"}
+        )
+        await asyncio.gather(*[
+            worker.on_event(evento) for worker in (worker_a, worker_b) * 5
+        ])
+
+        leitor = TranquilidadeCache(redis_client=redis_client)
+        entrada = await leitor.get("c1", "sindico", "u1")
+        assert entrada.metricas["ocorrencias_abertas"] == 12
+
+    @pytest.mark.asyncio
+    async def test_put_descarta_deltas_antigos(self, redis_client):
+        cache = TranquilidadeCache(redis_client=redis_client)
+        await cache.put(_entrada(ocorrencias_abertas=2))
+        await cache.aplicar_delta("c1", {"ocorrencias_abertas": 1})
+
+        await cache.put(_entrada(ocorrencias_abertas=5))
+
+        leitor = TranquilidadeCache(redis_client=redis_client)
+        entrada = await leitor.get("c1", "sindico", "u1")
+        assert entrada.metricas["ocorrencias_abertas"] == 5
+
+    @pytest.mark.asyncio
+    async def test_invalidacao_remove_do_redis(self, redis_client):
+        cache = TranquilidadeCache(redis_client=redis_client)
+        await cache.put(_entrada())
+        await cache.aplicar_delta("c1", {"ocorrencias_abertas": 1})
+
+        await cache.invalidar("c1")
+
+        assert await TranquilidadeCache(redis_client=redis_client).get("c1", "sindico", "u1") is None
+        assert await redis_client.keys("tranquilidade:c1:*") == []
+
+    @pytest.mark.asyncio
+    async def test_estado_compartilhado_entre_workers(self, redis_client):
+        worker_a = TranquilidadeCache(redis_client=redis_client)
+        worker_b = TranquilidadeCache(redis_client=redis_client)
+        await worker_a.registrar_estado("c1", "sindico", "u1", "verde")
+        assert await worker_b.estado_anterior("c1", "sindico", "u1") == "verde"
+
+        # Transicao registrada por B e vista por A (sem valor velho da memoria)
+        await worker_b.registrar_estado("c1", "sindico", "u1", "amarelo")
+        await worker_a.invalidar("c1")
+        assert await worker_a.estado_anterior("c1", "sindico", "u1") == "amarelo"
+
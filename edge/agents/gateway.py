@@ -4,10 +4,16 @@ API local com suporte a modo offline e sincronização cloud
 """
 
 import os
+import gzip
 import json
+import time
+import uuid
+import random
+import sqlite3
+import threading
 import asyncio
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
 from typing import Optional, Dict, Any, List
 from contextlib import asynccontextmanager
 
@@ -18,6 +24,16 @@ from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from pydantic_settings import BaseSettings
 
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
 
 # Configurações
 class EdgeSettings(BaseSettings):
@@ -29,6 +45,14 @@ class EdgeSettings(BaseSettings):
     REDIS_URL: str = "redis://localhost:6379"
     MQTT_BROKER: str = "mqtt://localhost:1883"
     SYNC_INTERVAL: int = 30
+    SYNC_BATCH_SIZE: int = 500
+    SYNC_BATCH_MIN: int = 50
+    SYNC_BATCH_MAX: int = 5000
+    SYNC_TARGET_LATENCY_MS: int = 2000
+    SYNC_BACKOFF_MAX: int = 300
+    SYNC_COMPRESSION: str = "gzip"
+    EVENT_DB_PATH: str = "/data/events.db"
+    EVENT_RETENTION_DAYS: int = 7
     OFFLINE_MODE_ENABLED: bool = True
     LOG_LEVEL: str = "INFO"
 
@@ -99,51 +123,412 @@ class DetectionEvent(BaseModel):
     snapshot_path: Optional[str] = None
 
 
+# Store local de eventos
+class EventStore:
+    """
+    Histórico local de acessos e detecções (SQLite em modo WAL)
+
+    - events: uma linha por evento, indexada por (kind, type, ts), câmera
+      e unidade; o payload é msgpack (JSON se msgpack não estiver instalado)
+    - counters: contagem por dia/kind/type atualizada na inserção, para o
+      painel da portaria não precisar varrer o dia
+
+    Consultas paginadas por cursor (ts, id), do mais recente para o mais
+    antigo; o custo de uma página não cresce com o volume do dia.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ts REAL NOT NULL,
+            day TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            type TEXT NOT NULL,
+            camera_id TEXT,
+            unit_id TEXT,
+            payload BLOB NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_events_kind ON events(kind, ts, id);
+        CREATE INDEX IF NOT EXISTS idx_events_type ON events(kind, type, ts, id);
+        CREATE INDEX IF NOT EXISTS idx_events_camera ON events(camera_id, ts, id) WHERE camera_id IS NOT NULL;
+        CREATE INDEX IF NOT EXISTS idx_events_unit ON events(unit_id, ts, id) WHERE unit_id IS NOT NULL;
+        CREATE TABLE IF NOT EXISTS counters (
+            day TEXT NOT NULL,
+            kind TEXT NOT NULL,
+            type TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, kind, type)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(self.SCHEMA)
+
+    @staticmethod
+    def _encode(data: Dict[str, Any]):
+        if msgpack is not None:
+            return msgpack.packb(data, default=str)
+        return json.dumps(data, separators=(",", ":"), default=str)
+
+    @staticmethod
+    def _decode(payload) -> Dict[str, Any]:
+        # BLOB = msgpack, TEXT = JSON (gravado sem msgpack disponível)
+        if isinstance(payload, bytes):
+            return msgpack.unpackb(payload)
+        return json.loads(payload)
+
+    @staticmethod
+    def _day(ts: float) -> str:
+        return datetime.utcfromtimestamp(ts).strftime("%Y%m%d")
+
+    def add_many(self, events: List[Dict[str, Any]]) -> List[int]:
+        """
+        Grava eventos e incrementa os contadores do dia
+
+        Cada evento: {kind, type, ts, camera_id, unit_id, data}
+        """
+        ids = []
+        counts: Dict[tuple, int] = {}
+        with self._lock, self.db:
+            for event in events:
+                day = self._day(event["ts"])
+                cursor = self.db.execute(
+                    "INSERT INTO events (ts, day, kind, type, camera_id, unit_id, payload) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        event["ts"], day, event["kind"], event["type"],
+                        event.get("camera_id"), event.get("unit_id"),
+                        self._encode(event["data"])
+                    )
+                )
+                ids.append(cursor.lastrowid)
+                key = (day, event["kind"], event["type"])
+                counts[key] = counts.get(key, 0) + 1
+            self.db.executemany(
+                "INSERT INTO counters (day, kind, type, count) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(day, kind, type) DO UPDATE SET count = count + excluded.count",
+                [(*key, count) for key, count in counts.items()]
+            )
+        return ids
+
+    def add(self, kind: str, event_type: str, data: Dict[str, Any], ts: float = None,
+            camera_id: str = None, unit_id: str = None) -> int:
+        return self.add_many([{
+            "kind": kind, "type": event_type, "ts": ts if ts is not None else time.time(),
+            "camera_id": camera_id, "unit_id": unit_id, "data": data
+        }])[0]
+
+    def query(
+        self,
+        kind: str = None,
+        event_type: str = None,
+        camera_id: str = None,
+        unit_id: str = None,
+        start: float = None,
+        end: float = None,
+        limit: int = 100,
+        cursor: str = None
+    ) -> Dict[str, Any]:
+        """
+        Eventos em [start, end), do mais recente para o mais antigo
+
+        Returns:
+            {"events": [...], "next_cursor": str | None}; next_cursor é
+            passado de volta para buscar a página seguinte
+        """
+        where, params = [], []
+        for column, value in (("kind", kind), ("type", event_type),
+                              ("camera_id", camera_id), ("unit_id", unit_id)):
+            if value is not None:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if start is not None:
+            where.append("ts >= ?")
+            params.append(start)
+        if end is not None:
+            where.append("ts < ?")
+            params.append(end)
+        if cursor:
+            cursor_ts, cursor_id = cursor.split(":")
+            where.append("(ts, id) < (?, ?)")
+            params.extend([float(cursor_ts), int(cursor_id)])
+
+        sql = "SELECT id, ts, payload FROM events"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY ts DESC, id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        with self._lock:
+            rows = self.db.execute(sql, params).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = f"{rows[-1][1]!r}:{rows[-1][0]}"
+        return {
+            "events": [self._decode(payload) for _, _, payload in rows],
+            "next_cursor": next_cursor
+        }
+
+    def counts(self, day: str) -> Dict[str, Dict[str, int]]:
+        """Contadores do dia (YYYYMMDD): {kind: {type: n}}"""
+        with self._lock:
+            rows = self.db.execute(
+                "SELECT kind, type, count FROM counters WHERE day = ?", (day,)
+            ).fetchall()
+        result: Dict[str, Dict[str, int]] = {}
+        for kind, event_type, count in rows:
+            result.setdefault(kind, {})[event_type] = count
+        return result
+
+    def purge(self, before: float) -> int:
+        """Remove eventos e contadores anteriores a `before`. Retorna eventos removidos"""
+        with self._lock:
+            with self.db:
+                removed = self.db.execute("DELETE FROM events WHERE ts < ?", (before,)).rowcount
+                self.db.execute("DELETE FROM counters WHERE day < ?", (self._day(before),))
+            self.db.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return removed
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+
+event_store: Optional[EventStore] = None
+
+
+def get_event_store() -> EventStore:
+    global event_store
+    if event_store is None:
+        event_store = EventStore(settings.EVENT_DB_PATH)
+    return event_store
+
+
+async def migrate_redis_events() -> int:
+    """Importa as listas diárias antigas do Redis (access:*, detection:*) para o store"""
+    r = await get_redis()
+    store = get_event_store()
+    migrated = 0
+    for pattern, kind in (("access:*", "access"), ("detection:*", "detection")):
+        async for key in r.scan_iter(match=pattern, count=500):
+            events = []
+            for raw in await r.lrange(key, 0, -1):
+                data = json.loads(raw)
+                if kind == "access":
+                    ts = datetime.fromisoformat(data["timestamp"]).replace(tzinfo=timezone.utc).timestamp()
+                    event_type = data.get("type") or "unknown"
+                else:
+                    ts = float(data.get("timestamp") or time.time())
+                    event_type = data.get("label") or "unknown"
+                events.append({
+                    "kind": kind, "type": event_type, "ts": ts,
+                    "camera_id": data.get("camera_id"), "unit_id": data.get("unit_id"),
+                    "data": data
+                })
+            await asyncio.to_thread(store.add_many, events)
+            await r.delete(key)
+            migrated += len(events)
+    if migrated:
+        logger.info(f"Migrated {migrated} events from Redis lists to {settings.EVENT_DB_PATH}")
+    return migrated
+
+
+# Move até N eventos do início da fila para a lista de processamento,
+# mantendo a ordem (equivale a N x LMOVE LEFT RIGHT em um round-trip).
+# Sobras de um lote anterior na lista de processamento (requeue que falhou)
+# voltam antes ao início da fila: o ack do novo lote apara só os seus.
+# KEYS: fila, processamento. ARGV: N. Retorna: [restantes, eventos...]
+CLAIM_LUA = """
+local leftover = redis.call('LRANGE', KEYS[2], 0, -1)
+for i = #leftover, 1, -1 do
+    redis.call('LPUSH', KEYS[1], leftover[i])
+end
+redis.call('DEL', KEYS[2])
+local items = redis.call('LRANGE', KEYS[1], 0, tonumber(ARGV[1]) - 1)
+if #items > 0 then
+    redis.call('RPUSH', KEYS[2], unpack(items))
+    redis.call('LTRIM', KEYS[1], #items, -1)
+end
+local out = {redis.call('LLEN', KEYS[1])}
+for i = 1, #items do
+    out[#out + 1] = items[i]
+end
+return out
+"""
+
+# Devolve a lista de processamento ao início da fila, na ordem original.
+# KEYS: fila, processamento. Retorna: tamanho da fila
+REQUEUE_LUA = """
+local items = redis.call('LRANGE', KEYS[2], 0, -1)
+for i = #items, 1, -1 do
+    redis.call('LPUSH', KEYS[1], items[i])
+end
+redis.call('DEL', KEYS[2])
+return redis.call('LLEN', KEYS[1])
+"""
+
+
 class SyncQueue:
-    """Fila de sincronização com cloud"""
+    """
+    Fila confiável de sincronização com cloud
+
+    Eventos reservados para envio ficam na lista de processamento até o
+    ack (POST aceito pelo cloud). Em falha, ou se o gateway cair entre a
+    reserva e o POST, voltam ao início da fila na ordem original; a
+    entrega é at-least-once e o cloud deduplica pelo id do evento.
+
+    ack() e requeue() atuam sobre a lista de processamento inteira, então
+    só pode haver um lote reservado por vez: use batch(), que serializa
+    reserva e confirmação entre sync_loop e /sync/force. Se um requeue()
+    falhar, a próxima reserva devolve as sobras à fila antes de reservar.
+    """
 
     QUEUE_KEY = "edge:sync:queue"
+    PROCESSING_KEY = "edge:sync:processing"
     PROCESSED_KEY = "edge:sync:processed"
 
+    _claim_script = None
+    _requeue_script = None
+    _batch_lock: Optional[asyncio.Lock] = None
+
+    @classmethod
+    def _lock(cls) -> asyncio.Lock:
+        if cls._batch_lock is None:
+            cls._batch_lock = asyncio.Lock()
+        return cls._batch_lock
+
     @staticmethod
-    async def push(event_type: str, data: Dict[str, Any]):
-        """Adiciona evento à fila de sync"""
-        r = await get_redis()
-        event = {
-            "id": f"{settings.NODE_ID}:{datetime.utcnow().timestamp()}",
+    def _event(event_type: str, data: Dict[str, Any]) -> str:
+        now = datetime.utcnow()
+        return json.dumps({
+            "id": f"{settings.NODE_ID}:{now.timestamp()}:{uuid.uuid4().hex[:8]}",
             "type": event_type,
             "data": data,
-            "timestamp": datetime.utcnow().isoformat(),
+            "timestamp": now.isoformat(),
             "node_id": settings.NODE_ID
-        }
-        await r.rpush(SyncQueue.QUEUE_KEY, json.dumps(event))
-        edge_state.pending_events = await r.llen(SyncQueue.QUEUE_KEY)
+        }, separators=(",", ":"))
 
     @staticmethod
-    async def pop_batch(batch_size: int = 100) -> List[Dict]:
-        """Remove lote de eventos da fila"""
+    async def push(event_type: str, data: Dict[str, Any]):
+        """Adiciona evento à fila de sync"""
         r = await get_redis()
-        events = []
-        for _ in range(batch_size):
-            event = await r.lpop(SyncQueue.QUEUE_KEY)
-            if event:
-                events.append(json.loads(event))
-            else:
-                break
-        edge_state.pending_events = await r.llen(SyncQueue.QUEUE_KEY)
-        return events
+        # RPUSH já retorna o tamanho da fila
+        edge_state.pending_events = await r.rpush(
+            SyncQueue.QUEUE_KEY, SyncQueue._event(event_type, data)
+        )
+
+    @staticmethod
+    async def push_many(events: List[tuple]):
+        """Adiciona vários eventos [(tipo, dados)] em um único RPUSH"""
+        if not events:
+            return
+        r = await get_redis()
+        edge_state.pending_events = await r.rpush(
+            SyncQueue.QUEUE_KEY,
+            *[SyncQueue._event(event_type, data) for event_type, data in events]
+        )
+
+    @classmethod
+    async def _scripts(cls):
+        r = await get_redis()
+        if cls._claim_script is None:
+            cls._claim_script = r.register_script(CLAIM_LUA)
+            cls._requeue_script = r.register_script(REQUEUE_LUA)
+        return cls._claim_script, cls._requeue_script
+
+    @classmethod
+    @asynccontextmanager
+    async def batch(cls, batch_size: int = None, raw: bool = False):
+        """
+        Reserva um lote com exclusividade até o fim do bloco, onde o
+        chamador faz ack() ou requeue(). Outra reserva espera a anterior.
+
+        Uso:
+            async with SyncQueue.batch(500) as events:
+                ...
+                await SyncQueue.ack(len(events))
+        """
+        async with cls._lock():
+            yield await cls.pop_batch(batch_size, raw)
+
+    @staticmethod
+    async def pop_batch(batch_size: int = None, raw: bool = False) -> List[Any]:
+        """
+        Reserva lote de eventos (um round-trip)
+
+        Os eventos ficam na lista de processamento até ack() ou requeue();
+        sobras de um lote anterior voltam antes ao início da fila.
+        Com raw=True retorna o JSON serializado de cada evento (bytes).
+        Chamar dentro de batch(): duas reservas simultâneas confirmariam
+        uma os eventos da outra.
+        """
+        claim, _ = await SyncQueue._scripts()
+        result = await claim(
+            keys=[SyncQueue.QUEUE_KEY, SyncQueue.PROCESSING_KEY],
+            args=[batch_size or settings.SYNC_BATCH_SIZE]
+        )
+        edge_state.pending_events = int(result[0])
+        if raw:
+            return result[1:]
+        return [json.loads(event) for event in result[1:]]
+
+    @staticmethod
+    async def ack(count: int):
+        """Confirma os `count` eventos mais antigos em processamento"""
+        r = await get_redis()
+        await r.ltrim(SyncQueue.PROCESSING_KEY, count, -1)
+
+    @staticmethod
+    async def requeue(events: List[Dict] = None):
+        """
+        Recoloca eventos em processamento no início da fila (em caso de
+        falha), preservando a ordem original
+        """
+        _, requeue = await SyncQueue._scripts()
+        edge_state.pending_events = int(await requeue(
+            keys=[SyncQueue.QUEUE_KEY, SyncQueue.PROCESSING_KEY]
+        ))
 
     @staticmethod
-    async def requeue(events: List[Dict]):
-        """Recoloca eventos na fila (em caso de falha)"""
+    async def recover() -> int:
+        """Devolve à fila eventos reservados antes de um crash"""
         r = await get_redis()
-        for event in events:
-            await r.lpush(SyncQueue.QUEUE_KEY, json.dumps(event))
-        edge_state.pending_events = await r.llen(SyncQueue.QUEUE_KEY)
+        async with SyncQueue._lock():
+            in_flight = await r.llen(SyncQueue.PROCESSING_KEY)
+            if in_flight:
+                await SyncQueue.requeue()
+                logger.warning(f"Recovered {in_flight} unacknowledged events")
+            else:
+                edge_state.pending_events = await r.llen(SyncQueue.QUEUE_KEY)
+        return in_flight
 
 
 class CloudSync:
-    """Sincronização com cloud"""
+    """
+    Sincronização com cloud
+
+    Escalonamento adaptativo:
+    - Com backlog, envia lotes em sequência, sem esperar SYNC_INTERVAL
+    - O tamanho do lote segue a vazão medida, para que cada POST leve
+      perto de SYNC_TARGET_LATENCY_MS
+    - Offline, tenta de novo com backoff exponencial e jitter
+    - A conectividade é inferida das próprias requisições de sync e de
+      configuração (sem GET /health a cada ciclo)
+    """
+
+    BACKOFF_BASE = 1.0
+    CONFIG_KEY = "edge:config"
+    CURSOR_KEY = "edge:config:cursor"
 
     def __init__(self):
         self.client = httpx.AsyncClient(
@@ -151,91 +536,251 @@ class CloudSync:
             headers={"Authorization": f"Bearer {settings.CLOUD_API_KEY}"},
             timeout=30.0
         )
+        self.batch_size = settings.SYNC_BATCH_SIZE
+        self.throughput: Optional[float] = None  # eventos/s (média móvel)
+        self.failures = 0
+        self.retry_after: Optional[float] = None
+        self.config_cursor: Optional[str] = None
+        self.last_updates = 0.0
+        self.wakeup = asyncio.Event()
+
+    def _observe(self, online: bool, latency: float = None):
+        """Atualiza o estado de conectividade a partir de uma requisição"""
+        edge_state.online = online
+        edge_state.cloud_latency_ms = latency * 1000 if latency is not None else None
+
+    @staticmethod
+    def _compress(body: bytes) -> tuple:
+        if settings.SYNC_COMPRESSION == "zstd" and zstandard is not None:
+            return zstandard.ZstdCompressor(level=3).compress(body), "zstd"
+        return gzip.compress(body, compresslevel=6), "gzip"
+
+    def notify(self):
+        """Acorda o loop de sync (novo evento na fila)"""
+        if edge_state.online and not self.failures:
+            self.wakeup.set()
 
     async def check_connectivity(self) -> bool:
         """Verifica conectividade com cloud"""
         try:
-            start = datetime.utcnow()
+            start = time.monotonic()
             response = await self.client.get("/health")
-            latency = (datetime.utcnow() - start).total_seconds() * 1000
-            edge_state.cloud_latency_ms = latency
-            edge_state.online = response.status_code == 200
+            self._observe(response.status_code == 200, time.monotonic() - start)
             return edge_state.online
         except Exception as e:
             logger.warning(f"Cloud connectivity check failed: {e}")
-            edge_state.online = False
-            edge_state.cloud_latency_ms = None
+            self._observe(False)
             return False
 
-    async def sync_events(self) -> int:
-        """Sincroniza eventos com cloud"""
-        if not edge_state.online:
-            return 0
-
-        events = await SyncQueue.pop_batch()
-        if not events:
-            return 0
-
-        try:
-            response = await self.client.post(
-                f"/edge/{settings.NODE_ID}/events",
-                json={"events": events}
-            )
+    async def _sync_batch(self) -> tuple:
+        """
+        Envia um lote da fila como NDJSON comprimido
+
+        Returns:
+            (eventos confirmados, ok); ok é None se a fila estava vazia
+        """
+        async with SyncQueue.batch(self.batch_size, raw=True) as events:
+            if not events:
+                return 0, None
+
+            # Eventos já estão serializados na fila: NDJSON sem re-encode
+            body, encoding = self._compress(b"\n".join(events) + b"\n")
+            start = time.monotonic()
+            try:
+                response = await self.client.post(
+                    f"/edge/{settings.NODE_ID}/events",
+                    content=body,
+                    headers={"Content-Type": "application/x-ndjson", "Content-Encoding": encoding}
+                )
+            except Exception as e:
+                logger.warning(f"Sync error: {e}")
+                await SyncQueue.requeue()
+                self._observe(False)
+                self._failed()
+                return 0, False
+
+            latency = time.monotonic() - start
+            self._observe(True, latency)
 
             if response.status_code == 200:
+                await SyncQueue.ack(len(events))
                 edge_state.last_sync = datetime.utcnow()
-                logger.info(f"Synced {len(events)} events to cloud")
-                return len(events)
-            else:
-                # Requeue on failure
-                await SyncQueue.requeue(events)
-                logger.error(f"Sync failed: {response.status_code}")
-                return 0
+                self.failures = 0
+                self.retry_after = None
+                self._adapt(len(events), latency)
+                logger.info(f"Synced {len(events)} events to cloud ({latency * 1000:.0f}ms)")
+                return len(events), True
+
+            await SyncQueue.requeue()
+            if response.status_code == 413 and self.batch_size > settings.SYNC_BATCH_MIN:
+                # Lote grande demais para o cloud: reduz e tenta de novo já
+                self.batch_size = max(settings.SYNC_BATCH_MIN, self.batch_size // 2)
+                logger.warning(f"Sync batch too large, reducing to {self.batch_size}")
+                return 0, True
+
+            self._failed(response.headers.get("Retry-After"))
+            logger.error(f"Sync failed: {response.status_code}")
+            return 0, False
 
-        except Exception as e:
-            logger.error(f"Sync error: {e}")
-            await SyncQueue.requeue(events)
-            return 0
+    async def sync_events(self) -> int:
+        """Sincroniza um lote de eventos com cloud"""
+        synced, _ = await self._sync_batch()
+        return synced
+
+    def _adapt(self, sent: int, latency: float):
+        """Ajusta o lote para que um POST leve ~SYNC_TARGET_LATENCY_MS"""
+        rate = sent / max(latency, 0.001)
+        self.throughput = rate if self.throughput is None else 0.7 * self.throughput + 0.3 * rate
+
+        target = self.throughput * settings.SYNC_TARGET_LATENCY_MS / 1000
+        if sent < self.batch_size:
+            # Lote incompleto (fila esvaziou) não mostra a capacidade real:
+            # só permite reduzir
+            target = min(target, self.batch_size)
+
+        # No máximo dobra ou divide por 2 a cada lote
+        target = min(max(target, self.batch_size / 2), self.batch_size * 2)
+        self.batch_size = int(min(max(target, settings.SYNC_BATCH_MIN), settings.SYNC_BATCH_MAX))
+
+    def _failed(self, retry_after: str = None):
+        self.failures += 1
+        self.batch_size = max(settings.SYNC_BATCH_MIN, self.batch_size // 2)
+        self.retry_after = float(retry_after) if retry_after and retry_after.isdigit() else None
+
+    def backoff_delay(self) -> float:
+        """Backoff exponencial com jitter (metade fixa, metade aleatória)"""
+        if self.retry_after is not None:
+            return min(self.retry_after, settings.SYNC_BACKOFF_MAX)
+        ceiling = min(
+            settings.SYNC_BACKOFF_MAX,
+            self.BACKOFF_BASE * 2 ** min(self.failures, 16)
+        )
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
 
     async def fetch_updates(self) -> Dict[str, Any]:
-        """Busca atualizações do cloud"""
-        if not edge_state.online:
-            return {}
+        """
+        Busca alterações de configuração desde o último cursor
+
+        O cloud responde só o delta: {"cursor", "changes", "full"}, onde
+        valor None remove a chave e "full" substitui tudo; 304 significa
+        sem alterações. A configuração aplicada e o cursor ficam no Redis
+        e sobrevivem a reinícios.
 
+        Returns:
+            Chaves alteradas
+        """
+        r = await get_redis()
+        if self.config_cursor is None:
+            cursor = await r.get(self.CURSOR_KEY)
+            self.config_cursor = cursor.decode() if cursor else ""
+
+        start = time.monotonic()
         try:
             response = await self.client.get(
                 f"/edge/{settings.NODE_ID}/updates",
-                params={"since": edge_state.last_sync.isoformat() if edge_state.last_sync else None}
+                params={"since": self.config_cursor} if self.config_cursor else None
             )
-
-            if response.status_code == 200:
-                return response.json()
+        except Exception as e:
+            logger.warning(f"Fetch updates error: {e}")
+            self._observe(False)
             return {}
 
-        except Exception as e:
-            logger.error(f"Fetch updates error: {e}")
+        self._observe(True, time.monotonic() - start)
+        self.last_updates = time.monotonic()
+
+        if response.status_code == 304:
+            return {}
+        if response.status_code != 200:
+            logger.error(f"Fetch updates failed: {response.status_code}")
             return {}
 
+        delta = response.json()
+        changes = delta.get("changes") or {}
+        removed = [key for key, value in changes.items() if value is None]
+        updated = {key: json.dumps(value) for key, value in changes.items() if value is not None}
+
+        async with r.pipeline(transaction=True) as pipe:
+            if delta.get("full"):
+                pipe.delete(self.CONFIG_KEY)
+            if removed:
+                pipe.hdel(self.CONFIG_KEY, *removed)
+            if updated:
+                pipe.hset(self.CONFIG_KEY, mapping=updated)
+            if delta.get("cursor"):
+                pipe.set(self.CURSOR_KEY, delta["cursor"])
+            await pipe.execute()
+
+        if delta.get("cursor"):
+            self.config_cursor = delta["cursor"]
+        if changes:
+            logger.info(f"Applied {len(changes)} config changes")
+        return changes
+
+    async def run_once(self) -> float:
+        """
+        Um passo do escalonador
+
+        Returns:
+            Segundos até o próximo passo (0 = há backlog, continuar já)
+        """
+        _, ok = await self._sync_batch()
+        if ok is False:
+            return self.backoff_delay()
+
+        updates_due = time.monotonic() - self.last_updates >= settings.SYNC_INTERVAL
+        if not edge_state.online or updates_due:
+            # Sem lote enviado, a busca de configuração serve de sonda
+            await self.fetch_updates()
+            if not edge_state.online:
+                self.failures += 1
+                return self.backoff_delay()
+            self.failures = 0
+
+        return 0 if edge_state.pending_events else settings.SYNC_INTERVAL
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "batch_size": self.batch_size,
+            "throughput_eps": round(self.throughput, 1) if self.throughput is not None else None,
+            "failures": self.failures,
+            "compression": "zstd" if settings.SYNC_COMPRESSION == "zstd" and zstandard else "gzip",
+            "config_cursor": self.config_cursor or None,
+        }
+
 
 cloud_sync = CloudSync()
 
 
 # Background sync task
 async def sync_loop():
-    """Loop de sincronização em background"""
+    """Loop de sincronização em background (escalonamento adaptativo)"""
     while True:
+        # Eventos que chegarem durante o passo acordam a próxima espera
+        cloud_sync.wakeup.clear()
         try:
-            # Check connectivity
-            await cloud_sync.check_connectivity()
-
-            # Sync events
-            if edge_state.online:
-                await cloud_sync.sync_events()
-
+            delay = await cloud_sync.run_once()
         except Exception as e:
             logger.error(f"Sync loop error: {e}")
+            delay = settings.SYNC_INTERVAL
 
-        await asyncio.sleep(settings.SYNC_INTERVAL)
+        if delay > 0:
+            try:
+                await asyncio.wait_for(cloud_sync.wakeup.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+
+async def retention_loop():
+    """Remove do store local eventos mais antigos que EVENT_RETENTION_DAYS"""
+    while True:
+        try:
+            before = time.time() - settings.EVENT_RETENTION_DAYS * 86400
+            removed = await asyncio.to_thread(get_event_store().purge, before)
+            if removed:
+                logger.info(f"Purged {removed} local events")
+        except Exception as e:
+            logger.error(f"Retention loop error: {e}")
+        await asyncio.sleep(3600)
 
 
 # Lifespan
@@ -244,11 +789,17 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info(f"Starting Edge Gateway: {settings.NODE_ID}")
     await get_redis()
+    get_event_store()
+    await SyncQueue.recover()
+    await migrate_redis_events()
     asyncio.create_task(sync_loop())
+    asyncio.create_task(retention_loop())
     yield
     # Shutdown
     if redis_client:
         await redis_client.close()
+    if event_store:
+        event_store.close()
 
 
 # FastAPI app
@@ -293,19 +844,21 @@ async def status():
 @app.post("/access/register")
 async def register_access(event: AccessEvent, background: BackgroundTasks):
     """Registra evento de acesso"""
-    # Salvar localmente
-    r = await get_redis()
+    now = datetime.utcnow()
     event_data = event.dict()
-    event_data["timestamp"] = datetime.utcnow().isoformat()
+    event_data["timestamp"] = now.isoformat()
     event_data["node_id"] = settings.NODE_ID
 
-    # Cache local
-    event_key = f"access:{datetime.utcnow().strftime('%Y%m%d')}:{event.type}"
-    await r.rpush(event_key, json.dumps(event_data))
-    await r.expire(event_key, 86400 * 7)  # 7 dias
+    # Store local
+    await asyncio.to_thread(
+        get_event_store().add, "access", event.type, event_data,
+        ts=now.replace(tzinfo=timezone.utc).timestamp(),
+        camera_id=event.camera_id, unit_id=event.unit_id
+    )
 
     # Adicionar à fila de sync
     await SyncQueue.push("access", event_data)
+    cloud_sync.notify()
 
     return {"success": True, "queued": True, "online": edge_state.online}
 
@@ -313,35 +866,93 @@ async def register_access(event: AccessEvent, background: BackgroundTasks):
 @app.post("/detection/register")
 async def register_detection(event: DetectionEvent):
     """Registra evento de detecção de IA"""
-    r = await get_redis()
     event_data = event.dict()
     event_data["node_id"] = settings.NODE_ID
 
-    # Cache local
-    event_key = f"detection:{event.camera_id}:{datetime.utcnow().strftime('%Y%m%d')}"
-    await r.rpush(event_key, json.dumps(event_data))
-    await r.expire(event_key, 86400 * 7)
+    # Store local
+    await asyncio.to_thread(
+        get_event_store().add, "detection", event.label, event_data,
+        ts=event.timestamp, camera_id=event.camera_id
+    )
 
     # Adicionar à fila de sync
     await SyncQueue.push("detection", event_data)
+    cloud_sync.notify()
 
     return {"success": True}
 
 
+def _parse_time(value: Optional[str]) -> Optional[float]:
+    """Epoch ou ISO 8601 (sem fuso = UTC)"""
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid time: {value}")
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
 @app.get("/access/today")
-async def get_today_access():
-    """Retorna acessos de hoje"""
-    r = await get_redis()
-    today = datetime.utcnow().strftime('%Y%m%d')
+async def get_today_access(type: Optional[str] = None, limit: int = 100, cursor: Optional[str] = None):
+    """Retorna acessos de hoje (mais recentes primeiro, paginado)"""
+    now = datetime.utcnow()
+    today = now.strftime('%Y%m%d')
+    start = now.replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=timezone.utc).timestamp()
+
+    store = get_event_store()
+    try:
+        page = await asyncio.to_thread(
+            store.query, kind="access", event_type=type, start=start,
+            limit=min(max(limit, 1), 1000), cursor=cursor
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {cursor}")
+    counts = (await asyncio.to_thread(store.counts, today)).get("access", {})
+
+    return {
+        "date": today,
+        "count": counts.get(type, 0) if type else sum(counts.values()),
+        "counts": counts,
+        "entries": page["events"],
+        "next_cursor": page["next_cursor"]
+    }
+
+
+@app.get("/events")
+async def query_events(
+    kind: Optional[str] = None,
+    type: Optional[str] = None,
+    camera_id: Optional[str] = None,
+    unit_id: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None
+):
+    """Consulta eventos locais por período, tipo, câmera ou unidade (paginado)"""
+    start, end = _parse_time(start), _parse_time(end)
+    try:
+        return await asyncio.to_thread(
+            get_event_store().query,
+            kind=kind, event_type=type, camera_id=camera_id, unit_id=unit_id,
+            start=start, end=end, limit=min(max(limit, 1), 1000), cursor=cursor
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {cursor}")
 
-    entries = []
-    for event_type in ["entry", "exit", "visitor"]:
-        key = f"access:{today}:{event_type}"
-        events = await r.lrange(key, 0, -1)
-        for e in events:
-            entries.append(json.loads(e))
 
-    return {"date": today, "count": len(entries), "entries": entries}
+@app.get("/events/counts")
+async def event_counts(day: Optional[str] = None):
+    """Contadores por tipo de um dia (YYYYMMDD, padrão: hoje)"""
+    day = day or datetime.utcnow().strftime('%Y%m%d')
+    return {"date": day, "counts": await asyncio.to_thread(get_event_store().counts, day)}
 
 
 @app.get("/cameras")
@@ -354,22 +965,30 @@ async def list_cameras():
 @app.post("/sync/force")
 async def force_sync():
     """Força sincronização imediata"""
-    online = await cloud_sync.check_connectivity()
-    if online:
-        count = await cloud_sync.sync_events()
+    count, ok = await cloud_sync._sync_batch()
+    if ok is None:
+        # Fila vazia: só confirma a conectividade
+        ok = await cloud_sync.check_connectivity()
+    if ok:
+        # O loop drena o restante do backlog
+        cloud_sync.failures = 0
+        cloud_sync.wakeup.set()
         return {"success": True, "synced": count}
-    return {"success": False, "reason": "offline"}
+    return {"success": False, "reason": "offline" if not edge_state.online else "sync_failed"}
 
 
 @app.get("/sync/queue")
 async def get_sync_queue():
     """Retorna status da fila de sync"""
     r = await get_redis()
-    count = await r.llen(SyncQueue.QUEUE_KEY)
+    async with r.pipeline(transaction=False) as pipe:
+        count, in_flight = await pipe.llen(SyncQueue.QUEUE_KEY).llen(SyncQueue.PROCESSING_KEY).execute()
     return {
         "pending": count,
+        "in_flight": in_flight,
         "last_sync": edge_state.last_sync.isoformat() if edge_state.last_sync else None,
-        "online": edge_state.online
+        "online": edge_state.online,
+        "scheduler": cloud_sync.get_stats()
     }
 
 
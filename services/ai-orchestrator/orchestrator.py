@@ -6,11 +6,17 @@ Versão 2.0 - Integração com Framework de Evolução
 """
 
 import asyncio
+import importlib
+import inspect
 import json
 import logging
+import math
 import os
 import sys
-from typing import Any, Dict, List, Optional, Callable, Type
+import time
+import unicodedata
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Callable, Set, Tuple, Type
 from datetime import datetime
 from enum import Enum
 from dataclasses import dataclass, field
@@ -25,6 +31,12 @@ try:
 except ImportError:
     HAS_LANGCHAIN = False
 
+try:
+    from prometheus_client import Counter, Histogram
+    HAS_PROMETHEUS = True
+except ImportError:
+    HAS_PROMETHEUS = False
+
 # Importar framework de agentes
 try:
     from agents.core import (
@@ -92,6 +104,404 @@ class TaskResponse:
     completed_at: datetime = field(default_factory=datetime.now)
 
 
+# ==================== ROTEAMENTO POR KEYWORDS ====================
+
+def normalize_text(text: str) -> str:
+    """Normaliza texto para roteamento: minúsculas e sem acentos"""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+class KeywordRouter:
+    """
+    Roteador por keywords pré-compilado (autômato Aho-Corasick).
+
+    Todas as keywords de todos os agentes são compiladas uma única vez.
+    Cada mensagem é percorrida em uma única passada, com custo
+    O(tamanho da mensagem + matches) independente da quantidade de agentes
+    e keywords. Comparação insensível a acentos; cada keyword conta uma
+    vez por mensagem, como na busca por substring.
+    """
+
+    def __init__(self):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+        # Por padrão: lista de (índice do agente, peso)
+        self._targets: List[List[Tuple[int, int]]] = []
+        self._patterns: Dict[str, int] = {}
+        self._agents: List[str] = []
+        self._agent_index: Dict[str, int] = {}
+        self._built = False
+
+    @classmethod
+    def from_capabilities(
+        cls,
+        capabilities: Dict[str, Dict[str, Any]],
+        keyword_weight: int = 2,
+        intent_weight: int = 1,
+    ) -> "KeywordRouter":
+        """Cria o roteador a partir de AGENT_CAPABILITIES"""
+        router = cls()
+        for agent, config in capabilities.items():
+            for keyword in config.get("keywords", []):
+                router.add(agent, keyword, keyword_weight)
+            for intent in config.get("intents", []):
+                router.add(agent, intent, intent_weight)
+        return router.build()
+
+    @classmethod
+    def from_keywords(cls, routing_map: Dict[str, List[str]]) -> "KeywordRouter":
+        """Cria o roteador a partir de um mapa agente -> keywords (peso 1)"""
+        router = cls()
+        for agent, keywords in routing_map.items():
+            for keyword in keywords:
+                router.add(agent, keyword)
+        return router.build()
+
+    def add(self, agent: str, keyword: str, weight: int = 1) -> None:
+        """Adiciona uma keyword de um agente (antes de build)"""
+        if self._built:
+            raise RuntimeError("KeywordRouter já compilado")
+
+        if agent not in self._agent_index:
+            self._agent_index[agent] = len(self._agents)
+            self._agents.append(agent)
+
+        pattern = normalize_text(keyword)
+        if not pattern:
+            return
+
+        if pattern not in self._patterns:
+            self._patterns[pattern] = len(self._targets)
+            self._targets.append([])
+            state = 0
+            for char in pattern:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                state = next_state
+            self._output[state].append(self._patterns[pattern])
+
+        # Variantes que viram o mesmo padrão ("câmera"/"camera") contam uma
+        # vez por agente e peso; keyword e intent iguais continuam somando
+        targets = self._targets[self._patterns[pattern]]
+        target = (self._agent_index[agent], weight)
+        if target not in targets:
+            targets.append(target)
+
+    def build(self) -> "KeywordRouter":
+        """Calcula os links de falha (BFS) e compila o autômato"""
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._goto[fail].get(char, 0)
+                # Herda as keywords que terminam no sufixo
+                self._output[next_state] = (
+                    self._output[next_state] + self._output[self._fail[next_state]]
+                )
+        self._built = True
+        return self
+
+    def matches(self, message: str) -> Set[int]:
+        """Índices das keywords encontradas na mensagem"""
+        goto, fail, output = self._goto, self._fail, self._output
+        found: Set[int] = set()
+        state = 0
+        for char in normalize_text(message):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+    def scores(self, message: str) -> Dict[str, int]:
+        """Pontuação por agente, na ordem de cadastro dos agentes"""
+        totals = [0] * len(self._agents)
+        for pattern_id in self.matches(message):
+            for agent_index, weight in self._targets[pattern_id]:
+                totals[agent_index] += weight
+        return {
+            self._agents[i]: score
+            for i, score in enumerate(totals)
+            if score > 0
+        }
+
+    def best(self, message: str) -> Optional[Tuple[str, int]]:
+        """Agente de maior pontuação (empate: primeiro cadastrado)"""
+        scores = self.scores(message)
+        if not scores:
+            return None
+        agent = max(scores, key=scores.get)
+        return agent, scores[agent]
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {
+            "agents": len(self._agents),
+            "keywords": len(self._patterns),
+            "states": len(self._goto),
+        }
+
+
+class RoutingCache:
+    """
+    Cache de decisões de roteamento do LLM.
+
+    Mensagens são normalizadas (sem acentos, pontuação e espaços extras)
+    para formar a impressão digital. Uma busca exata resolve repetições;
+    paráfrases são resolvidas pelo vizinho mais próximo por similaridade
+    de Jaccard entre trigramas de caracteres, via índice invertido.
+    Decisões só são reaproveitadas acima do limiar de similaridade e
+    dentro do TTL; o excedente é removido por LRU.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 5000,
+        ttl_seconds: float = 24 * 3600,
+        similarity_threshold: float = 0.75,
+        ngram: int = 3,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self.ngram = ngram
+        # fingerprint -> (agente, trigramas, criado_em)
+        self._entries: "OrderedDict[str, Tuple[str, frozenset, float]]" = OrderedDict()
+        self._index: Dict[str, Set[str]] = {}
+        self.stats: Dict[str, int] = {
+            "exact_hits": 0,
+            "similar_hits": 0,
+            "misses": 0,
+            "stored": 0,
+            "evicted": 0,
+        }
+
+    @staticmethod
+    def fingerprint(message: str) -> str:
+        text = normalize_text(message)
+        text = "".join(c if c.isalnum() else " " for c in text)
+        return " ".join(text.split())
+
+    def _ngrams(self, fingerprint: str) -> frozenset:
+        padded = f" {fingerprint} "
+        if len(padded) <= self.ngram:
+            return frozenset([padded])
+        return frozenset(padded[i:i + self.ngram] for i in range(len(padded) - self.ngram + 1))
+
+    def lookup(self, message: str) -> Optional[Tuple[str, float]]:
+        """Retorna (agente, similaridade) ou None"""
+        fingerprint = self.fingerprint(message)
+        now = time.monotonic()
+
+        entry = self._entries.get(fingerprint)
+        if entry and now - entry[2] <= self.ttl_seconds:
+            self._entries.move_to_end(fingerprint)
+            self.stats["exact_hits"] += 1
+            return entry[0], 1.0
+
+        grams = self._ngrams(fingerprint)
+        shared: Dict[str, int] = {}
+        for gram in grams:
+            for candidate in self._index.get(gram, ()):
+                shared[candidate] = shared.get(candidate, 0) + 1
+
+        best: Optional[Tuple[str, float]] = None
+        for candidate, count in shared.items():
+            candidate_grams = self._entries[candidate][1]
+            similarity = count / (len(grams) + len(candidate_grams) - count)
+            if best is None or similarity > best[1]:
+                best = (candidate, similarity)
+
+        if best and best[1] >= self.similarity_threshold:
+            agent, _, created_at = self._entries[best[0]]
+            if now - created_at <= self.ttl_seconds:
+                self._entries.move_to_end(best[0])
+                self.stats["similar_hits"] += 1
+                return agent, best[1]
+
+        self.stats["misses"] += 1
+        return None
+
+    def store(self, message: str, agent: str) -> None:
+        """Registra a decisão do LLM para a mensagem"""
+        fingerprint = self.fingerprint(message)
+        if not fingerprint:
+            return
+        self._remove(fingerprint)
+        grams = self._ngrams(fingerprint)
+        self._entries[fingerprint] = (agent, grams, time.monotonic())
+        for gram in grams:
+            self._index.setdefault(gram, set()).add(fingerprint)
+        self.stats["stored"] += 1
+
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats["evicted"] += 1
+
+    def _remove(self, fingerprint: str) -> None:
+        entry = self._entries.pop(fingerprint, None)
+        if not entry:
+            return
+        for gram in entry[1]:
+            postings = self._index.get(gram)
+            if postings:
+                postings.discard(fingerprint)
+                if not postings:
+                    del self._index[gram]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+# ==================== MÉTRICAS DE TAREFAS ====================
+
+class LatencySketch:
+    """
+    Histograma de latência com erro relativo limitado (estilo HDR/DDSketch).
+
+    Cada valor cai no bucket ceil(log_gamma(v)), com gamma = (1+a)/(1-a);
+    qualquer quantil é estimado com erro relativo <= a. A faixa de valores
+    é limitada (min_value..max_value), então a memória é constante.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.02, min_value: float = 0.1, max_value: float = 3_600_000.0):
+        self.relative_accuracy = relative_accuracy
+        self._gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self._gamma)
+        self._min_index = self._index(min_value)
+        self._max_index = self._index(max_value)
+        self._buckets: Dict[int, int] = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = math.inf
+        self.max = 0.0
+
+    def _index(self, value: float) -> int:
+        return math.ceil(math.log(value) / self._log_gamma)
+
+    def add(self, value: float) -> None:
+        index = self._index(value) if value > 0 else self._min_index
+        index = min(max(index, self._min_index), self._max_index)
+        self._buckets[index] = self._buckets.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * (self.count - 1)
+        seen = 0
+        for index in sorted(self._buckets):
+            seen += self._buckets[index]
+            if seen > rank:
+                # Ponto médio (relativo) do bucket
+                value = 2 * self._gamma ** index / (1 + self._gamma)
+                return min(max(value, self.min), self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total / self.count, 2) if self.count else 0.0,
+            "min_ms": round(self.min, 2) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.5), 2),
+            "p90_ms": round(self.quantile(0.9), 2),
+            "p99_ms": round(self.quantile(0.99), 2),
+            "max_ms": round(self.max, 2),
+        }
+
+
+@dataclass
+class AgentTaskStats:
+    """Agregados de tarefas de um agente"""
+    total: int = 0
+    success: int = 0
+    failed: int = 0
+    last_completed_at: Optional[datetime] = None
+    latency: LatencySketch = field(default_factory=LatencySketch)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "total": self.total,
+            "success": self.success,
+            "failed": self.failed,
+            "success_rate": round(self.success / self.total, 4) if self.total else 0.0,
+            "last_completed_at": self.last_completed_at.isoformat() if self.last_completed_at else None,
+            "latency": self.latency.to_dict(),
+        }
+
+
+if HAS_PROMETHEUS:
+    ORCHESTRATOR_TASKS = Counter(
+        "orchestrator_tasks_total",
+        "Tarefas processadas pelo orquestrador",
+        ["agent", "status"],
+    )
+    ORCHESTRATOR_TASK_DURATION = Histogram(
+        "orchestrator_task_duration_seconds",
+        "Duração das tarefas por agente",
+        ["agent"],
+        buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0),
+    )
+
+
+class TaskMetrics:
+    """
+    Histórico recente (ring buffer) e agregados por agente em streaming.
+    Memória constante independente do tempo de execução.
+    """
+
+    def __init__(self, history_size: int = 1000):
+        self.recent: deque = deque(maxlen=history_size)
+        self.by_agent: Dict[str, AgentTaskStats] = {}
+        self.overall = AgentTaskStats()
+
+    def record(self, response: TaskResponse) -> None:
+        self.recent.append(response)
+        stats = self.by_agent.get(response.agent)
+        if stats is None:
+            stats = self.by_agent[response.agent] = AgentTaskStats()
+        for target in (stats, self.overall):
+            target.total += 1
+            if response.success:
+                target.success += 1
+            else:
+                target.failed += 1
+            target.last_completed_at = response.completed_at
+            target.latency.add(response.processing_time_ms)
+
+        if HAS_PROMETHEUS:
+            ORCHESTRATOR_TASKS.labels(
+                agent=response.agent,
+                status="success" if response.success else "failed",
+            ).inc()
+            ORCHESTRATOR_TASK_DURATION.labels(agent=response.agent).observe(
+                response.processing_time_ms / 1000
+            )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "overall": self.overall.to_dict(),
+            "recent_size": len(self.recent),
+            "agents": {agent: stats.to_dict() for agent, stats in self.by_agent.items()},
+        }
+
+
 class AIOrchestrator:
     """
     Orquestrador Central de Agentes do Conecta Plus
@@ -341,6 +751,9 @@ class AIOrchestrator:
         },
     }
 
+    # Autômato de keywords compilado uma única vez no carregamento
+    KEYWORD_ROUTER = KeywordRouter.from_capabilities(AGENT_CAPABILITIES)
+
     def __init__(
         self,
         model: str = "claude-3-5-sonnet-20241022",
@@ -350,7 +763,12 @@ class AIOrchestrator:
         self.max_retries = max_retries
         self.logger = logging.getLogger("orchestrator")
         self.active_tasks: Dict[str, TaskRequest] = {}
-        self.task_history: List[TaskResponse] = []
+
+        # Últimas tarefas (tamanho fixo) e agregados por agente
+        self.task_metrics = TaskMetrics(
+            history_size=int(os.getenv("ORCHESTRATOR_TASK_HISTORY", "1000"))
+        )
+        self.task_history = self.task_metrics.recent
 
         # LLM para roteamento inteligente
         self.router_llm = ChatAnthropic(
@@ -359,6 +777,16 @@ class AIOrchestrator:
             max_tokens=500,
         )
 
+        # Decisões anteriores do LLM reaproveitadas para paráfrases
+        self.routing_cache = RoutingCache()
+        self.routing_stats: Dict[str, int] = {
+            "target": 0,
+            "keyword": 0,
+            "cache": 0,
+            "llm": 0,
+            "fallback": 0,
+        }
+
         # Callbacks para eventos
         self.callbacks: Dict[str, List[Callable]] = {
             "task_started": [],
@@ -376,29 +804,19 @@ class AIOrchestrator:
         # Se agente específico foi solicitado
         if request.target_agent:
             if request.target_agent in self.AGENT_CAPABILITIES:
+                self.routing_stats["target"] += 1
                 return request.target_agent
             self.logger.warning(f"Agente '{request.target_agent}' não existe")
 
-        # Análise por keywords
-        message_lower = request.message.lower()
-        scores: Dict[str, int] = {}
-
-        for agent, config in self.AGENT_CAPABILITIES.items():
-            score = 0
-            for keyword in config["keywords"]:
-                if keyword in message_lower:
-                    score += 2
-            for intent in config["intents"]:
-                if intent in message_lower:
-                    score += 1
-            if score > 0:
-                scores[agent] = score
+        # Análise por keywords (uma passada pelo autômato)
+        scores = self.KEYWORD_ROUTER.scores(request.message)
 
         # Se houver match claro (score > 3), usa diretamente
         if scores:
             best_agent = max(scores, key=scores.get)
             if scores[best_agent] >= 3:
                 self.logger.info(f"Roteamento por keyword: {best_agent} (score: {scores[best_agent]})")
+                self.routing_stats["keyword"] += 1
                 return best_agent
 
         # Casos ambíguos: usa LLM para decidir
@@ -411,6 +829,14 @@ class AIOrchestrator:
     ) -> str:
         """Usa LLM para rotear requisições ambíguas"""
 
+        # Mensagem igual ou parecida já roteada pelo LLM
+        cached = self.routing_cache.lookup(request.message)
+        if cached and cached[0] in self.AGENT_CAPABILITIES:
+            agent, similarity = cached
+            self.logger.info(f"Roteamento por cache: {agent} (similaridade: {similarity:.2f})")
+            self.routing_stats["cache"] += 1
+            return agent
+
         agents_list = "\n".join([
             f"- {name}: {config['keywords'][:5]}"
             for name, config in self.AGENT_CAPABILITIES.items()
@@ -440,12 +866,15 @@ Se nenhum agente for apropriado, responda "suporte"."""
 
             if agent in self.AGENT_CAPABILITIES:
                 self.logger.info(f"Roteamento por LLM: {agent}")
+                self.routing_stats["llm"] += 1
+                self.routing_cache.store(request.message, agent)
                 return agent
 
         except Exception as e:
             self.logger.error(f"Erro no roteamento LLM: {e}")
 
         # Fallback para suporte
+        self.routing_stats["fallback"] += 1
         return "suporte"
 
     async def process_request(self, request: TaskRequest) -> TaskResponse:
@@ -487,7 +916,7 @@ Se nenhum agente for apropriado, responda "suporte"."""
             )
 
             await self._emit_event("task_completed", request, response)
-            self.task_history.append(response)
+            self.task_metrics.record(response)
 
             return response
 
@@ -501,6 +930,7 @@ Se nenhum agente for apropriado, responda "suporte"."""
                 response=f"Erro ao processar requisição: {str(e)}",
                 processing_time_ms=(datetime.now() - start_time).total_seconds() * 1000,
             )
+            self.task_metrics.record(response)
 
             await self._emit_event("task_failed", request, str(e))
             return response
@@ -562,14 +992,24 @@ Se nenhum agente for apropriado, responda "suporte"."""
         """Retorna status do orquestrador"""
         return {
             "active_tasks": len(self.active_tasks),
-            "total_processed": len(self.task_history),
+            "total_processed": self.task_metrics.overall.total,
+            "tasks": self.task_metrics.to_dict(),
             "agents_available": list(self.AGENT_CAPABILITIES.keys()),
             "model": self.model,
+            "routing": {
+                **self.routing_stats,
+                "cache_entries": len(self.routing_cache),
+                "cache": self.routing_cache.stats,
+            },
         }
 
 
 # ==================== ORCHESTRATOR V2 ====================
 
+# Condomínio das instâncias compartilhadas (agentes sem estado por condomínio)
+SHARED_CONDOMINIO = "*"
+
+
 class AgentRegistration:
     """Registro de agente no orchestrator V2"""
 
@@ -590,6 +1030,12 @@ class AgentRegistration:
         self.last_activity = None
         self.request_count = 0
         self.error_count = 0
+        self.active_requests = 0
+
+    @property
+    def shared(self) -> bool:
+        """Instância única compartilhada por todos os condomínios"""
+        return self.condominio_id == SHARED_CONDOMINIO
 
 
 class AIOrchestrator2:
@@ -661,6 +1107,15 @@ class AIOrchestrator2:
         "comercial": "agents.comercial:create_commercial_agent",
     }
 
+    # Agentes sem estado por condomínio: uma única instância no pool atende
+    # todos os condomínios. Os demais têm uma instância por condomínio.
+    SHARED_AGENT_TYPES = frozenset({
+        "atendimento",
+        "auditoria",
+        "fornecedores",
+        "valorizacao",
+    })
+
     # Descrição dos agentes para documentação
     AGENT_DESCRIPTIONS = {
         "cftv": "Monitoramento de vídeo e CFTV",
@@ -701,6 +1156,26 @@ class AIOrchestrator2:
         "comercial": "Comercial e vendas",
     }
 
+    # Mapeamento de keywords para agentes (roteamento simples, em ordem de prioridade)
+    SIMPLE_ROUTING_MAP = {
+        "emergencia": ["emergência", "incêndio", "socorro", "urgente", "ambulância"],
+        "alarme": ["alarme", "sensor", "disparou", "armar", "desarmar"],
+        "portaria_virtual": ["visitante", "portaria", "interfone", "ronda"],
+        "financeiro": ["boleto", "pagamento", "cobrança", "inadimplência", "2a via"],
+        "manutencao": ["manutenção", "conserto", "reparo", "vazamento", "quebrado"],
+        "reservas": ["reserva", "agendar", "salão", "churrasqueira", "quadra"],
+        "encomendas": ["encomenda", "pacote", "entrega", "correio"],
+        "ocorrencias": ["reclamação", "barulho", "ocorrência", "vizinho"],
+        "juridico": ["jurídico", "advogado", "processo", "notificação", "convenção"],
+        "estacionamento": ["estacionamento", "vaga", "garagem", "veículo"],
+        "pet": ["pet", "cachorro", "gato", "animal"],
+        "assembleias": ["assembleia", "votação", "quórum", "ata"],
+        "conhecimento": ["dúvida", "faq", "como funciona", "ajuda"],
+        "atendimento": ["atendimento", "falar com", "central"],
+    }
+
+    SIMPLE_ROUTER = KeywordRouter.from_keywords(SIMPLE_ROUTING_MAP)
+
     def __init__(
         self,
         redis_url: str = None,
@@ -712,10 +1187,28 @@ class AIOrchestrator2:
         self.default_level = default_level
         self.logger = logging.getLogger("orchestrator_v2")
 
-        self._agents: Dict[str, AgentRegistration] = {}
         self._condominios: Dict[str, List[str]] = {}
         self._is_running = False
 
+        # Pool de agentes: instâncias em ordem LRU, factories importadas uma vez
+        self._agents: "OrderedDict[str, AgentRegistration]" = OrderedDict()
+        self._factories: Dict[str, Callable] = {}
+        self._creating: Dict[str, asyncio.Future] = {}
+        self._evictor_task: Optional[asyncio.Task] = None
+        self.max_agent_instances = int(os.getenv("ORCHESTRATOR_MAX_AGENTS", "500"))
+        self.agent_idle_ttl = float(os.getenv("ORCHESTRATOR_AGENT_IDLE_TTL", "1800"))
+        self.prewarm_agent_types = [
+            t.strip() for t in os.getenv(
+                "ORCHESTRATOR_PREWARM_AGENTS", "atendimento,portaria_virtual,emergencia"
+            ).split(",") if t.strip()
+        ]
+        self._pool_metrics = {
+            "hits": 0,
+            "misses": 0,
+            "evicted_lru": 0,
+            "evicted_idle": 0,
+        }
+
         # Componentes compartilhados
         self._llm_client: Optional[UnifiedLLMClient] = None
         self._memory: Optional[UnifiedMemorySystem] = None
@@ -770,6 +1263,10 @@ class AIOrchestrator2:
                 )
                 self.logger.info("Message Bus inicializado - comunicação full-duplex ativa")
 
+            # Pré-aquecer tipos mais usados e iniciar limpeza de ociosos
+            await self.prewarm_agents()
+            self._evictor_task = asyncio.create_task(self._evict_idle_loop())
+
         self._is_running = True
         self.logger.info("AI Orchestrator V2 iniciado com suporte a 36 agentes")
 
@@ -777,6 +1274,10 @@ class AIOrchestrator2:
         """Para o orchestrator"""
         self._is_running = False
 
+        if self._evictor_task:
+            self._evictor_task.cancel()
+            self._evictor_task = None
+
         # Parar Message Bus
         if self._message_bus:
             await self._message_bus.stop()
@@ -791,13 +1292,51 @@ class AIOrchestrator2:
         condominio_id: str,
         evolution_level: EvolutionLevel = None
     ) -> BaseAgent:
-        """Obtém ou cria agente"""
-        agent_id = f"{agent_type}_{condominio_id}"
-
-        if agent_id in self._agents and self._agents[agent_id].instance:
-            return self._agents[agent_id].instance
+        """Obtém agente do pool ou cria (criações concorrentes são unificadas)"""
+        agent_id = self._agent_id(agent_type, condominio_id)
+
+        reg = self._agents.get(agent_id)
+        if reg and reg.instance:
+            self._agents.move_to_end(agent_id)
+            reg.last_activity = datetime.now()
+            self._pool_metrics["hits"] += 1
+            return reg.instance
+
+        pending = self._creating.get(agent_id)
+        if pending:
+            return await asyncio.shield(pending)
+
+        self._pool_metrics["misses"] += 1
+        task = asyncio.ensure_future(self.create_agent(agent_type, condominio_id, evolution_level))
+        self._creating[agent_id] = task
+        task.add_done_callback(lambda _: self._creating.pop(agent_id, None))
+        return await asyncio.shield(task)
+
+    def _agent_id(self, agent_type: str, condominio_id: str) -> str:
+        """Id no pool: tipos em SHARED_AGENT_TYPES têm instância única"""
+        if agent_type in self.SHARED_AGENT_TYPES:
+            return f"{agent_type}_{SHARED_CONDOMINIO}"
+        return f"{agent_type}_{condominio_id}"
+
+    def _resolve_factory(self, agent_type: str) -> Callable:
+        """Importa a factory do tipo uma única vez"""
+        if agent_type not in self._factories:
+            module_path, factory_name = self.AGENT_FACTORIES[agent_type].rsplit(":", 1)
+            # Converter path para formato de import (ex: agents.portaria-virtual -> agents.portaria_virtual)
+            module = importlib.import_module(module_path.replace("-", "_"))
+            self._factories[agent_type] = getattr(module, factory_name)
+        return self._factories[agent_type]
 
-        return await self.create_agent(agent_type, condominio_id, evolution_level)
+    @staticmethod
+    def _call_factory(factory_func: Callable, **kwargs) -> BaseAgent:
+        """Chama a factory apenas com os argumentos que ela aceita"""
+        try:
+            params = inspect.signature(factory_func).parameters
+        except (TypeError, ValueError):
+            return factory_func(**kwargs)
+        if any(p.kind == inspect.Parameter.VAR_KEYWORD for p in params.values()):
+            return factory_func(**kwargs)
+        return factory_func(**{k: v for k, v in kwargs.items() if k in params})
 
     async def create_agent(
         self,
@@ -809,35 +1348,33 @@ class AIOrchestrator2:
         if not HAS_AGENT_FRAMEWORK:
             raise RuntimeError("Framework de agentes não disponível")
 
-        agent_id = f"{agent_type}_{condominio_id}"
         level = evolution_level or self.default_level
 
         # Verificar se o tipo de agente é suportado
         if agent_type not in self.AGENT_FACTORIES:
             raise ValueError(f"Tipo de agente '{agent_type}' não suportado. Tipos disponíveis: {list(self.AGENT_FACTORIES.keys())}")
 
-        # Obter factory do mapeamento
-        factory_path = self.AGENT_FACTORIES[agent_type]
-        module_path, factory_name = factory_path.rsplit(":", 1)
+        if agent_type in self.SHARED_AGENT_TYPES:
+            condominio_id = SHARED_CONDOMINIO
 
-        # Importar dinamicamente o módulo e factory
+        # Importar dinamicamente o módulo e factory (cache por tipo)
         try:
-            # Converter path para formato de import (ex: agents.portaria-virtual -> agents.portaria_virtual)
-            import_path = module_path.replace("-", "_")
-            module = __import__(import_path, fromlist=[factory_name])
-            factory_func = getattr(module, factory_name)
+            factory_func = self._resolve_factory(agent_type)
 
             # Criar instância do agente
-            instance = factory_func(
+            instance = self._call_factory(
+                factory_func,
+                condominio_id=condominio_id,
                 memory=self._memory,
                 llm_client=self._llm_client,
                 tools=self._tools,
+                evolution_level=level,
             )
 
             self.logger.info(f"Agente {agent_type} criado via factory dinâmica")
 
         except ImportError as e:
-            self.logger.warning(f"Não foi possível importar {module_path}: {e}. Tentando import alternativo...")
+            self.logger.warning(f"Não foi possível importar {self.AGENT_FACTORIES[agent_type]}: {e}. Tentando import alternativo...")
 
             # Fallback para imports específicos (agentes já implementados)
             instance = await self._create_agent_fallback(agent_type, condominio_id, level)
@@ -845,6 +1382,8 @@ class AIOrchestrator2:
             if instance is None:
                 raise ValueError(f"Não foi possível criar agente '{agent_type}': {e}")
 
+        agent_id = f"{agent_type}_{condominio_id}"
+
         # Registrar
         registration = AgentRegistration(
             agent_id=agent_id,
@@ -854,6 +1393,7 @@ class AIOrchestrator2:
         )
         registration.instance = instance
         registration.status = "running"
+        registration.last_activity = datetime.now()
 
         self._agents[agent_id] = registration
 
@@ -865,8 +1405,84 @@ class AIOrchestrator2:
         self._metrics["agents_created"] += 1
 
         self.logger.info(f"Agente {agent_id} criado (nível {level.name})")
+
+        await self._evict_lru()
         return instance
 
+    async def prewarm_agents(self, agent_types: List[str] = None) -> None:
+        """
+        Importa as factories dos tipos mais usados na inicialização e já
+        cria as instâncias compartilhadas, evitando latência no primeiro request.
+        """
+        async def warm(agent_type: str):
+            self._resolve_factory(agent_type)
+            if agent_type in self.SHARED_AGENT_TYPES:
+                await self.get_or_create_agent(agent_type, SHARED_CONDOMINIO)
+
+        types = [t for t in (agent_types or self.prewarm_agent_types) if t in self.AGENT_FACTORIES]
+        results = await asyncio.gather(*(warm(t) for t in types), return_exceptions=True)
+        for agent_type, result in zip(types, results):
+            if isinstance(result, Exception):
+                self.logger.warning(f"Falha ao pré-aquecer agente {agent_type}: {result}")
+
+    async def _evict_lru(self) -> None:
+        """Remove as instâncias menos usadas acima da capacidade do pool"""
+        while len(self._agents) > self.max_agent_instances:
+            victim = next(
+                (reg for reg in self._agents.values() if reg.active_requests == 0),
+                None
+            )
+            if victim is None:
+                break
+            await self.destroy_agent(victim.agent_id)
+            self._pool_metrics["evicted_lru"] += 1
+
+    async def evict_idle(self) -> int:
+        """Remove instâncias sem atividade há mais de agent_idle_ttl segundos"""
+        now = datetime.now()
+        idle = [
+            reg.agent_id for reg in self._agents.values()
+            if reg.active_requests == 0
+            and reg.last_activity
+            and (now - reg.last_activity).total_seconds() > self.agent_idle_ttl
+        ]
+        for agent_id in idle:
+            await self.destroy_agent(agent_id)
+        self._pool_metrics["evicted_idle"] += len(idle)
+        return len(idle)
+
+    async def _evict_idle_loop(self) -> None:
+        while True:
+            await asyncio.sleep(min(60.0, self.agent_idle_ttl))
+            try:
+                removed = await self.evict_idle()
+                if removed:
+                    self.logger.info(f"{removed} agentes ociosos removidos do pool")
+            except Exception as e:
+                self.logger.error(f"Erro ao remover agentes ociosos: {e}")
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Ocupação e eficiência do pool de agentes"""
+        by_type: Dict[str, int] = {}
+        shared = 0
+        for reg in self._agents.values():
+            by_type[reg.agent_type] = by_type.get(reg.agent_type, 0) + 1
+            shared += reg.shared
+        lookups = self._pool_metrics["hits"] + self._pool_metrics["misses"]
+        return {
+            "instances": len(self._agents),
+            "capacity": self.max_agent_instances,
+            "occupancy": round(len(self._agents) / self.max_agent_instances, 3) if self.max_agent_instances else 0,
+            "shared_instances": shared,
+            "busy_instances": sum(1 for reg in self._agents.values() if reg.active_requests),
+            "creating": len(self._creating),
+            "factories_loaded": len(self._factories),
+            "idle_ttl_seconds": self.agent_idle_ttl,
+            "hit_rate": round(self._pool_metrics["hits"] / lookups, 3) if lookups else 0,
+            "by_type": by_type,
+            **self._pool_metrics,
+        }
+
     async def _create_agent_fallback(
         self,
         agent_type: str,
@@ -1048,6 +1664,8 @@ class AIOrchestrator2:
         del self._agents[agent_id]
         if reg.condominio_id in self._condominios:
             self._condominios[reg.condominio_id].remove(agent_id)
+            if not self._condominios[reg.condominio_id]:
+                del self._condominios[reg.condominio_id]
 
         return True
 
@@ -1063,23 +1681,28 @@ class AIOrchestrator2:
         """Processa requisição via agente V2"""
         self._metrics["total_requests"] += 1
 
+        reg = None
         try:
             agent = await self.get_or_create_agent(agent_type, condominio_id)
 
+            # Estado por condomínio viaja no contexto (instâncias podem ser compartilhadas)
             context = AgentContext(
                 condominio_id=condominio_id,
                 user_id=user_id,
                 session_id=session_id
             )
 
+            reg = self._agents.get(self._agent_id(agent_type, condominio_id))
+            if reg:
+                reg.active_requests += 1
+
             result = await agent.process(
                 input_data={"action": action, "params": params or {}},
                 context=context
             )
 
             # Atualizar registro
-            if f"{agent_type}_{condominio_id}" in self._agents:
-                reg = self._agents[f"{agent_type}_{condominio_id}"]
+            if reg:
                 reg.last_activity = datetime.now()
                 reg.request_count += 1
 
@@ -1088,9 +1711,15 @@ class AIOrchestrator2:
 
         except Exception as e:
             self._metrics["failed"] += 1
+            if reg:
+                reg.error_count += 1
             self.logger.error(f"Erro ao processar: {e}")
             return {"error": str(e)}
 
+        finally:
+            if reg:
+                reg.active_requests -= 1
+
     async def smart_route(
         self,
         condominio_id: str,
@@ -1137,28 +1766,11 @@ class AIOrchestrator2:
 
     def _simple_route(self, message: str) -> str:
         """Roteamento simples por keywords quando V1 não está disponível"""
-        message_lower = message.lower()
-
-        # Mapeamento de keywords para agentes
-        routing_map = {
-            "emergencia": ["emergência", "incêndio", "socorro", "urgente", "ambulância"],
-            "alarme": ["alarme", "sensor", "disparou", "armar", "desarmar"],
-            "portaria_virtual": ["visitante", "portaria", "interfone", "ronda"],
-            "financeiro": ["boleto", "pagamento", "cobrança", "inadimplência", "2a via"],
-            "manutencao": ["manutenção", "conserto", "reparo", "vazamento", "quebrado"],
-            "reservas": ["reserva", "agendar", "salão", "churrasqueira", "quadra"],
-            "encomendas": ["encomenda", "pacote", "entrega", "correio"],
-            "ocorrencias": ["reclamação", "barulho", "ocorrência", "vizinho"],
-            "juridico": ["jurídico", "advogado", "processo", "notificação", "convenção"],
-            "estacionamento": ["estacionamento", "vaga", "garagem", "veículo"],
-            "pet": ["pet", "cachorro", "gato", "animal"],
-            "assembleias": ["assembleia", "votação", "quórum", "ata"],
-            "conhecimento": ["dúvida", "faq", "como funciona", "ajuda"],
-            "atendimento": ["atendimento", "falar com", "central"],
-        }
+        scores = self.SIMPLE_ROUTER.scores(message)
 
-        for agent, keywords in routing_map.items():
-            if any(kw in message_lower for kw in keywords):
+        # Primeiro agente do mapa com match (ordem define prioridade)
+        for agent in self.SIMPLE_ROUTING_MAP:
+            if agent in scores:
                 return agent
 
         # Default: atendimento (central omnichannel)
@@ -1175,6 +1787,7 @@ class AIOrchestrator2:
             "active_instances": len(self._agents),
             "condominios": len(self._condominios),
             "metrics": self._metrics,
+            "pool": self.get_pool_stats(),
             "supported_agents": {
                 "total": len(self.AGENT_FACTORIES),
                 "categories": {
@@ -1210,7 +1823,7 @@ class AIOrchestrator2:
         """Lista agentes"""
         agents = []
         for reg in self._agents.values():
-            if condominio_id and reg.condominio_id != condominio_id:
+            if condominio_id and reg.condominio_id not in (condominio_id, SHARED_CONDOMINIO):
                 continue
             agents.append({
                 "agent_id": reg.agent_id,
@@ -1419,6 +2032,15 @@ async def create_api():
     async def list_agents():
         return list(orchestrator.AGENT_CAPABILITIES.keys()) if orchestrator else []
 
+    if HAS_PROMETHEUS:
+        from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+        from fastapi import Response
+
+        @app.get("/metrics")
+        async def metrics():
+            """Métricas Prometheus"""
+            return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
     # ==================== ENDPOINTS V2 ====================
 
     @app.on_event("startup")
@@ -205,24 +205,10 @@ def test_routing_keywords() -> Tuple[bool, str, List[Dict]]:
         correct = 0
 
         for expected_agent, message in test_messages.items():
-            # Simular análise de keywords
-            message_lower = message.lower()
-            scores = {}
-
-            for agent, config in orch.AGENT_CAPABILITIES.items():
-                score = 0
-                for keyword in config["keywords"]:
-                    if keyword in message_lower:
-                        score += 2
-                for intent in config["intents"]:
-                    if intent in message_lower:
-                        score += 1
-                if score > 0:
-                    scores[agent] = score
-
-            if scores:
-                routed_agent = max(scores, key=scores.get)
-                best_score = scores[routed_agent]
+            # Mesmo autômato usado por route_request
+            best = orch.KEYWORD_ROUTER.best(message)
+            if best:
+                routed_agent, best_score = best
             else:
                 routed_agent = "suporte"
                 best_score = 0
@@ -250,6 +236,143 @@ def test_routing_keywords() -> Tuple[bool, str, List[Dict]]:
         return False, f"Erro: {e}", []
 
 
+def test_keyword_router_accent_variants() -> Tuple[bool, str, Dict]:
+    """Variantes com/sem acento de uma keyword contam uma vez só"""
+    try:
+        from orchestrator import KeywordRouter
+
+        router = KeywordRouter.from_capabilities({
+            "cftv": {"keywords": ["câmera", "camera"], "intents": ["monitorar"]},
+            "alarme": {"keywords": ["armar"], "intents": ["armar"]},
+        })
+        details = {
+            "cftv": router.scores("a câmera caiu").get("cftv"),
+            "alarme": router.scores("armar a central").get("alarme"),
+        }
+
+        # câmera/camera: uma keyword (2); armar em keywords e intents: 2 + 1
+        if details == {"cftv": 2, "alarme": 3}:
+            return True, "Keywords deduplicadas por agente após normalização", details
+        return False, f"Pontuações inesperadas: {details}", details
+
+    except Exception as e:
+        return False, f"Erro: {e}", {}
+
+
+def test_routing_cache() -> Tuple[bool, str, Dict]:
+    """Cache de roteamento: repetição exata, paráfrase e LRU"""
+    try:
+        from orchestrator import RoutingCache
+
+        cache = RoutingCache(max_entries=2, similarity_threshold=0.6)
+        cache.store("Quero liberar o acesso do visitante", "acesso")
+        cache.store("Qual o saldo do condomínio?", "financeiro")
+
+        details = {
+            "exata": cache.lookup("quero liberar o acesso do visitante!"),
+            "parafrase": cache.lookup("Quero liberar acesso do visitante"),
+            "diferente": cache.lookup("a câmera da garagem caiu"),
+        }
+        cache.store("Reservar o salão de festas", "reservas")
+        details["removida_lru"] = cache.lookup("Qual o saldo do condomínio?")
+
+        ok = (
+            details["exata"] == ("acesso", 1.0)
+            and details["parafrase"] is not None and details["parafrase"][0] == "acesso"
+            and details["diferente"] is None
+            and details["removida_lru"] is None
+            and len(cache) == 2
+        )
+        if ok:
+            return True, "Cache reaproveita decisões e respeita o limite", cache.stats
+        return False, f"Resultados inesperados: {details}", details
+
+    except Exception as e:
+        return False, f"Erro: {e}", {}
+
+
+def test_task_metrics() -> Tuple[bool, str, Dict]:
+    """Histórico limitado e quantis por agente com erro relativo pequeno"""
+    try:
+        from orchestrator import TaskMetrics, TaskResponse
+
+        metrics = TaskMetrics(history_size=10)
+        for i in range(1, 1001):
+            metrics.record(TaskResponse(
+                request_id=str(i), agent="acesso", success=i % 10 != 0,
+                response="", processing_time_ms=float(i),
+            ))
+
+        stats = metrics.by_agent["acesso"]
+        p50 = stats.latency.quantile(0.5)
+        p99 = stats.latency.quantile(0.99)
+        details = {"recent": len(metrics.recent), "failed": stats.failed, "p50": p50, "p99": p99}
+
+        ok = (
+            len(metrics.recent) == 10
+            and stats.total == 1000 and stats.failed == 100
+            and abs(p50 - 500) / 500 <= 0.03
+            and abs(p99 - 990) / 990 <= 0.03
+        )
+        if ok:
+            return True, "Agregados em streaming dentro da precisão", details
+        return False, f"Métricas inesperadas: {details}", details
+
+    except Exception as e:
+        return False, f"Erro: {e}", {}
+
+
+async def test_agent_pool() -> Tuple[bool, str, Dict]:
+    """Pool: compartilhamento declarado no registro, criação unificada e LRU"""
+    try:
+        from orchestrator import AIOrchestrator2, SHARED_CONDOMINIO
+
+        class FakeAgent:
+            async def start(self):
+                pass
+
+            async def stop(self):
+                pass
+
+        created = []
+
+        def factory(condominio_id=None, **kwargs):
+            created.append(condominio_id)
+            return FakeAgent()
+
+        orchestrator = AIOrchestrator2()
+        orchestrator.max_agent_instances = 3
+        for agent_type in ("atendimento", "cftv", "acesso"):
+            orchestrator._factories[agent_type] = factory
+
+        shared = [await orchestrator.get_or_create_agent("atendimento", c) for c in ("c1", "c2")]
+        concurrent = await asyncio.gather(*[
+            orchestrator.get_or_create_agent("cftv", "c1") for _ in range(3)
+        ])
+        other = await orchestrator.get_or_create_agent("cftv", "c2")
+        await orchestrator.get_or_create_agent("acesso", "c1")
+
+        stats = orchestrator.get_pool_stats()
+        details = {"created": created, **{k: stats[k] for k in ("instances", "hits", "misses", "evicted_lru")}}
+
+        ok = (
+            orchestrator.SHARED_AGENT_TYPES <= set(orchestrator.AGENT_FACTORIES)
+            and shared[0] is shared[1]
+            and all(agent is concurrent[0] for agent in concurrent)
+            and other is not concurrent[0]
+            and created == [SHARED_CONDOMINIO, "c1", "c2", "c1"]
+            and stats["instances"] == 3
+            and stats["evicted_lru"] == 1
+            and f"atendimento_{SHARED_CONDOMINIO}" not in orchestrator._agents
+        )
+        if ok:
+            return True, "Pool compartilha só os tipos declarados e respeita a capacidade", details
+        return False, f"Pool inesperado: {details}", details
+
+    except Exception as e:
+        return False, f"Erro: {e}", {}
+
+
 def test_factory_imports() -> Tuple[bool, str, Dict]:
     """Testa se as factories dos agentes podem ser importadas"""
     try:
@@ -396,6 +519,9 @@ def run_tests():
         ("AGENT_FACTORIES (36 agentes)", test_agent_factories),
         ("AGENT_DESCRIPTIONS (36 agentes)", test_agent_descriptions),
         ("Roteamento por Keywords", test_routing_keywords),
+        ("KeywordRouter com acentos", test_keyword_router_accent_variants),
+        ("Cache de Roteamento", test_routing_cache),
+        ("Métricas de Tarefas", test_task_metrics),
         ("Import das Factories", test_factory_imports),
         ("Status do Orchestrator V2", test_orchestrator_v2_status),
         ("Método get_supported_agents", test_supported_agents_method),
@@ -432,7 +558,21 @@ def run_tests():
             failed += 1
             results.append((name, False, str(e)))
 
-    # Teste assíncrono
+    # Testes assíncronos
+    print(f"\n{Colors.BOLD}Testando: Pool de Agentes (async){Colors.END}")
+    try:
+        success, message, details = asyncio.run(test_agent_pool())
+        if success:
+            print_success(message)
+            passed += 1
+        else:
+            print_error(message)
+            failed += 1
+        results.append(("Pool de Agentes", success, message))
+    except Exception as e:
+        print_error(f"Exceção: {e}")
+        failed += 1
+
     print(f"\n{Colors.BOLD}Testando: Simple Route (async){Colors.END}")
     try:
         success, message, details = asyncio.run(test_simple_route())
@@ -9,12 +9,21 @@ import asyncio
 from typing import Optional, Dict, Callable, Tuple
 from dataclasses import dataclass
 from datetime import datetime, timedelta
-from collections import defaultdict
 from functools import wraps
 
 from fastapi import Request, HTTPException, status
 from fastapi.responses import JSONResponse
 
+# Rate limiter compartilhado com o backend (shared/sliding_window.py): no
+# container shared/ fica em /app (PYTHONPATH do Dockerfile); localmente,
+# rode com a raiz do repositorio no PYTHONPATH.
+from shared.sliding_window import (
+    RateLimitRule,
+    RateLimitStore,
+    RateLimitResult,
+    create_rate_limit_store,
+)
+
 
 @dataclass
 class RateLimitConfig:
@@ -61,20 +70,24 @@ class RateLimiter:
     Rate Limiter com múltiplas janelas de tempo
 
     Implementa:
-    - Limites por minuto/hora/dia
+    - Limites por minuto/hora/dia (sliding window counter, ver shared/sliding_window.py)
+    - Store plugável: memória do processo ou Redis (script Lua, 1 round-trip)
     - Limites por endpoint
     - Token bucket para burst
     - Whitelist de IPs
     """
 
-    def __init__(self, config: RateLimitConfig = None):
+    def __init__(self, config: RateLimitConfig = None, store: Optional[RateLimitStore] = None):
         self.config = config or RateLimitConfig()
-        self._entries: Dict[str, RateLimitEntry] = defaultdict(RateLimitEntry)
-        self._endpoint_entries: Dict[str, Dict[str, RateLimitEntry]] = defaultdict(lambda: defaultdict(RateLimitEntry))
 
-        # Configura Redis se disponível
-        self._redis = None
+        # Store compartilhado (sliding window counter, memória constante por cliente).
+        # RATE_LIMIT_REDIS=true usa Redis para valer entre workers/instâncias.
         self._use_redis = os.getenv('RATE_LIMIT_REDIS', 'false').lower() == 'true'
+        self._store = store or create_rate_limit_store(
+            'redis' if self._use_redis else 'memory',
+            os.getenv('REDIS_URL'),
+        )
+        self._rules: Dict[str, Tuple[RateLimitRule, ...]] = {}
 
     def _get_client_id(self, request: Request) -> str:
         """Obtém identificador único do cliente"""
@@ -135,53 +148,18 @@ class RateLimiter:
             self.config.requests_per_day
         )
 
-    def _check_and_update(
-        self,
-        entry: RateLimitEntry,
-        limits: Tuple[int, int, int]
-    ) -> Tuple[bool, str, int]:
-        """
-        Verifica e atualiza contadores
-
-        Returns:
-            Tupla (permitido, motivo, retry_after_seconds)
-        """
-        now = time.time()
-        minute_limit, hour_limit, day_limit = limits
-
-        # Reset janelas expiradas
-        if now >= entry.minute_reset:
-            entry.minute_count = 0
-            entry.minute_reset = now + 60
-
-        if now >= entry.hour_reset:
-            entry.hour_count = 0
-            entry.hour_reset = now + 3600
-
-        if now >= entry.day_reset:
-            entry.day_count = 0
-            entry.day_reset = now + 86400
-
-        # Verifica limites
-        if entry.minute_count >= minute_limit:
-            retry_after = int(entry.minute_reset - now) + 1
-            return False, "rate_limit_minute", retry_after
-
-        if entry.hour_count >= hour_limit:
-            retry_after = int(entry.hour_reset - now) + 1
-            return False, "rate_limit_hour", retry_after
-
-        if entry.day_count >= day_limit:
-            retry_after = int(entry.day_reset - now) + 1
-            return False, "rate_limit_day", retry_after
-
-        # Atualiza contadores
-        entry.minute_count += 1
-        entry.hour_count += 1
-        entry.day_count += 1
-        entry.last_update = now
-
-        return True, "", 0
+    def _get_rules(self, endpoint_key: str) -> Tuple[RateLimitRule, ...]:
+        """Regras de janela deslizante (minuto/hora/dia) para o endpoint"""
+        rules = self._rules.get(endpoint_key)
+        if rules is None:
+            minute_limit, hour_limit, day_limit = self._get_limits(endpoint_key)
+            rules = (
+                RateLimitRule(minute_limit, 60, 'rate_limit_minute'),
+                RateLimitRule(hour_limit, 3600, 'rate_limit_hour'),
+                RateLimitRule(day_limit, 86400, 'rate_limit_day'),
+            )
+            self._rules[endpoint_key] = rules
+        return rules
 
     def _check_token_bucket(self, entry: RateLimitEntry) -> Tuple[bool, int]:
         """
@@ -221,16 +199,14 @@ class RateLimiter:
             return True, None
 
         endpoint_key = self._get_endpoint_key(request)
-        limits = self._get_limits(endpoint_key)
-
-        # Obtém ou cria entrada
-        entry = self._entries[client_id]
 
-        # Verifica limites
-        allowed, reason, retry_after = self._check_and_update(entry, limits)
+        # Verifica e contabiliza todas as janelas em uma única operação.
+        # Um contador por cliente: o endpoint só define os limites aplicados.
+        result = await self._store.hit(client_id, self._get_rules(endpoint_key))
+        request.state.rate_limit = result
 
-        if not allowed:
-            return False, self._create_error_response(reason, retry_after, client_id)
+        if not result.allowed:
+            return False, self._create_error_response(result.rule, result.retry_after, client_id)
 
         return True, None
 
@@ -266,27 +242,27 @@ class RateLimiter:
         )
 
     def get_remaining(self, request: Request) -> Dict[str, int]:
-        """Retorna limites restantes para o cliente"""
-        client_id = self._get_client_id(request)
-        entry = self._entries.get(client_id)
+        """Retorna limites restantes para o cliente (da última verificação)"""
+        result: Optional[RateLimitResult] = getattr(request.state, 'rate_limit', None)
 
-        if not entry:
+        if not result:
             return {
                 'minute_remaining': self.config.requests_per_minute,
                 'hour_remaining': self.config.requests_per_hour,
                 'day_remaining': self.config.requests_per_day
             }
 
-        endpoint_key = self._get_endpoint_key(request)
-        limits = self._get_limits(endpoint_key)
-        minute_limit, hour_limit, day_limit = limits
-
+        remaining = result.remaining_by_rule
         return {
-            'minute_remaining': max(0, minute_limit - entry.minute_count),
-            'hour_remaining': max(0, hour_limit - entry.hour_count),
-            'day_remaining': max(0, day_limit - entry.day_count)
+            'minute_remaining': remaining.get('rate_limit_minute', 0),
+            'hour_remaining': remaining.get('rate_limit_hour', 0),
+            'day_remaining': remaining.get('rate_limit_day', 0)
         }
 
+    async def close(self) -> None:
+        """Libera recursos do store"""
+        await self._store.close()
+
 
 # Instância global
 rate_limiter = RateLimiter()
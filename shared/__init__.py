@@ -0,0 +1,3 @@
+"""
+Conecta Plus - Codigo compartilhado entre servicos Python
+"""
@@ -0,0 +1,380 @@
+"""
+Conecta Plus - Rate Limiter Sliding Window Counter
+Limitador de memoria constante com store plugavel (memoria ou Redis)
+
+Modulo unico importado pelo backend (backend/middleware/rate_limit.py) e
+pelo api-gateway (services/api-gateway/middleware/rate_limit.py), para que
+os limites e as chaves Redis sejam os mesmos nos dois servicos.
+
+Algoritmo: para cada regra (limite, janela) guarda apenas o id da janela
+atual, a contagem da janela anterior e a contagem da atual. A estimativa
+da janela deslizante e:
+
+    anterior * (janela - decorrido) / janela + atual
+
+Cada verificacao e O(regras), independente do volume de requests.
+"""
+
+import asyncio
+import math
+import time
+import logging
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    """Regra de limite: `limit` requests a cada `window` segundos."""
+    limit: int
+    window: int
+    name: str = "default"
+
+
+@dataclass
+class RateLimitResult:
+    """Resultado de uma verificacao de rate limit."""
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_after: int
+    retry_after: int = 0
+    rule: Optional[str] = None
+    remaining_by_rule: Dict[str, int] = field(default_factory=dict)
+
+
+# Estado por (chave, janela): (id_janela, contagem_anterior, contagem_atual)
+WindowState = Tuple[int, float, float]
+
+
+def _advance(state: Optional[WindowState], window_id: int) -> Tuple[float, float]:
+    """Avanca o estado para a janela atual e retorna (anterior, atual)."""
+    if state is None:
+        return 0.0, 0.0
+    stored_id, previous, current = state
+    if stored_id == window_id:
+        return previous, current
+    if stored_id == window_id - 1:
+        return current, 0.0
+    return 0.0, 0.0
+
+
+def _estimate(previous: float, current: float, window: int, elapsed: float) -> float:
+    return previous * (window - elapsed) / window + current
+
+
+def _build_result(
+    rules: Sequence[RateLimitRule],
+    states: Sequence[Tuple[float, float, float]],
+    allowed: bool,
+    cost: int,
+) -> RateLimitResult:
+    """
+    Monta o resultado a partir de (anterior, atual, decorrido) de cada regra.
+    As contagens ja incluem `cost` quando a requisicao foi permitida.
+    """
+    blocking: Optional[RateLimitRule] = None
+    retry_after = 0
+    remaining_by_rule: Dict[str, int] = {}
+    tightest: Optional[Tuple[int, RateLimitRule, float]] = None
+
+    for rule, (previous, current, elapsed) in zip(rules, states):
+        estimate = _estimate(previous, current, rule.window, elapsed)
+        remaining = max(0, int(rule.limit - estimate))
+        remaining_by_rule[rule.name] = remaining
+
+        if tightest is None or remaining < tightest[0]:
+            tightest = (remaining, rule, elapsed)
+
+        if not allowed and estimate + cost > rule.limit:
+            wait = _retry_after(rule, previous, current, elapsed, cost)
+            if wait > retry_after:
+                retry_after = wait
+                blocking = rule
+
+    remaining, rule, elapsed = tightest
+    return RateLimitResult(
+        allowed=allowed,
+        limit=rule.limit,
+        remaining=0 if not allowed else remaining,
+        reset_after=max(1, math.ceil(rule.window - elapsed)),
+        retry_after=retry_after,
+        rule=blocking.name if blocking else None,
+        remaining_by_rule=remaining_by_rule,
+    )
+
+
+def _retry_after(
+    rule: RateLimitRule,
+    previous: float,
+    current: float,
+    elapsed: float,
+    cost: int,
+) -> int:
+    """Segundos ate a estimativa liberar `cost` requests."""
+    until_next = rule.window - elapsed
+    if current + cost > rule.limit or previous <= 0:
+        # So a proxima janela libera: a contagem atual vira a anterior
+        return max(1, math.ceil(until_next))
+    # A contribuicao da janela anterior decai linearmente
+    wait = until_next - (rule.limit - cost - current) * rule.window / previous
+    return max(1, math.ceil(min(wait, until_next)))
+
+
+# ==================== STORES ====================
+
+class RateLimitStore(ABC):
+    """Interface de armazenamento do rate limiter."""
+
+    @abstractmethod
+    async def hit(
+        self,
+        key: str,
+        rules: Sequence[RateLimitRule],
+        cost: int = 1,
+        now: Optional[float] = None,
+    ) -> RateLimitResult:
+        """Verifica todas as regras e, se permitido, contabiliza `cost`."""
+
+    async def close(self) -> None:
+        """Libera recursos do store."""
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """
+    Store em memoria do processo.
+
+    Memoria constante por cliente (tres numeros por regra). Clientes
+    inativos ha mais de duas janelas sao removidos por uma tarefa em
+    background iniciada na primeira verificacao.
+    """
+
+    def __init__(self, evict_interval: float = 60.0):
+        self._states: Dict[Tuple[str, int], WindowState] = {}
+        self._expires: Dict[Tuple[str, int], float] = {}
+        self._evict_interval = evict_interval
+        self._evict_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    async def hit(
+        self,
+        key: str,
+        rules: Sequence[RateLimitRule],
+        cost: int = 1,
+        now: Optional[float] = None,
+    ) -> RateLimitResult:
+        self._ensure_evictor()
+        now = time.time() if now is None else now
+
+        states: List[Tuple[float, float, float]] = []
+        window_ids: List[int] = []
+        allowed = True
+        for rule in rules:
+            window_id = int(now // rule.window)
+            previous, current = _advance(self._states.get((key, rule.window)), window_id)
+            elapsed = now - window_id * rule.window
+            if _estimate(previous, current, rule.window, elapsed) + cost > rule.limit:
+                allowed = False
+            states.append((previous, current, elapsed))
+            window_ids.append(window_id)
+
+        for i, rule in enumerate(rules):
+            previous, current, elapsed = states[i]
+            if allowed:
+                current += cost
+                states[i] = (previous, current, elapsed)
+            self._states[(key, rule.window)] = (window_ids[i], previous, current)
+            self._expires[(key, rule.window)] = (window_ids[i] + 2) * rule.window
+
+        return _build_result(rules, states, allowed, cost)
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Remove estados de clientes inativos. Retorna quantidade removida."""
+        now = time.time() if now is None else now
+        expired = [k for k, expires in self._expires.items() if expires <= now]
+        for k in expired:
+            self._states.pop(k, None)
+            self._expires.pop(k, None)
+        return len(expired)
+
+    def _ensure_evictor(self) -> None:
+        if self._evict_task is not None or self._evict_interval <= 0:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        self._evict_task = loop.create_task(self._evict_loop())
+
+    async def _evict_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self._evict_interval)
+            removed = self.evict_idle()
+            if removed:
+                logger.debug(f"Rate limiter: {removed} clientes inativos removidos")
+
+    async def close(self) -> None:
+        if self._evict_task:
+            self._evict_task.cancel()
+            self._evict_task = None
+
+
+# Verifica todas as regras e so contabiliza se todas permitirem (atomico).
+# KEYS: uma chave por regra. ARGV: now, cost, (limit, window) por regra.
+# Retorna: allowed, depois (anterior, atual, decorrido) por regra.
+SLIDING_WINDOW_LUA = """
+local now = tonumber(ARGV[1])
+local cost = tonumber(ARGV[2])
+local allowed = 1
+local states = {}
+for i = 1, #KEYS do
+    local limit = tonumber(ARGV[1 + 2 * i])
+    local window = tonumber(ARGV[2 + 2 * i])
+    local wid = math.floor(now / window)
+    local data = redis.call('HMGET', KEYS[i], 'w', 'p', 'c')
+    local w = tonumber(data[1])
+    local p = tonumber(data[2]) or 0
+    local c = tonumber(data[3]) or 0
+    if w == nil then
+        p = 0
+        c = 0
+    elseif w == wid - 1 then
+        p = c
+        c = 0
+    elseif w ~= wid then
+        p = 0
+        c = 0
+    end
+    local elapsed = now - wid * window
+    if p * (window - elapsed) / window + c + cost > limit then
+        allowed = 0
+    end
+    states[i] = {wid, p, c, elapsed, window}
+end
+local out = {allowed}
+for i = 1, #KEYS do
+    local s = states[i]
+    if allowed == 1 then
+        s[3] = s[3] + cost
+    end
+    redis.call('HSET', KEYS[i], 'w', s[1], 'p', s[2], 'c', s[3])
+    redis.call('PEXPIRE', KEYS[i], math.ceil(s[5] * 2000))
+    table.insert(out, tostring(s[2]))
+    table.insert(out, tostring(s[3]))
+    table.insert(out, tostring(s[4]))
+end
+return out
+"""
+
+
+class RedisRateLimitStore(RateLimitStore):
+    """
+    Store compartilhado entre workers/instancias via Redis.
+
+    Cada verificacao e um unico round-trip (EVALSHA do script Lua).
+    Clientes inativos expiram pelo TTL das chaves (2 janelas).
+    Em falha do Redis, usa o store em memoria como fallback e deixa de
+    consultar o Redis por `retry_interval` segundos (circuito aberto), para
+    que cada request nao espere o timeout enquanto o Redis estiver fora.
+    """
+
+    def __init__(
+        self,
+        redis_client=None,
+        redis_url: Optional[str] = None,
+        prefix: str = "ratelimit",
+        fallback: Optional[RateLimitStore] = None,
+        retry_interval: float = 5.0,
+    ):
+        if redis_client is None:
+            import redis.asyncio as redis
+            redis_client = redis.from_url(
+                redis_url or "redis://localhost:6379/0",
+                socket_timeout=0.5,
+                socket_connect_timeout=0.5,
+            )
+        self.redis = redis_client
+        self.prefix = prefix
+        self.fallback = fallback or MemoryRateLimitStore()
+        self._script = self.redis.register_script(SLIDING_WINDOW_LUA)
+        self.retry_interval = retry_interval
+        self._open_until = 0.0
+
+    @property
+    def circuit_open(self) -> bool:
+        """True enquanto o Redis estiver sendo ignorado apos uma falha."""
+        return time.monotonic() < self._open_until
+
+    async def hit(
+        self,
+        key: str,
+        rules: Sequence[RateLimitRule],
+        cost: int = 1,
+        now: Optional[float] = None,
+    ) -> RateLimitResult:
+        now = time.time() if now is None else now
+        if self.circuit_open:
+            return await self.fallback.hit(key, rules, cost, now)
+
+        # Hash tag garante o mesmo slot em Redis Cluster
+        keys = [f"{self.prefix}:{{{key}}}:{rule.window}" for rule in rules]
+        args: List = [now, cost]
+        for rule in rules:
+            args.extend([rule.limit, rule.window])
+
+        try:
+            raw = await self._script(keys=keys, args=args)
+        except Exception as e:
+            self._open_until = time.monotonic() + self.retry_interval
+            logger.warning(
+                f"Rate limiter Redis indisponivel, usando memoria por "
+                f"{self.retry_interval:.0f}s: {e}"
+            )
+            return await self.fallback.hit(key, rules, cost, now)
+
+        allowed = int(raw[0]) == 1
+        values = [float(v) for v in raw[1:]]
+        states = [tuple(values[i:i + 3]) for i in range(0, len(values), 3)]
+        return _build_result(rules, states, allowed, cost)
+
+    async def close(self) -> None:
+        await self.fallback.close()
+        await self.redis.close()
+
+
+def create_rate_limit_store(backend: str = "memory", redis_url: Optional[str] = None) -> RateLimitStore:
+    """Cria o store conforme configuracao ('memory' ou 'redis')."""
+    if backend == "redis":
+        try:
+            return RedisRateLimitStore(redis_url=redis_url)
+        except Exception as e:
+            logger.warning(f"Redis indisponivel para rate limit, usando memoria: {e}")
+    return MemoryRateLimitStore()
+
+
+class SlidingWindowRateLimiter:
+    """Rate limiter de janela deslizante sobre um store plugavel."""
+
+    def __init__(
+        self,
+        rules: Sequence[RateLimitRule],
+        store: Optional[RateLimitStore] = None,
+    ):
+        self.rules = tuple(rules)
+        self.store = store or MemoryRateLimitStore()
+
+    async def hit(
+        self,
+        key: str,
+        rules: Optional[Sequence[RateLimitRule]] = None,
+        cost: int = 1,
+    ) -> RateLimitResult:
+        return await self.store.hit(key, rules or self.rules, cost)
+
+    async def close(self) -> None:
+        await self.store.close()
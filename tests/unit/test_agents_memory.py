@@ -0,0 +1,300 @@
+"""
+Testes unitários das estruturas de memória dos agentes (agents/memory)
+"""
+
+import os
+import sys
+from datetime import date, datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from agents.memory.text_index import InvertedIndex, tokenize
+from agents.memory.temporal_memory import IntervalIndex, TemporalMemory, EventStatus
+from agents.memory.entity_memory import EntityMemory, EntityType, phonetic_key
+from agents.memory.relationship_memory import (
+    Relationship,
+    RelationshipGraph,
+    RelationshipStatus,
+    RelationshipType,
+)
+from agents.memory.conversation_memory import (
+    ConversationMemory,
+    ConversationStatus,
+    MessageRole,
+)
+
+
+class TestInvertedIndex:
+    """Testes do índice invertido BM25F"""
+
+    @pytest.fixture
+    def index(self):
+        index = InvertedIndex({"title": 3.0, "content": 1.0})
+        index.add("portao", {"title": "Portão da garagem", "content": "Como abrir o portão"},
+                  facets={"category": "acesso"})
+        index.add("piscina", {"title": "Horário da piscina", "content": "A piscina abre às 8h"},
+                  facets={"category": "areas", "tags": ["lazer"]})
+        index.add("garagem", {"title": "Vagas", "content": "Regras da garagem e dos portões"},
+                  facets={"category": "acesso"})
+        return index
+
+    def test_tokenize_remove_acentos_stopwords_e_plural(self):
+        assert tokenize("Os Portões da Garagem") == ["portao", "garagem"]
+
+    def test_campo_com_peso_maior_vem_primeiro(self, index):
+        results = index.search("portão")
+        assert [doc_id for doc_id, _ in results] == ["portao", "garagem"]
+        assert results[0][1] > results[1][1]
+
+    def test_filtro_por_faceta(self, index):
+        assert index.search("garagem", facets={"category": "areas"}) == []
+        results = index.search("piscina lazer", facets={"tags": "lazer"})
+        assert [doc_id for doc_id, _ in results] == ["piscina"]
+
+    def test_remove_e_reindexa(self, index):
+        index.remove("portao")
+        assert "portao" not in index
+        assert [doc_id for doc_id, _ in index.search("portão")] == ["garagem"]
+
+        # Número interno reaproveitado não herda facetas do documento removido
+        index.add("salao", {"title": "Salão de festas"}, facets={"category": "areas"})
+        assert index.search("salão", facets={"category": "acesso"}) == []
+        assert index.get_stats()["documents"] == 3
+
+
+class TestIntervalIndex:
+    """Testes do índice de intervalos da agenda"""
+
+    def test_sobreposicao_considera_intervalos_longos(self):
+        index = IntervalIndex()
+        base = datetime(2025, 1, 10, 8)
+        index.add(base, base + timedelta(hours=8), "longo")
+        index.add(base + timedelta(hours=3), base + timedelta(hours=4), "curto")
+
+        overlapping = index.overlapping(base + timedelta(hours=6), base + timedelta(hours=7))
+        assert [event_id for _, _, event_id in overlapping] == ["longo"]
+
+    def test_intervalos_livres(self):
+        index = IntervalIndex()
+        base = datetime(2025, 1, 10, 8)
+        index.add(base + timedelta(hours=1), base + timedelta(hours=2), "a")
+        index.add(base + timedelta(hours=1, minutes=30), base + timedelta(hours=3), "b")
+
+        gaps = index.free_gaps(base, base + timedelta(hours=4))
+        assert gaps == [
+            (base, base + timedelta(hours=1)),
+            (base + timedelta(hours=3), base + timedelta(hours=4)),
+        ]
+
+
+class TestTemporalMemory:
+    """Testes de disponibilidade e lembretes da memória temporal"""
+
+    @pytest.mark.asyncio
+    async def test_cancelado_libera_horario(self):
+        memory = TemporalMemory()
+        start = datetime(2030, 3, 5, 10)
+        event = memory.create_event("Reunião", start, duration_minutes=60, location_id="salao")
+
+        assert not memory.check_availability(start, start + timedelta(minutes=30), "salao")["available"]
+        assert memory.check_availability(start, start + timedelta(minutes=30), "piscina")["available"]
+
+        memory.cancel_event(event.event_id)
+        assert memory.check_availability(start, start + timedelta(minutes=30), "salao")["available"]
+
+    @pytest.mark.asyncio
+    async def test_slots_respeitam_eventos(self):
+        memory = TemporalMemory()
+        memory.create_event("Manutenção", datetime(2030, 3, 5, 9), duration_minutes=90)
+
+        slots = memory.find_available_slots(date(2030, 3, 5), 60, start_hour=8, end_hour=12)
+        assert [slot.start.strftime("%H:%M") for slot in slots] == ["08:00", "10:30", "11:00"]
+
+    @pytest.mark.asyncio
+    async def test_lembrete_reagendado_nao_dispara_horario_antigo(self):
+        sent = []
+
+        async def notify(**kwargs):
+            sent.append(kwargs["event_id"])
+
+        memory = TemporalMemory(notification_callback=notify)
+        soon = datetime.now() + timedelta(minutes=10)
+        event = memory.create_event("Vistoria", soon, reminders=[15])
+        assert len(memory._reminder_heap) == 1
+
+        memory.reschedule_event(event.event_id, soon + timedelta(days=1))
+        await memory._check_reminders()
+        assert sent == []
+
+        memory.reschedule_event(event.event_id, soon)
+        await memory._check_reminders()
+        await memory._check_reminders()
+        assert sent == [event.event_id]
+        assert event.status == EventStatus.RESCHEDULED
+
+
+class TestEntityMemory:
+    """Testes da deduplicação por blocos"""
+
+    def test_codigo_fonetico(self):
+        assert phonetic_key("luiz") == phonetic_key("luis")
+        assert phonetic_key("souza") == phonetic_key("sousa")
+
+    @pytest.mark.asyncio
+    async def test_encontra_duplicados_foneticos(self):
+        memory = EntityMemory()
+        a = memory.create_entity(EntityType.RESIDENT, "Luiz Souza")
+        b = memory.create_entity(EntityType.RESIDENT, "Luis Sousa")
+        memory.create_entity(EntityType.RESIDENT, "Maria Oliveira")
+
+        # Só o nome coincide (foneticamente): 0.9 * 3/6
+        duplicates = memory.find_duplicates(threshold=0.4)
+        pairs = [{e1.entity_id, e2.entity_id} for e1, e2, _ in duplicates]
+        assert pairs == [{a.entity_id, b.entity_id}]
+
+    @pytest.mark.asyncio
+    async def test_busca_fuzzy_tolera_erro_de_digitacao(self):
+        memory = EntityMemory()
+        entity = memory.create_entity(EntityType.RESIDENT, "Fernanda Albuquerque")
+
+        results = memory.find_by_name("Fernanda Albuquerqe", fuzzy=True)
+        assert [e.entity_id for e in results] == [entity.entity_id]
+
+    @pytest.mark.asyncio
+    async def test_busca_por_nome_em_ordem_deterministica(self):
+        memory = EntityMemory()
+        homonyms = [memory.create_entity(EntityType.RESIDENT, "Ana Lima") for _ in range(5)]
+        other = memory.create_entity(EntityType.RESIDENT, "Ana Limão")
+
+        exact = memory.find_by_name("Ana Lima")
+        assert [e.entity_id for e in exact] == sorted(e.entity_id for e in homonyms)
+
+        fuzzy = memory.find_by_name("ana lim", fuzzy=True)
+        expected = sorted(e.entity_id for e in homonyms + [other])
+        assert [e.entity_id for e in fuzzy] == expected
+
+
+class TestRelationshipGraph:
+    """Testes do núcleo de grafo de relacionamentos"""
+
+    @staticmethod
+    def _rel(rel_id, source, target, strength=0.5, **kwargs):
+        return Relationship(
+            relationship_id=rel_id,
+            relationship_type=RelationshipType.RESIDENT_OF,
+            source_id=source,
+            target_id=target,
+            strength=strength,
+            **kwargs
+        )
+
+    def test_caminho_ignora_arestas_inativas(self):
+        graph = RelationshipGraph()
+        graph.upsert(self._rel("ab", "a", "b"))
+        graph.upsert(self._rel("bc", "b", "c"))
+        graph.upsert(self._rel("ac", "a", "c", status=RelationshipStatus.INACTIVE))
+
+        path = graph.shortest_path("a", "c", max_depth=4)
+        assert [rel.relationship_id for rel in path] == ["ab", "bc"]
+        assert graph.shortest_path("a", "c", max_depth=1) is None
+
+    def test_agregados_incrementais(self):
+        graph = RelationshipGraph()
+        graph.upsert(self._rel("ab", "a", "b", strength=0.2))
+        graph.upsert(self._rel("ac", "a", "c", strength=0.8))
+        assert graph.node_stats("a") == (2, 0, 2, 0.5)
+
+        graph.upsert(self._rel("ab", "a", "b", strength=0.2, status=RelationshipStatus.INACTIVE))
+        assert graph.node_stats("a") == (2, 0, 1, 0.8)
+
+    def test_validade_temporal(self):
+        graph = RelationshipGraph()
+        now = datetime(2025, 1, 1)
+        graph.upsert(self._rel("ab", "a", "b", valid_until=now + timedelta(days=1)), now=now)
+        assert graph.node_stats("a")[2] == 1
+
+        graph.refresh_validity(now + timedelta(days=2))
+        assert graph.node_stats("a")[2] == 0
+
+    def test_componentes(self):
+        graph = RelationshipGraph()
+        for rel_id, source, target in [("ab", "a", "b"), ("bc", "b", "c"), ("xy", "x", "y")]:
+            graph.upsert(self._rel(rel_id, source, target))
+
+        components = sorted(graph.components(min_neighbors=1), key=len, reverse=True)
+        assert components == [{"a", "b", "c"}, {"x", "y"}]
+
+
+class TestConversationMemory:
+    """Testes do cache LRU com persistência write-behind"""
+
+    @pytest.fixture
+    def redis_client(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        return fakeredis.FakeAsyncRedis()
+
+    @pytest.mark.asyncio
+    async def test_cache_nunca_remove_conversas_ativas(self):
+        memory = ConversationMemory(max_active_conversations=2)
+        active = [memory.start_conversation(f"agente{i}") for i in range(3)]
+        assert len(memory._active_conversations) == 3
+
+        for conversation in active:
+            conversation.status = ConversationStatus.COMPLETED
+        memory.start_conversation("agente3")
+        assert len(memory._active_conversations) == 2
+
+    @pytest.mark.asyncio
+    async def test_write_behind_grava_so_turnos_novos(self, redis_client):
+        memory = ConversationMemory(redis_client=redis_client, flush_interval=60)
+        conversation = memory.start_conversation("portaria", user_id="u1")
+        memory.add_message(conversation.conversation_id, MessageRole.USER, "Olá")
+        memory.add_message(conversation.conversation_id, MessageRole.ASSISTANT, "Bom dia")
+
+        assert await memory.flush() == 1
+        memory.add_message(conversation.conversation_id, MessageRole.USER, "Obrigado")
+        assert await memory.flush() == 1
+        assert await memory.flush() == 0
+
+        turns_key = f"conversation_turns:{conversation.conversation_id}"
+        assert await redis_client.llen(turns_key) == 3
+        await memory.close()
+
+        # Outra instância carrega do Redis e coloca no cache
+        other = ConversationMemory(redis_client=redis_client)
+        loaded = await other._load_conversation(conversation.conversation_id)
+        assert [t.content for t in loaded.turns] == ["Olá", "Bom dia", "Obrigado"]
+        assert conversation.conversation_id in other._active_conversations
+
+    @pytest.mark.asyncio
+    async def test_nova_tentativa_apos_falha_nao_duplica_turnos(self, redis_client):
+        memory = ConversationMemory(redis_client=redis_client, flush_interval=60)
+        conversation = memory.start_conversation("portaria", user_id="u1")
+        memory.add_message(conversation.conversation_id, MessageRole.USER, "Olá")
+        assert await memory.flush() == 1
+        memory.add_message(conversation.conversation_id, MessageRole.ASSISTANT, "Bom dia")
+
+        # Conexão cai depois do EXEC aplicado: o cliente vê erro
+        pipeline = redis_client.pipeline
+
+        def pipeline_que_perde_resposta(*args, **kwargs):
+            pipe = pipeline(*args, **kwargs)
+            execute = pipe.execute
+
+            async def execute_e_falha():
+                await execute()
+                raise ConnectionError("conexão perdida")
+
+            pipe.execute = execute_e_falha
+            return pipe
+
+        redis_client.pipeline = pipeline_que_perde_resposta
+        assert await memory.flush() == 0
+        redis_client.pipeline = pipeline
+        assert await memory.flush() == 1
+
+        turns_key = f"conversation_turns:{conversation.conversation_id}"
+        assert await redis_client.llen(turns_key) == 2
+        await memory.close()
@@ -0,0 +1,248 @@
+"""
+Testes unitários do gateway edge (histórico local e sincronização)
+"""
+
+import asyncio
+import gzip
+import json
+import os
+import sys
+from datetime import datetime
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'edge', 'agents'))
+
+import gateway
+from gateway import CloudSync, EventStore, SyncQueue, settings
+
+
+class TestEventStore:
+    """Testes do histórico SQLite"""
+
+    @pytest.fixture
+    def store(self, tmp_path):
+        store = EventStore(str(tmp_path / "events.db"))
+        yield store
+        store.close()
+
+    def test_consulta_filtrada_e_paginada(self, store):
+        base = datetime(2025, 5, 10, 12).timestamp()
+        for i in range(5):
+            store.add("access", "entrada" if i % 2 else "saida", {"i": i},
+                      ts=base + i, unit_id="101" if i < 3 else "102")
+
+        page = store.query(kind="access", limit=2)
+        assert [e["i"] for e in page["events"]] == [4, 3]
+        page = store.query(kind="access", limit=2, cursor=page["next_cursor"])
+        assert [e["i"] for e in page["events"]] == [2, 1]
+        page = store.query(kind="access", limit=2, cursor=page["next_cursor"])
+        assert [e["i"] for e in page["events"]] == [0]
+        assert page["next_cursor"] is None
+
+        assert [e["i"] for e in store.query(event_type="entrada")["events"]] == [3, 1]
+        assert [e["i"] for e in store.query(unit_id="102")["events"]] == [4, 3]
+        assert [e["i"] for e in store.query(start=base + 1, end=base + 3)["events"]] == [2, 1]
+
+    def test_contadores_e_expurgo(self, store):
+        day1 = datetime(2025, 5, 10, 12).timestamp()
+        day2 = datetime(2025, 5, 11, 12).timestamp()
+        store.add_many([
+            {"kind": "access", "type": "entrada", "ts": day1, "data": {}},
+            {"kind": "access", "type": "entrada", "ts": day1 + 1, "data": {}},
+            {"kind": "detection", "type": "person", "ts": day1, "camera_id": "cam1", "data": {}},
+            {"kind": "access", "type": "entrada", "ts": day2, "data": {}},
+        ])
+
+        assert store.counts("20250510") == {"access": {"entrada": 2}, "detection": {"person": 1}}
+        assert store.counts("20250511") == {"access": {"entrada": 1}}
+
+        assert store.purge(datetime(2025, 5, 11).timestamp()) == 3
+        assert store.counts("20250510") == {}
+        assert len(store.query()["events"]) == 1
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class FakeClient:
+    """Cliente HTTP do cloud: responde com os status da lista, em ordem"""
+
+    def __init__(self, *statuses):
+        self.statuses = list(statuses)
+        self.batches = []
+
+    async def post(self, url, content, headers):
+        assert headers["Content-Encoding"] == "gzip"
+        lines = gzip.decompress(content).decode().splitlines()
+        self.batches.append([json.loads(line)["data"]["n"] for line in lines])
+        status = self.statuses.pop(0) if self.statuses else 200
+        if isinstance(status, Exception):
+            raise status
+        if isinstance(status, tuple):
+            return FakeResponse(*status)
+        return FakeResponse(status)
+
+
+@pytest.fixture
+def redis_client(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    client = fakeredis.FakeAsyncRedis()
+
+    async def get_redis():
+        return client
+
+    monkeypatch.setattr(gateway, "get_redis", get_redis)
+    # Scripts e lock são de classe: registrados no cliente/loop de cada teste
+    monkeypatch.setattr(SyncQueue, "_claim_script", None)
+    monkeypatch.setattr(SyncQueue, "_requeue_script", None)
+    monkeypatch.setattr(SyncQueue, "_batch_lock", None)
+    monkeypatch.setattr(gateway.edge_state, "pending_events", 0)
+    monkeypatch.setattr(gateway.edge_state, "online", True)
+    return client
+
+
+async def _push(count, start=0):
+    await SyncQueue.push_many([("access", {"n": n}) for n in range(start, start + count)])
+
+
+class TestSyncQueue:
+    """Testes da fila confiável de sincronização"""
+
+    @pytest.mark.asyncio
+    async def test_reserva_confirma_em_ordem(self, redis_client):
+        await _push(5)
+        assert gateway.edge_state.pending_events == 5
+
+        async with SyncQueue.batch(3) as events:
+            assert [e["data"]["n"] for e in events] == [0, 1, 2]
+            assert gateway.edge_state.pending_events == 2
+            await SyncQueue.ack(len(events))
+
+        async with SyncQueue.batch(3) as events:
+            assert [e["data"]["n"] for e in events] == [3, 4]
+            await SyncQueue.ack(len(events))
+
+        assert await redis_client.llen(SyncQueue.PROCESSING_KEY) == 0
+        async with SyncQueue.batch(3) as events:
+            assert events == []
+
+    @pytest.mark.asyncio
+    async def test_requeue_preserva_ordem(self, redis_client):
+        await _push(5)
+
+        async with SyncQueue.batch(3):
+            await SyncQueue.requeue()
+        assert gateway.edge_state.pending_events == 5
+
+        async with SyncQueue.batch(10) as events:
+            assert [e["data"]["n"] for e in events] == [0, 1, 2, 3, 4]
+
+    @pytest.mark.asyncio
+    async def test_sobra_de_requeue_falho_nao_e_confirmada_pelo_proximo_lote(self, redis_client):
+        await _push(6)
+        await SyncQueue.pop_batch(3)  # requeue() falhou: lote ficou em processamento
+
+        async with SyncQueue.batch(3) as events:
+            assert [e["data"]["n"] for e in events] == [0, 1, 2]
+            await SyncQueue.ack(len(events))
+
+        assert await redis_client.llen(SyncQueue.PROCESSING_KEY) == 0
+        async with SyncQueue.batch(10) as events:
+            assert [e["data"]["n"] for e in events] == [3, 4, 5]
+
+    @pytest.mark.asyncio
+    async def test_recover_devolve_lote_nao_confirmado(self, redis_client):
+        await _push(4)
+        await SyncQueue.pop_batch(2)  # Gateway caiu antes do ack
+        await _push(1, start=4)
+
+        assert await SyncQueue.recover() == 2
+        assert gateway.edge_state.pending_events == 5
+        async with SyncQueue.batch(10) as events:
+            assert [e["data"]["n"] for e in events] == [0, 1, 2, 3, 4]
+
+
+class TestCloudSync:
+    """Testes do envio adaptativo para o cloud"""
+
+    @pytest.fixture
+    def sync(self, redis_client, monkeypatch):
+        monkeypatch.setattr(settings, "SYNC_BATCH_SIZE", 100)
+        return CloudSync()
+
+    @pytest.mark.asyncio
+    async def test_lote_enviado_e_confirmado(self, sync, redis_client):
+        sync.client = FakeClient(200)
+        await _push(3)
+
+        assert await sync.sync_events() == 3
+        assert sync.client.batches == [[0, 1, 2]]
+        assert sync.failures == 0
+        assert await redis_client.llen(SyncQueue.QUEUE_KEY) == 0
+        assert await redis_client.llen(SyncQueue.PROCESSING_KEY) == 0
+
+    @pytest.mark.asyncio
+    async def test_413_reduz_lote_sem_perder_eventos(self, sync, redis_client):
+        sync.client = FakeClient(413, 200)
+        await _push(150)
+
+        assert await sync._sync_batch() == (0, True)
+        assert sync.batch_size == 50
+        assert sync.failures == 0
+
+        assert await sync.sync_events() == 50
+        assert sync.client.batches[1] == list(range(50))
+        assert await redis_client.llen(SyncQueue.QUEUE_KEY) == 100
+
+    @pytest.mark.asyncio
+    async def test_falha_requeue_e_backoff(self, sync, redis_client):
+        sync.client = FakeClient(ConnectionError("offline"), (503, {"Retry-After": "7"}))
+        await _push(4)
+
+        assert await sync._sync_batch() == (0, False)
+        assert not gateway.edge_state.online
+        assert sync.failures == 1
+        assert sync.retry_after is None
+        assert 1.0 <= sync.backoff_delay() <= 2.0
+
+        assert await sync._sync_batch() == (0, False)
+        assert sync.failures == 2
+        assert sync.backoff_delay() == 7.0
+
+        # Nada perdido: o próximo envio manda o lote inteiro, na ordem
+        sync.client.statuses = [200]
+        assert await sync.sync_events() == 4
+        assert sync.client.batches[-1] == [0, 1, 2, 3]
+        assert sync.failures == 0
+
+    def test_lote_acompanha_a_vazao(self, sync):
+        # 100 eventos em 0.1s = 1000 ev/s; alvo de 2s permite 2000, limitado a 2x
+        sync._adapt(100, 0.1)
+        assert sync.batch_size == 200
+
+        # Lote lento: reduz até a metade por vez
+        sync.throughput = None
+        sync._adapt(200, 8.0)
+        assert sync.batch_size == 100
+
+        # Lote incompleto não aumenta
+        sync.throughput = None
+        sync._adapt(10, 0.01)
+        assert sync.batch_size == 100
+
+    @pytest.mark.asyncio
+    async def test_envios_concorrentes_nao_confirmam_lote_alheio(self, sync, redis_client):
+        sync.client = FakeClient()
+        sync.batch_size = 3
+        await _push(10)
+
+        results = await asyncio.gather(*[sync.sync_events() for _ in range(5)])
+        assert sum(results) == 10
+        assert sorted(n for batch in sync.client.batches for n in batch) == list(range(10))
+        assert await redis_client.llen(SyncQueue.QUEUE_KEY) == 0
+        assert await redis_client.llen(SyncQueue.PROCESSING_KEY) == 0
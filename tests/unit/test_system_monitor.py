@@ -0,0 +1,441 @@
+"""
+Testes unitários das skills do agente system-monitor
+"""
+
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..', 'agents', 'system-monitor'))
+
+from skills import failure_predictor, forensic_audit, operational_memory
+from skills.correlation_engine import EventStore
+from skills.cycle_executor import CycleExecutor
+from skills.failure_predictor import FailurePredictor, MetricSeries
+from skills.forensic_audit import ForensicAudit
+from skills.log_analyzer import LogAnalyzer
+from skills.operational_memory import OperationalMemory
+
+
+@pytest.fixture
+def state_dir(tmp_path, monkeypatch):
+    """Redireciona o diretório de estado fixo das skills para tmp_path"""
+    for module in (failure_predictor, forensic_audit, operational_memory):
+        monkeypatch.setattr(module, 'Path', lambda *args: tmp_path)
+    return tmp_path
+
+
+class TestEventStore:
+    """Testes do buffer circular de eventos da correlação"""
+
+    def test_capacidade_descarta_mais_antigos(self):
+        store = EventStore(capacity=3)
+        for i in range(5):
+            store.add({'timestamp': 1000.0 + i, 'category': 'cpu' if i % 2 else 'disk', 'i': i})
+
+        assert len(store) == 3
+        assert [e['i'] for e in store] == [2, 3, 4]
+        assert store.category_counts == {'disk': 2, 'cpu': 1}
+
+    def test_evento_fora_de_ordem_mantem_buffer_ordenado(self):
+        store = EventStore(capacity=10)
+        store.add({'timestamp': 1000.0, 'category': 'a'})
+        assert store.add({'timestamp': 900.0, 'category': 'b'}) == 1000.0
+
+        assert [e['category'] for e in store.events_since(1000.0)] == ['a', 'b']
+        assert store.count_since(1000.5) == 0
+
+    def test_janela_deslizante(self):
+        store = EventStore(capacity=10, windows={'1m': timedelta(minutes=1)})
+        store.add({'timestamp': 1000.0, 'category': 'cpu'})
+        store.add({'timestamp': 1030.0, 'category': 'cpu'})
+        store.add({'timestamp': 1050.0, 'category': 'memory'})
+
+        assert store.window_counts('1m', now=1055.0) == {'cpu': 2, 'memory': 1}
+        assert store.window_counts('1m', now=1080.0) == {'cpu': 1, 'memory': 1}
+        assert store.window_counts('1m', now=1200.0) == {}
+        assert store.category_counts == {'cpu': 2, 'memory': 1}
+
+    def test_busca_por_corte_e_limite(self):
+        store = EventStore(capacity=4)
+        for i in range(6):
+            store.add({'timestamp': 1000.0 + i * 10, 'category': 'x', 'i': i})
+
+        assert [e['i'] for e in store.events_since(1025.0)] == [3, 4, 5]
+        assert [e['i'] for e in store.events_since(0, limit=2)] == [2, 3]
+        assert store.count_since(1040.0) == 2
+
+
+class TestMetricSeries:
+    """Testes da série temporal em buffer circular"""
+
+    def test_view_em_ordem_apos_dar_a_volta(self):
+        series = MetricSeries(capacity=4, anomaly_window=2)
+        for i in range(6):
+            series.append(i, 100.0 + i)
+
+        values, timestamps = series.view()
+        assert [float(v) for v in values] == [2.0, 3.0, 4.0, 5.0]
+        assert [float(t) for t in timestamps] == [102.0, 103.0, 104.0, 105.0]
+        assert series.last == 5.0
+
+        values, _ = series.since(104.0)
+        assert [float(v) for v in values] == [4.0, 5.0]
+
+    def test_zscore_contra_janela_anterior(self):
+        series = MetricSeries(capacity=100, anomaly_window=5)
+        for i, value in enumerate([10, 12, 10, 12]):
+            series.append(value, i)
+
+        series.append(30, 4)
+        assert series.last_mean == pytest.approx(11.0)
+        assert series.last_z > 10
+
+        # Janela móvel: as amostras antigas saem da média
+        for i in range(5, 10):
+            series.append(30, i)
+        assert series.last_mean == pytest.approx(30.0)
+        assert series.last_z == 0.0
+
+
+class TestFailurePredictor:
+    """Testes da persistência do histórico de métricas"""
+
+    def test_flush_e_recarga(self, state_dir):
+        predictor = FailurePredictor({})
+        for value in (50, 55, 60):
+            predictor.record_metrics({'cpu': {'percent': value}, 'disk': 70, 'status': 'ok'})
+
+        # Snapshot é periódico: nada gravado antes do flush
+        assert not (state_dir / 'metrics_history.json').exists()
+        predictor.flush()
+
+        reloaded = FailurePredictor({})
+        assert set(reloaded.series) == {'cpu', 'disk'}
+        values, _ = reloaded.series['cpu'].view()
+        assert [float(v) for v in values] == [50.0, 55.0, 60.0]
+
+
+class TestForensicAudit:
+    """Testes dos segmentos JSONL e do chain de hashes"""
+
+    @staticmethod
+    def _audit(max_entries=3):
+        audit = ForensicAudit({})
+        audit.audit_config['max_entries_per_file'] = max_entries
+        return audit
+
+    def test_rotacao_e_integridade(self, state_dir):
+        audit = self._audit()
+        ids = [audit.log('action', f'acao {i}', {'i': i}) for i in range(7)]
+        assert len(set(ids)) == 7
+
+        stats = audit.get_statistics()
+        assert stats['archived_files'] == 2
+        assert stats['current_log_entries'] == 1
+        assert stats['total_entries'] == 7
+
+        result = audit.verify_chain_integrity(full=True)
+        assert result['integrity'] == 'intact'
+        assert result['total_entries'] == 7
+        audit.close()
+
+    def test_timeline_atravessa_segmentos(self, state_dir):
+        audit = self._audit()
+        for i in range(7):
+            audit.log('healing' if i % 2 else 'action', f'acao {i}', {'i': i})
+
+        timeline = audit.get_timeline(limit=10)
+        assert [e['details']['i'] for e in timeline] == [6, 5, 4, 3, 2, 1, 0]
+
+        healing = audit.get_timeline(event_types=['healing'], limit=10)
+        assert [e['details']['i'] for e in healing] == [5, 3, 1]
+
+        future = datetime.now() + timedelta(hours=1)
+        assert audit.get_timeline(start_time=future) == []
+        audit.close()
+
+    def test_reinicio_continua_o_chain(self, state_dir):
+        audit = self._audit()
+        for i in range(4):
+            audit.log('action', f'acao {i}', {'i': i})
+        audit.close()
+
+        reopened = self._audit()
+        assert reopened.get_statistics()['current_log_entries'] == 1
+        reopened.log('action', 'acao 4', {'i': 4})
+
+        result = reopened.verify_chain_integrity(full=True)
+        assert result['integrity'] == 'intact'
+        assert result['total_entries'] == 5
+        reopened.close()
+
+    def test_migracao_do_formato_antigo(self, state_dir):
+        (state_dir / 'audit').mkdir()
+        legacy = state_dir / 'audit' / 'audit_current.json'
+        entries = [{'id': f'old{i}', 'event_type': 'action', 'hash': f'h{i}'} for i in range(2)]
+        legacy.write_text(json.dumps({'entries': entries}))
+        (state_dir / 'audit' / 'audit_chain.json').write_text(json.dumps(
+            {'last_hash': 'h1', 'total_entries': 2, 'files': [], 'active': None}
+        ))
+
+        audit = self._audit(max_entries=100)
+        stats = audit.get_statistics()
+        assert stats['current_log_entries'] == 2
+        assert stats['total_entries'] == 2
+        assert not legacy.exists()
+        audit.close()
+
+    def test_migracao_com_falha_desfaz_o_segmento(self, state_dir):
+        audit = self._audit(max_entries=100)
+        audit.log('action', 'acao 0', {'i': 0})
+        audit.close()
+
+        legacy = state_dir / 'audit' / 'audit_current.json'
+        legacy.write_text(json.dumps({'entries': [{'id': 'old0', 'hash': 'h0'}, 'corrompida']}))
+        size = audit._segment_path.stat().st_size
+
+        reopened = self._audit(max_entries=100)
+        assert audit._segment_path.stat().st_size == size
+        assert reopened.get_statistics()['current_log_entries'] == 1
+        assert legacy.exists()
+
+        reopened.log('action', 'acao 1', {'i': 1})
+        result = reopened.verify_chain_integrity(full=True)
+        assert result['integrity'] == 'intact'
+        assert result['total_entries'] == 2
+        reopened.close()
+
+    def test_adulteracao_detectada(self, state_dir):
+        audit = self._audit(max_entries=100)
+        for i in range(3):
+            audit.log('action', f'acao {i}', {'i': i})
+        audit.close()
+
+        segment = audit._segment_path
+        segment.write_text(segment.read_text().replace('acao 1', 'acao X'))
+
+        result = self._audit(max_entries=100).verify_chain_integrity()
+        assert result['integrity'] == 'compromised'
+        assert [issue['index'] for issue in result['issues']] == [1]
+
+    def test_escrita_concorrente(self, state_dir):
+        audit = self._audit(max_entries=10)
+
+        def worker(n):
+            for i in range(10):
+                audit.log('action', f'worker {n}', {'i': i})
+
+        threads = [threading.Thread(target=worker, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        result = audit.verify_chain_integrity(full=True)
+        assert result['total_entries'] == 40
+        assert result['integrity'] == 'intact'
+        audit.close()
+
+
+class TestCycleExecutor:
+    """Testes do executor paralelo do ciclo"""
+
+    @pytest.mark.asyncio
+    async def test_skills_rodam_em_paralelo(self):
+        executor = CycleExecutor({})
+        for name in ('a', 'b', 'c'):
+            executor.register(name, lambda name=name: time.sleep(0.2) or name)
+
+        started = time.monotonic()
+        results = await executor.run(['a', 'b', 'c'])
+        assert results == {'a': 'a', 'b': 'b', 'c': 'c'}
+        assert time.monotonic() - started < 0.5
+        executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_cadencia_usa_cache(self):
+        calls = []
+        executor = CycleExecutor({'cycle': {'skills': {'lenta': {'cadence': 600}}}})
+        executor.register('lenta', lambda: calls.append(1) or len(calls))
+        executor.register('rapida', lambda: calls.append(1) or len(calls), cadence=0)
+
+        first = await executor.run(['lenta', 'rapida'])
+        second = await executor.run(['lenta', 'rapida'])
+        assert second['lenta'] == first['lenta']
+        assert len(calls) == 3
+        assert executor.get_timings()['lenta']['status'] == 'cached'
+        executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_timeout_nao_redispara_e_guarda_resultado(self):
+        release = threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            release.wait(2)
+            return 'pronto'
+
+        executor = CycleExecutor({})
+        executor.register('pesada', slow, cadence=0, timeout=0.05, group='heavy')
+
+        results = await executor.run(['pesada'])
+        assert 'error' in results['pesada']
+        assert executor.get_timings()['pesada']['status'] == 'timeout'
+
+        # Ainda em execução: não dispara de novo
+        await executor.run(['pesada'])
+        assert len(calls) == 1
+        assert executor.get_timings()['pesada']['status'] == 'running'
+
+        release.set()
+        for _ in range(50):
+            if executor.skills['pesada'].has_result:
+                break
+            await asyncio.sleep(0.01)
+        assert executor.skills['pesada'].result == 'pronto'
+        executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_erro_da_skill(self):
+        executor = CycleExecutor({})
+        executor.register('quebrada', lambda: 1 / 0)
+
+        results = await executor.run(['quebrada'])
+        assert 'division by zero' in results['quebrada']['error']
+        assert executor.get_timings()['quebrada']['status'] == 'error'
+        executor.shutdown()
+
+
+class TestLatencyHistogram:
+    """Testes do histograma HDR do load tester"""
+
+    @pytest.fixture(autouse=True)
+    def histogram_cls(self):
+        pytest.importorskip('aiohttp')
+        from skills.load_tester import LatencyHistogram
+        self.LatencyHistogram = LatencyHistogram
+
+    def test_percentis_com_erro_relativo_pequeno(self):
+        histogram = self.LatencyHistogram()
+        for ms in range(1, 1001):
+            histogram.record(ms / 1000)
+
+        summary = histogram.summary()
+        assert summary['count'] == 1000
+        assert summary['min'] == pytest.approx(0.001)
+        assert summary['max'] == pytest.approx(1.0)
+        assert summary['p50'] == pytest.approx(0.5, rel=0.02)
+        assert summary['p99'] == pytest.approx(0.99, rel=0.02)
+        assert summary['mean'] == pytest.approx(0.5005, rel=0.001)
+
+    def test_merge(self):
+        a, b = self.LatencyHistogram(), self.LatencyHistogram()
+        for _ in range(90):
+            a.record(0.010)
+        for _ in range(10):
+            b.record(0.200)
+
+        a.merge(b)
+        assert a.total == 100
+        assert a.percentile(50) == pytest.approx(0.010, rel=0.02)
+        assert a.percentile(99) == pytest.approx(0.200, rel=0.02)
+        assert a.max_us == 200_000
+
+
+class TestOperationalMemory:
+    """Testes da memória operacional em SQLite"""
+
+    def test_aprende_e_persiste(self, state_dir):
+        memory = OperationalMemory({})
+        action = {'type': 'restart_service', 'target': 'api'}
+        context = {'cpu_high': True}
+        for _ in range(6):
+            memory.record_action(action, context, {'success': True})
+
+        prediction = memory.predict_outcome(action, context)
+        assert prediction['success_probability'] > 0.9
+        assert prediction['confidence'] == 1.0
+        assert prediction['recommended']
+
+        unknown = memory.predict_outcome({'type': 'clear_cache'}, context)
+        assert unknown['success_probability'] == 0.5
+        assert unknown['confidence'] == 0.0
+        memory.store.close()
+
+        reloaded = OperationalMemory({})
+        assert reloaded.memory['metadata']['total_actions'] == 6
+        assert reloaded.predict_outcome(action, context)['recommended']
+        reloaded.store.close()
+
+    def test_falhas_reduzem_probabilidade(self, state_dir):
+        memory = OperationalMemory({})
+        action = {'type': 'kill_process'}
+        for i in range(6):
+            memory.record_action(action, {'load': 'alta'}, {'success': i == 0})
+
+        prediction = memory.predict_outcome(action, {'load': 'alta'})
+        assert prediction['success_probability'] < 0.5
+        assert not prediction['recommended']
+        memory.store.close()
+
+
+class TestLogAnalyzer:
+    """Testes da leitura incremental de logs"""
+
+    def test_numeros_de_linha_do_arquivo(self, tmp_path):
+        log = tmp_path / 'app.log'
+        log.write_text(''.join(f'INFO linha {i}\n' for i in range(1, 11)) + 'ERROR falha antiga\n')
+
+        analyzer = LogAnalyzer({}, state_dir=str(tmp_path))
+        first = analyzer.analyze_log_file(str(log), lines=3)
+        assert [e['line'] for e in first['errors']] == [11]
+
+        with open(log, 'a') as f:
+            f.write('INFO ok\nERROR falha nova\nERROR parcial')
+        second = analyzer.analyze_log_file(str(log))
+        assert [e['line'] for e in second['errors']] == [13]
+
+        # A linha parcial é lida quando completada
+        with open(log, 'a') as f:
+            f.write('\n')
+        third = analyzer.analyze_log_file(str(log))
+        assert [e['line'] for e in third['errors']] == [14]
+
+    def test_checkpoint_persistido(self, tmp_path):
+        log = tmp_path / 'app.log'
+        log.write_text('INFO a\nINFO b\n')
+
+        analyzer = LogAnalyzer({}, state_dir=str(tmp_path))
+        analyzer.analyze_log_file(str(log))
+        analyzer.save_checkpoints()
+
+        with open(log, 'a') as f:
+            f.write('ERROR depois do reinicio\n')
+        restarted = LogAnalyzer({}, state_dir=str(tmp_path))
+        result = restarted.analyze_log_file(str(log))
+        assert [e['line'] for e in result['errors']] == [3]
+
+    def test_grupos_do_regex_combinado(self, tmp_path):
+        log = tmp_path / 'app.log'
+        log.write_text(
+            'INFO ok\n'
+            'Error: ECONNRESET ao chamar API\n'
+            'WARN porta 8000 in use\n'
+            'ECONNRESET de novo, warning\n'
+        )
+        config = {'monitoring': {'logs': [{'patterns': ['ECONNRESET', r'port[a]? \d+']}]}}
+
+        analyzer = LogAnalyzer(config, state_dir=str(tmp_path))
+        result = analyzer.analyze_log_file(str(log), incremental=False)
+
+        assert [e['line'] for e in result['errors']] == [2]
+        assert [w['line'] for w in result['warnings']] == [3, 4]
+        assert dict(result['patterns']) == {'ECONNRESET': 2, r'port[a]? \d+': 1}